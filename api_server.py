@@ -1,32 +1,52 @@
-from flask import Flask, request, jsonify
+from flask import Flask, Response, g, request, jsonify
 from core import nlu_processor
 from core import intent_handler
+from core import conversation
+from core.conversation import MAX_BATCH_SIZE, answer_query
+from utils import knowledge_base
+from utils import log
+from utils import metrics
 from config import settings
+import time
 import uuid # To generate session IDs if client doesn't send one for the first time
 
 app = Flask(__name__)
-
-# In-memory store for user session contexts
-# In a production app, you'd use something more robust like Redis, a database, or Flask-Session
-user_sessions = {}
-
-def get_session_context(session_id):
-    """Initializes or retrieves session context."""
-    if session_id not in user_sessions:
-        user_sessions[session_id] = {
-            "awaiting_weather_location": False,
-            "awaiting_mandi_info": False,
-            "pending_mandi_entities": {}
-            # Add any other context flags you might need in the future
-        }
-    return user_sessions[session_id]
-
-def reset_mandi_context(context):
-    context["awaiting_mandi_info"] = False
-    context["pending_mandi_entities"] = {}
-
-def reset_weather_context(context):
-    context["awaiting_weather_location"] = False
+logger = log.get_logger(__name__)
+
+# Sessions and turns are handled in core/conversation.py. Importing this module starts nothing: the
+# worker startup (logging, the shared knowledge base and its file watcher) runs in create_app().
+
+def create_app():
+    """
+    The Flask app, after the worker startup work (conversation.prepare_worker). WSGI servers load it
+    through this factory, e.g. gunicorn --preload "api_server:create_app()" (the knowledge base is then
+    built once in the master and shared by the forked workers).
+    """
+    conversation.prepare_worker()
+    return app
+
+@app.before_request
+def _start_request():
+    g.request_started = time.perf_counter()
+    # Every log record of this request carries its id (the client's X-Request-ID if it sent one)
+    g.request_log_context = log.request_context(request.headers.get("X-Request-ID"))
+    g.request_id = g.request_log_context.__enter__()
+
+@app.after_request
+def _finish_request(response):
+    started = g.pop("request_started", None)
+    if started is not None:
+        route = request.url_rule.rule if request.url_rule is not None else "unmatched"
+        metrics.record_request(route, request.method, response.status_code, time.perf_counter() - started)
+    if "request_id" in g:
+        response.headers["X-Request-ID"] = g.request_id
+    return response
+
+@app.teardown_request
+def _end_request_log_context(exc):
+    request_log_context = g.pop("request_log_context", None)
+    if request_log_context is not None:
+        request_log_context.__exit__(None, None, None)
 
 @app.route('/')
 def home():
@@ -50,102 +70,58 @@ def ask_krishi_mitra_contextual():
         session_id = str(uuid.uuid4()) 
         # return jsonify({"error": "No session_id provided"}), 400 # Or handle as new session
 
-    # Get or initialize context for this session
-    session_context = get_session_context(session_id)
-
-    if settings.DEBUG_MODE:
-        print(f"\nAPI Server - Session ID: {session_id}")
-        print(f"API Server - Received query: {user_query_text}")
-        print(f"API Server - Context BEFORE processing: {session_context}")
-
-    bot_response_text = ""
-    nlu_result_for_handler = {}
-
-    # 1. Check for Exit Commands (clears context)
-    exit_commands = ["धन्यवाद", "बाय", "बाय बाय", "स्टॉप", "बंद करो"]
-    if any(command in user_query_text.lower() for command in exit_commands):
-        bot_response_text = "आपकी सहायता करके खुशी हुई। फिर मिलेंगे!"
-        reset_weather_context(session_context)
-        reset_mandi_context(session_context)
-        # Optionally, you could remove the session from user_sessions here if it's truly the end.
-        # if session_id in user_sessions:
-        #     del user_sessions[session_id]
-    
-    # 2. Handle Weather Location Context
-    elif session_context["awaiting_weather_location"]:
-        if settings.DEBUG_MODE: print(f"API Server - Handling as weather location follow-up: {user_query_text}")
-        nlu_result_for_handler = {"intent": "get_weather", "entities": {"location": user_query_text}}
-        bot_response_text = intent_handler.handle_intent(nlu_result_for_handler)
-        reset_weather_context(session_context)
-            
-    # 3. Handle Mandi Price Context
-    elif session_context["awaiting_mandi_info"]:
-        if settings.DEBUG_MODE: print(f"API Server - Handling as Mandi info follow-up: {user_query_text}")
-        potential_entity_text = user_query_text.strip()
-        current_pending_entities = session_context["pending_mandi_entities"].copy()
-
-        if not current_pending_entities.get("crop_name") and not current_pending_entities.get("mandi_location"):
-            is_known_crop = any(c.lower() == potential_entity_text.lower() for c in nlu_processor.KNOWN_CROPS)
-            is_known_mandi_core = any(m.lower() == potential_entity_text.lower() for m in nlu_processor.KNOWN_MANDI_CORE_LOCATIONS)
-            if is_known_mandi_core:
-                for i, core_loc_name in enumerate(nlu_processor.KNOWN_MANDI_CORE_LOCATIONS):
-                    if core_loc_name.lower() == potential_entity_text.lower(): current_pending_entities["mandi_location"] = nlu_processor.KNOWN_MANDIS[i]; break
-            elif is_known_crop: current_pending_entities["crop_name"] = potential_entity_text
-            else: current_pending_entities["crop_name"] = potential_entity_text
-        elif not current_pending_entities.get("crop_name"): current_pending_entities["crop_name"] = potential_entity_text
-        elif not current_pending_entities.get("mandi_location"):
-            found_mandi = False
-            for i, core_loc_name in enumerate(nlu_processor.KNOWN_MANDI_CORE_LOCATIONS):
-                if core_loc_name.lower() in potential_entity_text.lower(): current_pending_entities["mandi_location"] = nlu_processor.KNOWN_MANDIS[i]; found_mandi = True; break
-            if not found_mandi: current_pending_entities["mandi_location"] = potential_entity_text
-        
-        nlu_result_for_handler = {"intent": "get_mandi_price", "entities": current_pending_entities}
-        bot_response_text = intent_handler.handle_intent(nlu_result_for_handler)
-        
-        still_awaiting_mandi = False
-        if ("किस फसल का" in bot_response_text and "किस मंडी में" in bot_response_text) or \
-           (current_pending_entities.get("mandi_location") and not current_pending_entities.get("crop_name") and "किस फसल का" in bot_response_text) or \
-           (current_pending_entities.get("crop_name") and not current_pending_entities.get("mandi_location") and ("किस मंडी के बारे में" in bot_response_text or "किस मंडी में" in bot_response_text)):
-            still_awaiting_mandi = True
-            session_context["pending_mandi_entities"] = current_pending_entities # Persist for next turn
-        
-        if still_awaiting_mandi: session_context["awaiting_mandi_info"] = True
-        else: reset_mandi_context(session_context)
-            
-    else:
-        # 4. Normal NLU processing
-        nlu_result = nlu_processor.process_query_rule_based(user_query_text)
-        if settings.DEBUG_MODE: print(f"API Server - NLU Result: {nlu_result}")
-        nlu_result_for_handler = nlu_result
-        bot_response_text = intent_handler.handle_intent(nlu_result)
-
-        # --- Set context flags based on bot's response from NORMAL NLU path ---
-        reset_weather_context(session_context) # Default reset
-        if bot_response_text == "आप किस जगह के मौसम के बारे में जानना चाहते हैं?":
-            session_context["awaiting_weather_location"] = True
-        
-        reset_mandi_context(session_context) # Default reset
-        if nlu_result_for_handler.get("intent") == "get_mandi_price":
-            is_asking_for_both = "आप किस फसल का और किस मंडी में भाव जानना चाहते हैं?" == bot_response_text
-            is_asking_for_crop = nlu_result_for_handler.get("entities",{}).get('mandi_location') and "किस फसल का भाव जानना चाहते हैं" in bot_response_text
-            is_asking_for_mandi = nlu_result_for_handler.get("entities",{}).get('crop_name') and ("किस मंडी के बारे में पूछ रहे हैं" in bot_response_text or "किस मंडी में भाव जानना चाहते हैं" in bot_response_text)
-            if is_asking_for_both or is_asking_for_crop or is_asking_for_mandi:
-                session_context["awaiting_mandi_info"] = True
-                session_context["pending_mandi_entities"] = nlu_result_for_handler.get("entities", {}).copy()
-
-    if settings.DEBUG_MODE:
-        print(f"API Server - Bot Response: {bot_response_text}")
-        print(f"API Server - Context AFTER processing: {session_context}")
-    
+    return jsonify(answer_query(session_id, user_query_text))
+
+@app.route('/ask/batch', methods=['POST'])
+def ask_krishi_mitra_batch():
+    """
+    Answers a burst of queries in one request.
+    Body: a JSON array of {"session_id", "query"} objects, or {"queries": [...]}.
+    Results come back in the same order; an invalid item gets an "error" entry instead of failing the batch.
+    Items for the same session are processed in order, so follow-up turns work inside a batch.
+    """
+    if not request.is_json:
+        return jsonify({"error": "Request must be JSON"}), 400
+
+    data = request.get_json()
+    items = data.get('queries') if isinstance(data, dict) else data
+    if not isinstance(items, list):
+        return jsonify({"error": "Request must be a JSON array of {session_id, query} objects"}), 400
+    if len(items) > MAX_BATCH_SIZE:
+        return jsonify({"error": f"Batch too large (max {MAX_BATCH_SIZE} queries)"}), 400
+
+    queries = [item.get('query') if isinstance(item, dict) else None for item in items]
+    # NLU is stateless, so run it for the whole batch up front and prefetch every weather location it found
+    nlu_results = nlu_processor.process_queries_batch([q or "" for q in queries])
+    weather_cache = intent_handler.prefetch_weather(
+        r["entities"].get("location") for r in nlu_results if r["intent"] == "get_weather"
+    )
+
+    results = []
+    for item, user_query_text, nlu_result in zip(items, queries, nlu_results):
+        if not user_query_text:
+            results.append({"error": "No query provided"})
+            continue
+        session_id = item.get('session_id') or str(uuid.uuid4())
+        results.append(answer_query(session_id, user_query_text, nlu_result=nlu_result, weather_cache=weather_cache))
+
+    return jsonify({"results": results})
+
+@app.route('/admin/reload', methods=['POST'])
+def admin_reload_knowledge_base():
+    """Reloads the knowledge base files now, instead of waiting for the file watcher."""
+    if not conversation.admin_token_accepted(request.headers.get('X-Admin-Token')):
+        return jsonify({"error": "Forbidden"}), 403
+    reloaded = knowledge_base.reload_knowledge_base(force=True)
     return jsonify({
-        "session_id": session_id, # Return session_id so client can use it for next request
-        "user_query": user_query_text,
-        "nlu_intent": nlu_result_for_handler.get("intent"),
-        "nlu_entities": nlu_result_for_handler.get("entities"),
-        "bot_response": bot_response_text,
-        "awaiting_weather_location": session_context["awaiting_weather_location"], # Optionally send context state back
-        "awaiting_mandi_info": session_context["awaiting_mandi_info"]
-    })
+        "reloaded": reloaded,
+        "generation": knowledge_base.get_knowledge_base().generation,
+    }), (200 if reloaded else 500)
+
+@app.route('/metrics', methods=['GET'])
+def prometheus_metrics():
+    """Request, stage, intent and weather upstream latency histograms plus cache, session and reload counters (Prometheus text format)."""
+    return Response(metrics.render_metrics(), content_type=metrics.CONTENT_TYPE)
 
 if __name__ == '__main__':
-    app.run(host='0.0.0.0', port=5000, debug=settings.DEBUG_MODE)
\ No newline at end of file
+    create_app().run(host='0.0.0.0', port=5000, debug=settings.DEBUG_MODE)
\ No newline at end of file
@@ -1,18 +1,15 @@
 import streamlit as st
 from core import voice_input
 from core import voice_output
-from core import nlu_processor 
 from core import intent_handler
+from core import dialogue_manager
 from config import settings
+from utils import log
 import os
 import time
 
-# --- Helper Function for TTS Cleaning ---
-def clean_text_for_speech(text):
-    """Removes common Markdown for better TTS."""
-    if not text:
-        return ""
-    return text.replace("**", "").replace("*", "")
+logger = log.get_logger(__name__)
+log.configure_logging() # Streamlit re-runs this script on every interaction; only the first call sets up logging
 
 # --- Page Configuration ---
 st.set_page_config(
@@ -30,15 +27,12 @@ if "messages" not in st.session_state:
     initial_greeting_text = intent_handler.handle_intent({"intent": "get_help", "entities": {}})
     st.session_state.messages = [{"role": "assistant", "content": initial_greeting_text, "show_feedback": False}]
     if "greeted" not in st.session_state: 
-        voice_output.speak_hindi(clean_text_for_speech(initial_greeting_text))
+        voice_output.speak_hindi(voice_output.clean_text_for_speech(initial_greeting_text))
         st.session_state.greeted = True
 
-if "awaiting_weather_location" not in st.session_state:
-    st.session_state.awaiting_weather_location = False
-if "awaiting_mandi_info" not in st.session_state:
-    st.session_state.awaiting_mandi_info = False
-if "pending_mandi_entities" not in st.session_state:
-    st.session_state.pending_mandi_entities = {}
+dialogue = dialogue_manager.get_dialogue_engine()
+if "dialogue_context" not in st.session_state: # Open follow-up question, if any (see core/dialogue_manager.py)
+    st.session_state.dialogue_context = dialogue.new_context()
 
 # --- Display chat messages ---
 for i, message in enumerate(st.session_state.messages):
@@ -63,77 +57,18 @@ def process_and_respond(user_query_text):
         st.markdown(user_query_text)
     st.session_state.messages.append({"role": "user", "content": user_query_text, "show_feedback": False})
 
-    bot_response_text = ""
-    nlu_result_for_handler = {} 
-
-    exit_commands = ["धन्यवाद", "बाय", "बाय बाय", "स्टॉप", "बंद करो"]
-    if any(command in user_query_text.lower() for command in exit_commands):
-        bot_response_text = "आपकी सहायता करके खुशी हुई। फिर मिलेंगे!"
-        st.session_state.awaiting_weather_location = False
-        st.session_state.awaiting_mandi_info = False
-        st.session_state.pending_mandi_entities = {}
-    elif st.session_state.awaiting_weather_location:
-        if settings.DEBUG_MODE: print(f"Streamlit App - Handling as weather location follow-up: {user_query_text}")
-        nlu_result_for_handler = {"intent": "get_weather", "entities": {"location": user_query_text}}
-        bot_response_text = intent_handler.handle_intent(nlu_result_for_handler)
-        st.session_state.awaiting_weather_location = False
-    elif st.session_state.awaiting_mandi_info:
-        if settings.DEBUG_MODE: print(f"Streamlit App - Handling as Mandi info follow-up: {user_query_text}")
-        potential_entity_text = user_query_text.strip()
-        current_pending_entities = st.session_state.pending_mandi_entities.copy()
-        if not current_pending_entities.get("crop_name") and not current_pending_entities.get("mandi_location"):
-            is_known_crop = any(crop.lower() == potential_entity_text.lower() for crop in nlu_processor.KNOWN_CROPS)
-            is_known_mandi_core = False; temp_mandi_full_name = None
-            for i, core_loc_name in enumerate(nlu_processor.KNOWN_MANDI_CORE_LOCATIONS):
-                if core_loc_name.lower() == potential_entity_text.lower(): is_known_mandi_core = True; temp_mandi_full_name = nlu_processor.KNOWN_MANDIS[i]; break
-            if is_known_mandi_core: current_pending_entities["mandi_location"] = temp_mandi_full_name
-            elif is_known_crop: current_pending_entities["crop_name"] = potential_entity_text
-            else: current_pending_entities["crop_name"] = potential_entity_text
-        elif not current_pending_entities.get("crop_name"): current_pending_entities["crop_name"] = potential_entity_text
-        elif not current_pending_entities.get("mandi_location"):
-            found_mandi = False
-            for i, core_loc_name in enumerate(nlu_processor.KNOWN_MANDI_CORE_LOCATIONS):
-                if core_loc_name.lower() in potential_entity_text.lower(): current_pending_entities["mandi_location"] = nlu_processor.KNOWN_MANDIS[i]; found_mandi = True; break
-            if not found_mandi: current_pending_entities["mandi_location"] = potential_entity_text
-        nlu_result_for_handler = {"intent": "get_mandi_price", "entities": current_pending_entities}
-        bot_response_text = intent_handler.handle_intent(nlu_result_for_handler)
-        still_awaiting_mandi = False
-        if ("किस फसल का" in bot_response_text and "किस मंडी में" in bot_response_text) or \
-           (current_pending_entities.get("mandi_location") and not current_pending_entities.get("crop_name") and "किस फसल का" in bot_response_text) or \
-           (current_pending_entities.get("crop_name") and not current_pending_entities.get("mandi_location") and ("किस मंडी के बारे में" in bot_response_text or "किस मंडी में" in bot_response_text)):
-            still_awaiting_mandi = True
-            st.session_state.pending_mandi_entities = current_pending_entities
-        if still_awaiting_mandi: st.session_state.awaiting_mandi_info = True
-        else: st.session_state.awaiting_mandi_info = False; st.session_state.pending_mandi_entities = {}
-    else:
-        nlu_result = nlu_processor.process_query_rule_based(user_query_text)
-        if settings.DEBUG_MODE: print(f"Streamlit App - NLU Result: {nlu_result}")
-        nlu_result_for_handler = nlu_result
-        bot_response_text = intent_handler.handle_intent(nlu_result)
-        st.session_state.awaiting_weather_location = False # Default reset
-        if bot_response_text == "आप किस जगह के मौसम के बारे में जानना चाहते हैं?": st.session_state.awaiting_weather_location = True
-        
-        st.session_state.awaiting_mandi_info = False # Default reset
-        st.session_state.pending_mandi_entities = {}
-        if nlu_result_for_handler.get("intent") == "get_mandi_price":
-            is_asking_for_both = "आप किस फसल का और किस मंडी में भाव जानना चाहते हैं?" == bot_response_text
-            mandi_in_entities = nlu_result_for_handler.get("entities",{}).get('mandi_location')
-            is_asking_for_crop = mandi_in_entities and f"आप {mandi_in_entities} में किस फसल का भाव जानना चाहते हैं?" == bot_response_text
-            crop_in_entities = nlu_result_for_handler.get("entities",{}).get('crop_name')
-            ask_for_mandi_template_part = "आप किस मंडी के बारे में पूछ रहे हैं?"
-            is_asking_for_mandi = crop_in_entities and ask_for_mandi_template_part in bot_response_text
-            if is_asking_for_both or is_asking_for_crop or is_asking_for_mandi:
-                st.session_state.awaiting_mandi_info = True
-                st.session_state.pending_mandi_entities = nlu_result_for_handler.get("entities", {}).copy()
+    turn = dialogue.handle_turn(st.session_state.dialogue_context, user_query_text)
+    logger.debug("NLU Result: %s, awaiting: %s", turn.nlu_result, turn.awaiting)
+    bot_response_text = turn.text
 
     with st.chat_message("assistant"):
         st.markdown(bot_response_text) # Display with Markdown
     
-    cleaned_bot_response_for_speech = clean_text_for_speech(bot_response_text)
+    cleaned_bot_response_for_speech = voice_output.clean_text_for_speech(bot_response_text)
     voice_output.speak_hindi(cleaned_bot_response_for_speech)
     st.session_state.messages.append({"role": "assistant", "content": bot_response_text, "show_feedback": True})
 
-    if "आपकी सहायता करके खुशी हुई।" in bot_response_text:
+    if turn.ended:
          st.info("बातचीत समाप्त हो गई है। आप टैब बंद कर सकते हैं।")
 
 text_prompt = st.chat_input("अपना सवाल यहाँ लिखें...")
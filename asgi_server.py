@@ -0,0 +1,238 @@
+"""
+Asyncio serving mode for the api_server.py API (same routes, request and response JSON).
+
+    uvicorn asgi_server:app --host 0.0.0.0 --port 5000
+    uvicorn asgi_server:app --host 0.0.0.0 --port 5000 --workers 4   # one event loop per worker process
+
+Weather questions wait on the upstream through the async weather client (utils/async_api_clients.py),
+so a slow OpenWeatherMap holds no thread and one process keeps thousands of requests in flight.
+The NLU, intent handlers and the in-memory session store are CPU work on in-memory data taking
+microseconds, so they run inline on the loop. Blocking I/O goes to the default executor instead: knowledge
+base reloads (file reads), the session store when SESSION_STORE_BACKEND is "sqlite" (a read and a committed
+write per turn), and the price trend handler when MANDI_PRICE_BACKEND is "sqlite".
+Sessions and the response payloads come from core/conversation.py, shared with api_server.py, so both modes
+share the session settings and behaviour; this module does not import Flask.
+"""
+import asyncio
+import json
+import time
+import uuid
+from contextlib import asynccontextmanager
+
+from core import conversation
+from core import nlu_processor
+from core import intent_handler
+from utils import async_api_clients
+from utils import knowledge_base
+from utils import log
+from utils import metrics
+from config import settings
+
+MAX_REQUEST_BODY_BYTES = 1024 * 1024 # Larger bodies are refused with 413
+
+dialogue = conversation.dialogue
+logger = log.get_logger(__name__)
+
+# session_id -> [asyncio.Lock, number of requests holding or waiting for it]
+_session_locks = {}
+
+@asynccontextmanager
+async def _session_lock(session_id):
+    """Serialises turns of one session (read context, await the answer, save context); other sessions run concurrently."""
+    entry = _session_locks.get(session_id)
+    if entry is None:
+        entry = _session_locks[session_id] = [asyncio.Lock(), 0]
+    entry[1] += 1
+    try:
+        async with entry[0]:
+            yield
+    finally:
+        entry[1] -= 1
+        if not entry[1]:
+            del _session_locks[session_id]
+
+async def _session_io(func, *args):
+    """Runs a session store call inline for the in-memory store, or on the default executor for one doing disk I/O."""
+    if conversation.user_sessions.name == "memory":
+        return func(*args)
+    return await asyncio.to_thread(func, *args) # Keeps the request id for log records
+
+async def answer_query(session_id, user_query_text, nlu_result=None, weather_cache=None):
+    """Async conversation.answer_query: runs one conversational turn for a session and returns the response payload."""
+    async with _session_lock(session_id):
+        session_context = await _session_io(conversation.get_session_context, session_id)
+        logger.debug("Received query %r, context before: %s", user_query_text, session_context, extra={"session_id": session_id})
+        turn = await dialogue.handle_turn_async(session_context, user_query_text,
+                                                nlu_result=nlu_result, weather_cache=weather_cache)
+        logger.debug("Bot response %r, context after: %s", turn.text, session_context, extra={"session_id": session_id})
+        await _session_io(conversation.save_session_context, session_id, session_context)
+    return conversation.turn_payload(session_id, user_query_text, turn, session_context)
+
+# --- Routes ---
+# Each takes (scope, parsed JSON body or None) and returns (status, payload) or (status, payload, content type);
+# a str payload is sent as text.
+
+async def home(scope, data):
+    return 200, "कृषि मित्र AI - API is running with context handling! (asyncio mode)"
+
+async def ask(scope, data):
+    if not isinstance(data, dict):
+        return 400, {"error": "Request must be JSON"}
+    user_query_text = data.get('query')
+    if not user_query_text:
+        return 400, {"error": "No query provided"}
+    session_id = data.get('session_id') or str(uuid.uuid4())
+    return 200, await answer_query(session_id, user_query_text)
+
+async def ask_batch(scope, data):
+    """Same as POST /ask/batch of api_server.py. Sessions are answered concurrently, each session's items in order."""
+    items = data.get('queries') if isinstance(data, dict) else data
+    if not isinstance(items, list):
+        return 400, {"error": "Request must be a JSON array of {session_id, query} objects"}
+    if len(items) > conversation.MAX_BATCH_SIZE:
+        return 400, {"error": f"Batch too large (max {conversation.MAX_BATCH_SIZE} queries)"}
+
+    queries = [item.get('query') if isinstance(item, dict) else None for item in items]
+    nlu_results = nlu_processor.process_queries_batch([q or "" for q in queries])
+    weather_cache = await intent_handler.prefetch_weather_async(
+        r["entities"].get("location") for r in nlu_results if r["intent"] == "get_weather"
+    )
+
+    results = [None] * len(items)
+    positions_by_session = {} # session_id -> positions of its items, in order
+    for position, (item, user_query_text) in enumerate(zip(items, queries)):
+        if not user_query_text:
+            results[position] = {"error": "No query provided"}
+            continue
+        session_id = item.get('session_id') or str(uuid.uuid4())
+        positions_by_session.setdefault(session_id, []).append(position)
+
+    async def answer_session(session_id, positions):
+        for position in positions:
+            results[position] = await answer_query(session_id, queries[position],
+                                                   nlu_result=nlu_results[position], weather_cache=weather_cache)
+
+    await asyncio.gather(*(answer_session(s, p) for s, p in positions_by_session.items()))
+    return 200, {"results": results}
+
+async def admin_reload(scope, data):
+    if not conversation.admin_token_accepted(_header(scope, b"x-admin-token")):
+        return 403, {"error": "Forbidden"}
+    loop = asyncio.get_running_loop()
+    reloaded = await loop.run_in_executor(None, lambda: knowledge_base.reload_knowledge_base(force=True))
+    return (200 if reloaded else 500), {
+        "reloaded": reloaded,
+        "generation": knowledge_base.get_knowledge_base().generation,
+    }
+
+async def prometheus_metrics(scope, data):
+    """Same as GET /metrics of api_server.py (this process's numbers, including the async weather cache)."""
+    return 200, metrics.render_metrics(), metrics.CONTENT_TYPE
+
+# (method, path) -> (route, whether it takes a JSON body)
+ROUTES = {
+    ("GET", "/"): (home, False),
+    ("POST", "/ask"): (ask, True),
+    ("POST", "/ask/batch"): (ask_batch, True),
+    ("POST", "/admin/reload"): (admin_reload, False),
+    ("GET", "/metrics"): (prometheus_metrics, False),
+}
+
+# --- ASGI plumbing ---
+
+class _BadRequest(Exception):
+    pass
+
+def _header(scope, name):
+    for key, value in scope.get("headers") or ():
+        if key == name:
+            return value.decode("latin-1")
+    return None
+
+async def _read_body(receive):
+    """Returns the request body (reading stops once it exceeds MAX_REQUEST_BODY_BYTES), or None if the client went away."""
+    body = bytearray()
+    while True:
+        message = await receive()
+        if message["type"] == "http.disconnect":
+            return None
+        body += message.get("body", b"")
+        if len(body) > MAX_REQUEST_BODY_BYTES or not message.get("more_body"):
+            return bytes(body)
+
+def _parse_json_body(scope, body):
+    content_type = (_header(scope, b"content-type") or "").split(";")[0].strip().lower()
+    if content_type != "application/json" and not content_type.endswith("+json"):
+        raise _BadRequest("Request must be JSON")
+    try:
+        return json.loads(body)
+    except ValueError:
+        raise _BadRequest("Request body is not valid JSON")
+
+async def _send(send, status, payload, content_type=None):
+    if isinstance(payload, str):
+        body, content_type = payload.encode("utf-8"), (content_type or "text/plain; charset=utf-8").encode("latin-1")
+    else:
+        body, content_type = json.dumps(payload, ensure_ascii=False).encode("utf-8"), b"application/json"
+    headers = [(b"content-type", content_type), (b"content-length", str(len(body)).encode())]
+    request_id = log.current_request_id()
+    if request_id:
+        headers.append((b"x-request-id", request_id.encode("latin-1")))
+    await send({"type": "http.response.start", "status": status, "headers": headers})
+    await send({"type": "http.response.body", "body": body})
+
+async def _lifespan(receive, send):
+    while True:
+        message = await receive()
+        if message["type"] == "lifespan.startup":
+            # Logging, the shared knowledge base and its file watcher, once per worker process (not at import)
+            conversation.prepare_worker()
+            await send({"type": "lifespan.startup.complete"})
+        elif message["type"] == "lifespan.shutdown":
+            await async_api_clients.aclose()
+            await send({"type": "lifespan.shutdown.complete"})
+            return
+
+async def app(scope, receive, send):
+    """The ASGI application."""
+    if scope["type"] == "lifespan":
+        await _lifespan(receive, send)
+        return
+    if scope["type"] != "http":
+        return
+
+    started = time.perf_counter()
+    route = ROUTES.get((scope["method"], scope["path"]))
+    with log.request_context(_header(scope, b"x-request-id")):
+        status = await _respond(scope, receive, send, route)
+    if status is not None:
+        metrics.record_request(scope["path"] if route is not None else "unmatched", scope["method"], status,
+                               time.perf_counter() - started)
+
+async def _respond(scope, receive, send, route):
+    """Answers one HTTP request; returns the status sent, or None if the client went away first."""
+    if route is None:
+        allowed = any(path == scope["path"] for _, path in ROUTES)
+        status = 405 if allowed else 404
+        await _send(send, status, {"error": "Method not allowed" if allowed else "Not found"})
+        return status
+    handler, takes_json = route
+
+    body = await _read_body(receive)
+    if body is None:
+        return None
+    if len(body) > MAX_REQUEST_BODY_BYTES:
+        await _send(send, 413, {"error": f"Request body too large (max {MAX_REQUEST_BODY_BYTES} bytes)"})
+        return 413
+    try:
+        data = _parse_json_body(scope, body) if takes_json else None
+    except _BadRequest as e:
+        await _send(send, 400, {"error": str(e)})
+        return 400
+    status, payload, *content_type = await handler(scope, data)
+    await _send(send, status, payload, *content_type)
+    return status
+
+if __name__ == '__main__':
+    import uvicorn
+    uvicorn.run(app, host='0.0.0.0', port=5000, log_level="debug" if settings.DEBUG_MODE else "info")
@@ -0,0 +1,20 @@
+"""
+Benchmark suite for the query pipeline.
+
+    python -m benchmarks                                     # full run, JSON results on stdout
+    python -m benchmarks --quick --output before.json        # smaller run, written to a file
+    python -m benchmarks --output after.json --compare before.json   # exit status 1 on a regression
+
+Parts (select with --only):
+    micro       process_query_rule_based per query type and handle_intent per intent (micro.py)
+    scaling     NLU and handler latency, and knowledge base build time, with the crops, mandis and
+                schemes grown synthetically 10x / 100x / 1000x (scaling.py)
+    end_to_end  /ask throughput and p50/p99 latency through the Flask test client (end_to_end.py)
+    accuracy    NLU intent/entity accuracy and queries per second on a generated, labelled corpus,
+                clean and with simulated ASR noise (accuracy.py; the generator is corpus.py)
+    startup     wall time of a fresh interpreter importing the settings, the NLU, each API server, and
+                answering a first query on a text-only ASGI worker (startup.py)
+
+The weather API is always stubbed and DEBUG_MODE is switched off while measuring.
+Results are {"meta": {...}, "results": {benchmark name: metrics}}; see harness.py for the metrics.
+"""
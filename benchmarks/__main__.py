@@ -0,0 +1,95 @@
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+from datetime import datetime, timezone
+
+from benchmarks import accuracy, compare, end_to_end, micro, scaling, startup
+from benchmarks.harness import benchmark_environment
+from config import settings
+
+PARTS = ("micro", "scaling", "end_to_end", "accuracy", "startup")
+
+# (micro/scaling iterations per benchmark, scaling factors, end-to-end requests, accuracy corpus size,
+#  fresh interpreters started per startup scenario)
+FULL_RUN = (2000, scaling.DEFAULT_FACTORS, 2000, 20000, 20)
+QUICK_RUN = (200, (10,), 200, 2000, 5)
+
+
+def _git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=settings.PROJECT_ROOT,
+                              capture_output=True, text=True, timeout=10).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def run_benchmarks(parts=PARTS, quick=False):
+    """
+    Runs the selected parts of the suite.
+    Returns:
+        dict: {"meta": {...}, "results": {benchmark name: metrics}}, ready to be written as JSON.
+    """
+    iterations, factors, requests, corpus_size, startup_runs = QUICK_RUN if quick else FULL_RUN
+    results = {}
+    with benchmark_environment():
+        if "micro" in parts:
+            results.update(micro.run(iterations))
+        if "scaling" in parts:
+            results.update(scaling.run(iterations, factors))
+        if "end_to_end" in parts:
+            results.update(end_to_end.run(requests))
+        if "accuracy" in parts:
+            results.update(accuracy.run(corpus_size))
+        if "startup" in parts:
+            results.update(startup.run(startup_runs))
+    meta = {
+        "created_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "git_commit": _git_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "quick": quick,
+        "parts": list(parts),
+    }
+    return {"meta": meta, "results": results}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m benchmarks", description="Benchmark the query pipeline")
+    parser.add_argument("--quick", action="store_true", help="Fewer iterations, scaling only to 10x")
+    parser.add_argument("--only", default=",".join(PARTS), help=f"Comma-separated parts to run (default: {','.join(PARTS)})")
+    parser.add_argument("--output", help="Write the JSON results here instead of stdout")
+    parser.add_argument("--compare", metavar="BASELINE", help="Compare with an earlier results file; exit 1 on a regression")
+    parser.add_argument("--threshold", type=float, default=compare.DEFAULT_THRESHOLD,
+                        help="Relative slowdown counted as a regression (default: %(default)s)")
+    args = parser.parse_args(argv)
+
+    parts = [part.strip() for part in args.only.split(",") if part.strip()]
+    unknown = [part for part in parts if part not in PARTS]
+    if unknown:
+        parser.error(f"unknown parts {unknown} (expected some of {list(PARTS)})")
+
+    document = run_benchmarks(parts, quick=args.quick)
+    text = json.dumps(document, ensure_ascii=False, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            rows = compare.compare(json.load(f), document, threshold=args.threshold)
+        print(compare.format_comparison(rows), file=sys.stderr)
+        regressions = [row["name"] for row in rows if row["regressed"]]
+        if regressions:
+            print(f"{len(regressions)} benchmark(s) regressed: {', '.join(regressions)}", file=sys.stderr)
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
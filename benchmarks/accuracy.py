@@ -0,0 +1,25 @@
+from benchmarks import corpus
+
+CORPUS_SEED = 0
+ASR_NOISE_SHARE = 1.0 # Every query of the noisy corpus carries simulated ASR errors
+
+
+def run(count):
+    """
+    Scores the NLU on `count` generated queries, clean and with ASR noise (same seed every run).
+    Returns:
+        dict: "accuracy.clean", "accuracy.asr_noise" -> {"n", "intent_accuracy", "entity_accuracy", "throughput_rps"}
+              where throughput_rps is NLU queries per second.
+    """
+    results = {}
+    generator = corpus.QueryGenerator()
+    for name, noise in (("clean", 0.0), ("asr_noise", ASR_NOISE_SHARE)):
+        scores = corpus.evaluate(list(generator.generate(count, seed=CORPUS_SEED, noise=noise)))
+        results[f"accuracy.{name}"] = {
+            "n": scores["n"],
+            "intent_accuracy": scores["intent_accuracy"],
+            "entity_accuracy": scores["entity_accuracy"],
+            "throughput_rps": round(scores["n"] / scores["nlu_seconds"], 1),
+            "top_confusions": scores["top_confusions"],
+        }
+    return results
@@ -0,0 +1,50 @@
+DEFAULT_THRESHOLD = 0.25 # A benchmark regressed if it got more than 25% worse...
+MIN_DELTA_US = 2.0 # ...and more than this many microseconds slower (sub-microsecond timings are mostly noise)
+ACCURACY_TOLERANCE = 0.001 # Accuracy regressed if it dropped by more than this (absolute; the corpus is seeded)
+ACCURACY_METRICS = ("intent_accuracy", "entity_accuracy")
+
+
+def compare(baseline, current, threshold=DEFAULT_THRESHOLD, min_delta_us=MIN_DELTA_US):
+    """
+    Compares two result documents benchmark by benchmark: p50 latency (lower is better) or, where present,
+    throughput_rps (higher is better), plus accuracy (higher is better) for the accuracy benchmarks.
+    Benchmarks missing from either side are skipped.
+    Args:
+        baseline (dict), current (dict): Documents written by `python -m benchmarks`.
+    Returns:
+        list: One dict per compared metric, {"name", "metric", "baseline", "current", "change", "regressed"}, where
+              change is the relative change (positive = slower / fewer requests per second) or, for accuracy,
+              the absolute drop.
+    """
+    rows = []
+    baseline_results, current_results = baseline.get("results", {}), current.get("results", {})
+    for name in sorted(set(baseline_results) & set(current_results)):
+        before, after = baseline_results[name], current_results[name]
+        for metric in ACCURACY_METRICS:
+            if before.get(metric) is not None and after.get(metric) is not None:
+                drop = before[metric] - after[metric]
+                rows.append({"name": name, "metric": metric, "baseline": before[metric], "current": after[metric],
+                             "change": round(drop, 6), "regressed": drop > ACCURACY_TOLERANCE})
+        if before.get("throughput_rps") and after.get("throughput_rps"):
+            metric, old, new = "throughput_rps", before["throughput_rps"], after["throughput_rps"]
+            change = (old - new) / old
+            regressed = change > threshold
+        elif before.get("p50") and after.get("p50") is not None:
+            metric, old, new = "p50", before["p50"], after["p50"]
+            change = (new - old) / old
+            regressed = change > threshold and new - old > min_delta_us
+        else:
+            continue
+        rows.append({"name": name, "metric": metric, "baseline": old, "current": new,
+                     "change": round(change, 4), "regressed": regressed})
+    return rows
+
+
+def format_comparison(rows):
+    """Human-readable table of compare() rows, regressions marked with '!'."""
+    lines = [f"{'benchmark':<48} {'metric':<15} {'baseline':>12} {'current':>12} {'change':>8}"]
+    for row in rows:
+        precision = 4 if row["metric"] in ACCURACY_METRICS else 1
+        lines.append(f"{row['name']:<48} {row['metric']:<15} {row['baseline']:>12.{precision}f} {row['current']:>12.{precision}f} "
+                     f"{row['change'] * 100:>+7.1f}%{' !' if row['regressed'] else ''}")
+    return "\n".join(lines)
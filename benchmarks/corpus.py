@@ -0,0 +1,375 @@
+"""
+Synthetic, labelled Hindi query corpus built from the knowledge base, KNOWN_LOCATIONS_FOR_WEATHER and the
+NLU keyword lists, for load tests and for checking that NLU changes keep intent accuracy.
+
+    python -m benchmarks.corpus --count 1000000 --output corpus.jsonl
+    python -m benchmarks.corpus --count 20 --noise 0.5 --seed 7
+    python -m benchmarks.corpus --evaluate corpus.jsonl        # accuracy of the current NLU on a corpus
+
+One JSON object per line:
+    {"id": 0, "query": "...", "intent": "get_mandi_price", "entities": {"crop_name": "गेहूं"},
+     "template": "get_mandi_price/crop_only/1", "noise": ["vowel_length"]}
+intent and entities are what the query means, in the NLU's result shape. They are not what the NLU
+answers, so the corpus measures the NLU. Queries are generated lazily from a seeded random stream:
+the same seed, count and knowledge base always give the same corpus.
+"""
+import argparse
+import json
+import random
+import sys
+import time
+from collections import Counter
+
+from core import nlu_processor as nlu
+from config import settings
+from utils import knowledge_base
+
+# Polite openers and closers ASR transcripts typically carry around the actual question
+PREFIXES = ["", "", "", "भाई ", "कृपया ", "जी ", "अरे ", "मुझे बताइए "]
+SUFFIXES = ["", "", "?", "।", " जी", " भाई"]
+
+CHIT_CHAT = [
+    "नमस्ते", "आप कौन हो", "आज कौन सा दिन है", "एक चुटकुला सुनाओ", "क्रिकेट का स्कोर बताओ",
+    "मेरा नाम रमेश है", "शुभ प्रभात", "ट्रेन कब आएगी", "गाना बजाओ", "तुम्हारा नाम क्या रखा है",
+]
+GENERIC_SCHEME_WORDS = ["योजना", "योजनाएं", "स्कीम", "सब्सिडी", "सरकारी योजना", "सरकारी मदद", "लोन", "ऋण"]
+FILTER_PLACES = {"jharkhand": ["झारखंड"], "all_india": ["केंद्र", "भारत", "अखिल भारतीय"]}
+
+# Crop questions per intent: (nlu_processor keyword list that fills {kw}, templates). Template ids are "<intent>/<position>".
+CROP_DETAIL_TEMPLATES = {
+    "ask_crop_sowing_time": ("SOWING_TIME_KEYWORDS", ["{crop} की खेती {kw}", "{crop} {kw}", "{crop} की बुवाई {kw}", "हम {crop} की फसल {kw}"]),
+    "ask_crop_general_info": ("GENERAL_INFO_KEYWORDS", ["{crop} {kw}", "{crop} की फसल {kw}", "मुझे {crop} {kw}"]),
+    "ask_crop_pests": ("PEST_INFO_KEYWORDS", ["{crop} {kw}", "{crop} की फसल {kw}", "{crop} में {kw} लग गया है क्या करें"]),
+    "ask_crop_fertilizers": ("FERTILIZER_KEYWORDS", ["{crop} के लिए {kw}", "{crop} में {kw}", "{crop} की फसल में {kw} बताओ"]),
+    "ask_crop_soil_type": ("SOIL_TYPE_KEYWORDS", ["{crop} के लिए {kw}", "{crop} की खेती के लिए {kw}", "{crop} {kw}"]),
+    "ask_crop_irrigation": ("IRRIGATION_KEYWORDS", ["{crop} में {kw}", "{crop} की फसल में {kw}", "{crop} {kw}"]),
+}
+WEATHER_TEMPLATES = ["{location} में {kw} कैसा है", "आज {location} का {kw}", "{location} में आज {kw}", "{kw} {location}"]
+WEATHER_NO_LOCATION_TEMPLATES = ["आज {kw} कैसा रहेगा", "{kw} बताओ", "कल {kw} कैसा होगा"]
+MANDI_TEMPLATES = {
+    "crop_and_mandi": ["{mandi} में {crop} {kw}", "{mandi_core} में {crop} {kw}", "आज {mandi} में {crop} {kw}"],
+    "crop_only": ["{crop} {kw}", "आज {crop} {kw}", "{crop} का आज क्या भाव है"],
+    "mandi_only": ["{mandi} में भाव", "{mandi} के भाव बताओ", "{mandi_core} मंडी में आज क्या भाव है"],
+}
+RANK_TEMPLATES = ["{crop} का {kw} किस मंडी में है", "{crop} {kw} कहां है", "किस मंडी में {crop} {kw} है"]
+NEAR_PRICE_TEMPLATES = ["{crop} का भाव {price} रुपये {kw} किस मंडी में है", "{price} रुपये {kw} {crop} का भाव कहां है"]
+TREND_TEMPLATES = [
+    "{crop} का भाव {window} {kw}", "{crop} के भाव में {window} {kw}", "{mandi} में {crop} का भाव {window} {kw}",
+    "{crop} का भाव {window} कैसा रहा",
+]
+SCHEME_NAMED_TEMPLATES = ["{scheme} के बारे में बताओ", "{scheme} क्या है", "{scheme} की जानकारी दो", "{scheme} के लिए आवेदन कैसे करें"]
+SCHEME_GENERIC_TEMPLATES = ["कौन सी {word} हैं", "सरकार की {word} बताओ", "{word} की जानकारी चाहिए", "{place} की {context} बताओ"]
+HELP_TEMPLATES = ["{kw}", "कृपया {kw}", "{kw} चाहिए"]
+
+# Share of the corpus per kind of question (roughly the traffic mix of the voice assistant)
+KIND_WEIGHTS = {
+    "crop_detail": 30, "weather": 18, "weather_no_location": 2, "mandi": 18, "mandi_rank": 5, "mandi_near": 2,
+    "price_trend": 5, "scheme_named": 8, "scheme_generic": 6, "help": 3, "unknown": 3,
+}
+
+# --- Simulated ASR noise ---
+# Each function takes (words, rng) and returns the new word list, or None if it does not apply to them.
+
+_VOWEL_LENGTH_PAIRS = {"ि": "ी", "ी": "ि", "ु": "ू", "ू": "ु"}
+_DEVANAGARI_SIGNS = set("ािीुूृेैोौंँः़्")
+
+def _pick_word(words, rng, condition):
+    candidates = [i for i, word in enumerate(words) if condition(word)]
+    return rng.choice(candidates) if candidates else None
+
+def _swap_chars(words, rng, table):
+    i = _pick_word(words, rng, lambda w: any(c in table for c in w))
+    if i is None:
+        return None
+    word = words[i]
+    positions = [p for p, c in enumerate(word) if c in table]
+    p = rng.choice(positions)
+    return words[:i] + [word[:p] + table[word[p]] + word[p + 1:]] + words[i + 1:]
+
+def _noise_vowel_length(words, rng):
+    return _swap_chars(words, rng, _VOWEL_LENGTH_PAIRS)
+
+def _noise_nasal(words, rng):
+    return _swap_chars(words, rng, {"ं": "ँ", "ँ": "ं"})
+
+def _noise_nukta(words, rng):
+    return _swap_chars(words, rng, {"़": ""})
+
+def _noise_merge_words(words, rng):
+    if len(words) < 2:
+        return None
+    i = rng.randrange(len(words) - 1)
+    return words[:i] + [words[i] + words[i + 1]] + words[i + 2:]
+
+def _noise_split_word(words, rng):
+    # Only split before a base letter, never between a consonant and its vowel sign or virama
+    splittable = lambda w: any(c not in _DEVANAGARI_SIGNS and w[p - 1] != "्" for p, c in enumerate(w) if p >= 2)
+    i = _pick_word(words, rng, lambda w: len(w) >= 4 and splittable(w))
+    if i is None:
+        return None
+    word = words[i]
+    p = rng.choice([p for p, c in enumerate(word) if p >= 2 and c not in _DEVANAGARI_SIGNS and word[p - 1] != "्"])
+    return words[:i] + [word[:p], word[p:]] + words[i + 1:]
+
+def _noise_filler(words, rng):
+    i = rng.randrange(len(words) + 1)
+    return words[:i] + [rng.choice(["अं", "उम्म", "मतलब", "वो"])] + words[i:]
+
+def _noise_drop_word(words, rng):
+    i = _pick_word(words, rng, lambda w: w in ("का", "की", "के", "में", "है", "आज"))
+    return None if i is None else words[:i] + words[i + 1:]
+
+ASR_NOISE = {
+    "vowel_length": _noise_vowel_length,
+    "nasal": _noise_nasal,
+    "nukta": _noise_nukta,
+    "merge_words": _noise_merge_words,
+    "split_word": _noise_split_word,
+    "filler": _noise_filler,
+    "drop_word": _noise_drop_word,
+}
+
+def add_asr_noise(query, rng, max_edits=2):
+    """
+    Distorts a query the way speech recognition tends to (no punctuation, matra and nasal confusions,
+    split or merged words, fillers, dropped postpositions).
+    Returns:
+        tuple: (noisy query, names of the edits applied)
+    """
+    words = query.replace("?", "").replace("।", "").split()
+    applied = []
+    edits = rng.randint(1, max_edits)
+    for name in rng.sample(list(ASR_NOISE), len(ASR_NOISE)):
+        if len(applied) >= edits:
+            break
+        edited = ASR_NOISE[name](words, rng)
+        if edited:
+            words = edited
+            applied.append(name)
+    return " ".join(words), applied
+
+
+class QueryGenerator:
+    """
+    Generates labelled queries from one KnowledgeBase (default: the current one).
+    Call generate() for a lazy, seeded stream of records.
+    """
+
+    def __init__(self, knowledge=None):
+        kb = knowledge or knowledge_base.get_knowledge_base()
+        self.crops = list(kb.known_crops)
+        self.mandis = list(kb.known_mandis)
+        self.mandi_cores = list(kb.known_mandi_core_locations)
+        self.locations = list(kb.weather_locations)
+        self.price_index = kb.price_index
+        self.priced_crops = [crop for crop in self.crops if self.price_index.prices_for_crop(crop)]
+
+        schemes = [scheme for scheme in (kb.schemes_data or ()) if scheme and scheme.get("name")]
+        patterns_by_scheme = [[scheme["name"].lower()] + [k.lower() for k in scheme.get("keywords", ())] for scheme in schemes]
+        # (text to put in the query, canonical name): the name itself, and each keyword that names only this
+        # scheme (no other scheme's name or keyword occurs inside it)
+        self.scheme_mentions = []
+        for index, scheme in enumerate(schemes):
+            others = [p for j, patterns in enumerate(patterns_by_scheme) if j != index for p in patterns]
+            for mention in [scheme["name"]] + list(scheme.get("keywords", ())):
+                if not any(other in mention.lower() for other in others):
+                    self.scheme_mentions.append((mention, scheme["name"]))
+
+        self._kinds = list(KIND_WEIGHTS)
+        self._kind_weights = list(KIND_WEIGHTS.values())
+
+    def generate(self, count, seed=0, noise=0.0, start_id=0):
+        """
+        Yields `count` records (see the module docstring).
+        Args:
+            seed (int): Seed of the random stream.
+            noise (float): Share of queries passed through add_asr_noise (0..1).
+            start_id (int): id of the first record.
+        """
+        rng = random.Random(seed)
+        for n in range(count):
+            kind = rng.choices(self._kinds, self._kind_weights)[0]
+            template, query, intent, entities = getattr(self, f"_{kind}")(rng)
+            query = f"{rng.choice(PREFIXES)}{query}{rng.choice(SUFFIXES)}"
+            applied = []
+            if noise and rng.random() < noise:
+                query, applied = add_asr_noise(query, rng)
+            yield {"id": start_id + n, "query": query, "intent": intent, "entities": entities,
+                   "template": template, "noise": applied}
+
+    # One method per kind: rng -> (template id, query, intent, entities)
+
+    def _crop_detail(self, rng):
+        intent = rng.choice(list(CROP_DETAIL_TEMPLATES))
+        keyword_list, templates = CROP_DETAIL_TEMPLATES[intent]
+        t = rng.randrange(len(templates))
+        crop = rng.choice(self.crops)
+        query = templates[t].format(crop=crop, kw=rng.choice(getattr(nlu, keyword_list)))
+        return f"{intent}/{t}", query, intent, {"crop_name": crop}
+
+    def _weather(self, rng):
+        t = rng.randrange(len(WEATHER_TEMPLATES))
+        location = rng.choice(self.locations)
+        query = WEATHER_TEMPLATES[t].format(location=location, kw=rng.choice(nlu.WEATHER_KEYWORDS))
+        return f"get_weather/{t}", query, "get_weather", {"location": location}
+
+    def _weather_no_location(self, rng):
+        t = rng.randrange(len(WEATHER_NO_LOCATION_TEMPLATES))
+        query = WEATHER_NO_LOCATION_TEMPLATES[t].format(kw=rng.choice(nlu.WEATHER_KEYWORDS))
+        return f"get_weather/no_location/{t}", query, "get_weather", {"location": None}
+
+    def _mandi(self, rng):
+        variant = rng.choice(list(MANDI_TEMPLATES))
+        t = rng.randrange(len(MANDI_TEMPLATES[variant]))
+        m = rng.randrange(len(self.mandis))
+        crop = rng.choice(self.crops)
+        query = MANDI_TEMPLATES[variant][t].format(mandi=self.mandis[m], mandi_core=self.mandi_cores[m], crop=crop,
+                                                   kw=rng.choice(nlu.MANDI_PRICE_KEYWORDS))
+        entities = {}
+        if variant != "mandi_only":
+            entities["crop_name"] = crop
+        if variant != "crop_only":
+            entities["mandi_location"] = self.mandis[m]
+        return f"get_mandi_price/{variant}/{t}", query, "get_mandi_price", entities
+
+    def _mandi_rank(self, rng):
+        t = rng.randrange(len(RANK_TEMPLATES))
+        rank = rng.choice(["lowest", "highest"])
+        keywords = nlu.CHEAPEST_PRICE_KEYWORDS if rank == "lowest" else nlu.COSTLIEST_PRICE_KEYWORDS
+        crop = rng.choice(self.crops)
+        query = RANK_TEMPLATES[t].format(crop=crop, kw=rng.choice(keywords))
+        return f"get_mandi_price/rank/{t}", query, "get_mandi_price", {"crop_name": crop, "price_rank": rank}
+
+    def _mandi_near(self, rng):
+        t = rng.randrange(len(NEAR_PRICE_TEMPLATES))
+        crop = rng.choice(self.priced_crops or self.crops)
+        quoted = [entry.price for entry in self.price_index.prices_for_crop(crop)] or [2000.0]
+        price = int(round(rng.choice(quoted) * rng.uniform(0.9, 1.1) / 50.0)) * 50
+        query = NEAR_PRICE_TEMPLATES[t].format(crop=crop, price=price, kw=rng.choice(nlu.NEAR_PRICE_KEYWORDS))
+        return f"get_mandi_price/near/{t}", query, "get_mandi_price", {"crop_name": crop, "target_price": float(price)}
+
+    def _price_trend(self, rng):
+        t = rng.randrange(len(TREND_TEMPLATES))
+        window_days, window = rng.choice([(7, ""), (7, rng.choice(nlu.PRICE_WINDOW_WEEK_KEYWORDS)),
+                                          (30, rng.choice(nlu.PRICE_WINDOW_MONTH_KEYWORDS))])
+        if not window and "{kw}" not in TREND_TEMPLATES[t]:
+            window = rng.choice(nlu.PRICE_WINDOW_WEEK_KEYWORDS) # A trend must be asked for somehow
+        crop = rng.choice(self.crops)
+        m = rng.randrange(len(self.mandis))
+        query = " ".join(TREND_TEMPLATES[t].format(crop=crop, mandi=self.mandis[m], window=window,
+                                                   kw=rng.choice(nlu.PRICE_TREND_KEYWORDS)).split())
+        entities = {"crop_name": crop}
+        if "{mandi}" in TREND_TEMPLATES[t]:
+            entities["mandi_location"] = self.mandis[m]
+        entities["window_days"] = window_days
+        return f"ask_price_trend/{t}", query, "ask_price_trend", entities
+
+    def _scheme_named(self, rng):
+        t = rng.randrange(len(SCHEME_NAMED_TEMPLATES))
+        mention, name = rng.choice(self.scheme_mentions)
+        query = SCHEME_NAMED_TEMPLATES[t].format(scheme=mention)
+        return f"ask_scheme_info/named/{t}", query, "ask_scheme_info", self._with_filter({"scheme_name": name}, query)
+
+    def _scheme_generic(self, rng):
+        t = rng.randrange(len(SCHEME_GENERIC_TEMPLATES))
+        place = rng.choice(FILTER_PLACES[rng.choice(list(FILTER_PLACES))])
+        query = SCHEME_GENERIC_TEMPLATES[t].format(word=rng.choice(GENERIC_SCHEME_WORDS), place=place,
+                                                   context=rng.choice(["योजनाएं", "स्कीम"]))
+        return f"ask_scheme_info/generic/{t}", query, "ask_scheme_info", self._with_filter({}, query)
+
+    @staticmethod
+    def _with_filter(entities, query):
+        """Adds the scheme category filter the query asks for: a place term together with a word for schemes."""
+        if any(term in query for term in nlu.SCHEME_FILTER_CONTEXT_TERMS):
+            for filter_name, terms in (("jharkhand", nlu.JHARKHAND_FILTER_TERMS), ("all_india", nlu.ALL_INDIA_FILTER_TERMS)):
+                if any(term in query for term in terms):
+                    return dict(entities, filter=filter_name)
+        return entities
+
+    def _help(self, rng):
+        t = rng.randrange(len(HELP_TEMPLATES))
+        return f"get_help/{t}", HELP_TEMPLATES[t].format(kw=rng.choice(nlu.HELP_KEYWORDS)), "get_help", {}
+
+    def _unknown(self, rng):
+        return "unknown/0", rng.choice(CHIT_CHAT), "unknown", {}
+
+
+def generate(count, seed=0, noise=0.0):
+    """Shortcut for QueryGenerator().generate(count, seed, noise) on the current knowledge base."""
+    return QueryGenerator().generate(count, seed=seed, noise=noise)
+
+
+def write_jsonl(records, f):
+    """Writes records to an open text file, one JSON object per line. Returns the number written."""
+    written = 0
+    for record in records:
+        f.write(json.dumps(record, ensure_ascii=False))
+        f.write("\n")
+        written += 1
+    return written
+
+
+def read_jsonl(f):
+    """Lazily reads records written by write_jsonl."""
+    for line in f:
+        if line.strip():
+            yield json.loads(line)
+
+
+def evaluate(records, process_query=None):
+    """
+    Runs the NLU over labelled records and scores it.
+    Args:
+        records (iterable): Records with "query", "intent" and "entities".
+        process_query (callable, optional): The NLU to score (default: nlu_processor.process_query_rule_based).
+    Returns:
+        dict: {"n", "intent_accuracy", "entity_accuracy" (intent and every entity right), "nlu_seconds",
+               "per_intent": {intent: {"n", "intent_accuracy"}}, "top_confusions": [[expected, got, count], ...]}
+    """
+    process_query = process_query or nlu.process_query_rule_based
+    n = intent_correct = entities_correct = 0
+    nlu_ns = 0
+    per_intent = {}
+    confusions = Counter()
+    for record in records:
+        started = time.perf_counter_ns()
+        result = process_query(record["query"])
+        nlu_ns += time.perf_counter_ns() - started
+        n += 1
+        counts = per_intent.setdefault(record["intent"], [0, 0])
+        counts[0] += 1
+        if result["intent"] == record["intent"]:
+            intent_correct += 1
+            counts[1] += 1
+            entities_correct += result["entities"] == record["entities"]
+        else:
+            confusions[(record["intent"], result["intent"])] += 1
+    return {
+        "n": n,
+        "intent_accuracy": round(intent_correct / n, 6) if n else None,
+        "entity_accuracy": round(entities_correct / n, 6) if n else None,
+        "nlu_seconds": round(nlu_ns / 1e9, 6),
+        "per_intent": {intent: {"n": c[0], "intent_accuracy": round(c[1] / c[0], 6)} for intent, c in sorted(per_intent.items())},
+        "top_confusions": [[expected, got, count] for (expected, got), count in confusions.most_common(10)],
+    }
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.corpus", description="Generate or score a labelled query corpus")
+    parser.add_argument("--count", type=int, default=10000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--noise", type=float, default=0.0, help="Share of queries with simulated ASR noise (0..1)")
+    parser.add_argument("--output", help="JSONL file to write (default: stdout)")
+    parser.add_argument("--evaluate", metavar="CORPUS", help="Score the NLU on an existing JSONL corpus instead of generating")
+    args = parser.parse_args()
+    settings.DEBUG_MODE = False
+
+    if args.evaluate:
+        with open(args.evaluate, "r", encoding="utf-8") as f:
+            print(json.dumps(evaluate(read_jsonl(f)), ensure_ascii=False, indent=2))
+    elif args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            written = write_jsonl(generate(args.count, args.seed, args.noise), f)
+        print(f"Wrote {written} queries to {args.output}", file=sys.stderr)
+    else:
+        write_jsonl(generate(args.count, args.seed, args.noise), sys.stdout)
@@ -0,0 +1,57 @@
+import random
+import time
+
+from benchmarks.harness import summarize
+from benchmarks.micro import QUERIES
+
+SESSIONS = 100 # Requests are spread over this many session ids
+
+# Follow-up conversations mixed in with the one-shot queries: (opening query, reply)
+FOLLOW_UPS = [
+    ("मौसम कैसा है", "पटना"),
+    ("भाव बताओ", "कानपुर"),
+    ("कानपुर मंडी में भाव", "गेहूं"),
+]
+
+
+def _request_mix(requests, seed=0):
+    """`requests` (session_id, query) pairs: one-shot queries interleaved with follow-up conversations."""
+    rng = random.Random(seed)
+    one_shot = list(QUERIES.values())
+    mix = []
+    while len(mix) < requests:
+        session_id = f"bench-{rng.randrange(SESSIONS)}"
+        if rng.random() < 0.2:
+            opening, reply = rng.choice(FOLLOW_UPS)
+            mix.extend([(session_id, opening), (session_id, reply)])
+        else:
+            mix.append((session_id, rng.choice(one_shot)))
+    return mix[:requests]
+
+
+def run(requests):
+    """
+    Sends `requests` POST /ask requests through the Flask test client, one after another.
+    Returns:
+        dict: {"e2e.ask": latency metrics in microseconds plus "throughput_rps" and "errors"}.
+    """
+    import api_server # Imported here, like the rest of the server; the warm-up builds the knowledge base
+
+    client = api_server.app.test_client()
+    mix = _request_mix(requests)
+    for session_id, query in mix[:max(1, requests // 10)]: # Warm up
+        client.post("/ask", json={"session_id": session_id, "query": query})
+
+    latencies, errors = [], 0
+    started = time.perf_counter_ns()
+    for session_id, query in mix:
+        request_started = time.perf_counter_ns()
+        response = client.post("/ask", json={"session_id": session_id, "query": query})
+        latencies.append(time.perf_counter_ns() - request_started)
+        errors += response.status_code != 200
+    elapsed_seconds = (time.perf_counter_ns() - started) / 1e9
+
+    metrics = summarize(latencies)
+    metrics["throughput_rps"] = round(len(latencies) / elapsed_seconds, 1)
+    metrics["errors"] = errors
+    return {"e2e.ask": metrics}
@@ -0,0 +1,98 @@
+import gc
+import logging
+import math
+import time
+from contextlib import contextmanager
+
+from config import settings
+from utils import api_clients
+from utils import knowledge_base
+from utils import log
+
+# What the stubbed weather API answers for every city
+STUB_WEATHER = {"name": "स्टब", "weather": [{"description": "साफ आसमान"}], "main": {"temp": 30.0, "humidity": 40}}
+
+
+def percentile(sorted_values, fraction):
+    """Nearest-rank percentile of an already sorted list (fraction in 0..1)."""
+    if not sorted_values:
+        return None
+    rank = max(1, math.ceil(fraction * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+
+def summarize(latencies_ns):
+    """
+    Latency metrics in microseconds for one benchmark.
+    Returns:
+        dict: {"unit": "us", "n", "mean", "min", "p50", "p99"}; p50 is the number runs are compared on.
+    """
+    values = sorted(latencies_ns)
+    to_us = lambda ns: round(ns / 1000.0, 3)
+    return {
+        "unit": "us",
+        "n": len(values),
+        "mean": to_us(sum(values) / len(values)),
+        "min": to_us(values[0]),
+        "p50": to_us(percentile(values, 0.50)),
+        "p99": to_us(percentile(values, 0.99)),
+    }
+
+
+MEASURE_TIME_BUDGET_SECONDS = 2.0 # Slow benchmarks stop early (with at least MIN_SAMPLES calls timed)
+MIN_SAMPLES = 20
+
+
+def measure(func, iterations, warmup=None, time_budget_seconds=MEASURE_TIME_BUDGET_SECONDS):
+    """
+    Calls func() `iterations` times (after a warmup) and times each call, stopping early once
+    time_budget_seconds have been spent. The garbage collector is paused while timing so one
+    collection does not land on a single sample.
+    Returns:
+        dict: summarize() of the per-call latencies.
+    """
+    for _ in range(warmup if warmup is not None else max(1, min(iterations // 10, MIN_SAMPLES))):
+        func()
+    latencies = []
+    deadline = time.perf_counter_ns() + int(time_budget_seconds * 1e9)
+    gc_was_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        for _ in range(iterations):
+            started = time.perf_counter_ns()
+            func()
+            finished = time.perf_counter_ns()
+            latencies.append(finished - started)
+            if finished > deadline and len(latencies) >= MIN_SAMPLES:
+                break
+    finally:
+        if gc_was_enabled:
+            gc.enable()
+    return summarize(latencies)
+
+
+@contextmanager
+def benchmark_environment():
+    """DEBUG_MODE and debug logging off (their output would dominate every number) and the weather API stubbed."""
+    debug_mode, get_weather = settings.DEBUG_MODE, api_clients.get_live_weather_data
+    logger = logging.getLogger(log.ROOT_LOGGER_NAME)
+    log_level = logger.level
+    settings.DEBUG_MODE = False
+    logger.setLevel(logging.WARNING)
+    api_clients.get_live_weather_data = lambda city_name: STUB_WEATHER
+    try:
+        yield
+    finally:
+        settings.DEBUG_MODE, api_clients.get_live_weather_data = debug_mode, get_weather
+        logger.setLevel(log_level)
+
+
+@contextmanager
+def use_knowledge_base(kb):
+    """Publishes kb (derived indexes already built) as the current knowledge base, restoring the previous one after."""
+    previous = knowledge_base._current
+    knowledge_base._current = kb
+    try:
+        yield kb
+    finally:
+        knowledge_base._current = previous
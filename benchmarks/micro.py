@@ -0,0 +1,40 @@
+from benchmarks.harness import measure
+from core import intent_handler
+from core import nlu_processor
+
+# Benchmark name -> query. Covers every intent and the main NLU branches (entity position, ranking, trend, filters).
+QUERIES = {
+    "sowing_time": "गेहूं की खेती कब करें?",
+    "general_info": "धान के बारे में बताओ।",
+    "pests": "सरसों में कौन से कीट लगते हैं?",
+    "fertilizers": "मक्का के लिए खाद की जानकारी दें।",
+    "soil_type": "आलू के लिए मिट्टी कैसी होनी चाहिए?",
+    "irrigation": "टमाटर में सिंचाई कब करें?",
+    "weather": "कानपुर में आज मौसम कैसा है?",
+    "mandi_price": "लखनऊ मंडी में गेहूं का भाव क्या है?",
+    "mandi_price_crop_only": "गेहूं का भाव",
+    "mandi_price_mandi_only": "कानपुर मंडी में भाव",
+    "mandi_price_cheapest": "गेहूं का सबसे सस्ता भाव",
+    "mandi_price_near": "गेहूं का भाव 2200 रुपये के आसपास",
+    "price_trend": "गेहूं का भाव पिछले महीने कैसा रहा",
+    "scheme_by_name": "पीएम किसान योजना क्या है?",
+    "scheme_filter": "झारखंड की योजनाएं",
+    "help": "मदद",
+    "unknown": "नमस्ते भाई",
+}
+
+
+def run(iterations):
+    """
+    Returns:
+        dict: "micro.nlu.<query>" and "micro.intent.<query>" (handle_intent on that query's NLU result) -> metrics.
+    """
+    results = {}
+    for name, query in QUERIES.items():
+        results[f"micro.nlu.{name}"] = measure(lambda: nlu_processor.process_query_rule_based(query), iterations)
+    for name, query in QUERIES.items():
+        nlu_result = nlu_processor.process_query_rule_based(query)
+        metrics = measure(lambda: intent_handler.handle_intent(nlu_result), iterations)
+        metrics["intent"] = nlu_result["intent"]
+        results[f"micro.intent.{name}"] = metrics
+    return results
@@ -0,0 +1,103 @@
+import copy
+import time
+
+from benchmarks.harness import measure, use_knowledge_base
+from core import intent_handler
+from core import nlu_processor
+from utils import data_loaders
+from utils.knowledge_base import KnowledgeBase
+
+DEFAULT_FACTORS = (10, 100, 1000)
+
+# Synthetic names share no substring with real crop, mandi or scheme names, so a query naming a
+# synthetic entity only matches that entity (the keyword matcher finds names anywhere in the query).
+def _crop_name(i):
+    return f"किस्म{i:06d}"
+
+def _mandi_name(i):
+    return f"बाजार{i:06d} मंडी"
+
+def _scheme_keyword(i):
+    return f"अनुदान{i:06d}"
+
+
+def synthetic_data(factor):
+    """
+    The knowledge base files grown `factor` times: (factor - 1) synthetic copies of every crop, mandi and
+    scheme are added after the real ones. Synthetic mandis trade the same crops as the mandi they copy,
+    so a real crop is quoted in `factor` times as many mandis.
+    Returns:
+        tuple: (crop_data, mandi_price_data, schemes_data) as plain JSON-shaped data.
+    """
+    crop_data = data_loaders.get_crop_data() or {}
+    mandi_price_data = data_loaders.get_mandi_price_data() or {}
+    schemes_data = data_loaders.get_schemes_data() or []
+
+    scaled_crops = dict(crop_data)
+    crops = list(crop_data.values())
+    for i in range((factor - 1) * len(crops)):
+        scaled_crops[_crop_name(i)] = crops[i % len(crops)]
+
+    scaled_mandis = dict(mandi_price_data)
+    mandis = list(mandi_price_data.values())
+    for i in range((factor - 1) * len(mandis)):
+        scaled_mandis[_mandi_name(i)] = mandis[i % len(mandis)]
+
+    scaled_schemes = list(schemes_data)
+    for i in range((factor - 1) * len(schemes_data)):
+        scheme = copy.copy(schemes_data[i % len(schemes_data)])
+        scheme["name"] = f"सहायता कार्यक्रम {_scheme_keyword(i)}"
+        scheme["keywords"] = [_scheme_keyword(i), f"{_scheme_keyword(i)} सहायता"]
+        scaled_schemes.append(scheme)
+    return scaled_crops, scaled_mandis, scaled_schemes
+
+
+def _queries(added_crops, added_mandis, added_schemes):
+    """Benchmark name -> query; the "tail" queries name the last synthetic entity of each kind."""
+    queries = {
+        "crop_head": "गेहूं की खेती कब करें?",
+        "mandi_price_crop_only": "गेहूं का भाव",
+        "scheme_filter": "झारखंड की योजनाएं",
+        "no_entity": "नमस्ते भाई",
+        # ASR spellings of real names, resolved through the fuzzy index
+        "crop_misheard": "गेहू की खेती कब करें?",
+        "mandi_misheard": "कानपूर मंडी में गेंहू का भाव",
+        "location_misheard": "जामतारा में मौसम कैसा है",
+    }
+    if added_crops:
+        queries["crop_tail"] = f"{_crop_name(added_crops - 1)} की खेती कब करें?"
+        queries["mandi_tail"] = f"{_mandi_name(added_mandis - 1)} में गेहूं का भाव क्या है?"
+        queries["scheme_tail"] = f"{_scheme_keyword(added_schemes - 1)} योजना क्या है?"
+    return queries
+
+
+def run(iterations, factors=DEFAULT_FACTORS):
+    """
+    For every factor (1 = the real data, for reference): the knowledge base build time (data plus every
+    derived index, as a reload does) and NLU / handle_intent latency on that knowledge base.
+    Returns:
+        dict: "scaling.<factor>x.build", "scaling.<factor>x.nlu.<query>", "scaling.<factor>x.intent.<query>" -> metrics.
+    """
+    results = {}
+    real_sizes = [len(data) for data in synthetic_data(1)]
+    for factor in (1,) + tuple(factors):
+        crop_data, mandi_price_data, schemes_data = synthetic_data(factor)
+        added = [len(data) - real for data, real in zip((crop_data, mandi_price_data, schemes_data), real_sizes)]
+
+        started = time.perf_counter_ns()
+        kb = KnowledgeBase(crop_data, mandi_price_data, schemes_data).build_derived_indexes()
+        build_us = (time.perf_counter_ns() - started) / 1000.0
+        results[f"scaling.{factor}x.build"] = {
+            "unit": "us", "n": 1, "p50": round(build_us, 3),
+            "crops": len(kb.known_crops), "mandis": len(kb.known_mandis), "schemes": len(schemes_data),
+        }
+
+        with use_knowledge_base(kb):
+            for name, query in _queries(*added).items():
+                results[f"scaling.{factor}x.nlu.{name}"] = measure(
+                    lambda: nlu_processor.process_query_rule_based(query), iterations)
+                nlu_result = nlu_processor.process_query_rule_based(query)
+                metrics = measure(lambda: intent_handler.handle_intent(nlu_result), iterations)
+                metrics["intent"] = nlu_result["intent"]
+                results[f"scaling.{factor}x.intent.{name}"] = metrics
+    return results
@@ -0,0 +1,43 @@
+import os
+import subprocess
+import sys
+import time
+
+from benchmarks.harness import summarize
+from config import settings
+
+# What each fresh interpreter runs; the wall time from launch to exit is one sample.
+# startup.python is the interpreter alone, so the others minus it are what the project adds.
+SCENARIOS = {
+    "startup.python": "pass",
+    "startup.settings": "import config.settings",
+    "startup.nlu": "from core import nlu_processor",
+    "startup.api_server": "import api_server",
+    "startup.asgi_server": "import asgi_server",
+    # A text-only ASGI worker from launch to its first answer (knowledge base, NLU index, dialogue engine)
+    "startup.asgi_first_answer": "import asgi_server\n"
+                                 "from core import conversation\n"
+                                 "conversation.answer_query('startup', 'गेहूं की खेती कब करें')",
+}
+
+
+def _run_once(code):
+    env = dict(os.environ, LOG_LEVEL="WARNING")
+    started = time.perf_counter_ns()
+    subprocess.run([sys.executable, "-c", code], cwd=settings.PROJECT_ROOT, env=env, check=True,
+                   stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    return time.perf_counter_ns() - started
+
+
+def run(runs):
+    """
+    Starts a fresh interpreter `runs` times per scenario (after one warmup, which fills the bytecode and
+    OS file caches) and times each from launch to exit.
+    Returns:
+        dict: {"startup.<scenario>": latency metrics in microseconds}.
+    """
+    results = {}
+    for name, code in SCENARIOS.items():
+        _run_once(code)
+        results[name] = summarize([_run_once(code) for _ in range(runs)])
+    return results
@@ -1,5 +1,9 @@
 import os
-from dotenv import load_dotenv, dotenv_values
+
+# Importing this module has no side effects (no file reads, no prints). The settings read from the environment
+# are marked with _env() below and resolve on first access: the .env file in the project root is loaded then
+# (once, overriding the process environment as before) and each value is cached as a normal module attribute,
+# so it can still be assigned or monkeypatched like any other setting.
 
 # Determine the absolute path of the project root directory
 PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir))
@@ -12,31 +16,130 @@ dotenv_path = os.path.join(PROJECT_ROOT, '.env')
 # Set to True during development to see more detailed logs.
 DEBUG_MODE = True # You can toggle this
 
-if os.path.exists(dotenv_path):
-    load_dotenv(dotenv_path, override=True, verbose=False)
-    if DEBUG_MODE:
-        print(f"DEBUG_SETTINGS: .env file found and loaded from: {dotenv_path}")
-else:
-    if DEBUG_MODE:
-        print(f"DEBUG_SETTINGS: Warning - .env file not found at {dotenv_path}.")
+# Setting name -> (environment variable, default or callable returning it, converter)
+_ENVIRONMENT_SETTINGS = {}
+_environment_loaded = False
+
+def _env(name, default=None, variable=None, convert=None):
+    """Declares setting `name`, read from environment variable `variable` (default: the same name) on first access."""
+    _ENVIRONMENT_SETTINGS[name] = (variable or name, default, convert)
+
+def load_environment():
+    """Loads the .env file into os.environ (once). Returns True if a .env file was found."""
+    global _environment_loaded
+    found = os.path.exists(dotenv_path)
+    if not _environment_loaded:
+        if found:
+            from dotenv import load_dotenv # Only needed when there is a .env file to read
+            load_dotenv(dotenv_path, override=True, verbose=False)
+        _environment_loaded = True
+    return found
+
+def __getattr__(name):
+    if name not in _ENVIRONMENT_SETTINGS:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    load_environment()
+    variable, default, convert = _ENVIRONMENT_SETTINGS[name]
+    value = os.getenv(variable)
+    if value is None:
+        value = default() if callable(default) else default
+    elif convert is not None:
+        value = convert(value)
+    globals()[name] = value # Later reads are plain attribute lookups
+    return value
 
 # --- API Keys (Loaded from .env) ---
-GOOGLE_API_KEY = os.getenv("GOOGLE_API_KEY") # Retained for potential future use
-OPENWEATHERMAP_API_KEY = os.getenv("OPENWEATHERMAP_API_KEY")
+_env("GOOGLE_API_KEY") # Retained for potential future use
+_env("OPENWEATHERMAP_API_KEY")
 
 # --- API Base URLs ---
-OPENWEATHERMAP_BASE_URL = "http://api.openweathermap.org/data/2.5/weather"
+# Can point at the local stand-in (python -m utils.weather_stub_server) for offline runs and load tests
+_env("OPENWEATHERMAP_BASE_URL", "http://api.openweathermap.org/data/2.5/weather")
+
+# --- Weather Provider ---
+# "live": OpenWeatherMap only; "static": answer from WEATHER_STATIC_FILE only (no network);
+# "auto": live first, falling back to the static snapshot when the API key is missing or the network is down
+_env("WEATHER_PROVIDER", "auto")
+# Snapshot entries are answered with their date ("dt"); older ones (or undated ones) are refused. None: always answer.
+# The file ships empty; capture (and refresh) it with: python -m utils.api_clients --snapshot
+WEATHER_STATIC_MAX_AGE_SECONDS = 6 * 3600
+
+# --- Weather Cache ---
+WEATHER_CACHE_TTL_SECONDS = 600 # Serve cached weather for a city without refreshing for this long
+WEATHER_CACHE_STALE_SECONDS = 1800 # After the TTL, keep serving the old copy this long while it refreshes in the background
+WEATHER_CACHE_MAX_ENTRIES = 1024
+
+# --- Weather API Client ---
+WEATHER_API_TIMEOUT_BUDGET_SECONDS = 4.0 # Total time a single lookup may take, across all retries
+WEATHER_API_MAX_RETRIES = 2
+WEATHER_API_BACKOFF_SECONDS = 0.2 # Base delay for jittered exponential backoff between retries
+WEATHER_API_POOL_SIZE = 20 # Keep-alive connections kept open to the weather API
+WEATHER_CIRCUIT_FAILURE_RATE = 0.5 # Open the circuit when this share of recent lookups failed...
+WEATHER_CIRCUIT_WINDOW_SIZE = 20 # ...among the last this many lookups...
+WEATHER_CIRCUIT_MIN_REQUESTS = 5 # ...once at least this many have been made
+WEATHER_CIRCUIT_OPEN_SECONDS = 30 # Fail fast for this long before letting a trial request through
 
 # --- Language Settings ---
 ASR_LANGUAGE = "hi-IN"
+ASR_CALIBRATION_SECONDS = 1.0 # Ambient noise is measured once, when the microphone is opened (then followed between utterances)
+ASR_END_SILENCE_SECONDS = 0.5 # An utterance ends after this much silence and goes to recognition right away
+ASR_LISTEN_TIMEOUT_SECONDS = 5 # listen_hindi gives up if nobody starts speaking within this
+ASR_MAX_UTTERANCE_SECONDS = 10
+# Batch transcription of recorded calls (python -m core.batch_transcription <directory>)
+ASR_BATCH_BACKEND = "google" # "google" (speech_recognition, network) or "sidecar" (<recording>.txt next to each WAV, offline)
+ASR_BATCH_SAMPLE_RATE = 16000 # Recordings are downmixed to mono and resampled to this before chunking
+ASR_BATCH_MAX_CHUNK_SECONDS = 30 # Longer stretches of speech are cut (recognizers reject very long audio)
+ASR_BATCH_WORKERS = 8 # Recordings processed at once; recognition is network-bound, so threads by default
 TTS_LANGUAGE = "hi"
+TTS_SLOW = False # gTTS slow speech; part of the speech cache key
 
 # --- Paths to Data Files ---
 CROP_ADVISORY_FILE = os.path.join(PROJECT_ROOT, "data", "knowledge_base", "crop_advisory.json")
 MANDI_PRICES_FILE = os.path.join(PROJECT_ROOT, "data", "knowledge_base", "mandi_prices.json")
+MANDI_PRICE_HISTORY_FILE = os.path.join(PROJECT_ROOT, "data", "knowledge_base", "mandi_prices.csv") # Daily prices (shipped empty; fill it or ingest a dump), see utils/price_history.py
 SCHEMES_ADVISORY_FILE = os.path.join(PROJECT_ROOT, "data", "knowledge_base", "schemes_advisory.json")
-# WEATHER_STATIC_FILE = os.path.join(PROJECT_ROOT, "data", "knowledge_base", "weather_static.json") # If you plan to use it
+WEATHER_STATIC_FILE = os.path.join(PROJECT_ROOT, "data", "knowledge_base", "weather_static.json")
 # LOCATIONS_FILE = os.path.join(PROJECT_ROOT, "data", "predefined_data", "locations.json") # If you plan to use it
+DIALOGUE_DOMAIN_FILE = os.path.join(PROJECT_ROOT, "data", "nlu_training_data", "domain.yml") # Slots and fixed responses
+DIALOGUE_STORIES_FILE = os.path.join(PROJECT_ROOT, "data", "nlu_training_data", "stories.yml") # Follow-up conversations
+
+# --- Mandi Price Backend ---
+# "json": current prices from MANDI_PRICES_FILE and history parsed from MANDI_PRICE_HISTORY_FILE at startup.
+# "sqlite": both served from MANDI_PRICE_DB_FILE, filled by `python -m utils.mandi_ingest <dump.csv>`
+# (startup time and memory then stay the same however large the history grows).
+_env("MANDI_PRICE_BACKEND", "json")
+_env("MANDI_PRICE_DB_FILE", os.path.join(PROJECT_ROOT, "data", "knowledge_base", "mandi_prices.sqlite3"))
+
+# --- Knowledge Base Loading ---
+# True: the API servers build the knowledge base and its indexes at startup (before a pre-fork server forks).
+# False: it is built on the first query instead, so a worker is ready sooner (e.g. short-lived serverless workers).
+KNOWLEDGE_BASE_PRELOAD = True
+
+# --- Knowledge Base Reload ---
+# How often (seconds) the API server checks the knowledge base files for changes and reloads them; 0 disables
+KNOWLEDGE_BASE_RELOAD_INTERVAL_SECONDS = 30
+# POST /admin/reload requires this value in the X-Admin-Token header; while it is unset the endpoint refuses every request
+_env("ADMIN_TOKEN", variable="KRISHI_MITRA_ADMIN_TOKEN")
+
+# --- Session Store (api_server) ---
+# "memory": per-process LRU; "sqlite": SESSION_STORE_FILE, shared by every worker process on the host
+_env("SESSION_STORE_BACKEND", "memory")
+_env("SESSION_STORE_FILE", os.path.join(PROJECT_ROOT, "data", "sessions.sqlite3"))
+SESSION_MAX_ENTRIES = 100000 # Least recently used sessions are evicted beyond this
+SESSION_IDLE_TTL_SECONDS = 1800 # A session idle for longer starts over
+
+# --- Logging (utils/log.py) ---
+# Records go through a bounded queue to a background writer thread, so request threads never wait on console I/O
+_env("LOG_LEVEL", lambda: "DEBUG" if DEBUG_MODE else "INFO")
+_env("LOG_FORMAT", "text") # "text", or "json" for one JSON object per line
+_env("LOG_DEBUG_SAMPLE_RATE", 1.0, convert=float) # Share of requests whose DEBUG records are written
+LOG_QUEUE_SIZE = 10000 # Records waiting for the writer beyond this are dropped (and counted) instead of blocking
+
+# --- NLU (core/nlu_processor.py) ---
+# Crop, mandi and location names the exact scan misses (ASR spellings like "गेहू", "जामतारा") are looked up
+# in a fuzzy index; a match counts if at least this share of its spelling skeleton agrees
+NLU_FUZZY_MATCHING = True
+NLU_FUZZY_MIN_CONFIDENCE = 0.75
 
 # --- Predefined Lists ---
 KNOWN_LOCATIONS_FOR_WEATHER = [
@@ -65,11 +168,27 @@ EXAMPLE_QUERIES = [
 ]
 
 # --- Audio Settings ---
-AUDIO_RESPONSE_FILENAME = "response.mp3" # Temporary file for TTS output
+AUDIO_RESPONSE_FILENAME = "response.mp3" # Temporary file for TTS output (used when the speech cache is off)
+# Synthesised speech is kept here and replayed without a network call (utils/tts_cache.py);
+# fill it ahead of time with `python -m core.voice_output --prewarm`
+TTS_CACHE_DIR = os.path.join(PROJECT_ROOT, "data", "tts_cache")
+TTS_CACHE_MAX_BYTES = 200 * 1024 * 1024 # Least recently played files are deleted beyond this; 0 turns the cache off
+# Streaming speech: long answers are spoken sentence by sentence, the next sentences synthesised while one plays
+TTS_STREAMING = True
+TTS_STREAM_WORKERS = 3 # Sentences synthesised in parallel ahead of the one playing
+TTS_CHUNK_MAX_CHARS = 200 # Longer sentences are cut at commas (or between words)
+# Voice CLI (main.py): listen for the next question while the answer is still playing; speaking cuts the answer short.
+# Opt-in: the microphone also hears the answer through a speaker, so only turn this on with headphones.
+VOICE_BARGE_IN = False
+VOICE_SKIP_PHRASES = ["रुको", "बस", "बस करो", "चुप", "आगे", "अगला"] # Saying only one of these just stops the current answer
 
-if DEBUG_MODE:
-    print(f"DEBUG_SETTINGS: DEBUG MODE IS ON (verified in settings.py)")
-    if OPENWEATHERMAP_API_KEY and OPENWEATHERMAP_API_KEY != "YOUR_ACTUAL_OPENWEATHERMAP_API_KEY_HERE": # Check it's not the placeholder
-        print("DEBUG_SETTINGS: OpenWeatherMap API Key is loaded.")
+def describe():
+    """What used to be printed at import: .env, debug mode and API key status (logged by utils.log.configure_logging)."""
+    messages = [f".env file found and loaded from: {dotenv_path}" if load_environment() else f"Warning - .env file not found at {dotenv_path}."]
+    messages.append(f"DEBUG MODE IS {'ON' if DEBUG_MODE else 'OFF'}")
+    api_key = globals()["OPENWEATHERMAP_API_KEY"] if "OPENWEATHERMAP_API_KEY" in globals() else __getattr__("OPENWEATHERMAP_API_KEY")
+    if api_key and api_key != "YOUR_ACTUAL_OPENWEATHERMAP_API_KEY_HERE": # Check it's not the placeholder
+        messages.append("OpenWeatherMap API Key is loaded.")
     else:
-        print("DEBUG_SETTINGS: Warning - OpenWeatherMap API Key is NOT loaded or is placeholder.")
\ No newline at end of file
+        messages.append("Warning - OpenWeatherMap API Key is NOT loaded or is placeholder.")
+    return messages
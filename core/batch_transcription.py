@@ -0,0 +1,285 @@
+"""
+Transcribes a directory of recorded calls (WAV files) and answers them offline, one JSON line per recording.
+
+Each recording goes through the same stages as a live conversation, without a microphone:
+decode (stdlib wave) -> downmix to mono and resample to settings.ASR_BATCH_SAMPLE_RATE -> cut into
+utterances (utils/endpointing.py) -> recognition -> NLU and intent handling (the dialogue engine, one
+context per call, so "मौसम कैसा है" ... "पटना" is answered like it was on the phone).
+
+    python -m core.batch_transcription recordings/2024-06-01 --output transcripts.jsonl
+    python -m core.batch_transcription recordings --workers 16 --backend sidecar
+
+Recordings run on a bounded pool (threads by default, --processes for CPU-bound recognizers) and at most
+--max-pending of them are decoded or in flight at once, so memory stays flat however many files there are.
+Results are written in file order as soon as each one (and all before it) is done.
+"""
+import argparse
+import json
+import os
+import time
+import wave
+from collections import deque, namedtuple
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+import numpy as np
+
+from config import settings
+from core import dialogue_manager
+from utils import log
+from utils.endpointing import EnergyEndpointer
+
+logger = log.get_logger(__name__)
+
+AUDIO_EXTENSIONS = (".wav",)
+FRAME_SECONDS = 0.02 # Endpointing frame length
+NOISE_PERCENTILE = 10 # The quietest 10% of a recording's frames are taken as its background noise
+
+# One utterance of a recording, as handed to a recognizer (16-bit mono PCM)
+AudioChunk = namedtuple("AudioChunk", ["path", "index", "start_seconds", "end_seconds",
+                                       "frame_data", "sample_rate", "sample_width"])
+
+TranscriptionReport = namedtuple("TranscriptionReport", ["files", "failed_files", "utterances", "audio_seconds", "seconds"])
+
+
+# --- Recognizer backends ---
+# A recognizer is any object with transcribe(chunk) -> text (str), or None if nothing was understood.
+# Objects handed to a process pool must be picklable, so backends import their libraries lazily.
+
+class GoogleRecognizer:
+    """Google Web Speech API via speech_recognition (the same recognizer as core/voice_input.py)."""
+
+    def __init__(self, language=None):
+        self.language = language or settings.ASR_LANGUAGE
+        self._recognizer = None
+
+    def __getstate__(self):
+        return {"language": self.language, "_recognizer": None}
+
+    def transcribe(self, chunk):
+        import speech_recognition as sr
+        if self._recognizer is None:
+            self._recognizer = sr.Recognizer()
+        audio = sr.AudioData(chunk.frame_data, chunk.sample_rate, chunk.sample_width)
+        try:
+            return self._recognizer.recognize_google(audio, language=self.language).lower()
+        except sr.UnknownValueError:
+            return None
+
+
+class SidecarTranscriptRecognizer:
+    """
+    Local stand-in for offline runs and tests: utterance n of call.wav is line n of call.txt (UTF-8),
+    e.g. a human transcript. A missing file or line means nothing was understood.
+    """
+
+    def transcribe(self, chunk):
+        transcript_path = os.path.splitext(chunk.path)[0] + ".txt"
+        try:
+            with open(transcript_path, encoding="utf-8") as f:
+                lines = [line.strip() for line in f]
+        except FileNotFoundError:
+            return None
+        if chunk.index < len(lines) and lines[chunk.index]:
+            return lines[chunk.index]
+        return None
+
+
+RECOGNIZERS = {
+    "google": GoogleRecognizer,
+    "sidecar": SidecarTranscriptRecognizer,
+}
+
+
+def create_recognizer(backend=None):
+    """The recognizer for `backend` (default: settings.ASR_BATCH_BACKEND)."""
+    backend = backend or settings.ASR_BATCH_BACKEND
+    if backend not in RECOGNIZERS:
+        raise ValueError(f"Unknown recognizer backend {backend!r}; expected one of {', '.join(RECOGNIZERS)}")
+    return RECOGNIZERS[backend]()
+
+
+# --- Audio stages ---
+
+def read_wav(path, sample_rate=None):
+    """
+    Decodes a PCM WAV file to mono 16-bit samples at sample_rate.
+    Args:
+        path (str): The WAV file (8, 16 or 32-bit integer PCM, any channel count and rate).
+        sample_rate (int, optional): Output rate (default: settings.ASR_BATCH_SAMPLE_RATE).
+    Returns:
+        numpy.ndarray: int16 samples.
+    """
+    sample_rate = sample_rate or settings.ASR_BATCH_SAMPLE_RATE
+    with wave.open(path, "rb") as wav:
+        channels, width, rate = wav.getnchannels(), wav.getsampwidth(), wav.getframerate()
+        data = wav.readframes(wav.getnframes())
+    if width == 1: # 8-bit WAV is unsigned
+        samples = (np.frombuffer(data, np.uint8).astype(np.float64) - 128) * 256
+    elif width == 2:
+        samples = np.frombuffer(data, "<i2").astype(np.float64)
+    elif width == 4:
+        samples = np.frombuffer(data, "<i4").astype(np.float64) / 65536
+    else:
+        raise ValueError(f"Unsupported sample width: {width * 8} bits")
+    samples = samples[:len(samples) // channels * channels].reshape(-1, channels).mean(axis=1)
+    samples = resample(samples, rate, sample_rate)
+    return np.clip(np.round(samples), -32768, 32767).astype(np.int16)
+
+
+def resample(samples, from_rate, to_rate):
+    """Linear-interpolation resampling; when downsampling, a moving average first keeps aliasing down."""
+    if from_rate == to_rate or not len(samples):
+        return samples
+    if to_rate < from_rate:
+        width = int(round(from_rate / to_rate))
+        if width > 1:
+            samples = np.convolve(samples, np.ones(width) / width, mode="same")
+    target_length = int(round(len(samples) * to_rate / from_rate))
+    positions = np.arange(target_length) * (from_rate / to_rate)
+    return np.interp(positions, np.arange(len(samples)), samples)
+
+
+def split_utterances(samples, sample_rate, max_chunk_seconds=None):
+    """
+    Cuts a recording into utterances with the energy endpointer. The noise level is measured over the
+    whole recording (its quietest frames), so a call that starts mid-sentence is not calibrated on speech.
+    Args:
+        samples (numpy.ndarray): int16 mono samples.
+        sample_rate (int): Their rate.
+        max_chunk_seconds (float, optional): Longest chunk (default: settings.ASR_BATCH_MAX_CHUNK_SECONDS).
+    Returns:
+        list: (start_sample, end_sample, frame_data bytes) per utterance, in order.
+    """
+    frame_samples = int(sample_rate * FRAME_SECONDS)
+    frames = samples[:len(samples) // frame_samples * frame_samples].reshape(-1, frame_samples)
+    if not len(frames):
+        return []
+    energies = np.sqrt((frames.astype(np.float64) ** 2).mean(axis=1))
+    endpointer = EnergyEndpointer(sample_rate, frame_samples, end_silence_seconds=settings.ASR_END_SILENCE_SECONDS,
+                                  max_utterance_seconds=max_chunk_seconds or settings.ASR_BATCH_MAX_CHUNK_SECONDS,
+                                  noise_level=float(np.percentile(energies, NOISE_PERCENTILE)))
+    utterances = []
+    for index, frame in enumerate(frames):
+        frame_data = endpointer.feed(frame.tobytes())
+        if frame_data:
+            end = (index + 1) * frame_samples
+            utterances.append((end - len(frame_data) // 2, end, frame_data))
+    frame_data = endpointer.flush() # Speech running into the end of the recording
+    if frame_data:
+        end = len(frames) * frame_samples
+        utterances.append((end - len(frame_data) // 2, end, frame_data))
+    return utterances
+
+
+# --- Pipeline ---
+
+def transcribe_file(path, recognizer, sample_rate=None, max_chunk_seconds=None):
+    """
+    Runs one recording through every stage.
+    Args:
+        path (str): The WAV file.
+        recognizer: A recognizer backend (see RECOGNIZERS).
+        sample_rate (int, optional): Recognition sample rate (default: settings.ASR_BATCH_SAMPLE_RATE).
+        max_chunk_seconds (float, optional): Longest utterance sent to the recognizer.
+    Returns:
+        dict: The JSON line for the recording: file, duration_seconds, utterances (start/end seconds,
+              text, intent, entities, response; or error) and error if the file could not be decoded.
+    """
+    started = time.perf_counter()
+    sample_rate = sample_rate or settings.ASR_BATCH_SAMPLE_RATE
+    record = {"file": path, "duration_seconds": None, "utterances": [], "error": None}
+    try:
+        samples = read_wav(path, sample_rate)
+    except (OSError, EOFError, wave.Error, ValueError) as e:
+        logger.warning("Could not decode %s: %s", path, e)
+        record["error"] = f"{type(e).__name__}: {e}"
+        return record
+    record["duration_seconds"] = round(len(samples) / sample_rate, 3)
+
+    dialogue = dialogue_manager.get_dialogue_engine()
+    context = dialogue.new_context() # One call is one conversation
+    for index, (start, end, frame_data) in enumerate(split_utterances(samples, sample_rate, max_chunk_seconds)):
+        chunk = AudioChunk(path, index, round(start / sample_rate, 3), round(end / sample_rate, 3),
+                           frame_data, sample_rate, 2)
+        utterance = {"start_seconds": chunk.start_seconds, "end_seconds": chunk.end_seconds, "text": None}
+        try:
+            utterance["text"] = recognizer.transcribe(chunk)
+        except Exception as e: # E.g. the recognition service being unreachable; the rest of the call still counts
+            logger.warning("Recognition failed for %s utterance %d: %s", path, index, e)
+            utterance["error"] = f"{type(e).__name__}: {e}"
+        if utterance["text"]:
+            turn = dialogue.handle_turn(context, utterance["text"])
+            utterance.update(intent=turn.nlu_result.get("intent"), entities=turn.nlu_result.get("entities"),
+                             response=turn.text)
+        record["utterances"].append(utterance)
+    logger.debug("Transcribed %s (%d utterances) in %.2fs", path, len(record["utterances"]), time.perf_counter() - started)
+    return record
+
+
+def find_recordings(directory):
+    """Yields the audio files under directory (recursively, sorted within each directory)."""
+    for root, directories, files in os.walk(directory):
+        directories.sort()
+        for name in sorted(files):
+            if name.lower().endswith(AUDIO_EXTENSIONS):
+                yield os.path.join(root, name)
+
+
+def transcribe_directory(directory, output_path, recognizer=None, workers=None, processes=False, max_pending=None):
+    """
+    Transcribes every recording under directory into a JSONL file.
+    Args:
+        directory (str): Where the recordings are (searched recursively).
+        output_path (str): The JSONL file to write (one line per recording, in file order).
+        recognizer (optional): A recognizer backend (default: create_recognizer()).
+        workers (int, optional): Pool size (default: settings.ASR_BATCH_WORKERS).
+        processes (bool): Use a process pool instead of threads.
+        max_pending (int, optional): Recordings submitted but not yet written (default: 2 * workers).
+                                     Listing pauses when the window is full (backpressure).
+    Returns:
+        TranscriptionReport: File, failure and utterance counts, total audio and elapsed seconds.
+    """
+    started = time.perf_counter()
+    recognizer = recognizer or create_recognizer()
+    workers = workers or settings.ASR_BATCH_WORKERS
+    max_pending = max(1, max_pending or 2 * workers)
+    counts = {"files": 0, "failed_files": 0, "utterances": 0, "audio_seconds": 0.0}
+
+    def write(record):
+        out.write(json.dumps(record, ensure_ascii=False) + "\n")
+        out.flush() # A crash part-way leaves every finished recording on disk
+        counts["files"] += 1
+        counts["failed_files"] += record["error"] is not None
+        counts["utterances"] += len(record["utterances"])
+        counts["audio_seconds"] += record["duration_seconds"] or 0.0
+
+    pool_class = ProcessPoolExecutor if processes else ThreadPoolExecutor
+    with pool_class(max_workers=workers) as pool, open(output_path, "w", encoding="utf-8") as out:
+        pending = deque()
+        for path in find_recordings(directory):
+            if len(pending) >= max_pending:
+                write(pending.popleft().result())
+            pending.append(pool.submit(transcribe_file, path, recognizer))
+        while pending:
+            write(pending.popleft().result())
+    return TranscriptionReport(counts["files"], counts["failed_files"], counts["utterances"],
+                               round(counts["audio_seconds"], 3), time.perf_counter() - started)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Transcribe and answer a directory of recorded calls")
+    parser.add_argument("directory")
+    parser.add_argument("--output", default="transcripts.jsonl", help="JSONL file to write (default: transcripts.jsonl)")
+    parser.add_argument("--backend", choices=sorted(RECOGNIZERS), default=None,
+                        help="Recognizer (default: settings.ASR_BATCH_BACKEND)")
+    parser.add_argument("--workers", type=int, default=None, help="Pool size (default: settings.ASR_BATCH_WORKERS)")
+    parser.add_argument("--processes", action="store_true", help="Use worker processes instead of threads")
+    parser.add_argument("--max-pending", type=int, default=None, help="Recordings in flight at once (default: 2 x workers)")
+    args = parser.parse_args()
+
+    log.configure_logging()
+    report = transcribe_directory(args.directory, args.output, create_recognizer(args.backend),
+                                  args.workers, args.processes, args.max_pending)
+    speed = f", {report.audio_seconds / report.seconds:.1f}x real time" if report.seconds else ""
+    print(f"Transcribed {report.files} recordings ({report.failed_files} failed, {report.utterances} utterances, "
+          f"{report.audio_seconds:.0f}s of audio) into {args.output} in {report.seconds:.1f}s{speed}")
@@ -0,0 +1,121 @@
+import hmac
+import time
+
+from core import dialogue_manager
+from utils import knowledge_base
+from utils import log
+from utils import metrics
+from utils import session_store
+from config import settings
+
+logger = log.get_logger(__name__)
+
+# --- Conversation Service ---
+# The session handling and /ask response shape shared by api_server.py (Flask) and asgi_server.py (asyncio).
+# Nothing here imports a web framework, so an ASGI worker starts without loading Flask.
+
+MAX_BATCH_SIZE = 500 # Upper bound on queries accepted by /ask/batch in one request
+
+# Follow-up handling shared with the CLI and Streamlit front ends
+dialogue = dialogue_manager.get_dialogue_engine()
+
+# Store for user session contexts (bounded, with idle expiry; see settings.SESSION_STORE_BACKEND)
+user_sessions = session_store.create_session_store()
+
+_SESSION_LOAD_SECONDS = metrics.stage_timer("session_load")
+_SESSION_SAVE_SECONDS = metrics.stage_timer("session_save")
+
+def prepare_worker():
+    """
+    Startup work of an API server process, called by its entry point (api_server.create_app, the ASGI
+    lifespan startup), never at import: starts the log writer, builds the shared knowledge base
+    (before a pre-fork server forks its workers; skipped when settings.KNOWLEDGE_BASE_PRELOAD is off,
+    so it is built on the first query), then picks up file changes (e.g. daily mandi prices) without
+    restarting the workers.
+    """
+    log.configure_logging()
+    if settings.KNOWLEDGE_BASE_PRELOAD:
+        knowledge_base.preload_knowledge_base()
+    knowledge_base.start_knowledge_base_watcher()
+
+def admin_token_accepted(token):
+    """
+    Whether token (the X-Admin-Token header, or None) authorises an /admin request. Without a configured
+    settings.ADMIN_TOKEN nothing is accepted: a forced reload rebuilds every index and must not be open to anyone.
+    """
+    if not settings.ADMIN_TOKEN or token is None:
+        return False
+    return hmac.compare_digest(token.encode("utf-8"), settings.ADMIN_TOKEN.encode("utf-8"))
+
+def get_session_context(session_id):
+    """Initializes or retrieves session context."""
+    started = time.perf_counter()
+    session_context = user_sessions.get(session_id)
+    _SESSION_LOAD_SECONDS.observe(time.perf_counter() - started)
+    if session_context is None:
+        session_context = dialogue.new_context()
+    return session_context
+
+def save_session_context(session_id, session_context):
+    """
+    Stores the context after a turn. A context with nothing pending is the same as a fresh one, so it is
+    not kept at all: one-off sessions (e.g. clients that never send a session_id) take no space.
+    """
+    started = time.perf_counter()
+    if session_context == dialogue.new_context():
+        user_sessions.delete(session_id)
+    else:
+        user_sessions.set(session_id, session_context)
+    _SESSION_SAVE_SECONDS.observe(time.perf_counter() - started)
+
+def get_session_store_stats():
+    """Returns the session store's size and hit/miss/expiry/eviction counters."""
+    return user_sessions.stats()
+
+@metrics.register_collector
+def _collect_session_metrics():
+    stats = get_session_store_stats()
+    labels = {"backend": stats["backend"]}
+    families = [("krishi_mitra_sessions", "gauge", "Sessions currently held in the session store.", [(labels, stats["sessions"])])]
+    for counter_name, description in (("hits", "Session lookups that found a context."),
+                                      ("misses", "Session lookups for an unknown or expired session."),
+                                      ("expired", "Sessions dropped after their idle TTL."),
+                                      ("evicted", "Sessions evicted to stay within the size cap.")):
+        families.append((f"krishi_mitra_session_{counter_name}_total", "counter", description, [(labels, stats[counter_name])]))
+    return families
+
+def answer_query(session_id, user_query_text, nlu_result=None, weather_cache=None):
+    """
+    Runs one conversational turn for a session and returns the response payload.
+    Args:
+        session_id (str): The client's session id.
+        user_query_text (str): The user's query.
+        nlu_result (dict, optional): Precomputed NLU result for the query (used on the normal NLU path).
+        weather_cache (dict, optional): Weather lookups shared across a batch.
+    Returns:
+        dict: The JSON-serialisable response for this turn.
+    """
+    # Get or initialize context for this session
+    session_context = get_session_context(session_id)
+
+    logger.debug("Received query %r, context before: %s", user_query_text, session_context, extra={"session_id": session_id})
+
+    turn = dialogue.handle_turn(session_context, user_query_text, nlu_result=nlu_result, weather_cache=weather_cache)
+
+    logger.debug("Bot response %r, context after: %s", turn.text, session_context, extra={"session_id": session_id})
+    save_session_context(session_id, session_context)
+    return turn_payload(session_id, user_query_text, turn, session_context)
+
+def turn_payload(session_id, user_query_text, turn, session_context):
+    """The /ask response for one handled turn."""
+    awaiting_intent = dialogue.awaiting_intent(session_context)
+    return {
+        "session_id": session_id, # Return session_id so client can use it for next request
+        "user_query": user_query_text,
+        "nlu_intent": turn.nlu_result.get("intent"),
+        "nlu_entities": turn.nlu_result.get("entities"),
+        "bot_response": turn.text,
+        "awaiting_weather_location": awaiting_intent == "get_weather", # Optionally send context state back
+        "awaiting_mandi_info": awaiting_intent == "get_mandi_price",
+        "awaiting_slots": list(turn.awaiting),
+    }
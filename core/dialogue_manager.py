@@ -0,0 +1,264 @@
+from collections import namedtuple
+
+import yaml
+
+from core import intent_handler
+from core import nlu_processor
+from config import settings
+from utils import log
+from utils.keyword_matcher import KeywordMatcher
+
+logger = log.get_logger(__name__)
+
+# --- Dialogue Manager ---
+# Shared by main.py, app.py and api_server.py. The follow-up conversations in stories.yml are compiled
+# into a small finite-state machine: "idle" plus one state per story ("<intent>:<asked slots>"). After
+# each turn the handler's structured IntentResponse (which intent answered, which slots it asked for)
+# selects the next state with one dict lookup. The state decides how the next message is read: through
+# the NLU when idle, or as the reply that fills the asked slots otherwise.
+
+IDLE = "idle"
+# Waiting for a yes/no on entities the NLU only guessed (fuzzy matches below confidence 1.0, e.g. "जामतारा" -> जामताड़ा)
+CONFIRM = "confirm"
+
+# Punctuation around a yes/no reply ("हाँ।", "नहीं, ...")
+_REPLY_PUNCTUATION = str.maketrans({mark: " " for mark in "।,.?!"})
+
+# A state that waits for the user's reply to fill `slots` (in order) and then handles `intent` again
+DialogueState = namedtuple("DialogueState", ["name", "intent", "slots"])
+
+# One handled turn. nlu_result is what went to the intent handler ({} for an exit phrase); awaiting holds
+# the slots the next message will fill; ended is True when the user closed the conversation.
+TurnResult = namedtuple("TurnResult", ["text", "nlu_result", "awaiting", "ended"])
+
+
+def _fuzzy_fill(reply, category, names, knowledge):
+    """(the name in category closest to the reply (a misheard "जामतारा"), its confidence), or None."""
+    if not settings.NLU_FUZZY_MATCHING:
+        return None
+    match = knowledge.derived("nlu_index").fuzzy_lookup(reply.lower(), category)
+    if match is None:
+        return None
+    logger.debug("Follow-up reply %r read as %r (confidence %.2f)", reply, match.name, match.confidence)
+    return names[match.payload], match.confidence
+
+def _fill_text(reply, hits, knowledge):
+    return reply, 1.0
+
+def _fill_location(reply, hits, knowledge):
+    if "weather_location" in hits:
+        return knowledge.weather_locations[hits["weather_location"]], 1.0
+    # Unknown places go to the weather API as said
+    return _fuzzy_fill(reply, "weather_location", knowledge.weather_locations, knowledge) or (reply, 1.0)
+
+def _fill_mandi(reply, hits, knowledge):
+    for category in ("mandi_core", "mandi_name"):
+        if category in hits:
+            return knowledge.known_mandis[hits[category]], 1.0
+    return _fuzzy_fill(reply, "mandi_name", knowledge.known_mandis, knowledge)
+
+def _fill_crop(reply, hits, knowledge):
+    if "crop" in hits:
+        return knowledge.known_crops[hits["crop"]], 1.0
+    return _fuzzy_fill(reply, "crop", knowledge.known_crops, knowledge)
+
+# `fill` values allowed in domain.yml -> filler(reply, NLU scan hits of the reply, KnowledgeBase)
+# -> (value, confidence) or None; a confidence below 1.0 is confirmed with the user before it is used
+SLOT_FILLERS = {"text": _fill_text, "location": _fill_location, "mandi": _fill_mandi, "crop": _fill_crop}
+
+
+class DialogueEngine:
+    """
+    The compiled dialogue machine. It holds no per-user state: each front end keeps a context dict
+    (see new_context; JSON-serialisable) per conversation and passes it to handle_turn.
+    """
+
+    def __init__(self, domain, stories):
+        self.goodbye_text = domain["responses"]["utter_goodbye"]
+        self._exit_matcher = KeywordMatcher()
+        for phrase in domain.get("exit_phrases") or ():
+            self._exit_matcher.add(phrase.lower(), phrase)
+        self._exit_matcher.build()
+        # "Did you mean ...?" for guessed entities; without utter_confirm_entity guesses are used as they are
+        self.confirm_text = domain["responses"].get("utter_confirm_entity")
+        self.confirm_words = {word.lower() for word in domain.get("confirm_phrases") or ()}
+        self.deny_words = {word.lower() for word in domain.get("deny_phrases") or ()}
+
+        self.slot_fillers = {}
+        for slot, spec in (domain.get("slots") or {}).items():
+            fill = (spec or {}).get("fill", "text")
+            if fill not in SLOT_FILLERS:
+                raise ValueError(f"Slot '{slot}' has unknown fill '{fill}' (expected one of {sorted(SLOT_FILLERS)})")
+            self.slot_fillers[slot] = SLOT_FILLERS[fill]
+
+        self.states = {} # state name -> DialogueState
+        self.transitions = {} # (intent, asked slots) -> state name
+        for story in (stories.get("stories") or ()):
+            intent, slots = self._parse_story(story)
+            state = DialogueState(f"{intent}:{'+'.join(slots)}", intent, slots)
+            self.states[state.name] = state
+            self.transitions[(intent, slots)] = state.name
+
+    def _parse_story(self, story):
+        intent, slots = None, None
+        for step in story.get("steps") or ():
+            intent = step.get("intent", intent)
+            slots = step.get("ask", slots)
+        if not intent or not slots:
+            raise ValueError(f"Story {story.get('story')!r} needs an 'intent' step and an 'ask' step")
+        unknown = [slot for slot in slots if slot not in self.slot_fillers]
+        if unknown:
+            raise ValueError(f"Story {story.get('story')!r} asks for slots not declared in the domain: {unknown}")
+        return intent, tuple(slots)
+
+    @classmethod
+    def from_files(cls, domain_file, stories_file):
+        """Compiles the engine from a domain.yml and a stories.yml."""
+        with open(domain_file, "r", encoding="utf-8") as f:
+            domain = yaml.safe_load(f) or {}
+        with open(stories_file, "r", encoding="utf-8") as f:
+            stories = yaml.safe_load(f) or {}
+        return cls(domain, stories)
+
+    def new_context(self):
+        """A fresh conversation context (nothing pending)."""
+        return {"state": IDLE, "pending_entities": {}}
+
+    def _reset(self, context):
+        context.clear()
+        context.update(self.new_context())
+
+    def awaiting_intent(self, context):
+        """The intent whose follow-up question is open in context, or None."""
+        state = self.states.get(context.get("state"))
+        return state.intent if state else None
+
+    def is_exit(self, user_query_text):
+        return bool(self._exit_matcher.find_all(user_query_text.lower()))
+
+    def fill_slots(self, state, pending_entities, reply, confidences=None):
+        """
+        Returns pending_entities with the reply filled into the first of state.slots that accepts it.
+        A slot filled with a guessed name gets its confidence in `confidences` (a dict, if given).
+        """
+        entities = dict(pending_entities)
+        reply = reply.strip()
+        index = nlu_processor.get_nlu_index()
+        hits = index.scan(reply.lower())
+        for slot in state.slots:
+            filled = self.slot_fillers[slot](reply, hits, index.knowledge_base)
+            if filled and filled[0]:
+                entities[slot] = filled[0]
+                if filled[1] < 1.0 and confidences is not None:
+                    confidences[slot] = filled[1]
+                return entities
+        entities[state.slots[-1]] = reply
+        return entities
+
+    def handle_turn(self, context, user_query_text, nlu_result=None, weather_cache=None):
+        """
+        Handles one user message and advances context in place.
+        Args:
+            context (dict): The conversation context from new_context().
+            user_query_text (str): The user's message.
+            nlu_result (dict, optional): Precomputed NLU result for the message (used only when no question is open).
+            weather_cache (dict, optional): Weather lookups shared across a batch.
+        Returns:
+            TurnResult: The response and what the conversation is waiting for next.
+        """
+        nlu_result = self._begin_turn(context, user_query_text, nlu_result)
+        if nlu_result is None:
+            return TurnResult(self.goodbye_text, {}, (), True)
+        question = self._ask_confirmation(context, nlu_result)
+        if question is not None:
+            return question
+        response = intent_handler.respond_to_intent(nlu_result, weather_cache=weather_cache)
+        return self._finish_turn(context, nlu_result, response)
+
+    async def handle_turn_async(self, context, user_query_text, nlu_result=None, weather_cache=None):
+        """handle_turn for an event loop: the handler's network I/O is awaited (see intent_handler.respond_to_intent_async)."""
+        nlu_result = self._begin_turn(context, user_query_text, nlu_result)
+        if nlu_result is None:
+            return TurnResult(self.goodbye_text, {}, (), True)
+        question = self._ask_confirmation(context, nlu_result)
+        if question is not None:
+            return question
+        response = await intent_handler.respond_to_intent_async(nlu_result, weather_cache=weather_cache)
+        return self._finish_turn(context, nlu_result, response)
+
+    def _begin_turn(self, context, user_query_text, nlu_result):
+        """Returns the NLU result to answer, or None (with context reset) if the user closed the conversation."""
+        if self.is_exit(user_query_text):
+            self._reset(context)
+            return None
+
+        if context.get("state") == CONFIRM:
+            confirmed = self._read_confirmation(context, user_query_text)
+            if confirmed is not None:
+                return confirmed
+            # Neither yes nor no: the message is a new question
+
+        state = self.states.get(context.get("state"))
+        if state is not None:
+            logger.debug("Handling as %s follow-up for %s: %r", state.intent, state.slots, user_query_text)
+            confidences = {}
+            result = {"intent": state.intent,
+                      "entities": self.fill_slots(state, context.get("pending_entities") or {}, user_query_text, confidences)}
+            if confidences:
+                result["entity_confidence"] = confidences
+            return result
+        if nlu_result is None:
+            nlu_result = nlu_processor.process_query_rule_based(user_query_text)
+        return nlu_result
+
+    def _ask_confirmation(self, context, nlu_result):
+        """
+        If nlu_result holds guessed entities (confidence below 1.0), asks the user to confirm them instead
+        of answering for a place or crop they may not have meant. Returns that TurnResult, or None.
+        """
+        entities = nlu_result.get("entities") or {}
+        guessed = [name for name, confidence in (nlu_result.get("entity_confidence") or {}).items()
+                   if confidence < 1.0 and entities.get(name)]
+        if not guessed or not self.confirm_text:
+            return None
+        self._reset(context)
+        context["state"] = CONFIRM
+        context["pending_entities"] = dict(entities)
+        context["confirming"] = {"intent": nlu_result.get("intent"), "entities": guessed}
+        text = self.confirm_text.format(value=", ".join(entities[name] for name in guessed))
+        return TurnResult(text, nlu_result, ("confirmation",), False)
+
+    def _read_confirmation(self, context, reply):
+        """
+        The NLU result to answer after a yes/no to _ask_confirmation: the guessed entities kept, or dropped
+        (so the handler asks for them again). A reply counts as yes/no only if it is made of nothing but
+        confirm/deny words ("हाँ जी", "नहीं"); anything else ("गेहूं की खेती कब करें ना") returns None and is
+        a new question. The context is reset either way.
+        """
+        confirming = context.get("confirming") or {}
+        entities = dict(context.get("pending_entities") or {})
+        words = set(reply.lower().translate(_REPLY_PUNCTUATION).split())
+        self._reset(context)
+        if not words or not words <= self.confirm_words | self.deny_words:
+            return None
+        if words & self.deny_words:
+            for name in confirming.get("entities") or ():
+                entities.pop(name, None)
+        return {"intent": confirming.get("intent"), "entities": entities}
+
+    def _finish_turn(self, context, nlu_result, response):
+        next_state = self.transitions.get((nlu_result.get("intent"), tuple(response.awaiting)), IDLE)
+        context["state"] = next_state
+        context["pending_entities"] = dict(nlu_result.get("entities") or {}) if next_state != IDLE else {}
+        awaiting = self.states[next_state].slots if next_state != IDLE else ()
+        return TurnResult(response.text, nlu_result, awaiting, False)
+
+
+_engine = None
+
+def get_dialogue_engine():
+    """Returns the engine compiled from settings.DIALOGUE_DOMAIN_FILE and DIALOGUE_STORIES_FILE (built once)."""
+    global _engine
+    if _engine is None:
+        _engine = DialogueEngine.from_files(settings.DIALOGUE_DOMAIN_FILE, settings.DIALOGUE_STORIES_FILE)
+    return _engine
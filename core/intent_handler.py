@@ -1,12 +1,23 @@
-from utils.data_loaders import get_crop_data, get_mandi_price_data, get_schemes_data
+from utils import knowledge_base
 from utils import api_clients # Assuming you have this for get_live_weather_data
+from utils import log
+from utils import metrics
 from config import settings
+from collections import namedtuple
+from datetime import datetime
+import asyncio
 import random
+import time
 
-# Load all necessary data at the module level
-CROP_DATA = get_crop_data()
-MANDI_PRICE_DATA = get_mandi_price_data()
-SCHEMES_DATA = get_schemes_data()
+logger = log.get_logger(__name__)
+
+# Module-level data names kept for existing callers; they resolve against the shared KnowledgeBase
+_KNOWLEDGE_BASE_ATTRIBUTES = {"CROP_DATA": "crop_data", "MANDI_PRICE_DATA": "mandi_price_data", "SCHEMES_DATA": "schemes_data"}
+
+def __getattr__(name):
+    if name in _KNOWLEDGE_BASE_ATTRIBUTES:
+        return getattr(knowledge_base.get_knowledge_base(), _KNOWLEDGE_BASE_ATTRIBUTES[name])
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 def _format_list_to_hindi_string(items_list):
     """Helper function to format a list into a Hindi string e.g., 'A, B और C'."""
@@ -19,239 +30,497 @@ def _format_list_to_hindi_string(items_list):
     # For 3 or more items: "A, B, C और D" -> "A, B, C और D"
     return ", ".join(items_list[:-1]) + " और " + items_list[-1]
 
-def handle_intent(nlu_result):
+_PREFETCH_STAGE_SECONDS = metrics.stage_timer("weather_prefetch")
+
+def prefetch_weather(locations, max_workers=8):
+    """
+    Fetches live weather once per distinct location, concurrently.
+    Args:
+        locations (iterable): Location names; duplicates and empty values are skipped.
+        max_workers (int): Upper bound on parallel upstream calls.
+    Returns:
+        dict: location -> weather data (or None if the lookup failed).
+    """
+    unique_locations = list(dict.fromkeys(loc for loc in locations if loc))
+    if not unique_locations:
+        return {}
+    started = time.perf_counter()
+    try:
+        if len(unique_locations) == 1:
+            return {unique_locations[0]: api_clients.get_live_weather_data(unique_locations[0])}
+        from concurrent.futures import ThreadPoolExecutor # Only batches with several locations need the pool
+        with ThreadPoolExecutor(max_workers=min(max_workers, len(unique_locations))) as executor:
+            return dict(zip(unique_locations, executor.map(api_clients.get_live_weather_data, unique_locations)))
+    finally:
+        _PREFETCH_STAGE_SECONDS.observe(time.perf_counter() - started)
+
+async def prefetch_weather_async(locations):
+    """Async prefetch_weather: all distinct locations are awaited concurrently on the async weather client."""
+    import asyncio
+    from utils import async_api_clients # Only the ASGI server needs the async client (and httpx)
+    unique_locations = list(dict.fromkeys(loc for loc in locations if loc))
+    if not unique_locations:
+        return {}
+    started = time.perf_counter()
+    results = await asyncio.gather(*(async_api_clients.get_live_weather_data(loc) for loc in unique_locations))
+    _PREFETCH_STAGE_SECONDS.observe(time.perf_counter() - started)
+    return dict(zip(unique_locations, results))
+
+def _get_weather_data(location, weather_cache=None):
+    """Returns weather for location, reusing (and filling) a per-batch weather_cache dict if given."""
+    if weather_cache is None:
+        return api_clients.get_live_weather_data(location)
+    if location not in weather_cache:
+        weather_cache[location] = api_clients.get_live_weather_data(location)
+    return weather_cache[location]
+
+def handle_intents(nlu_results):
+    """
+    Batch version of handle_intent.
+    Weather for all distinct locations in the batch is fetched once up front and shared.
+    Args:
+        nlu_results (list): NLU result dicts as returned by the NLU processor.
+    Returns:
+        list: Bot response strings, in the same order as nlu_results.
+    """
+    weather_cache = prefetch_weather(
+        (r.get("entities") or {}).get("location") for r in nlu_results if r.get("intent") == "get_weather"
+    )
+    return [handle_intent(nlu_result, weather_cache=weather_cache) for nlu_result in nlu_results]
+
+_INTENT_SECONDS = metrics.histogram("krishi_mitra_intent_duration_seconds", "Time spent in one intent handler.", ("intent",))
+_INTENT_STAGE_SECONDS = metrics.stage_timer("intent")
+
+class IntentHandler:
+    """
+    A registered handler for one intent.
+    Holds the handler function func(entities, knowledge, weather_cache), the knowledge base data
+    it depends on, the optional async prefetch of its network I/O, and simple per-intent call
+    statistics collected by handle_intent (the latency histogram feeds /metrics).
+    """
+    __slots__ = ("intent", "func", "requires", "prefetch", "calls", "total_seconds", "latency")
+
+    def __init__(self, intent, func, requires=(), prefetch=None):
+        self.intent = intent
+        self.func = func
+        self.requires = tuple(requires)
+        self.prefetch = prefetch
+        self.calls = 0
+        self.total_seconds = 0.0
+        self.latency = _INTENT_SECONDS.labels(intent)
+
+    def __call__(self, entities, knowledge, weather_cache=None):
+        return self.func(entities, knowledge, weather_cache)
+
+# Intent name -> IntentHandler. Filled by the @register_intent decorators below.
+INTENT_HANDLERS = {}
+
+# What a handler returns when its answer is a question back to the user: `awaiting` names the slots
+# (entity names, e.g. ("mandi_location",)) the user's next reply should fill. Plain answers are strings.
+IntentResponse = namedtuple("IntentResponse", ["text", "awaiting"])
+
+def _ask(text, *slots):
+    return IntentResponse(text, slots)
+
+# Data a handler can declare in `requires`: name -> (getter(knowledge), debug message, user-facing message when missing)
+DATA_DEPENDENCIES = {
+    "crop_data": (lambda knowledge: knowledge.crop_data, "Crop data not loaded for a crop-specific intent.",
+                  "क्षमा करें, मैं इस समय फसल सलाहकार डेटा तक नहीं पहुंच पा रहा हूँ।"),
+    "mandi_price_data": (lambda knowledge: knowledge.mandi_price_data, "Mandi price data not loaded.",
+                         "क्षमा करें, मैं इस समय मंडी भाव डेटा तक नहीं पहुंच पा रहा हूँ।"),
+    "schemes_data": (lambda knowledge: knowledge.schemes_data, "Schemes data not loaded.",
+                     "क्षमा करें, मेरे पास अभी योजनाओं की जानकारी उपलब्ध नहीं है।"),
+    "price_history": (lambda knowledge: knowledge.price_history, "Mandi price history not loaded or empty.",
+                      "क्षमा करें, मेरे पास अभी मंडी भाव के इतिहास की जानकारी उपलब्ध नहीं है।"),
+}
+
+def register_intent(intent, requires=(), prefetch=None):
+    """
+    Decorator that registers func(entities, knowledge, weather_cache) as the handler for intent.
+    `knowledge` is the KnowledgeBase taken once for the request.
+    Args:
+        intent (str): The intent name produced by the NLU.
+        requires (iterable): Names from DATA_DEPENDENCIES that must be loaded before the handler runs.
+        prefetch (coroutine function, optional): prefetch(entities, weather_cache) doing the handler's
+            network I/O ahead of it on the async path (respond_to_intent_async), leaving the results in
+            weather_cache where the handler looks first. Handlers themselves never block on I/O there.
+    """
+    unknown = [name for name in requires if name not in DATA_DEPENDENCIES]
+    if unknown:
+        raise ValueError(f"Unknown data dependencies for intent '{intent}': {unknown}")
+    def decorator(func):
+        INTENT_HANDLERS[intent] = IntentHandler(intent, func, requires, prefetch)
+        return func
+    return decorator
+
+def handle_intent(nlu_result, weather_cache=None):
+    """Runs the handler for nlu_result and returns the response text."""
+    return respond_to_intent(nlu_result, weather_cache).text
+
+def respond_to_intent(nlu_result, weather_cache=None):
+    """
+    Runs the handler for nlu_result.
+    Returns:
+        IntentResponse: The response text and the slots it asks the user for (empty if it asks nothing).
+    """
     intent = nlu_result.get("intent")
     entities = nlu_result.get("entities", {})
 
-    # Check if necessary data is loaded for specific intents
-    crop_specific_intents = [
-        "ask_crop_sowing_time", "ask_crop_general_info", "ask_crop_pests",
-        "ask_crop_fertilizers", "ask_crop_soil_type", "ask_crop_irrigation"
-    ]
-    if intent in crop_specific_intents and not CROP_DATA:
-        if settings.DEBUG_MODE: print("Intent Handler Error: Crop data not loaded for a crop-specific intent.")
-        return "क्षमा करें, मैं इस समय फसल सलाहकार डेटा तक नहीं पहुंच पा रहा हूँ।"
-    
-    if intent == "get_mandi_price" and not MANDI_PRICE_DATA:
-        if settings.DEBUG_MODE: print("Intent Handler Error: Mandi price data not loaded.")
-        return "क्षमा करें, मैं इस समय मंडी भाव डेटा तक नहीं पहुंच पा रहा हूँ।"
+    handler = INTENT_HANDLERS.get(intent, _UNKNOWN_INTENT_HANDLER)
+    knowledge = knowledge_base.get_knowledge_base() # One consistent KnowledgeBase for the whole request
+
+    # Check if necessary data is loaded for this intent
+    for dependency in handler.requires:
+        get_data, debug_message, unavailable_response = DATA_DEPENDENCIES[dependency]
+        if not get_data(knowledge):
+            logger.warning(debug_message)
+            return IntentResponse(unavailable_response, ())
+
+    started = time.perf_counter()
+    try:
+        response = handler(entities, knowledge, weather_cache)
+        return response if isinstance(response, IntentResponse) else IntentResponse(response, ())
+    finally:
+        elapsed = time.perf_counter() - started
+        handler.calls += 1
+        handler.total_seconds += elapsed
+        handler.latency.observe(elapsed)
+        _INTENT_STAGE_SECONDS.observe(elapsed)
+
+# Dependencies read from disk on every request when settings.MANDI_PRICE_BACKEND is "sqlite"
+SQLITE_BACKED_DEPENDENCIES = frozenset(["price_history"])
+
+def _blocks_on_io(handler):
+    return settings.MANDI_PRICE_BACKEND == "sqlite" and not SQLITE_BACKED_DEPENDENCIES.isdisjoint(handler.requires)
+
+async def respond_to_intent_async(nlu_result, weather_cache=None):
+    """
+    respond_to_intent for an event loop: awaits the handler's prefetch (if it has one), then runs the
+    handler inline, since with its I/O done it only does CPU work on in-memory data. Handlers that query
+    the SQLite price store (MANDI_PRICE_BACKEND = "sqlite") run on the default executor instead.
+    Args:
+        nlu_result (dict): The NLU result.
+        weather_cache (dict, optional): Weather already fetched (e.g. for a batch); filled in by the prefetch.
+    Returns:
+        IntentResponse: As respond_to_intent.
+    """
+    handler = INTENT_HANDLERS.get(nlu_result.get("intent"))
+    if handler is not None and handler.prefetch is not None:
+        weather_cache = {} if weather_cache is None else weather_cache
+        await handler.prefetch(nlu_result.get("entities") or {}, weather_cache)
+    if handler is not None and _blocks_on_io(handler):
+        # to_thread = the loop's default executor, keeping the request id for the handler's log records
+        return await asyncio.to_thread(respond_to_intent, nlu_result, weather_cache)
+    return respond_to_intent(nlu_result, weather_cache)
+
+def get_intent_stats():
+    """Returns {intent: {"calls": n, "total_seconds": t}} for every handler that has run."""
+    return {
+        h.intent: {"calls": h.calls, "total_seconds": h.total_seconds}
+        for h in list(INTENT_HANDLERS.values()) + [_UNKNOWN_INTENT_HANDLER] if h.calls
+    }
+
+# --- Intent Handlers ---
+
+@register_intent("get_help")
+def _handle_help(entities, knowledge, weather_cache=None):
+    help_message = (
+        "मैं आपकी मदद कर सकता हूँ: फसल की बुवाई का समय, सामान्य जानकारी, कीट-रोग, खाद (उर्वरक), मिट्टी, और सिंचाई की जानकारी; साथ ही मौसम की जानकारी, मंडी भाव, और सरकारी योजनाओं के बारे में भी बता सकता हूँ। "
+        "उदाहरण: 'गेहूं की खेती कब करें', 'धान में कीट', 'मक्का के लिए खाद', 'आलू के लिए मिट्टी', 'टमाटर में सिंचाई', 'दिल्ली में मौसम', 'कानपुर मंडी में गेहूं का भाव', 'सरकारी योजनाएं दिखाओ'। "
+        "बातचीत समाप्त करने के लिए 'धन्यवाद' या 'बाय' कहें।"
+    )
+    return help_message
+
+async def _prefetch_weather(entities, weather_cache):
+    location = entities.get("location")
+    if location and location not in weather_cache:
+        weather_cache.update(await prefetch_weather_async([location]))
+
+@register_intent("get_weather", prefetch=_prefetch_weather)
+def _handle_weather(entities, knowledge, weather_cache=None):
+    location = entities.get("location")
+    if not location:
+        return _ask("आप किस जगह के मौसम के बारे में जानना चाहते हैं?", "location")
     
-    if intent == "ask_scheme_info" and not SCHEMES_DATA:
-        if settings.DEBUG_MODE: print("Intent Handler Error: Schemes data not loaded.")
-        return "क्षमा करें, मेरे पास अभी योजनाओं की जानकारी उपलब्ध नहीं है।"
-
-    # --- Intent Handling Logic ---
-    if intent == "get_help":
-        help_message = (
-            "मैं आपकी मदद कर सकता हूँ: फसल की बुवाई का समय, सामान्य जानकारी, कीट-रोग, खाद (उर्वरक), मिट्टी, और सिंचाई की जानकारी; साथ ही मौसम की जानकारी, मंडी भाव, और सरकारी योजनाओं के बारे में भी बता सकता हूँ। "
-            "उदाहरण: 'गेहूं की खेती कब करें', 'धान में कीट', 'मक्का के लिए खाद', 'आलू के लिए मिट्टी', 'टमाटर में सिंचाई', 'दिल्ली में मौसम', 'कानपुर मंडी में गेहूं का भाव', 'सरकारी योजनाएं दिखाओ'। "
-            "बातचीत समाप्त करने के लिए 'धन्यवाद' या 'बाय' कहें।"
-        )
-        return help_message
-
-    elif intent == "get_weather":
-        location = entities.get("location")
-        if not location:
-            return "आप किस जगह के मौसम के बारे में जानना चाहते हैं?"
-        
-        if settings.DEBUG_MODE: print(f"Intent Handler: Fetching weather for {location}")
-        weather_data = api_clients.get_live_weather_data(location) # Assumes api_clients is imported
-
-        if weather_data:
-            try:
-                city_name = weather_data.get("name", location) 
-                main_weather = weather_data.get("weather", [{}])[0]
-                description_hindi = main_weather.get("description", "उपलब्ध नहीं")
-                main_details = weather_data.get("main", {})
-                temp_celsius = main_details.get("temp")
-                humidity = main_details.get("humidity")
-                
-                response_parts = [f"{city_name} में मौसम {description_hindi} है।"]
-                if temp_celsius is not None:
-                    response_parts.append(f"तापमान लगभग {temp_celsius:.1f}° सेल्सियस है")
-                if humidity is not None:
-                    response_parts.append(f"और हवा में नमी {humidity}% है।")
-                
-                return " ".join(response_parts)
-            except Exception as e:
-                if settings.DEBUG_MODE:
-                    print(f"Intent Handler: Error parsing weather data for {location}: {e}")
-                return f"क्षमा करें, {location} के लिए मौसम की जानकारी को समझने में कुछ दिक्कत हुई।"
+    logger.debug("Fetching weather for %s", location)
+    weather_data = _get_weather_data(location, weather_cache)
+
+    snapshot_note = None
+    if weather_data and weather_data.get("source") == "static":
+        # A saved snapshot is never passed off as current: it is read out with its date, or not at all once too old
+        observed_at = weather_data.get("dt")
+        max_age = settings.WEATHER_STATIC_MAX_AGE_SECONDS
+        if max_age is not None and (observed_at is None or time.time() - observed_at > max_age):
+            logger.info("Static weather for %s is too old to answer with (dt=%s)", location, observed_at)
+            return f"क्षमा करें, {location} का ताज़ा मौसम अभी उपलब्ध नहीं है। कृपया थोड़ी देर बाद फिर से पूछें।"
+        if observed_at is not None:
+            snapshot_note = f"(यह {datetime.fromtimestamp(observed_at):%d-%m-%Y %H:%M} बजे की सहेजी गई जानकारी है, अभी का मौसम अलग हो सकता है।)"
         else:
-            return f"क्षमा करें, मैं {location} के लिए मौसम की जानकारी प्राप्त नहीं कर सका। कृपया शहर का नाम जांचें या बाद में प्रयास करें।"
+            snapshot_note = "(यह स्थानीय रूप से सहेजी गई जानकारी है, ताज़ा मौसम से अलग हो सकती है।)"
 
-    elif intent == "get_mandi_price":
-        crop_name = entities.get("crop_name")
-        mandi_location = entities.get("mandi_location")
-
-        if not crop_name and not mandi_location:
-            return "आप किस फसल का और किस मंडी में भाव जानना चाहते हैं?"
-        elif not mandi_location: # Crop specified, but not mandi
-            responses = []
-            if MANDI_PRICE_DATA: # Ensure data is loaded
-                for mandi, crops_in_mandi in MANDI_PRICE_DATA.items():
-                    if crop_name in crops_in_mandi:
-                        price_info = crops_in_mandi[crop_name]
-                        responses.append(f"{crop_name} का भाव {mandi} में {price_info['price']} है (आखरी अपडेट: {price_info['last_updated']})।")
-            if responses:
-                return " ".join(responses) if len(responses) < 3 else " विभिन्न मंडियों में भाव इस प्रकार हैं: " + " ".join(responses)
-            else:
-                return f"क्षमा करें, मुझे {crop_name} के लिए किसी भी मंडी में भाव की जानकारी नहीं है। आप किस मंडी के बारे में पूछ रहे हैं?"
-        elif not crop_name: # Mandi specified, but not crop
-            return f"आप {mandi_location} में किस फसल का भाव जानना चाहते हैं?"
-        
-        # Both crop_name and mandi_location are specified
-        if MANDI_PRICE_DATA and mandi_location in MANDI_PRICE_DATA:
-            mandi_info = MANDI_PRICE_DATA[mandi_location]
-            if crop_name in mandi_info:
-                price_info = mandi_info[crop_name]
-                return (f"{crop_name} का भाव {mandi_location} में {price_info['price']} है। "
-                        f"यह जानकारी {price_info['last_updated']} को अपडेट की गई थी।")
-            else:
-                return f"क्षमा करें, {mandi_location} में {crop_name} के भाव की जानकारी उपलब्ध नहीं है।"
-        else: # Mandi location not found in our data
-            return f"क्षमा करें, मुझे {mandi_location} की जानकारी नहीं है। मैं कुछ चुनिंदा मंडियों का ही भाव बता सकता हूँ।"
-
-    elif intent == "ask_scheme_info":
-        entities_from_nlu = entities # Use the full entities dict passed from NLU
-        specific_scheme_name_query = entities_from_nlu.get("scheme_name")
-
-        response_parts = []
-        schemes_found_for_details = []
-
-        if not isinstance(SCHEMES_DATA, list) or not SCHEMES_DATA:
-            return "क्षमा करें, मेरे पास अभी योजनाओं की विस्तृत जानकारी उपलब्ध नहीं है।"
-
-        if specific_scheme_name_query:
-            for scheme in SCHEMES_DATA:
-                s_name = scheme.get("name", "").lower()
-                s_keywords = [k.lower() for k in scheme.get("keywords", [])]
-                query_part = specific_scheme_name_query.lower()
-                if query_part in s_name or query_part in s_keywords or s_name in query_part: # More flexible matching
-                    schemes_found_for_details.append(scheme)
-                    break 
+    if weather_data:
+        try:
+            city_name = weather_data.get("name", location) 
+            main_weather = weather_data.get("weather", [{}])[0]
+            description_hindi = main_weather.get("description", "उपलब्ध नहीं")
+            main_details = weather_data.get("main", {})
+            temp_celsius = main_details.get("temp")
+            humidity = main_details.get("humidity")
             
-        if schemes_found_for_details:
-            scheme = schemes_found_for_details[0]
-            response_parts.append(f"**{scheme.get('name', 'योजना')}**")
-            if scheme.get('category'): response_parts.append(f"*श्रेणी:* {scheme.get('category')}")
-            if scheme.get('focus'): response_parts.append(f"*मुख्य उद्देश्य:* {scheme.get('focus')}")
-            if scheme.get('details'): response_parts.append(f"*विवरण:* {scheme.get('details')}")
-            if scheme.get('eligibility'): response_parts.append(f"*पात्रता:* {scheme.get('eligibility')}")
-            if scheme.get('advice'): response_parts.append(f"*सलाह:* {scheme.get('advice')}")
-        else: 
-            response_parts.append("किसानों और ग्रामीण विकास के लिए कई योजनाएं और सलाहकार सेवाएं उपलब्ध हैं।")
-            filter_category = entities_from_nlu.get("filter") # NLU needs to provide this for filtering
+            response_parts = [f"{city_name} में मौसम {description_hindi} है।"]
+            if temp_celsius is not None:
+                response_parts.append(f"तापमान लगभग {temp_celsius:.1f}° सेल्सियस है")
+            if humidity is not None:
+                response_parts.append(f"और हवा में नमी {humidity}% है।")
+            if snapshot_note:
+                response_parts.append(snapshot_note)
             
-            schemes_to_list_display = []
-            temp_list_for_filtering = []
-
-            if filter_category == "jharkhand":
-                temp_list_for_filtering = [s for s in SCHEMES_DATA if "Jharkhand" in s.get("category", "")]
-                if temp_list_for_filtering: response_parts.append("\n**झारखंड विशिष्ट योजनाएं/पहल:**")
-            elif filter_category == "all_india":
-                temp_list_for_filtering = [s for s in SCHEMES_DATA if "All India" in s.get("category", "")]
-                if temp_list_for_filtering: response_parts.append("\n**अखिल भारतीय योजनाएं:**")
-            else: # No filter or filter didn't match specific category, list a mix
-                jharkhand_schemes = [s for s in SCHEMES_DATA if "Jharkhand" in s.get("category", "")]
-                all_india_schemes = [s for s in SCHEMES_DATA if "All India" in s.get("category", "")]
-                if jharkhand_schemes:
-                    response_parts.append("\n**कुछ झारखंड विशिष्ट योजनाएं/पहल:**")
-                    for i, scheme in enumerate(jharkhand_schemes[:min(3, len(jharkhand_schemes))]): response_parts.append(f"- {scheme.get('name')}")
-                    if len(jharkhand_schemes) > 3: response_parts.append("  और भी...")
-                if all_india_schemes:
-                    response_parts.append("\n**कुछ अखिल भारतीय योजनाएं:**")
-                    for i, scheme in enumerate(all_india_schemes[:min(3, len(all_india_schemes))]): response_parts.append(f"- {scheme.get('name')}")
-                    if len(all_india_schemes) > 3: response_parts.append("  और भी...")
-                if not jharkhand_schemes and not all_india_schemes and SCHEMES_DATA:
-                    response_parts.append("\n**कुछ मुख्य योजनाएं हैं:**")
-                    for i, scheme in enumerate(SCHEMES_DATA[:min(3, len(SCHEMES_DATA))]): response_parts.append(f"- {scheme.get('name')}")
-            
-            if temp_list_for_filtering: # if a filter was applied
-                for i, scheme in enumerate(temp_list_for_filtering[:min(5, len(temp_list_for_filtering))]):
-                    response_parts.append(f"- {scheme.get('name')}")
-                if len(temp_list_for_filtering) > 5: response_parts.append("  और भी...")
+            return " ".join(response_parts)
+        except Exception as e:
+            logger.warning("Error parsing weather data for %s: %s", location, e)
+            return f"क्षमा करें, {location} के लिए मौसम की जानकारी को समझने में कुछ दिक्कत हुई।"
+    elif api_clients.is_weather_service_degraded():
+        return "क्षमा करें, मौसम सेवा अभी उपलब्ध नहीं है। कृपया थोड़ी देर बाद फिर से पूछें।"
+    else:
+        return f"क्षमा करें, मैं {location} के लिए मौसम की जानकारी प्राप्त नहीं कर सका। कृपया शहर का नाम जांचें या बाद में प्रयास करें।"
 
-            response_parts.append("\nआप किसी विशिष्ट योजना का नाम लेकर पूछ सकते हैं, या श्रेणी के अनुसार (जैसे 'झारखंड की योजनाएं')।")
+RANKED_PRICE_RESULTS = 3 # How many mandis a "cheapest / best price" answer lists
+NEAR_PRICE_TOLERANCE = 100.0 # Rupees per quintal either side of the asked-for price
+
+def _format_ranked_mandi_prices(crop_name, entities, price_index):
+    """Answers 'where is X cheapest / costliest / near a price' from the price index; None if nothing matches."""
+    target_price = entities.get("target_price")
+    if target_price is not None:
+        entries = price_index.near_price(crop_name, target_price, NEAR_PRICE_TOLERANCE)[:RANKED_PRICE_RESULTS]
+        heading = f"{crop_name} का भाव {target_price:.0f} रुपये के आसपास इन मंडियों में है:"
+    elif entities.get("price_rank") == "lowest":
+        entries = price_index.cheapest(crop_name, RANKED_PRICE_RESULTS)
+        heading = f"{crop_name} का सबसे कम भाव इन मंडियों में है:"
+    else:
+        entries = price_index.costliest(crop_name, RANKED_PRICE_RESULTS)
+        heading = f"{crop_name} का सबसे अच्छा (ऊंचा) भाव इन मंडियों में है:"
+    if not entries:
+        return None
+    lines = [f"{rank}. {entry.mandi} - {entry.price_text} (आखरी अपडेट: {entry.last_updated})"
+             for rank, entry in enumerate(entries, start=1)]
+    return "\n".join([heading] + lines)
+
+@register_intent("get_mandi_price", requires=("mandi_price_data",))
+def _handle_mandi_price(entities, knowledge, weather_cache=None):
+    crop_name = entities.get("crop_name")
+    mandi_location = entities.get("mandi_location")
+
+    if not crop_name and not mandi_location:
+        return _ask("आप किस फसल का और किस मंडी में भाव जानना चाहते हैं?", "mandi_location", "crop_name")
+    elif not mandi_location: # Crop specified, but not mandi
+        price_index = knowledge.price_index
+        if entities.get("price_rank") or entities.get("target_price") is not None:
+            ranked_response = _format_ranked_mandi_prices(crop_name, entities, price_index)
+            if ranked_response:
+                return ranked_response
+        responses = [
+            f"{crop_name} का भाव {entry.mandi} में {entry.price_text} है (आखरी अपडेट: {entry.last_updated})।"
+            for entry in price_index.prices_for_crop(crop_name)
+        ]
+        if responses:
+            return " ".join(responses) if len(responses) < 3 else " विभिन्न मंडियों में भाव इस प्रकार हैं: " + " ".join(responses)
+        else:
+            return _ask(f"क्षमा करें, मुझे {crop_name} के लिए किसी भी मंडी में भाव की जानकारी नहीं है। आप किस मंडी के बारे में पूछ रहे हैं?",
+                        "mandi_location")
+    elif not crop_name: # Mandi specified, but not crop
+        return _ask(f"आप {mandi_location} में किस फसल का भाव जानना चाहते हैं?", "crop_name")
+    
+    # Both crop_name and mandi_location are specified
+    if mandi_location in knowledge.mandi_price_data:
+        mandi_info = knowledge.mandi_price_data[mandi_location]
+        if crop_name in mandi_info:
+            price_info = mandi_info[crop_name]
+            return (f"{crop_name} का भाव {mandi_location} में {price_info['price']} है। "
+                    f"यह जानकारी {price_info['last_updated']} को अपडेट की गई थी।")
+        else:
+            return f"क्षमा करें, {mandi_location} में {crop_name} के भाव की जानकारी उपलब्ध नहीं है।"
+    else: # Mandi location not found in our data
+        return f"क्षमा करें, मुझे {mandi_location} की जानकारी नहीं है। मैं कुछ चुनिंदा मंडियों का ही भाव बता सकता हूँ।"
+
+def _format_price_trend(stats):
+    """One sentence for a PriceWindowStats: how the modal price moved over the window and its range."""
+    if round(stats.modal_price) == round(stats.previous_price):
+        movement = f"{stats.modal_price:.0f} रुपये प्रति क्विंटल पर स्थिर रहा"
+    else:
+        direction = "बढ़कर" if stats.modal_price > stats.previous_price else "घटकर"
+        movement = (f"{stats.previous_price:.0f} से {direction} {stats.modal_price:.0f} रुपये प्रति क्विंटल हो गया "
+                    f"({stats.change_percent:+.1f}%)")
+    return (f"{stats.crop} का भाव {stats.mandi} में पिछले {stats.days} दिनों में {movement}। "
+            f"इस दौरान न्यूनतम {stats.min_price:.0f}, अधिकतम {stats.max_price:.0f} और औसत {stats.mean_price:.0f} रुपये रहा "
+            f"(आखरी अपडेट: {stats.end_date:%d-%m-%Y})।")
+
+@register_intent("ask_price_trend", requires=("price_history",))
+def _handle_price_trend(entities, knowledge, weather_cache=None):
+    crop_name = entities.get("crop_name")
+    mandi_location = entities.get("mandi_location")
+    window_days = entities.get("window_days", 7)
+    price_history = knowledge.price_history
+
+    if not crop_name:
+        return _ask("आप किस फसल के भाव का उतार-चढ़ाव जानना चाहते हैं?", "crop_name")
+    if mandi_location:
+        stats = price_history.window_stats(mandi_location, crop_name, window_days)
+        if stats is None:
+            return f"क्षमा करें, {mandi_location} में {crop_name} के पिछले {window_days} दिनों के भाव उपलब्ध नहीं हैं।"
+        return _format_price_trend(stats)
+
+    all_stats = price_history.crop_window_stats(crop_name, window_days)
+    if not all_stats:
+        return f"क्षमा करें, मेरे पास {crop_name} के भाव का इतिहास उपलब्ध नहीं है। आप किस मंडी के बारे में पूछ रहे हैं?"
+    if len(all_stats) < 3:
+        return " ".join(_format_price_trend(stats) for stats in all_stats)
+    # Many mandis: summarise instead of reading out every one
+    average_change = sum(stats.change_percent for stats in all_stats) / len(all_stats)
+    biggest_rise = max(all_stats, key=lambda stats: stats.change_percent)
+    biggest_fall = min(all_stats, key=lambda stats: stats.change_percent)
+    return (f"पिछले {window_days} दिनों में {len(all_stats)} मंडियों में {crop_name} का भाव औसतन {average_change:+.1f}% बदला। "
+            f"सबसे अच्छा रुख {biggest_rise.mandi} में ({biggest_rise.change_percent:+.1f}%, अब {biggest_rise.modal_price:.0f} रुपये) "
+            f"और सबसे कमजोर रुख {biggest_fall.mandi} में ({biggest_fall.change_percent:+.1f}%, अब {biggest_fall.modal_price:.0f} रुपये) रहा। "
+            f"किसी एक मंडी का पूरा हाल जानने के लिए मंडी का नाम भी बताएं।")
+
+@register_intent("ask_scheme_info", requires=("schemes_data",))
+def _handle_scheme_info(entities, knowledge, weather_cache=None):
+    schemes_data = knowledge.schemes_data
+    specific_scheme_name_query = entities.get("scheme_name")
+
+    response_parts = []
+    schemes_found_for_details = []
+
+    if not isinstance(schemes_data, (list, tuple)):
+        return "क्षमा करें, मेरे पास अभी योजनाओं की विस्तृत जानकारी उपलब्ध नहीं है।"
+
+    if specific_scheme_name_query:
+        for scheme in schemes_data:
+            s_name = scheme.get("name", "").lower()
+            s_keywords = [k.lower() for k in scheme.get("keywords", [])]
+            query_part = specific_scheme_name_query.lower()
+            if query_part in s_name or query_part in s_keywords or s_name in query_part: # More flexible matching
+                schemes_found_for_details.append(scheme)
+                break 
+        
+    if schemes_found_for_details:
+        scheme = schemes_found_for_details[0]
+        response_parts.append(f"**{scheme.get('name', 'योजना')}**")
+        if scheme.get('category'): response_parts.append(f"*श्रेणी:* {scheme.get('category')}")
+        if scheme.get('focus'): response_parts.append(f"*मुख्य उद्देश्य:* {scheme.get('focus')}")
+        if scheme.get('details'): response_parts.append(f"*विवरण:* {scheme.get('details')}")
+        if scheme.get('eligibility'): response_parts.append(f"*पात्रता:* {scheme.get('eligibility')}")
+        if scheme.get('advice'): response_parts.append(f"*सलाह:* {scheme.get('advice')}")
+    else: 
+        response_parts.append("किसानों और ग्रामीण विकास के लिए कई योजनाएं और सलाहकार सेवाएं उपलब्ध हैं।")
+        filter_category = entities.get("filter") # NLU needs to provide this for filtering
         
-        return "\n".join(response_parts)
+        temp_list_for_filtering = []
 
-    elif intent == "ask_crop_sowing_time":
-        crop_name = entities.get("crop_name")
-        if crop_name:
-            crop_info = CROP_DATA.get(crop_name)
-            if crop_info and "sowing_time" in crop_info:
-                return f"{crop_name} की बुवाई का सही समय {crop_info['sowing_time']} है।"
-            else: return f"क्षमा करें, मुझे {crop_name} की बुवाई के समय की जानकारी नहीं है।"
-        else: return "आप किस फसल की बुवाई के समय के बारे में पूछ रहे हैं?"
-
-    elif intent == "ask_crop_general_info":
-        crop_name = entities.get("crop_name")
-        if crop_name:
-            crop_info = CROP_DATA.get(crop_name)
-            if crop_info and "general_info" in crop_info and crop_info["general_info"]:
-                return f"{crop_name} के बारे में यह जानकारी है: {crop_info['general_info']}"
-            else: return f"क्षमा करें, मेरे पास {crop_name} के बारे में सामान्य जानकारी उपलब्ध नहीं है।"
-        else: return "आप किस फसल के बारे में सामान्य जानकारी चाहते हैं?"
-
-    elif intent == "ask_crop_pests":
-        crop_name = entities.get("crop_name")
-        if crop_name:
-            crop_info = CROP_DATA.get(crop_name)
-            if crop_info and "pests" in crop_info and crop_info["pests"]:
-                return f"{crop_name} में लगने वाले प्रमुख कीट या रोग हैं: {_format_list_to_hindi_string(crop_info['pests'])}।"
-            else: return f"क्षमा करें, मेरे पास {crop_name} के कीट या रोगों की विशिष्ट जानकारी उपलब्ध नहीं है।"
-        else: return "आप किस फसल के कीट या रोगों के बारे में पूछ रहे हैं?"
-
-    elif intent == "ask_crop_fertilizers":
-        crop_name = entities.get("crop_name")
-        if crop_name:
-            crop_info = CROP_DATA.get(crop_name)
-            if crop_info and "fertilizers" in crop_info and crop_info["fertilizers"]:
-                fertilizer_info = crop_info["fertilizers"]
-                if isinstance(fertilizer_info, dict):
-                    response_parts = [f"{crop_name} के लिए खाद की सलाह:"]
-                    for key, value in fertilizer_info.items():
-                        response_parts.append(f"{key.capitalize()}: {value}")
-                    return " ".join(response_parts)
-                else:
-                    return f"{crop_name} के लिए खाद की सलाह है: {fertilizer_info}"
-            else: return f"क्षमा करें, मेरे पास {crop_name} के लिए खाद की विशिष्ट जानकारी उपलब्ध नहीं है।"
-        else: return "आप किस फसल के लिए खाद की जानकारी चाहते हैं?"
-
-    elif intent == "ask_crop_soil_type":
-        crop_name = entities.get("crop_name")
-        if crop_name:
-            crop_info = CROP_DATA.get(crop_name)
-            if crop_info and "soil_type" in crop_info and crop_info["soil_type"]:
-                return f"{crop_name} के लिए उपयुक्त मिट्टी है: {crop_info['soil_type']}"
-            else: return f"क्षमा करें, मेरे पास {crop_name} के लिए मिट्टी की विशिष्ट जानकारी उपलब्ध नहीं है।"
-        else: return "आप किस फसल के लिए मिट्टी की जानकारी चाहते हैं?"
-
-    elif intent == "ask_crop_irrigation":
+        if filter_category == "jharkhand":
+            temp_list_for_filtering = [s for s in schemes_data if "Jharkhand" in s.get("category", "")]
+            if temp_list_for_filtering: response_parts.append("\n**झारखंड विशिष्ट योजनाएं/पहल:**")
+        elif filter_category == "all_india":
+            temp_list_for_filtering = [s for s in schemes_data if "All India" in s.get("category", "")]
+            if temp_list_for_filtering: response_parts.append("\n**अखिल भारतीय योजनाएं:**")
+        else: # No filter or filter didn't match specific category, list a mix
+            jharkhand_schemes = [s for s in schemes_data if "Jharkhand" in s.get("category", "")]
+            all_india_schemes = [s for s in schemes_data if "All India" in s.get("category", "")]
+            if jharkhand_schemes:
+                response_parts.append("\n**कुछ झारखंड विशिष्ट योजनाएं/पहल:**")
+                for scheme in jharkhand_schemes[:3]: response_parts.append(f"- {scheme.get('name')}")
+                if len(jharkhand_schemes) > 3: response_parts.append("  और भी...")
+            if all_india_schemes:
+                response_parts.append("\n**कुछ अखिल भारतीय योजनाएं:**")
+                for scheme in all_india_schemes[:3]: response_parts.append(f"- {scheme.get('name')}")
+                if len(all_india_schemes) > 3: response_parts.append("  और भी...")
+            if not jharkhand_schemes and not all_india_schemes:
+                response_parts.append("\n**कुछ मुख्य योजनाएं हैं:**")
+                for scheme in schemes_data[:3]: response_parts.append(f"- {scheme.get('name')}")
+        
+        if temp_list_for_filtering: # if a filter was applied
+            for scheme in temp_list_for_filtering[:5]:
+                response_parts.append(f"- {scheme.get('name')}")
+            if len(temp_list_for_filtering) > 5: response_parts.append("  और भी...")
+
+        response_parts.append("\nआप किसी विशिष्ट योजना का नाम लेकर पूछ सकते हैं, या श्रेणी के अनुसार (जैसे 'झारखंड की योजनाएं')।")
+    
+    return "\n".join(response_parts)
+
+def _format_fertilizer_answer(crop_name, fertilizer_info):
+    if isinstance(fertilizer_info, dict):
+        response_parts = [f"{crop_name} के लिए खाद की सलाह:"]
+        for key, value in fertilizer_info.items():
+            response_parts.append(f"{key.capitalize()}: {value}")
+        return " ".join(response_parts)
+    return f"{crop_name} के लिए खाद की सलाह है: {fertilizer_info}"
+
+def _register_crop_field_intent(intent, field, format_answer, not_available_template, ask_crop_prompt):
+    """
+    Registers a handler that answers from a single field of the crop's advisory entry.
+    All crop-specific intents share the same lookup: crop name -> crop data entry -> field.
+    """
+    @register_intent(intent, requires=("crop_data",))
+    def _handle_crop_field(entities, knowledge, weather_cache=None):
         crop_name = entities.get("crop_name")
-        if crop_name:
-            crop_info = CROP_DATA.get(crop_name)
-            if crop_info and "irrigation" in crop_info and crop_info["irrigation"]:
-                return f"{crop_name} की सिंचाई के बारे में जानकारी: {crop_info['irrigation']}"
-            else: return f"क्षमा करें, मेरे पास {crop_name} के लिए सिंचाई की विशिष्ट जानकारी उपलब्ध नहीं है।"
-        else: return "आप किस फसल के लिए सिंचाई की जानकारी चाहते हैं?"
-
-    else: # Default for "unknown" intent
-        base_unknown_response = "क्षमा करें, मैं आपका सवाल समझ नहीं पाया।"
-        if hasattr(settings, 'EXAMPLE_QUERIES') and settings.EXAMPLE_QUERIES:
-            try:
-                num_examples = min(2, len(settings.EXAMPLE_QUERIES))
-                example_queries = random.sample(settings.EXAMPLE_QUERIES, num_examples)
-                examples_text = " आप ऐसा कुछ पूछ सकते हैं: " + " या ".join([f"'{q}'" for q in example_queries])
-                return base_unknown_response + examples_text
-            except ValueError: # Handle case where EXAMPLE_QUERIES might be too short for num_examples
-                return base_unknown_response + " आप 'मदद' या 'सहायता' कहकर जान सकते हैं कि मैं क्या कर सकता हूँ।"
-            except Exception as e:
-                if settings.DEBUG_MODE: print(f"Error generating example queries for unknown intent: {e}")
-                return base_unknown_response + " आप 'मदद' या 'सहायता' कहकर जान सकते हैं कि मैं क्या कर सकता हूँ।"
-        else:
+        if not crop_name:
+            return ask_crop_prompt
+        crop_info = knowledge.crop_data.get(crop_name)
+        value = crop_info.get(field) if crop_info else None
+        if not value:
+            return not_available_template.format(crop_name=crop_name)
+        return format_answer(crop_name, value)
+    return _handle_crop_field
+
+_register_crop_field_intent(
+    "ask_crop_sowing_time", "sowing_time",
+    lambda crop_name, value: f"{crop_name} की बुवाई का सही समय {value} है।",
+    "क्षमा करें, मुझे {crop_name} की बुवाई के समय की जानकारी नहीं है।",
+    "आप किस फसल की बुवाई के समय के बारे में पूछ रहे हैं?")
+_register_crop_field_intent(
+    "ask_crop_general_info", "general_info",
+    lambda crop_name, value: f"{crop_name} के बारे में यह जानकारी है: {value}",
+    "क्षमा करें, मेरे पास {crop_name} के बारे में सामान्य जानकारी उपलब्ध नहीं है।",
+    "आप किस फसल के बारे में सामान्य जानकारी चाहते हैं?")
+_register_crop_field_intent(
+    "ask_crop_pests", "pests",
+    lambda crop_name, value: f"{crop_name} में लगने वाले प्रमुख कीट या रोग हैं: {_format_list_to_hindi_string(value)}।",
+    "क्षमा करें, मेरे पास {crop_name} के कीट या रोगों की विशिष्ट जानकारी उपलब्ध नहीं है।",
+    "आप किस फसल के कीट या रोगों के बारे में पूछ रहे हैं?")
+_register_crop_field_intent(
+    "ask_crop_fertilizers", "fertilizers",
+    _format_fertilizer_answer,
+    "क्षमा करें, मेरे पास {crop_name} के लिए खाद की विशिष्ट जानकारी उपलब्ध नहीं है।",
+    "आप किस फसल के लिए खाद की जानकारी चाहते हैं?")
+_register_crop_field_intent(
+    "ask_crop_soil_type", "soil_type",
+    lambda crop_name, value: f"{crop_name} के लिए उपयुक्त मिट्टी है: {value}",
+    "क्षमा करें, मेरे पास {crop_name} के लिए मिट्टी की विशिष्ट जानकारी उपलब्ध नहीं है।",
+    "आप किस फसल के लिए मिट्टी की जानकारी चाहते हैं?")
+_register_crop_field_intent(
+    "ask_crop_irrigation", "irrigation",
+    lambda crop_name, value: f"{crop_name} की सिंचाई के बारे में जानकारी: {value}",
+    "क्षमा करें, मेरे पास {crop_name} के लिए सिंचाई की विशिष्ट जानकारी उपलब्ध नहीं है।",
+    "आप किस फसल के लिए सिंचाई की जानकारी चाहते हैं?")
+
+def _handle_unknown(entities, knowledge, weather_cache=None):
+    base_unknown_response = "क्षमा करें, मैं आपका सवाल समझ नहीं पाया।"
+    if hasattr(settings, 'EXAMPLE_QUERIES') and settings.EXAMPLE_QUERIES:
+        try:
+            num_examples = min(2, len(settings.EXAMPLE_QUERIES))
+            example_queries = random.sample(settings.EXAMPLE_QUERIES, num_examples)
+            examples_text = " आप ऐसा कुछ पूछ सकते हैं: " + " या ".join([f"'{q}'" for q in example_queries])
+            return base_unknown_response + examples_text
+        except ValueError: # Handle case where EXAMPLE_QUERIES might be too short for num_examples
+            return base_unknown_response + " आप 'मदद' या 'सहायता' कहकर जान सकते हैं कि मैं क्या कर सकता हूँ।"
+        except Exception as e:
+            logger.warning("Error generating example queries for unknown intent: %s", e)
             return base_unknown_response + " आप 'मदद' या 'सहायता' कहकर जान सकते हैं कि मैं क्या कर सकता हूँ।"
+    else:
+        return base_unknown_response + " आप 'मदद' या 'सहायता' कहकर जान सकते हैं कि मैं क्या कर सकता हूँ।"
+
+# Default for "unknown" and any intent without a registered handler
+_UNKNOWN_INTENT_HANDLER = IntentHandler("unknown", _handle_unknown)
 
 if __name__ == '__main__':
     print("Testing Intent Handler...")
@@ -263,7 +532,7 @@ if __name__ == '__main__':
 
     # Schemes Test
     print("--- Scheme Info Intent Handler Tests ---")
-    if not SCHEMES_DATA:
+    if not knowledge_base.get_knowledge_base().schemes_data:
         print("WARNING: Schemes data not loaded for testing.")
     else:
         nlu_scheme_general = {"intent": "ask_scheme_info", "entities": {}}
@@ -1,27 +1,11 @@
-from utils.data_loaders import get_crop_data, get_mandi_price_data, get_schemes_data
+import re
+import time
+from utils import knowledge_base
+from utils import metrics
+from utils.fuzzy_index import FuzzyIndex
+from utils.keyword_matcher import KeywordMatcher
 from config import settings # To access KNOWN_LOCATIONS_FOR_WEATHER
 
-# Load data at module level
-CROP_DATA = get_crop_data()
-KNOWN_CROPS = list(CROP_DATA.keys()) if CROP_DATA else []
-
-MANDI_PRICE_DATA = get_mandi_price_data()
-KNOWN_MANDIS = list(MANDI_PRICE_DATA.keys()) if MANDI_PRICE_DATA else []
-KNOWN_MANDI_CORE_LOCATIONS = [m.replace("मंडी", "").strip() for m in KNOWN_MANDIS]
-
-SCHEMES_DATA = get_schemes_data()
-KNOWN_SCHEME_KEYWORDS_FROM_DATA = []
-KNOWN_SCHEME_NAMES_FROM_DATA = [] # To store canonical scheme names
-if isinstance(SCHEMES_DATA, list):
-    for scheme in SCHEMES_DATA:
-        if scheme and isinstance(scheme.get("keywords"), list): # Check if scheme is not None
-            KNOWN_SCHEME_KEYWORDS_FROM_DATA.extend([k.lower() for k in scheme["keywords"]])
-        if scheme and scheme.get("name"): # Check if scheme is not None
-            KNOWN_SCHEME_NAMES_FROM_DATA.append(scheme.get("name").lower())
-KNOWN_SCHEME_KEYWORDS_FROM_DATA = sorted(list(set(KNOWN_SCHEME_KEYWORDS_FROM_DATA)))
-KNOWN_SCHEME_NAMES_FROM_DATA = sorted(list(set(KNOWN_SCHEME_NAMES_FROM_DATA)))
-
-
 KNOWN_LOCATIONS_FOR_WEATHER = settings.KNOWN_LOCATIONS_FOR_WEATHER
 
 # Keyword Lists
@@ -57,110 +41,304 @@ HELP_KEYWORDS = [ # ... (no changes here from last full version) ...
 ]
 WEATHER_KEYWORDS = ["मौसम", "तापमान", "बारिश", "हवा", "कैसा है आज"]
 MANDI_PRICE_KEYWORDS = ["भाव", "क्या भाव है", "क्या रेट है", "दाम क्या है", "कीमत क्या है", "मंडी में", "का रेट", "का भाव", "का दाम"]
+# Ranked price questions ("where is wheat cheapest / where does it fetch the best price")
+CHEAPEST_PRICE_KEYWORDS = ["सबसे सस्ता", "सबसे सस्ती", "सबसे सस्ते", "सबसे कम भाव", "सबसे कम दाम", "सबसे कम रेट", "सबसे कम कीमत"]
+COSTLIEST_PRICE_KEYWORDS = [
+    "सबसे महंगा", "सबसे महंगी", "सबसे महंगे", "सबसे ज्यादा भाव", "सबसे ज्यादा दाम", "सबसे ज्यादा रेट",
+    "सबसे ज्यादा कीमत", "सबसे अधिक भाव", "सबसे ऊंचा भाव", "सबसे अच्छा भाव", "सबसे अच्छा दाम"
+]
+NEAR_PRICE_KEYWORDS = ["के आसपास", "के आस पास", "के करीब", "के लगभग"] # e.g. "2200 रुपये के आसपास"
+# Price trend questions ("गेहूं का भाव पिछले हफ्ते से कितना बदला") and the window they ask about
+PRICE_TREND_KEYWORDS = [
+    "कितना बदला", "कितना बढ़ा", "कितना घटा", "कितना गिरा", "बदलाव", "रुझान", "ट्रेंड", "उतार चढ़ाव", "उतार-चढ़ाव"
+]
+PRICE_WINDOW_WEEK_KEYWORDS = ["पिछले हफ्ते", "पिछले सप्ताह", "हफ्ते भर", "इस हफ्ते", "इस सप्ताह", "7 दिन", "सात दिन"]
+PRICE_WINDOW_MONTH_KEYWORDS = ["पिछले महीने", "महीने भर", "इस महीने", "30 दिन", "तीस दिन"]
+PRICE_WINDOW_DAYS = {"price_window_week": 7, "price_window_month": 30}
+DEFAULT_PRICE_WINDOW_DAYS = 7
 CROP_KEYWORDS = ["की खेती", "की फसल", "की बुवाई", "फसल"] # General crop related, not for intent directly
 SCHEME_KEYWORDS = ["योजना", "स्कीम", "सब्सिडी", "सरकारी मदद", "लोन", "ऋण", "कार्यक्रम", "सरकारी योजना", "सलाह"]
 
+# Crop-specific detail intents in priority order (sowing time often uses general "कब करें",
+# general info is last among crop specific)
+CROP_DETAIL_INTENTS = [
+    ("pest", "ask_crop_pests"),
+    ("fertilizer", "ask_crop_fertilizers"),
+    ("soil", "ask_crop_soil_type"),
+    ("irrigation", "ask_crop_irrigation"),
+    ("sowing_time", "ask_crop_sowing_time"),
+    ("general_info", "ask_crop_general_info"),
+]
+
+
+# Entity categories of the scan that fall back to the fuzzy index, and the entity each one fills.
+# The mandi index holds the core locations and the full mandi names, both resolving to KnowledgeBase.known_mandis.
+FUZZY_ENTITY_NAMES = {"weather_location": "location", "crop": "crop_name", "mandi_name": "mandi_location"}
+
+
+# Scheme category filter terms, matched in the same pass as everything else
+JHARKHAND_FILTER_TERMS = ["झारखंड"]
+ALL_INDIA_FILTER_TERMS = ["केंद्र", "भारत", "अखिल भारतीय"]
+SCHEME_FILTER_CONTEXT_TERMS = ["योजना", "स्कीम"]
+
+
+class NluIndex:
+    """
+    The compiled query matcher (and fuzzy entity indexes) for one KnowledgeBase, registered as a derived
+    index so it is rebuilt off the request path whenever the knowledge base is (re)loaded.
+    """
+
+    def __init__(self, knowledge_base):
+        self.knowledge_base = knowledge_base
+        self.query_matcher = self._build_query_matcher()
+        self.fuzzy_indexes = self._build_fuzzy_indexes()
+
+    def _build_query_matcher(self):
+        """
+        Compiles every keyword list and every known entity name into one automaton.
+        Each pattern carries a (category, index) payload so that a single scan of the
+        query tells us which lists matched and, for entity lists, which entry matched first
+        in list order (the order the original priority rules relied on).
+        """
+        kb = self.knowledge_base
+        matcher = KeywordMatcher()
+        pattern_lists = [
+            ("help", HELP_KEYWORDS),
+            ("weather", WEATHER_KEYWORDS),
+            ("mandi_price", MANDI_PRICE_KEYWORDS),
+            ("price_rank_lowest", CHEAPEST_PRICE_KEYWORDS),
+            ("price_rank_highest", COSTLIEST_PRICE_KEYWORDS),
+            ("near_price", NEAR_PRICE_KEYWORDS),
+            ("price_trend", PRICE_TREND_KEYWORDS),
+            ("price_window_week", PRICE_WINDOW_WEEK_KEYWORDS),
+            ("price_window_month", PRICE_WINDOW_MONTH_KEYWORDS),
+            ("scheme", SCHEME_KEYWORDS),
+            ("pest", PEST_INFO_KEYWORDS),
+            ("fertilizer", FERTILIZER_KEYWORDS),
+            ("soil", SOIL_TYPE_KEYWORDS),
+            ("irrigation", IRRIGATION_KEYWORDS),
+            ("sowing_time", SOWING_TIME_KEYWORDS),
+            ("general_info", GENERAL_INFO_KEYWORDS),
+            ("filter_jharkhand", JHARKHAND_FILTER_TERMS),
+            ("filter_all_india", ALL_INDIA_FILTER_TERMS),
+            ("filter_context", SCHEME_FILTER_CONTEXT_TERMS),
+            ("weather_location", kb.weather_locations),
+            ("mandi_core", kb.known_mandi_core_locations),
+            ("mandi_name", kb.known_mandis),
+            ("crop", kb.known_crops),
+        ]
+        for category, patterns in pattern_lists:
+            for index, pattern in enumerate(patterns):
+                matcher.add(pattern.lower(), (category, index))
+
+        if kb.schemes_data:
+            for index, scheme in enumerate(kb.schemes_data):
+                if not scheme: continue
+                # A scheme matches on its full name or on any of its own keywords
+                matcher.add(scheme.get("name", "").lower(), ("scheme_entry", index))
+                for json_keyword in scheme.get("keywords", []):
+                    matcher.add(json_keyword.lower(), ("scheme_entry", index))
+        return matcher.build()
+
+    def _build_fuzzy_indexes(self):
+        """{scan category: FuzzyIndex whose payloads are indexes into the category's entity list}"""
+        kb = self.knowledge_base
+        name_lists = {
+            "weather_location": [kb.weather_locations],
+            "crop": [kb.known_crops],
+            "mandi_name": [kb.known_mandi_core_locations, kb.known_mandis],
+        }
+        indexes = {}
+        for category, lists in name_lists.items():
+            fuzzy_index = FuzzyIndex(min_confidence=settings.NLU_FUZZY_MIN_CONFIDENCE)
+            for names in lists:
+                for index, name in enumerate(names):
+                    fuzzy_index.add(name, index)
+            indexes[category] = fuzzy_index.build()
+        return indexes
+
+    def fuzzy_lookup(self, text, category):
+        """The best fuzzy match (utils.fuzzy_index.FuzzyMatch) for a category's names anywhere in text, or None."""
+        return self.fuzzy_indexes[category].find_in(text)
+
+    def scan(self, query_lower):
+        """Returns {category: lowest matched index} for every category hit in the query."""
+        hits = {}
+        for _, (category, index) in self.query_matcher.iter_matches(query_lower):
+            if category not in hits or index < hits[category]:
+                hits[category] = index
+        return hits
+
+knowledge_base.register_derived_index("nlu_index", NluIndex)
+
+def get_nlu_index():
+    """Returns the NLU index for the current knowledge base."""
+    return knowledge_base.get_knowledge_base().derived("nlu_index")
+
+# Module-level names kept for callers that read the entity lists directly (e.g. follow-up handling in
+# the front ends). They resolve against the shared KnowledgeBase, so they follow reloads.
+_KNOWLEDGE_BASE_ATTRIBUTES = {
+    "CROP_DATA": "crop_data",
+    "KNOWN_CROPS": "known_crops",
+    "MANDI_PRICE_DATA": "mandi_price_data",
+    "KNOWN_MANDIS": "known_mandis",
+    "KNOWN_MANDI_CORE_LOCATIONS": "known_mandi_core_locations",
+    "SCHEMES_DATA": "schemes_data",
+    "KNOWN_SCHEME_KEYWORDS_FROM_DATA": "known_scheme_keywords",
+    "KNOWN_SCHEME_NAMES_FROM_DATA": "known_scheme_names",
+}
+
+def __getattr__(name):
+    if name in _KNOWLEDGE_BASE_ATTRIBUTES:
+        return getattr(knowledge_base.get_knowledge_base(), _KNOWLEDGE_BASE_ATTRIBUTES[name])
+    if name == "QUERY_MATCHER":
+        return get_nlu_index().query_matcher
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+_TARGET_PRICE_PATTERN = re.compile(r"(\d[\d,]*)\s*(?:रुपये|रुपए|रु\.?|₹)?\s*(?:प्रति क्विंटल\s*)?(?:के आसपास|के आस पास|के करीब|के लगभग)")
+
+def _extract_target_price(query_lower):
+    """'2200 रुपये के आसपास' -> 2200.0"""
+    match = _TARGET_PRICE_PATTERN.search(query_lower)
+    return float(match.group(1).replace(",", "")) if match else None
+
+
+_NLU_SECONDS = metrics.stage_timer("nlu")
 
 def process_query_rule_based(query_text):
+    """
+    Classifies a query and extracts its entities.
+    Returns:
+        dict: {"intent", "entities"}, plus "entity_confidence" ({entity: confidence}) for entities that
+              were resolved through the fuzzy index rather than found verbatim.
+    """
+    started = time.perf_counter()
+    try:
+        confidences = {}
+        result = _classify_query(query_text, confidences)
+        fuzzy_entities = {name: confidence for name, confidence in confidences.items() if name in result["entities"]}
+        if fuzzy_entities:
+            result["entity_confidence"] = fuzzy_entities
+        return result
+    finally:
+        _NLU_SECONDS.observe(time.perf_counter() - started)
+
+def _add_fuzzy_hits(index, query_lower, hits, categories, confidences):
+    """
+    Fills the entity categories the exact scan missed from the fuzzy index (hits and confidences are
+    updated in place: category -> list index, entity name -> match confidence).
+    """
+    if not settings.NLU_FUZZY_MATCHING:
+        return
+    for category in categories:
+        if category in hits or (category == "mandi_name" and "mandi_core" in hits):
+            continue
+        match = index.fuzzy_lookup(query_lower, category)
+        if match is not None:
+            hits[category] = match.payload
+            confidences[FUZZY_ENTITY_NAMES[category]] = match.confidence
+
+def _classify_query(query_text, confidences):
     if not query_text: return {"intent": "unknown", "entities": {}}
     query_lower = query_text.lower()
+    index = get_nlu_index() # One knowledge base for the whole query, even if a reload happens meanwhile
+    kb = index.knowledge_base
+    hits = index.scan(query_lower)
 
     # Priority 1: Help
-    for keyword in HELP_KEYWORDS:
-        if keyword.lower() in query_lower: return {"intent": "get_help", "entities": {}}
+    if "help" in hits: return {"intent": "get_help", "entities": {}}
 
     # Priority 2: Weather
-    identified_loc_weather = None; is_weather_q = any(wk.lower() in query_lower for wk in WEATHER_KEYWORDS)
-    if is_weather_q:
-        for loc in KNOWN_LOCATIONS_FOR_WEATHER:
-            if loc.lower() in query_lower: identified_loc_weather = loc; return {"intent": "get_weather", "entities": {"location": identified_loc_weather}}
-        if identified_loc_weather is None and is_weather_q: return {"intent": "get_weather", "entities": {"location": None}}
-
-    # Priority 3: Mandi Price
-    is_mandi_q = any(mpk.lower() in query_lower for mpk in MANDI_PRICE_KEYWORDS)
-    identified_mandi = None; identified_crop_mandi = None
-    if is_mandi_q:
-        for i, core_loc in enumerate(KNOWN_MANDI_CORE_LOCATIONS):
-            if core_loc.lower() in query_lower: identified_mandi = KNOWN_MANDIS[i]; break
-        if not identified_mandi:
-            for mandi_name in KNOWN_MANDIS:
-                if mandi_name.lower() in query_lower: identified_mandi = mandi_name; break
-        for crop in KNOWN_CROPS: # Use KNOWN_CROPS for consistency
-            if crop.lower() in query_lower: identified_crop_mandi = crop; break
-        if identified_crop_mandi or identified_mandi:
-            entities = {};
-            if identified_crop_mandi: entities["crop_name"] = identified_crop_mandi
-            if identified_mandi: entities["mandi_location"] = identified_mandi
-            return {"intent": "get_mandi_price", "entities": entities}
-        elif is_mandi_q: return {"intent": "get_mandi_price", "entities": {}}
+    if "weather" in hits:
+        _add_fuzzy_hits(index, query_lower, hits, ("weather_location",), confidences)
+        if "weather_location" in hits:
+            return {"intent": "get_weather", "entities": {"location": kb.weather_locations[hits["weather_location"]]}}
+        return {"intent": "get_weather", "entities": {"location": None}}
+
+    # Priority 3: Mandi Price. A ranked price phrase like "सबसे सस्ता" is a price question on its own,
+    # unless the query asks for a crop detail and names no price or mandi ("गेहूं के लिए सबसे सस्ता खाद")
+    ranked = "price_rank_lowest" in hits or "price_rank_highest" in hits
+    if ranked and not ("mandi_core" in hits or "mandi_name" in hits):
+        ranked = not any(category in hits for category, _ in CROP_DETAIL_INTENTS)
+    if "mandi_price" in hits or ranked:
+        identified_mandi = None; identified_crop_mandi = None
+        _add_fuzzy_hits(index, query_lower, hits, ("mandi_name", "crop"), confidences)
+        if "mandi_core" in hits: identified_mandi = kb.known_mandis[hits["mandi_core"]]
+        elif "mandi_name" in hits: identified_mandi = kb.known_mandis[hits["mandi_name"]]
+        if "crop" in hits: identified_crop_mandi = kb.known_crops[hits["crop"]]
+        entities = {}
+        if identified_crop_mandi: entities["crop_name"] = identified_crop_mandi
+        if identified_mandi: entities["mandi_location"] = identified_mandi
+        # A price question that asks how it changed (or names a past window) is a trend question
+        if "price_trend" in hits or "price_window_week" in hits or "price_window_month" in hits:
+            if "price_window_month" in hits and "price_window_week" not in hits:
+                entities["window_days"] = PRICE_WINDOW_DAYS["price_window_month"]
+            else:
+                entities["window_days"] = DEFAULT_PRICE_WINDOW_DAYS
+            return {"intent": "ask_price_trend", "entities": entities}
+        if "price_rank_lowest" in hits: entities["price_rank"] = "lowest"
+        elif "price_rank_highest" in hits: entities["price_rank"] = "highest"
+        if "near_price" in hits:
+            target_price = _extract_target_price(query_lower)
+            if target_price is not None: entities["target_price"] = target_price
+        return {"intent": "get_mandi_price", "entities": entities}
 
     # Priority 4: Scheme Info
-    is_scheme_q = any(sk.lower() in query_lower for sk in SCHEME_KEYWORDS) # General scheme keywords
-    extracted_scheme_name = None # This will store the canonical name of the matched scheme
-
-    if isinstance(SCHEMES_DATA, list): # Ensure SCHEMES_DATA is loaded and is a list
-        for scheme in SCHEMES_DATA:
-            if scheme: # Ensure scheme object is not None
-                s_name = scheme.get("name", "").lower()
-                s_keywords_from_json = [k.lower() for k in scheme.get("keywords", [])] # Keywords from JSON
-
-                # Check if the query contains the scheme's main name (or part of it)
-                if s_name and s_name in query_lower: # Check if full scheme name is in query
-                    extracted_scheme_name = scheme.get("name") # Use the canonical name
-                    break 
-                # Check if the query contains any of the scheme's specific keywords from JSON
-                for json_keyword in s_keywords_from_json:
-                    if json_keyword in query_lower: # Check if a defined keyword is in the query
-                        extracted_scheme_name = scheme.get("name") # Return the canonical name
-                        break
-            if extracted_scheme_name: # If found by its specific keywords or name, break outer loop
-                break
-    
-    if is_scheme_q or extracted_scheme_name: # If general scheme keywords OR a specific scheme was identified
+    # "scheme_entry" holds the first scheme (in data order) whose name or own keywords occur in the query
+    if "scheme" in hits or "scheme_entry" in hits:
         entities = {}
-        if extracted_scheme_name:
-            entities["scheme_name"] = extracted_scheme_name
-        # You could add more entity extraction here e.g. "झारखंड की योजनाएं" -> filter: "jharkhand"
-        if "झारखंड" in query_lower and ("योजना" in query_lower or "स्कीम" in query_lower):
-            entities["filter"] = "jharkhand"
-        elif ("केंद्र" in query_lower or "भारत" in query_lower or "अखिल भारतीय" in query_lower) and ("योजना" in query_lower or "स्कीम" in query_lower):
-            entities["filter"] = "all_india"
+        if "scheme_entry" in hits:
+            entities["scheme_name"] = kb.schemes_data[hits["scheme_entry"]].get("name") # Use the canonical name
+        if "filter_context" in hits:
+            if "filter_jharkhand" in hits:
+                entities["filter"] = "jharkhand"
+            elif "filter_all_india" in hits:
+                entities["filter"] = "all_india"
         return {"intent": "ask_scheme_info", "entities": entities}
 
     # Priority 5: Other Crop-Specific Intents
-    identified_crop_agri = None
-    for crop in KNOWN_CROPS:
-        if crop.lower() in query_lower: identified_crop_agri = crop; break
-        for ck in CROP_KEYWORDS:
-            if f"{crop.lower()} {ck.lower()}" in query_lower: identified_crop_agri = crop; break
-        if identified_crop_agri: break
-
-    if identified_crop_agri:
-        entities_agri = {"crop_name": identified_crop_agri}
+    # (a "<crop> <crop keyword>" phrase always contains the crop name itself, so the crop hit covers it)
+    if "crop" not in hits and any(category in hits for category, _ in CROP_DETAIL_INTENTS):
+        _add_fuzzy_hits(index, query_lower, hits, ("crop",), confidences)
+    if "crop" in hits:
+        entities_agri = {"crop_name": kb.known_crops[hits["crop"]]}
         # Order of checks for crop specific details (more specific keywords first)
-        for k in PEST_INFO_KEYWORDS:
-            if k.lower() in query_lower: return {"intent": "ask_crop_pests", "entities": entities_agri}
-        for k in FERTILIZER_KEYWORDS:
-            if k.lower() in query_lower: return {"intent": "ask_crop_fertilizers", "entities": entities_agri}
-        for k in SOIL_TYPE_KEYWORDS:
-            if k.lower() in query_lower: return {"intent": "ask_crop_soil_type", "entities": entities_agri}
-        for k in IRRIGATION_KEYWORDS:
-            if k.lower() in query_lower: return {"intent": "ask_crop_irrigation", "entities": entities_agri}
-        for k in SOWING_TIME_KEYWORDS: # Sowing time often uses general "कब करें"
-            if k.lower() in query_lower: return {"intent": "ask_crop_sowing_time", "entities": entities_agri}
-        for k in GENERAL_INFO_KEYWORDS: # General info last among crop specific
-            if k.lower() in query_lower: return {"intent": "ask_crop_general_info", "entities": entities_agri}
-            
+        for category, intent in CROP_DETAIL_INTENTS:
+            if category in hits: return {"intent": intent, "entities": entities_agri}
+
     return {"intent": "unknown", "entities": {}}
 
+def process_queries_batch(queries):
+    """
+    Runs process_query_rule_based over a list of queries.
+    Identical query texts in the batch are only analysed once.
+    Args:
+        queries (list): Query strings.
+    Returns:
+        list: NLU result dicts, in the same order as queries (each result is its own copy).
+    """
+    results_by_text = {}
+    results = []
+    for query_text in queries:
+        if query_text not in results_by_text:
+            results_by_text[query_text] = process_query_rule_based(query_text)
+        result = results_by_text[query_text]
+        copy = {"intent": result["intent"], "entities": dict(result["entities"])}
+        if "entity_confidence" in result:
+            copy["entity_confidence"] = dict(result["entity_confidence"])
+        results.append(copy)
+    return results
+
 if __name__ == '__main__':
     print("Testing NLU Processor (Rule-Based)...")
-    if not CROP_DATA: print("WARNING: Crop data not loaded.")
-    else: print(f"Loaded crops: {len(KNOWN_CROPS)} crops - e.g., {KNOWN_CROPS[:3] if KNOWN_CROPS else 'None'}")
-    if not MANDI_PRICE_DATA: print("WARNING: Mandi price data not loaded.")
-    else: print(f"Loaded Mandis: {len(KNOWN_MANDIS)} mandis - (Core e.g.: {KNOWN_MANDI_CORE_LOCATIONS[:3] if KNOWN_MANDI_CORE_LOCATIONS else 'None'})")
-    if not SCHEMES_DATA: print("WARNING: Schemes data not loaded.")
-    else: print(f"Loaded Schemes: {len(SCHEMES_DATA)} (Sample keywords from data: {KNOWN_SCHEME_KEYWORDS_FROM_DATA[:3] if KNOWN_SCHEME_KEYWORDS_FROM_DATA else 'None'})")
+    kb = knowledge_base.get_knowledge_base()
+    if not kb.crop_data: print("WARNING: Crop data not loaded.")
+    else: print(f"Loaded crops: {len(kb.known_crops)} crops - e.g., {kb.known_crops[:3] if kb.known_crops else 'None'}")
+    if not kb.mandi_price_data: print("WARNING: Mandi price data not loaded.")
+    else: print(f"Loaded Mandis: {len(kb.known_mandis)} mandis - (Core e.g.: {kb.known_mandi_core_locations[:3] if kb.known_mandi_core_locations else 'None'})")
+    if not kb.schemes_data: print("WARNING: Schemes data not loaded.")
+    else: print(f"Loaded Schemes: {len(kb.schemes_data)} (Sample keywords from data: {kb.known_scheme_keywords[:3] if kb.known_scheme_keywords else 'None'})")
     print(f"Known Locations for Weather: {len(KNOWN_LOCATIONS_FOR_WEATHER)} locations - e.g., {KNOWN_LOCATIONS_FOR_WEATHER[:3] if KNOWN_LOCATIONS_FOR_WEATHER else 'None'}")
     print("-" * 30)
 
@@ -170,6 +348,7 @@ if __name__ == '__main__':
         "गेहूं की खेती कब करें", "गेहूं के बारे में बताओ", "गेहूं में कौन से कीट लगते हैं",
         "गेहूं में कौन सी खाद डालें?", "गेहूं के लिए मिट्टी कैसी चाहिए?", "गेहूं में सिंचाई कब करें?",
         "कानपुर मंडी में गेहूं का भाव क्या है?", "गेहूं का दाम",
+        "गेहूं का भाव पिछले हफ्ते से कितना बदला", "कानपुर मंडी में आलू के दाम का पिछले महीने का रुझान",
         "किसानों के लिए सरकारी योजनाएं कौन सी हैं?",
         "पीएम किसान योजना के बारे में बताओ", # Example of specific scheme query
         "नाबार्ड की योजना", # Example of query that might match a keyword in schemes data
@@ -1,60 +1,190 @@
-import speech_recognition as sr
+import atexit
+import queue
+import threading
+import time
 from config import settings # Import settings from your config package
+from utils import endpointing
+from utils import log
 # import wave # Not directly needed if using get_wav_data()
 
-def listen_hindi():
-    recognizer = sr.Recognizer()
-    microphone = sr.Microphone()
+logger = log.get_logger(__name__)
 
-    with microphone as source:
-        print("कृषि मित्र AI सुन रहा है... कृपया बोलिए।")
-        recognizer.pause_threshold = 1
-        recognizer.adjust_for_ambient_noise(source, duration=1)
-        
+# The microphone stays open for the whole conversation (see MicrophoneSession): ambient noise is measured
+# once when it is opened, not before every question, and each utterance is handed to recognition as soon
+# as the speaker pauses for settings.ASR_END_SILENCE_SECONDS.
+
+class MicrophoneSession:
+    """
+    Long-lived capture: a background thread reads frames continuously and cuts them into utterances with
+    an endpointing.EnergyEndpointer; next_utterance() returns the next one.
+    Args:
+        read_frame (callable): Returns the next frame of 16-bit mono PCM (blocking until it is recorded).
+        sample_rate (int), frame_samples (int), sample_width (int): The stream's format.
+        on_close (callable, optional): Releases the device once capture has stopped.
+    """
+    MAX_PENDING_UTTERANCES = 4 # Older utterances nobody asked for are dropped beyond this
+
+    def __init__(self, read_frame, sample_rate, frame_samples, sample_width=2, on_close=None, endpointer=None):
+        self._read_frame = read_frame
+        self.sample_rate = sample_rate
+        self.sample_width = sample_width
+        self._on_close = on_close
+        self.endpointer = endpointer or endpointing.EnergyEndpointer(
+            sample_rate, frame_samples,
+            calibration_seconds=settings.ASR_CALIBRATION_SECONDS,
+            end_silence_seconds=settings.ASR_END_SILENCE_SECONDS,
+            max_utterance_seconds=settings.ASR_MAX_UTTERANCE_SECONDS,
+        )
+        self._utterances = queue.Queue(maxsize=self.MAX_PENDING_UTTERANCES)
+        self._lock = threading.Lock() # Held while a frame is fed, so discard_pending never sees half an utterance
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._capture, name="microphone", daemon=True)
+        self.error = None
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def _capture(self):
         try:
-            print("अब आप बोल सकते हैं...")
-            audio = recognizer.listen(source, timeout=5, phrase_time_limit=10)
+            while not self._stop.is_set():
+                frame = self._read_frame()
+                with self._lock:
+                    frame_data = self.endpointer.feed(frame)
+                    if frame_data is not None:
+                        self._put(endpointing.Utterance(frame_data, self.sample_rate, self.sample_width))
+        except Exception as e:
+            self.error = e
+            logger.warning("Microphone capture stopped: %s", e)
+
+    def _put(self, utterance):
+        while True:
+            try:
+                self._utterances.put_nowait(utterance)
+                return
+            except queue.Full:
+                try:
+                    self._utterances.get_nowait()
+                except queue.Empty:
+                    pass
 
-            '''# --- START DEBUG: Save captured audio ---
-            if settings.DEBUG_MODE:
+    def wait_calibrated(self, timeout=None):
+        """Blocks until the ambient noise level has been measured; returns False on timeout or a capture error."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while not self.endpointer.calibrated:
+            if self.error is not None or (deadline is not None and time.monotonic() >= deadline):
+                return False
+            time.sleep(0.01)
+        return True
+
+    def discard_pending(self):
+        """
+        Forgets everything heard so far: queued utterances and speech in progress. The microphone keeps
+        recording while an answer is played, so without this the next listen returns the bot's own voice.
+        """
+        with self._lock:
+            self.endpointer.reset()
+            while True:
                 try:
-                    with open("captured_audio.wav", "wb") as f:
-                        f.write(audio.get_wav_data())
-                    print(">>> [DEBUG] Audio captured and saved to captured_audio.wav for review.")
-                except Exception as e_audio_save:
-                    print(f">>> [DEBUG] Error saving audio: {e_audio_save}")
-            # --- END DEBUG ---'''
-
-        except sr.WaitTimeoutError:
-            # ... (rest of your code for this exception)
-            if settings.DEBUG_MODE:
-                print(" कोई आवाज़ नहीं मिली (Timeout).")
-            return None
-        # ... (other exception blocks)
-        except Exception as e: # General exception for listen part
-            if settings.DEBUG_MODE:
-                print(f"ऑडियो सुनने में त्रुटि: {e}")
-            return None
+                    self._utterances.get_nowait()
+                except queue.Empty:
+                    return
+
+    def next_utterance(self, timeout=5.0):
+        """
+        The next utterance (an endpointing.Utterance), waiting up to timeout seconds for speech to start and
+        then for as long as it lasts. None if nobody spoke. Raises the capture error if the microphone failed.
+        """
+        deadline = time.monotonic() + timeout
+        while True:
+            try:
+                return self._utterances.get(timeout=0.02)
+            except queue.Empty:
+                pass
+            if self.error is not None:
+                raise self.error
+            if time.monotonic() >= deadline and not self.endpointer.in_speech:
+                return None
+
+    def close(self):
+        self._stop.set()
+        self._thread.join(timeout=1)
+        if self._on_close is not None:
+            self._on_close()
+            self._on_close = None
 
+def open_microphone_session():
+    """Opens the default microphone through speech_recognition and starts a MicrophoneSession on it."""
+    import speech_recognition as sr # Only voice mode needs it (and a microphone)
+    microphone = sr.Microphone()
+    source = microphone.__enter__()
+    return MicrophoneSession(lambda: source.stream.read(source.CHUNK), source.SAMPLE_RATE, source.CHUNK, source.SAMPLE_WIDTH,
+                             on_close=lambda: microphone.__exit__(None, None, None)).start()
+
+_session = None
+_recognizer = None
+
+def get_microphone_session():
+    """The shared microphone session, opened (and calibrated) on first use."""
+    global _session
+    if _session is None:
+        print("कृषि मित्र AI सुन रहा है... कृपया बोलिए।")
+        _session = open_microphone_session()
+        atexit.register(close_microphone_session)
+        _session.wait_calibrated(timeout=settings.ASR_CALIBRATION_SECONDS + 5)
+    return _session
+
+def close_microphone_session():
+    global _session
+    session, _session = _session, None
+    if session is not None:
+        session.close()
+
+def listen_hindi():
+    import speech_recognition as sr
+    global _recognizer
+    if _recognizer is None:
+        _recognizer = sr.Recognizer()
+    recognizer = _recognizer
+
+    try:
+        session = get_microphone_session()
+        session.discard_pending() # Only speech that starts from now on is the user's answer
+        print("अब आप बोल सकते हैं...")
+        utterance = session.next_utterance(timeout=settings.ASR_LISTEN_TIMEOUT_SECONDS)
+    except Exception as e: # General exception for listen part
+        logger.warning("ऑडियो सुनने में त्रुटि: %s", e)
+        close_microphone_session() # Reopened on the next call
+        return None
+    if utterance is None:
+        logger.debug("कोई आवाज़ नहीं मिली (Timeout).")
+        return None
+    audio = sr.AudioData(*utterance)
+
+    '''# --- START DEBUG: Save captured audio ---
+    if settings.DEBUG_MODE:
+        try:
+            with open("captured_audio.wav", "wb") as f:
+                f.write(audio.get_wav_data())
+            print(">>> [DEBUG] Audio captured and saved to captured_audio.wav for review.")
+        except Exception as e_audio_save:
+            print(f">>> [DEBUG] Error saving audio: {e_audio_save}")
+    # --- END DEBUG ---'''
 
     try:
         print("पहचान रहा है...")
         query = recognizer.recognize_google(audio, language=settings.ASR_LANGUAGE)
-        if settings.DEBUG_MODE:
-            print(f"उपयोगकर्ता ने कहा: {query}")
+        logger.debug("उपयोगकर्ता ने कहा: %s", query)
         return query.lower()
         
     except sr.UnknownValueError:
-        if settings.DEBUG_MODE:
-            print("क्षमा करें, मैं आपकी बात समझ नहीं पाया।")
+        logger.debug("क्षमा करें, मैं आपकी बात समझ नहीं पाया।")
         return None
     except sr.RequestError as e:
-        if settings.DEBUG_MODE:
-            print(f"Google Speech Recognition सेवा से परिणाम प्राप्त करने में असमर्थ; {e}")
+        logger.warning("Google Speech Recognition सेवा से परिणाम प्राप्त करने में असमर्थ; %s", e)
         return None
     except Exception as e: # General exception for recognition part
-        if settings.DEBUG_MODE:
-            print(f"भाषण पहचानने में एक अप्रत्याशित त्रुटि हुई: {e}")
+        logger.warning("भाषण पहचानने में एक अप्रत्याशित त्रुटि हुई: %s", e)
         return None
 
 
@@ -1,58 +1,371 @@
-from gtts import gTTS
+import argparse
+import io
 import os
-from playsound import playsound
+import queue
+import re
+import threading
+import time
 from config import settings # To get the TTS language and response filename
+from utils import log
+from utils import tts_cache
+
+logger = log.get_logger(__name__)
+
+# Speech already synthesised is replayed from disk (utils/tts_cache.py); created on first use
+_audio_cache = None
+_audio_cache_created = False
+
+def get_audio_cache():
+    """The shared speech cache, or None if settings.TTS_CACHE_MAX_BYTES turns it off."""
+    global _audio_cache, _audio_cache_created
+    if not _audio_cache_created:
+        _audio_cache = tts_cache.create_tts_cache()
+        _audio_cache_created = True
+    return _audio_cache
+
+def clean_text_for_speech(text):
+    """Removes common Markdown for better TTS."""
+    if not text:
+        return ""
+    return text.replace("**", "").replace("*", "")
+
+def _synthesize(text_to_speak):
+    """MP3 audio (bytes) for the text from gTTS; this is the network call the cache saves."""
+    # Imported here, so importing this module (e.g. by a text-only front end) costs nothing
+    from gtts import gTTS
+    buffer = io.BytesIO()
+    gTTS(text=text_to_speak, lang=settings.TTS_LANGUAGE, slow=settings.TTS_SLOW).write_to_fp(buffer)
+    return buffer.getvalue()
+
+def _play(audio_file_path):
+    from playsound import playsound
+    playsound(audio_file_path)
+
+def synthesize_to_cache(text_to_speak):
+    """
+    Returns the cached audio file for the text, synthesising and storing it first on a miss.
+    Returns:
+        tuple: (path of the MP3 file, True if it was already cached).
+    """
+    cache = get_audio_cache()
+    audio_file_path = cache.get(text_to_speak, settings.TTS_LANGUAGE, settings.TTS_SLOW)
+    if audio_file_path is not None:
+        return audio_file_path, True
+    audio = _synthesize(text_to_speak)
+    return cache.put(text_to_speak, settings.TTS_LANGUAGE, settings.TTS_SLOW, audio), False
+
+# Where long answers are cut for streaming: after a sentence end (। ? ! or a full stop) or a line break,
+# and inside an over-long sentence after a clause separator
+_SENTENCE_BREAK = re.compile(r"(?<=[।॥?!.])\s+|\s*\n\s*")
+_CLAUSE_BREAK = re.compile(r"(?<=[,;:])\s+")
+
+def split_for_speech(text, max_chars=200):
+    """
+    Splits text into the pieces it is spoken in: its sentences, with a sentence longer than max_chars
+    cut at clause separators (or, failing that, between words) into pieces of at most max_chars.
+    """
+    chunks = []
+    for sentence in _SENTENCE_BREAK.split(text):
+        sentence = sentence.strip()
+        if not sentence:
+            continue
+        if len(sentence) <= max_chars:
+            chunks.append(sentence)
+            continue
+        for clause in _pack(_CLAUSE_BREAK.split(sentence), max_chars):
+            chunks.extend(_pack(clause.split(), max_chars) if len(clause) > max_chars else [clause])
+    return chunks
+
+def _pack(pieces, max_chars):
+    """Joins consecutive pieces with spaces into as few chunks of at most max_chars as possible (a longer piece stays whole)."""
+    chunks = []
+    for piece in pieces:
+        if chunks and len(chunks[-1]) + 1 + len(piece) <= max_chars:
+            chunks[-1] += " " + piece
+        else:
+            chunks.append(piece)
+    return chunks
+
+def speech_chunks(text_to_speak):
+    """The pieces the text is synthesised and played in (the whole text unless settings.TTS_STREAMING)."""
+    if not settings.TTS_STREAMING:
+        return [text_to_speak]
+    return split_for_speech(text_to_speak, settings.TTS_CHUNK_MAX_CHARS) or [text_to_speak]
+
+def _prepare_audio(index, chunk):
+    """
+    Audio file for one piece of speech: the cached file, or (with the cache off) a temporary file.
+    Returns:
+        tuple: (path, True if it is a temporary file to remove after playing).
+    """
+    if get_audio_cache() is not None:
+        audio_file_path, cached = synthesize_to_cache(chunk)
+        logger.debug("Speech audio %s: %s", "from cache" if cached else "synthesised", audio_file_path)
+        return audio_file_path, False
+    # Define the audio file path using PROJECT_ROOT from settings (one file per piece: several may be ready at once)
+    name, extension = os.path.splitext(settings.AUDIO_RESPONSE_FILENAME)
+    audio_file_path = os.path.join(settings.PROJECT_ROOT, f"{name}-{index}{extension}")
+    audio = _synthesize(chunk)
+    with open(audio_file_path, "wb") as f:
+        f.write(audio)
+    return audio_file_path, True
+
+def _remove_temporary_file(audio_file_path):
+    # After attempting to play (whether successful or not), try to remove the temporary audio file.
+    if os.path.exists(audio_file_path):
+        try:
+            os.remove(audio_file_path)
+            logger.debug("Temporary audio file %r removed.", audio_file_path)
+        except Exception as e_remove:
+            # If removal fails (e.g., still locked for some reason), log it.
+            # This might still happen if playsound is extremely slow to release, but it's less likely.
+            logger.warning("Error removing temporary audio file %r: %s", audio_file_path, e_remove)
 
 def speak_hindi(text_to_speak):
+    """
+    Speaks the text and returns when it has been played. Long answers are streamed: split into sentences,
+    the first one starts playing as soon as it is synthesised, and the following ones are synthesised on a
+    small pool (settings.TTS_STREAM_WORKERS) while earlier ones play, so the wait before the first word
+    depends on the first sentence only. SpeechPlayer.say() does the same without waiting.
+    """
     if not text_to_speak:
-        if settings.DEBUG_MODE:
-            print("TTS: No text provided to speak.")
+        logger.debug("No text provided to speak.")
         return
+    _speak(text_to_speak)
 
-    # Define the audio file path using PROJECT_ROOT from settings
-    audio_file_path = os.path.join(settings.PROJECT_ROOT, settings.AUDIO_RESPONSE_FILENAME)
+def _speak(text_to_speak, cancelled=None):
+    """
+    Synthesises and plays the text piece by piece, stopping before the next piece once `cancelled`
+    (a threading.Event) is set.
+    Returns:
+        str: "done", "cancelled", or "failed" (gTTS / playsound missing; the text was printed instead).
+    """
+    chunks = speech_chunks(text_to_speak)
+    logger.debug("Attempting to speak: %r (%d piece(s))", text_to_speak, len(chunks))
+    started = time.perf_counter()
+    executor, next_piece = None, 0
+    if len(chunks) > 1:
+        from concurrent import futures
+        executor = futures.ThreadPoolExecutor(max_workers=min(settings.TTS_STREAM_WORKERS, len(chunks)), thread_name_prefix="tts")
+        # Submitted in order, so the pool always works on the pieces needed soonest
+        pending = [executor.submit(_prepare_audio, index, chunk) for index, chunk in enumerate(chunks)]
 
     try:
-        if settings.DEBUG_MODE:
-            print(f"TTS: Attempting to speak: '{text_to_speak}'")
-
-        # Create gTTS object
-        tts = gTTS(text=text_to_speak, lang=settings.TTS_LANGUAGE, slow=False)
-        
-        # Save the audio file
-        tts.save(audio_file_path)
-
-        # Play the audio file
-        playsound(audio_file_path)
-
-        if settings.DEBUG_MODE:
-            print(f"TTS: Successfully played: '{text_to_speak}'")
-
-    except ImportError:
-        if settings.DEBUG_MODE:
-            print("TTS Error: gTTS or playsound library not found. Please install them using 'pip install gTTS playsound==1.2.2'.")
-        print(f"BOT (audio fallback): {text_to_speak}") # Fallback
-    except Exception as e:
-        if settings.DEBUG_MODE:
-            print(f"TTS Error: An error occurred during text-to-speech: {e}")
-        print(f"BOT (audio fallback): {text_to_speak}") # Fallback
-    finally:
-        # After attempting to play (whether successful or not), try to remove the temporary audio file.
-        if os.path.exists(audio_file_path):
+        for index, chunk in enumerate(chunks):
+            audio_file_path, temporary = None, False
             try:
-                os.remove(audio_file_path)
-                if settings.DEBUG_MODE: # Optional: uncomment to confirm deletion
-                    print(f"TTS: Temporary audio file '{audio_file_path}' removed.")
-            except Exception as e_remove:
-                # If removal fails (e.g., still locked for some reason), print a debug message.
-                # This might still happen if playsound is extremely slow to release, but it's less likely.
-                if settings.DEBUG_MODE:
-                    print(f"TTS: Error removing temporary audio file '{audio_file_path}': {e_remove}")
+                # Wait for the piece's synthesis, noticing an interruption meanwhile
+                while executor and not pending[index].done() and not (cancelled and cancelled.is_set()):
+                    futures.wait([pending[index]], timeout=0.05)
+                if cancelled is not None and cancelled.is_set():
+                    logger.debug("Speech interrupted after %d of %d piece(s).", index, len(chunks))
+                    return "cancelled"
+                audio_file_path, temporary = pending[index].result() if executor else _prepare_audio(index, chunk)
+                next_piece = index + 1
+                if index == 0:
+                    logger.debug("Time to first audio: %.0f ms", (time.perf_counter() - started) * 1000)
+
+                # Play the audio file
+                _play(audio_file_path)
+
+            except ImportError:
+                logger.error("gTTS or playsound library not found. Please install them using 'pip install gTTS playsound==1.2.2'.")
+                print(f"BOT (audio fallback): {' '.join(chunks[index:])}") # Fallback
+                return "failed"
+            except Exception as e:
+                logger.error("An error occurred during text-to-speech: %s", e)
+                print(f"BOT (audio fallback): {chunk}") # Fallback, then carry on with the next piece
+            finally:
+                if temporary:
+                    _remove_temporary_file(audio_file_path)
+
+        logger.debug("Successfully played: %r", text_to_speak)
+        return "done"
+    finally:
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+            for future in pending[next_piece:]: # Synthesised (or still being synthesised) but never played
+                future.add_done_callback(_discard_audio)
+
+def _discard_audio(future):
+    if not future.cancelled() and future.exception() is None:
+        audio_file_path, temporary = future.result()
+        if temporary:
+            _remove_temporary_file(audio_file_path)
+
+class SpeechJob:
+    """
+    One text queued on a SpeechPlayer. status goes "queued" -> "playing" -> "done", "cancelled" or "failed";
+    `finished` (a threading.Event) is set at the end either way.
+    """
+
+    def __init__(self, text):
+        self.text = text
+        self.status = "queued"
+        self.finished = threading.Event()
+        self._cancelled = threading.Event()
+
+    def cancel(self):
+        """Drops the job if it has not started, or stops it before its next sentence."""
+        self._cancelled.set()
+
+    @property
+    def cancelled(self):
+        return self._cancelled.is_set()
+
+    def wait(self, timeout=None):
+        """Blocks until the job is finished; returns False on timeout."""
+        return self.finished.wait(timeout)
+
+
+class SpeechPlayer:
+    """
+    Speaks queued texts one after another on a background thread, so the caller can listen for the next
+    question while an answer is still playing:
+        player = SpeechPlayer(on_finished=lambda job: ...)
+        job = player.say(text)   # returns immediately
+        player.stop()            # barge-in: cut the current answer short and drop anything queued
+    Speech stops between sentences (playsound cannot stop a file half way), so with TTS_STREAMING on a
+    long answer is cut within one sentence.
+    """
+
+    def __init__(self, on_finished=None):
+        self.on_finished = on_finished # Called with each SpeechJob when it is finished, on the player thread
+        self._queue = queue.Queue()
+        self._current = None
+        self._idle = threading.Event()
+        self._idle.set()
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def say(self, text_to_speak):
+        """Queues the text and returns its SpeechJob without waiting."""
+        job = SpeechJob(text_to_speak)
+        with self._lock:
+            self._idle.clear()
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="speech-player", daemon=True)
+                self._thread.start()
+            self._queue.put(job)
+        return job
+
+    @property
+    def speaking(self):
+        """True while a job is playing or queued."""
+        return not self._idle.is_set()
+
+    def skip(self):
+        """Stops the current job (before its next sentence); queued ones still play."""
+        current = self._current
+        if current is not None:
+            current.cancel()
+
+    def stop(self):
+        """Stops the current job and cancels everything queued."""
+        with self._lock:
+            for job in list(self._queue.queue):
+                job.cancel()
+            self.skip()
+
+    def wait(self, timeout=None):
+        """Blocks until everything queued has been played (or cancelled); returns False on timeout."""
+        return self._idle.wait(timeout)
+
+    def close(self, timeout=None):
+        """Lets the queued speech finish, then ends the player thread."""
+        with self._lock:
+            thread, self._thread = self._thread, None
+            if thread is not None:
+                self._queue.put(None)
+        if thread is not None:
+            thread.join(timeout)
+
+    def _run(self):
+        while True:
+            job = self._queue.get()
+            if job is None:
+                return
+            self._current = job
+            if job.cancelled or not job.text:
+                job.status = "cancelled" if job.cancelled else "done"
+            else:
+                job.status = "playing"
+                try:
+                    job.status = _speak(job.text, job._cancelled)
+                except Exception as e: # Keep the player alive for the next job
+                    logger.error("Speech player failed on %r: %s", job.text[:40], e)
+                    job.status = "failed"
+            self._current = None
+            job.finished.set()
+            if self.on_finished is not None:
+                try:
+                    self.on_finished(job)
+                except Exception as e:
+                    logger.warning("Speech player on_finished callback failed: %s", e)
+            with self._lock:
+                if self._queue.empty():
+                    self._idle.set()
+
+def speech_texts_to_prewarm():
+    """
+    The fixed texts the bot speaks, as they are spoken: the help text, every follow-up question,
+    the scheme listing, the goodbye, and the answer to every crop advisory question for every known crop.
+    """
+    from core import dialogue_manager
+    from core import intent_handler
+    from utils import knowledge_base
+
+    knowledge = knowledge_base.get_knowledge_base()
+    texts = []
+    for intent, handler in intent_handler.INTENT_HANDLERS.items():
+        # Without entities a handler asks for what it is missing (or answers in general, e.g. the help text)
+        texts.append(intent_handler.handle_intent({"intent": intent, "entities": {}}))
+        if "crop_data" in handler.requires:
+            for crop_name in knowledge.crop_data:
+                texts.append(intent_handler.handle_intent({"intent": intent, "entities": {"crop_name": crop_name}}))
+    texts.append(dialogue_manager.get_dialogue_engine().goodbye_text)
+    return list(dict.fromkeys(text for text in map(clean_text_for_speech, texts) if text))
+
+def prewarm_audio_cache(texts=None):
+    """
+    Synthesises every text not cached yet, so it later plays without a network call.
+    Args:
+        texts (list, optional): Defaults to speech_texts_to_prewarm().
+    Returns:
+        dict: {"texts", "pieces" (what is cached: see speech_chunks), "cached" (already there), "synthesized", "failed"} counts.
+    """
+    if get_audio_cache() is None:
+        raise ValueError("The speech cache is off (settings.TTS_CACHE_MAX_BYTES = 0)")
+    texts = speech_texts_to_prewarm() if texts is None else texts
+    # Cached per piece, as speak_hindi plays them
+    pieces = list(dict.fromkeys(chunk for text in texts for chunk in speech_chunks(text)))
+    counts = {"texts": len(texts), "pieces": len(pieces), "cached": 0, "synthesized": 0, "failed": 0}
+    for text in pieces:
+        try:
+            _, cached = synthesize_to_cache(text)
+        except ImportError: # gTTS is missing: every text would fail the same way
+            raise
+        except Exception as e: # E.g. a network error; the text is synthesised on first use instead
+            logger.warning("Could not synthesise %r: %s", text[:40], e)
+            counts["failed"] += 1
+            continue
+        counts["cached" if cached else "synthesized"] += 1
+    return counts
 
 if __name__ == '__main__':
-    print("यह वॉयस आउटपुट मॉड्यूल का सीधा परीक्षण है।")
-    
-    speak_hindi("नमस्ते, यह एक परीक्षण है।")
-    speak_hindi("कृषि मित्र AI आपकी सहायता के लिए तैयार है।")
-    speak_hindi("") # Test with empty string
-    speak_hindi("गेहूं की खेती के लिए अक्टूबर और नवंबर का महीना उत्तम होता है।")
\ No newline at end of file
+    parser = argparse.ArgumentParser(prog="python -m core.voice_output", description="Speak test sentences, or fill the speech cache")
+    parser.add_argument("--prewarm", action="store_true", help="Synthesise the fixed prompts and crop advisory answers into the speech cache")
+    args = parser.parse_args()
+
+    if args.prewarm:
+        log.configure_logging()
+        counts = prewarm_audio_cache()
+        print(f"{counts['texts']} texts in {counts['pieces']} pieces: {counts['synthesized']} synthesised, {counts['cached']} already cached, {counts['failed']} failed.")
+        print(f"Speech cache: {get_audio_cache().stats()}")
+    else:
+        print("यह वॉयस आउटपुट मॉड्यूल का सीधा परीक्षण है।")
+
+        speak_hindi("नमस्ते, यह एक परीक्षण है।")
+        speak_hindi("कृषि मित्र AI आपकी सहायता के लिए तैयार है।")
+        speak_hindi("") # Test with empty string
+        speak_hindi("गेहूं की खेती के लिए अक्टूबर और नवंबर का महीना उत्तम होता है।")
\ No newline at end of file
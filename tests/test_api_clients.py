@@ -0,0 +1,252 @@
+import json
+import os
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import pytest
+
+from config import settings
+from utils import api_clients
+from utils.api_clients import (CircuitBreaker, FallbackWeatherProvider, StaticWeatherProvider, WeatherCache, WeatherClient,
+                               create_weather_provider, normalize_city_name)
+from utils.weather_stub_server import start_stub_server
+
+WEATHER_FIXTURE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures", "weather_static.json")
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def _counting_fetch(result=None):
+    calls = []
+    def fetch(city_name):
+        calls.append(city_name)
+        return result if result is not None else {"name": city_name, "n": len(calls)}
+    return fetch, calls
+
+
+def test_normalize_city_name():
+    assert normalize_city_name("  Kanpur   City ") == normalize_city_name("kanpur city")
+
+
+def test_fresh_entries_are_hits():
+    fetch, calls = _counting_fetch()
+    cache = WeatherCache(fetch, ttl_seconds=60, stale_seconds=60, clock=FakeClock())
+    assert cache.get("पटना") == cache.get(" पटना ")
+    assert len(calls) == 1
+    assert cache.stats()["hits"] == 1 and cache.stats()["misses"] == 1
+
+
+def test_stale_entry_is_served_and_refreshed_in_background():
+    clock = FakeClock()
+    fetch, calls = _counting_fetch()
+    cache = WeatherCache(fetch, ttl_seconds=60, stale_seconds=300, clock=clock)
+    first = cache.get("रांची")
+    clock.now += 120
+    assert cache.get("रांची") == first # served stale
+    for thread in threading.enumerate():
+        if thread.name.startswith("weather-refresh-"):
+            thread.join(timeout=2)
+    assert len(calls) == 2
+    assert cache.get("रांची")["n"] == 2
+    assert cache.stats()["stale_hits"] == 1
+
+
+def test_expired_entries_and_failures_are_not_served():
+    clock = FakeClock()
+    results = [{"name": "x"}, None]
+    cache = WeatherCache(lambda city: results.pop(0), ttl_seconds=10, stale_seconds=10, clock=clock)
+    assert cache.get("x") == {"name": "x"}
+    clock.now += 100
+    assert cache.get("x") is None
+    assert cache.stats()["size"] == 0
+
+
+def test_snapshot_answers_are_not_cached():
+    fetch, calls = _counting_fetch({"name": "पटना", "source": "static"})
+    cache = WeatherCache(fetch, ttl_seconds=60, stale_seconds=60, clock=FakeClock())
+    assert cache.get("पटना")["source"] == "static"
+    cache.get("पटना")
+    assert len(calls) == 2 and cache.stats()["size"] == 0
+
+
+def test_concurrent_misses_share_one_fetch():
+    release = threading.Event()
+    calls = []
+    def slow_fetch(city_name):
+        calls.append(city_name)
+        release.wait(timeout=2)
+        return {"name": city_name}
+    cache = WeatherCache(slow_fetch, ttl_seconds=60, stale_seconds=0)
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(cache.get("लखनऊ"))) for _ in range(8)]
+    for thread in threads: thread.start()
+    while not calls: pass
+    release.set()
+    for thread in threads: thread.join(timeout=2)
+    assert len(calls) == 1
+    assert results == [{"name": "लखनऊ"}] * 8
+
+
+def test_module_level_function_goes_through_cache(monkeypatch):
+    fetch, calls = _counting_fetch()
+    monkeypatch.setattr(api_clients, "weather_cache", WeatherCache(fetch, ttl_seconds=60, stale_seconds=0))
+    api_clients.get_live_weather_data("दिल्ली")
+    api_clients.get_live_weather_data("दिल्ली")
+    assert len(calls) == 1
+    assert api_clients.get_weather_cache_stats()["hits"] == 1
+
+
+# --- WeatherClient against a local stub HTTP server ---
+
+
+class _ScriptedWeatherHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1" # Allow keep-alive
+
+    def do_GET(self):
+        server = self.server
+        server.requests.append(self.client_address[1])
+        server.api_keys.extend(parse_qs(urlparse(self.path).query).get("appid", []))
+        status = server.script.pop(0) if server.script else 200
+        body = {"cod": 200, "name": "कानपुर", "main": {"temp": 30.0}} if status == 200 else {"cod": str(status), "message": "error"}
+        payload = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def stub_server():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _ScriptedWeatherHandler)
+    server.script = []
+    server.requests = []
+    server.api_keys = []
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def _client(server, **kwargs):
+    kwargs.setdefault("backoff_seconds", 0.001)
+    return WeatherClient(f"http://127.0.0.1:{server.server_address[1]}/data/2.5/weather", "test-key", **kwargs)
+
+
+def test_client_reuses_pooled_connection(stub_server):
+    client = _client(stub_server)
+    for _ in range(3):
+        assert client.fetch("कानपुर")["name"] == "कानपुर"
+    assert len(stub_server.requests) == 3
+    assert len(set(stub_server.requests)) == 1 # same client port -> one keep-alive connection
+
+
+def test_client_reads_the_api_key_from_settings_on_each_lookup(stub_server, monkeypatch):
+    client = WeatherClient(f"http://127.0.0.1:{stub_server.server_address[1]}/data/2.5/weather")
+    for key in ("first-key", "rotated-key"):
+        monkeypatch.setattr(settings, "OPENWEATHERMAP_API_KEY", key)
+        client.fetch("कानपुर")
+    assert stub_server.api_keys == ["first-key", "rotated-key"]
+
+
+def test_client_retries_transient_errors(stub_server):
+    outcomes = api_clients.WEATHER_UPSTREAM_REQUESTS
+    before = {outcome: outcomes.labels("sync", outcome).value for outcome in ("ok", "server_error")}
+    stub_server.script = [503, 502]
+    assert _client(stub_server, max_retries=2).fetch("कानपुर") is not None
+    assert len(stub_server.requests) == 3
+    assert outcomes.labels("sync", "server_error").value - before["server_error"] == 2
+    assert outcomes.labels("sync", "ok").value - before["ok"] == 1
+
+
+def test_client_does_not_retry_unknown_city(stub_server):
+    stub_server.script = [404]
+    client = _client(stub_server)
+    assert client.fetch("कहीं नहीं") is None
+    assert len(stub_server.requests) == 1
+    assert client.breaker.state == CircuitBreaker.CLOSED
+
+
+def test_circuit_opens_and_fails_fast_then_recovers(stub_server):
+    clock = FakeClock()
+    breaker = CircuitBreaker(failure_rate_threshold=0.5, window_size=4, min_requests=2, open_seconds=30, clock=clock)
+    client = _client(stub_server, max_retries=0, breaker=breaker)
+    stub_server.script = [500, 500]
+    assert client.fetch("कानपुर") is None
+    assert client.fetch("कानपुर") is None
+    assert client.is_degraded
+
+    requests_before = len(stub_server.requests)
+    assert client.fetch("कानपुर") is None
+    assert len(stub_server.requests) == requests_before # failed fast, no upstream call
+
+    clock.now += 31
+    assert client.fetch("कानपुर") is not None # half-open trial succeeds
+    assert breaker.state == CircuitBreaker.CLOSED
+
+
+# --- Weather providers and the local stand-in server ---
+
+
+def test_static_provider_answers_from_snapshot():
+    provider = StaticWeatherProvider(WEATHER_FIXTURE)
+    weather_data = provider.get(" रांची ")
+    assert weather_data["name"] == "रांची" and weather_data["source"] == "static"
+    assert provider.get("अटलांटिस") is None
+
+
+def test_static_provider_tolerates_missing_file(tmp_path):
+    assert StaticWeatherProvider(str(tmp_path / "missing.json")).get("दिल्ली") is None
+
+
+def test_fallback_provider_uses_first_answer():
+    class Down:
+        name = "down"
+        def get(self, city_name):
+            return None
+    provider = FallbackWeatherProvider([Down(), StaticWeatherProvider(WEATHER_FIXTURE)])
+    assert provider.get("पटना")["source"] == "static"
+    assert provider.name == "down+static"
+    assert create_weather_provider("static").name == "static"
+
+
+def test_capture_weather_snapshot_keeps_entries_of_failed_cities(tmp_path):
+    path = str(tmp_path / "weather_static.json")
+    assert StaticWeatherProvider(path).get("पटना") is None # Nothing captured yet
+    live = {"पटना": {"name": "पटना", "dt": 1}, "रांची": {"name": "रांची", "dt": 1}}
+    assert api_clients.capture_weather_snapshot(path, ["पटना", "रांची"], live.get) == (2, 0)
+
+    live = {"पटना": {"name": "पटना", "dt": 2}} # रांची is unreachable this time
+    assert api_clients.capture_weather_snapshot(path, ["पटना", "रांची"], live.get) == (1, 1)
+    provider = StaticWeatherProvider(path)
+    assert provider.get("पटना")["dt"] == 2 and provider.get("रांची")["dt"] == 1
+    assert not os.path.exists(path + ".tmp")
+
+
+def test_shipped_weather_snapshot_is_empty():
+    # Offline answers come from a captured snapshot (python -m utils.api_clients --snapshot), never from made-up data
+    assert StaticWeatherProvider(settings.WEATHER_STATIC_FILE).cities() == []
+
+
+def test_weather_client_against_stub_server():
+    server, base_url = start_stub_server(static_file=WEATHER_FIXTURE)
+    try:
+        client = WeatherClient(base_url, "stub-key")
+        weather_data = client.fetch("कानपुर")
+        assert weather_data["cod"] == 200 and weather_data["name"] == "कानपुर"
+        assert "source" not in weather_data
+        assert client.fetch("अटलांटिस") is None
+    finally:
+        server.shutdown()
+        server.server_close()
@@ -0,0 +1,68 @@
+import pytest
+
+import api_server
+from utils import api_clients
+
+
+@pytest.fixture
+def client(monkeypatch):
+    monkeypatch.setattr(api_clients, "get_live_weather_data",
+                        lambda city: {"name": city, "weather": [{"description": "बादल"}], "main": {"temp": 25.0}})
+    api_server.app.config["TESTING"] = True
+    return api_server.app.test_client()
+
+
+def test_ask_requires_query(client):
+    assert client.post("/ask", json={"session_id": "s1"}).status_code == 400
+
+
+def test_ask_weather_follow_up(client):
+    first = client.post("/ask", json={"session_id": "weather-1", "query": "मौसम कैसा है"}).get_json()
+    assert first["awaiting_weather_location"] is True
+    second = client.post("/ask", json={"session_id": "weather-1", "query": "पटना"}).get_json()
+    assert second["nlu_intent"] == "get_weather" and "पटना" in second["bot_response"]
+    assert second["awaiting_weather_location"] is False
+
+
+def test_batch_returns_results_in_order(client):
+    response = client.post("/ask/batch", json=[
+        {"session_id": "b1", "query": "गेहूं की खेती कब करें"},
+        {"session_id": "b2", "query": ""},
+        {"session_id": "b3", "query": "मौसम कैसा है"},
+        {"session_id": "b3", "query": "रांची"},
+    ])
+    assert response.status_code == 200
+    results = response.get_json()["results"]
+    assert [r.get("nlu_intent") for r in results] == ["ask_crop_sowing_time", None, "get_weather", "get_weather"]
+    assert results[1] == {"error": "No query provided"}
+    assert "रांची" in results[3]["bot_response"]
+
+
+def test_batch_rejects_non_list_body(client):
+    assert client.post("/ask/batch", json={"queries": "not a list"}).status_code == 400
+
+
+def test_mandi_follow_up_reports_awaited_slots(client):
+    first = client.post("/ask", json={"session_id": "mandi-1", "query": "कानपुर मंडी में भाव"}).get_json()
+    assert first["awaiting_mandi_info"] is True and first["awaiting_slots"] == ["crop_name"]
+    second = client.post("/ask", json={"session_id": "mandi-1", "query": "गेहूं"}).get_json()
+    assert "2250" in second["bot_response"] and second["awaiting_slots"] == []
+
+
+def test_metrics_endpoint_reports_request_stage_and_intent_latency(client):
+    client.post("/ask", json={"session_id": "metrics-1", "query": "मौसम कैसा है"})
+    response = client.get("/metrics")
+    assert response.status_code == 200 and response.content_type.startswith("text/plain; version=0.0.4")
+    text = response.get_data(as_text=True)
+    assert 'krishi_mitra_http_requests_total{route="/ask",method="POST",status="200"}' in text
+    assert 'krishi_mitra_http_request_duration_seconds_count{route="/ask"}' in text
+    assert 'krishi_mitra_stage_duration_seconds_count{stage="nlu"}' in text
+    assert 'krishi_mitra_intent_duration_seconds_count{intent="get_weather"}' in text
+    assert 'krishi_mitra_sessions{backend="memory"}' in text
+    assert "krishi_mitra_knowledge_base_reloads_total" in text and "krishi_mitra_weather_cache_hits_total" in text
+
+
+def test_request_id_is_echoed_or_generated(client):
+    response = client.post("/ask", json={"query": "मदद"}, headers={"X-Request-ID": "trace-7"})
+    assert response.headers["X-Request-ID"] == "trace-7"
+    assert len(client.get("/").headers["X-Request-ID"]) == 16
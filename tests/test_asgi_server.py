@@ -0,0 +1,151 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+httpx = pytest.importorskip("httpx")
+
+import asgi_server
+from core import conversation, intent_handler
+from utils import async_api_clients
+from utils.session_store import SqliteSessionStore
+from utils.api_clients import CircuitBreaker
+from utils.async_api_clients import AsyncWeatherCache, AsyncWeatherClient
+
+WEATHER_DELAY_SECONDS = 0.2
+
+
+@pytest.fixture
+def slow_weather(monkeypatch):
+    calls = []
+
+    async def get_live_weather_data(city):
+        calls.append(city)
+        await asyncio.sleep(WEATHER_DELAY_SECONDS)
+        return {"name": city, "weather": [{"description": "बादल"}], "main": {"temp": 25.0}}
+
+    monkeypatch.setattr(async_api_clients, "get_live_weather_data", get_live_weather_data)
+    return calls
+
+
+def run_requests(*requests):
+    """Sends (method, path, json) requests to the ASGI app concurrently and returns the responses in order."""
+    async def main():
+        transport = httpx.ASGITransport(app=asgi_server.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            return await asyncio.gather(*(client.request(method, path, json=body) for method, path, body in requests))
+    return asyncio.run(main())
+
+
+def test_ask_weather_follow_up(slow_weather):
+    first, = run_requests(("POST", "/ask", {"session_id": "asgi-weather", "query": "मौसम कैसा है"}))
+    assert first.json()["awaiting_weather_location"] is True and first.json()["awaiting_slots"] == ["location"]
+    second, = run_requests(("POST", "/ask", {"session_id": "asgi-weather", "query": "पटना"}))
+    assert second.json()["nlu_intent"] == "get_weather" and "पटना में मौसम बादल है" in second.json()["bot_response"]
+    assert slow_weather == ["पटना"]
+
+
+def test_ask_validates_request(slow_weather):
+    missing_query, not_found, wrong_method = run_requests(
+        ("POST", "/ask", {"session_id": "s1"}), ("POST", "/nope", {}), ("GET", "/ask", None))
+    assert missing_query.status_code == 400 and missing_query.json() == {"error": "No query provided"}
+    assert not_found.status_code == 404 and wrong_method.status_code == 405
+
+
+def test_weather_requests_wait_concurrently(slow_weather):
+    count = 300
+    started = time.perf_counter()
+    responses = run_requests(*[("POST", "/ask", {"session_id": f"c{i}", "query": "पटना में मौसम"}) for i in range(count)])
+    elapsed = time.perf_counter() - started
+    assert all("पटना में मौसम बादल है" in r.json()["bot_response"] for r in responses)
+    assert elapsed < count * WEATHER_DELAY_SECONDS / 10 # Serially this would take 60 seconds
+
+
+def test_batch_keeps_order_and_session_turns(slow_weather):
+    response, = run_requests(("POST", "/ask/batch", [
+        {"session_id": "ab1", "query": "गेहूं की खेती कब करें"},
+        {"session_id": "ab2", "query": ""},
+        {"session_id": "ab3", "query": "मौसम कैसा है"},
+        {"session_id": "ab3", "query": "रांची"},
+    ]))
+    results = response.json()["results"]
+    assert [r.get("nlu_intent") for r in results] == ["ask_crop_sowing_time", None, "get_weather", "get_weather"]
+    assert "रांची" in results[3]["bot_response"]
+
+
+def test_async_weather_cache_shares_one_fetch_per_city():
+    calls = []
+
+    async def fetch(city):
+        calls.append(city)
+        await asyncio.sleep(0.01)
+        return {"name": city}
+
+    async def main():
+        cache = AsyncWeatherCache(fetch, ttl_seconds=60, stale_seconds=60)
+        results = await asyncio.gather(*(cache.get(city) for city in ["Patna", "patna ", "Ranchi"] * 20))
+        return cache, results
+
+    cache, results = asyncio.run(main())
+    assert sorted(calls) == ["Patna", "Ranchi"]
+    assert results[0] == {"name": "Patna"} and cache.stats()["misses"] == 60
+
+
+def test_async_weather_client_retries_transient_errors():
+    statuses = [503, 200]
+
+    def respond(request):
+        status = statuses.pop(0)
+        return httpx.Response(status, json={"cod": status, "name": "Patna"})
+
+    async def main():
+        client = AsyncWeatherClient("http://weather.test/data", "key", backoff_seconds=0.0, breaker=CircuitBreaker())
+        client._client = httpx.AsyncClient(transport=httpx.MockTransport(respond))
+        try:
+            return await client.fetch("Patna")
+        finally:
+            await client.aclose()
+
+    assert asyncio.run(main()) == {"cod": 200, "name": "Patna"}
+    assert statuses == []
+
+
+def test_metrics_endpoint(slow_weather):
+    run_requests(("POST", "/ask", {"session_id": "asgi-metrics", "query": "पटना में मौसम कैसा है"}), ("GET", "/nowhere", None))
+    response, = run_requests(("GET", "/metrics", None))
+    assert response.status_code == 200 and response.headers["content-type"].startswith("text/plain; version=0.0.4")
+    assert 'krishi_mitra_http_requests_total{route="/ask",method="POST",status="200"}' in response.text
+    assert 'krishi_mitra_http_requests_total{route="unmatched",method="GET",status="404"}' in response.text
+    assert 'krishi_mitra_stage_duration_seconds_count{stage="weather_prefetch"}' in response.text
+    assert 'krishi_mitra_weather_cache_entries{cache="async"}' in response.text
+
+
+def test_admin_reload_requires_the_configured_token(monkeypatch):
+    monkeypatch.setattr(asgi_server.settings, "ADMIN_TOKEN", None)
+    response, = run_requests(("POST", "/admin/reload", None))
+    assert response.status_code == 403
+
+
+def test_sqlite_backends_are_used_off_the_event_loop(tmp_path, monkeypatch):
+    loop_threads, io_threads = set(), []
+
+    class RecordingStore(SqliteSessionStore):
+        def get(self, session_id):
+            io_threads.append(threading.get_ident())
+            return super().get(session_id)
+
+    def respond_to_intent(nlu_result, weather_cache=None):
+        io_threads.append(threading.get_ident())
+        return intent_handler.IntentResponse("ठीक", ())
+
+    async def home(scope, data):
+        loop_threads.add(threading.get_ident())
+        return 200, "ok"
+
+    monkeypatch.setattr(conversation, "user_sessions", RecordingStore(str(tmp_path / "sessions.sqlite3")))
+    monkeypatch.setattr(asgi_server.settings, "MANDI_PRICE_BACKEND", "sqlite")
+    monkeypatch.setattr(intent_handler, "respond_to_intent", respond_to_intent)
+    monkeypatch.setitem(asgi_server.ROUTES, ("GET", "/"), (home, False))
+    run_requests(("GET", "/", None), ("POST", "/ask", {"session_id": "sq", "query": "गेहूं का भाव पिछले हफ्ते से कितना बदला"}))
+    assert len(io_threads) == 2 and loop_threads.isdisjoint(io_threads)
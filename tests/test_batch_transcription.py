@@ -0,0 +1,124 @@
+import json
+import math
+import os
+import random
+import threading
+import time
+import wave
+from array import array
+
+from core import batch_transcription
+from core.batch_transcription import SidecarTranscriptRecognizer, read_wav, split_utterances, transcribe_directory
+from utils import api_clients
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def write_wav(path, segments, rate=44100, channels=2):
+    """segments: (seconds, amplitude) pairs; amplitude 0 is faint noise, otherwise a 220 Hz tone."""
+    rng = random.Random(0)
+    samples = array("h")
+    for seconds, amplitude in segments:
+        for i in range(int(seconds * rate)):
+            value = amplitude * math.sin(2 * math.pi * 220 * i / rate) if amplitude else rng.uniform(-50, 50)
+            samples.extend([int(value)] * channels)
+    with wave.open(str(path), "wb") as wav:
+        wav.setnchannels(channels)
+        wav.setsampwidth(2)
+        wav.setframerate(rate)
+        wav.writeframes(samples.tobytes())
+
+
+def read_jsonl(path):
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f]
+
+
+def test_read_wav_downmixes_and_resamples():
+    samples = read_wav(os.path.join(ROOT, "captured_audio.wav"), 16000) # 44.1 kHz stereo, 83968 frames
+    assert samples.dtype.name == "int16"
+    assert len(samples) == round(83968 * 16000 / 44100)
+
+
+def test_split_utterances_finds_each_burst(tmp_path):
+    write_wav(tmp_path / "call.wav", [(0.5, 0), (0.6, 8000), (1.0, 0), (0.6, 8000)])
+    samples = read_wav(str(tmp_path / "call.wav"), 16000)
+    utterances = split_utterances(samples, 16000)
+    assert len(utterances) == 2
+    (first_start, first_end, _), (second_start, _, second_data) = utterances
+    # Bursts at 0.5-1.1 s and 2.1-2.7 s; chunks keep a 0.3 s pre-roll and end after 0.5 s of silence
+    assert 0.1 < first_start / 16000 < 0.5 and 1.1 < first_end / 16000 < 1.7 < second_start / 16000 < 2.1
+    assert len(second_data) > 0.6 * 16000 * 2 # Speech running into the end of the file is kept
+
+
+def test_directory_is_transcribed_in_order_with_one_dialogue_per_call(tmp_path, monkeypatch):
+    monkeypatch.setattr(api_clients, "get_live_weather_data", 
+                        lambda city: {"name": city, "weather": [{"description": "बादल"}], "main": {"temp": 31.0}})
+    for name in ("b", "a"):
+        write_wav(tmp_path / f"{name}.wav", [(0.3, 0), (0.5, 8000), (0.8, 0), (0.5, 8000), (0.3, 0)])
+    (tmp_path / "a.txt").write_text("मौसम कैसा है\nपटना\n", encoding="utf-8")
+    (tmp_path / "b.txt").write_text("गेहूं की बुवाई कब करें\n", encoding="utf-8")
+    (tmp_path / "notes.md").write_text("not audio")
+    output = tmp_path / "out.jsonl"
+
+    report = transcribe_directory(str(tmp_path), str(output), SidecarTranscriptRecognizer(), workers=2)
+
+    records = read_jsonl(output)
+    assert [os.path.basename(r["file"]) for r in records] == ["a.wav", "b.wav"]
+    assert (report.files, report.failed_files, report.utterances) == (2, 0, 4)
+    weather_question, location = records[0]["utterances"]
+    assert weather_question["intent"] == "get_weather" and location["text"] == "पटना"
+    assert "31" in location["response"] # The follow-up was answered in the context of this call
+    sowing, unrecognized = records[1]["utterances"]
+    assert sowing["intent"] == "ask_crop_sowing_time"
+    assert unrecognized["text"] is None and "intent" not in unrecognized
+
+
+def test_undecodable_file_and_recognizer_errors_are_recorded(tmp_path):
+    (tmp_path / "broken.wav").write_bytes(b"not a wav file")
+    write_wav(tmp_path / "ok.wav", [(0.3, 0), (0.5, 8000), (0.3, 0)])
+
+    class FailingRecognizer:
+        def transcribe(self, chunk):
+            raise ConnectionError("recognition service unreachable")
+
+    report = transcribe_directory(str(tmp_path), str(tmp_path / "out.jsonl"), FailingRecognizer(), workers=2)
+
+    broken, ok = read_jsonl(tmp_path / "out.jsonl")
+    assert broken["error"].startswith("Error") and broken["utterances"] == []
+    assert ok["error"] is None and "unreachable" in ok["utterances"][0]["error"]
+    assert report.failed_files == 1
+
+
+def test_in_flight_recordings_are_bounded(tmp_path, monkeypatch):
+    for i in range(8):
+        write_wav(tmp_path / f"{i}.wav", [(0.1, 0)], rate=16000, channels=1)
+    active, peak, lock = [0], [0], threading.Lock()
+    listed, finished, ahead = [0], [0], [0]
+
+    def slow_transcribe_file(path, recognizer):
+        with lock:
+            active[0] += 1
+            peak[0] = max(peak[0], active[0])
+        time.sleep(0.02)
+        with lock:
+            active[0] -= 1
+            finished[0] += 1
+        return {"file": path, "duration_seconds": 0.1, "utterances": [], "error": None}
+
+    paths = batch_transcription.find_recordings(str(tmp_path))
+
+    def counting_find_recordings(directory):
+        for path in paths:
+            listed[0] += 1
+            ahead[0] = max(ahead[0], listed[0] - finished[0])
+            yield path
+    monkeypatch.setattr(batch_transcription, "transcribe_file", slow_transcribe_file)
+    monkeypatch.setattr(batch_transcription, "find_recordings", counting_find_recordings)
+
+    report = transcribe_directory(str(tmp_path), str(tmp_path / "out.jsonl"), SidecarTranscriptRecognizer(),
+                                  workers=2, max_pending=3)
+
+    assert report.files == 8 and peak[0] <= 2
+    assert ahead[0] <= 4 # The directory listing waits while 3 recordings are pending (+1 being submitted)
+    assert [os.path.basename(r["file"]) for r in read_jsonl(tmp_path / "out.jsonl")] == [f"{i}.wav" for i in range(8)]
@@ -0,0 +1,46 @@
+import json
+
+from benchmarks import compare, scaling
+from benchmarks.__main__ import main
+from benchmarks.harness import measure, percentile
+
+
+def test_percentile_uses_nearest_rank():
+    values = list(range(1, 101))
+    assert percentile(values, 0.5) == 50 and percentile(values, 0.99) == 99 and percentile(values, 1.0) == 100
+
+
+def test_measure_reports_microseconds():
+    metrics = measure(lambda: None, iterations=50)
+    assert metrics["unit"] == "us" and metrics["n"] == 50
+    assert metrics["min"] <= metrics["p50"] <= metrics["p99"]
+
+
+def test_synthetic_data_grows_every_list():
+    crops, mandis, schemes = scaling.synthetic_data(10)
+    real_crops, real_mandis, real_schemes = scaling.synthetic_data(1)
+    assert (len(crops), len(mandis), len(schemes)) == (10 * len(real_crops), 10 * len(real_mandis), 10 * len(real_schemes))
+    assert list(crops)[:len(real_crops)] == list(real_crops)
+
+
+def test_compare_flags_regressions_beyond_threshold_and_noise():
+    baseline = {"results": {"a": {"p50": 10.0}, "b": {"p50": 1.0}, "c": {"p50": 100.0, "throughput_rps": 1000.0}, "d": {"p50": 5.0}}}
+    current = {"results": {"a": {"p50": 20.0}, "b": {"p50": 2.0}, "c": {"p50": 150.0, "throughput_rps": 900.0}}}
+    rows = {row["name"]: row for row in compare.compare(baseline, current, threshold=0.25)}
+    assert set(rows) == {"a", "b", "c"}
+    assert rows["a"]["regressed"] # 2x slower
+    assert not rows["b"]["regressed"] # 2x, but only 1 microsecond
+    assert rows["c"]["metric"] == "throughput_rps" and not rows["c"]["regressed"]
+
+
+def test_cli_writes_results_and_fails_on_regression(tmp_path):
+    output = tmp_path / "results.json"
+    assert main(["--quick", "--only", "micro", "--output", str(output)]) == 0
+    document = json.loads(output.read_text(encoding="utf-8"))
+    assert document["meta"]["parts"] == ["micro"]
+    assert document["results"]["micro.intent.weather"]["intent"] == "get_weather"
+
+    baseline = tmp_path / "baseline.json"
+    document["results"] = {name: dict(metrics, p50=metrics["p50"] / 100) for name, metrics in document["results"].items()}
+    baseline.write_text(json.dumps(document), encoding="utf-8")
+    assert main(["--quick", "--only", "micro", "--output", str(output), "--compare", str(baseline)]) == 1
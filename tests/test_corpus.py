@@ -0,0 +1,50 @@
+import io
+import random
+
+from benchmarks import corpus
+from core import nlu_processor
+
+
+def test_generation_is_lazy_and_seeded():
+    stream = corpus.generate(10**9, seed=3)
+    first = [next(stream) for _ in range(50)]
+    assert first == list(corpus.generate(50, seed=3))
+    assert first != list(corpus.generate(50, seed=4))
+    assert [r["id"] for r in first] == list(range(50))
+
+
+def test_labels_are_in_nlu_result_shape():
+    for record in corpus.generate(300, seed=1):
+        if record["intent"] == "get_mandi_price" and "mandi_location" in record["entities"]:
+            assert record["entities"]["mandi_location"].endswith("मंडी")
+        if record["template"].startswith("get_mandi_price/near/"):
+            assert isinstance(record["entities"]["target_price"], float)
+        assert set(record["entities"]) <= {"crop_name", "mandi_location", "location", "price_rank", "target_price",
+                                           "window_days", "scheme_name", "filter"}
+
+
+def test_clean_corpus_is_mostly_understood():
+    scores = corpus.evaluate(corpus.generate(2000, seed=0))
+    assert scores["n"] == 2000
+    assert scores["intent_accuracy"] > 0.95 and scores["entity_accuracy"] > 0.95
+    assert scores["per_intent"]["get_mandi_price"]["intent_accuracy"] == 1.0
+
+
+def test_asr_noise_changes_the_text_and_is_recorded():
+    rng = random.Random(0)
+    query, applied = corpus.add_asr_noise("कानपुर मंडी में गेहूं का भाव क्या है?", rng, max_edits=2)
+    assert applied and all(name in corpus.ASR_NOISE for name in applied)
+    assert "?" not in query and query != "कानपुर मंडी में गेहूं का भाव क्या है"
+    noisy = list(corpus.generate(200, seed=0, noise=1.0))
+    assert all(record["noise"] for record in noisy)
+
+
+def test_jsonl_round_trip_and_evaluate_with_custom_nlu():
+    buffer = io.StringIO()
+    assert corpus.write_jsonl(corpus.generate(20, seed=2), buffer) == 20
+    records = list(corpus.read_jsonl(io.StringIO(buffer.getvalue())))
+    assert records == list(corpus.generate(20, seed=2))
+    scores = corpus.evaluate(records, process_query=lambda query: {"intent": "unknown", "entities": {}})
+    expected_unknown = sum(r["intent"] == "unknown" for r in records)
+    assert scores["intent_accuracy"] == round(expected_unknown / 20, 6)
+    assert nlu_processor.process_query_rule_based(records[0]["query"])["intent"] == records[0]["intent"]
@@ -0,0 +1,121 @@
+import pytest
+
+from core import dialogue_manager
+from core.dialogue_manager import IDLE, DialogueEngine
+from utils import api_clients
+
+
+@pytest.fixture
+def dialogue(monkeypatch):
+    monkeypatch.setattr(api_clients, "get_live_weather_data",
+                        lambda city: {"name": city, "weather": [{"description": "बादल"}], "main": {"temp": 25.0}})
+    return dialogue_manager.get_dialogue_engine()
+
+
+def test_stories_compile_to_states(dialogue):
+    assert dialogue.transitions[("get_weather", ("location",))] == "get_weather:location"
+    assert dialogue.states["get_mandi_price:mandi_location+crop_name"].slots == ("mandi_location", "crop_name")
+
+
+def test_weather_follow_up(dialogue):
+    context = dialogue.new_context()
+    first = dialogue.handle_turn(context, "मौसम कैसा है")
+    assert first.awaiting == ("location",) and dialogue.awaiting_intent(context) == "get_weather"
+    second = dialogue.handle_turn(context, " पटना ")
+    assert second.nlu_result == {"intent": "get_weather", "entities": {"location": "पटना"}}
+    assert context == dialogue.new_context()
+
+
+def test_mandi_follow_up_collects_both_slots(dialogue):
+    context = dialogue.new_context()
+    dialogue.handle_turn(context, "भाव बताओ")
+    assert context["state"] == "get_mandi_price:mandi_location+crop_name"
+    dialogue.handle_turn(context, "कानपुर में") # A known mandi fills the mandi slot
+    assert context == {"state": "get_mandi_price:crop_name", "pending_entities": {"mandi_location": "कानपुर मंडी"}}
+    turn = dialogue.handle_turn(context, "गेहूं का")
+    assert turn.text.startswith("गेहूं का भाव कानपुर मंडी में 2250")
+    assert context["state"] == IDLE
+
+
+def test_misheard_follow_up_replies_resolve_to_known_names(dialogue):
+    mandi_state = dialogue.states["get_mandi_price:mandi_location+crop_name"]
+    assert dialogue.fill_slots(mandi_state, {}, "कानपूर") == {"mandi_location": "कानपुर मंडी"}
+    assert dialogue.fill_slots(mandi_state, {"mandi_location": "कानपुर मंडी"}, "गेहू") == {
+        "mandi_location": "कानपुर मंडी", "crop_name": "गेहूं"}
+    weather_state = dialogue.states["get_weather:location"]
+    assert dialogue.fill_slots(weather_state, {}, "जामतारा में") == {"location": "जामताड़ा"}
+
+
+def test_guessed_entity_is_confirmed_before_answering(dialogue):
+    context = dialogue.new_context()
+    question = dialogue.handle_turn(context, "जामतारा में मौसम कैसा है")
+    assert question.awaiting == ("confirmation",) and "जामताड़ा" in question.text
+    answer = dialogue.handle_turn(context, "हाँ")
+    assert answer.nlu_result == {"intent": "get_weather", "entities": {"location": "जामताड़ा"}}
+    assert answer.text.startswith("जामताड़ा में मौसम") and context == dialogue.new_context()
+
+
+def test_denied_guess_is_asked_for_again(dialogue):
+    context = dialogue.new_context()
+    dialogue.handle_turn(context, "जामतारा में मौसम कैसा है")
+    turn = dialogue.handle_turn(context, "नहीं")
+    assert turn.awaiting == ("location",) and dialogue.awaiting_intent(context) == "get_weather"
+    assert dialogue.handle_turn(context, "रांची").nlu_result["entities"] == {"location": "रांची"}
+
+
+def test_other_reply_to_a_confirmation_is_a_new_question(dialogue):
+    context = dialogue.new_context()
+    dialogue.handle_turn(context, "जामतारा में मौसम कैसा है")
+    turn = dialogue.handle_turn(context, "गेहूं की खेती कब करें")
+    assert turn.nlu_result["intent"] == "ask_crop_sowing_time" and context == dialogue.new_context()
+    # Spelling variants that match a name exactly are not questioned
+    assert dialogue.handle_turn(context, "गेहू की खेती कब करें").awaiting == ()
+
+
+@pytest.mark.parametrize("reply, intent", [
+    ("गेहूं की खेती कब करें ना", "ask_crop_sowing_time"), # "ना" and "जी" also end ordinary sentences
+    ("धान के बारे में बताओ जी", "ask_crop_general_info"),
+])
+def test_question_ending_in_a_yes_or_no_word_is_a_new_question(dialogue, reply, intent):
+    context = dialogue.new_context()
+    dialogue.handle_turn(context, "जामतारा में मौसम कैसा है")
+    turn = dialogue.handle_turn(context, reply)
+    assert turn.nlu_result["intent"] == intent and context == dialogue.new_context()
+
+
+def test_yes_or_no_with_fillers_and_punctuation_is_an_answer(dialogue):
+    context = dialogue.new_context()
+    dialogue.handle_turn(context, "जामतारा में मौसम कैसा है")
+    assert dialogue.handle_turn(context, "हाँ जी।").nlu_result["entities"] == {"location": "जामताड़ा"}
+    dialogue.handle_turn(context, "जामतारा में मौसम कैसा है")
+    assert dialogue.handle_turn(context, "नहीं ना").awaiting == ("location",)
+
+
+def test_unmatched_reply_goes_to_last_slot(dialogue):
+    state = dialogue.states["get_mandi_price:mandi_location+crop_name"]
+    assert dialogue.fill_slots(state, {}, " बाजरा ") == {"crop_name": "बाजरा"}
+    assert dialogue.fill_slots(state, {}, "गेहूं") == {"crop_name": "गेहूं"}
+
+
+def test_exit_clears_pending_question(dialogue):
+    context = dialogue.new_context()
+    dialogue.handle_turn(context, "मौसम कैसा है")
+    turn = dialogue.handle_turn(context, "धन्यवाद")
+    assert turn.ended and turn.text == "आपकी सहायता करके खुशी हुई। फिर मिलेंगे!"
+    assert context == dialogue.new_context()
+
+
+def test_question_without_story_leaves_no_context():
+    engine = DialogueEngine({"responses": {"utter_goodbye": "बाय"}, "slots": {"location": {"fill": "text"}}}, {"stories": []})
+    context = engine.new_context()
+    turn = engine.handle_turn(context, "भाव बताओ")
+    assert turn.text == "आप किस फसल का और किस मंडी में भाव जानना चाहते हैं?"
+    assert turn.awaiting == () and context["state"] == IDLE
+
+
+def test_invalid_domain_is_rejected():
+    with pytest.raises(ValueError):
+        DialogueEngine({"responses": {"utter_goodbye": ""}, "slots": {"x": {"fill": "regex"}}}, {})
+    with pytest.raises(ValueError):
+        DialogueEngine({"responses": {"utter_goodbye": ""}, "slots": {}},
+                       {"stories": [{"story": "s", "steps": [{"intent": "get_weather"}, {"ask": ["location"]}]}]})
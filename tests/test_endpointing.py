@@ -0,0 +1,104 @@
+import math
+import queue
+import random
+import time
+from array import array
+
+from core.voice_input import MicrophoneSession
+from utils.endpointing import EnergyEndpointer, frame_rms
+
+RATE, FRAME = 16000, 320 # 20 ms frames
+
+
+def noise(amplitude, seed=0):
+    rng = random.Random(seed)
+    return array("h", (int(rng.uniform(-amplitude, amplitude)) for _ in range(FRAME))).tobytes()
+
+
+def tone(amplitude=3000):
+    return array("h", (int(amplitude * math.sin(2 * math.pi * 220 * i / RATE)) for i in range(FRAME))).tobytes()
+
+
+def endpointer(**kwargs):
+    return EnergyEndpointer(RATE, FRAME, calibration_seconds=0.2, end_silence_seconds=0.3, pre_roll_seconds=0.1, **kwargs)
+
+
+def test_frame_rms():
+    assert frame_rms(b"") == 0.0
+    assert 2000 < frame_rms(tone(3000)) < 2200 # A sine's RMS is amplitude / sqrt(2)
+
+
+def test_utterance_is_emitted_as_soon_as_the_end_silence_has_passed():
+    detector = endpointer()
+    frames = [noise(50, i) for i in range(10)] + [tone()] * 50 + [noise(50, i) for i in range(100)]
+    emitted = [(index, detector.feed(frame)) for index, frame in enumerate(frames)]
+    utterances = [(index, data) for index, data in emitted if data is not None]
+    assert len(utterances) == 1
+    index, data = utterances[0]
+    assert index == 60 + 15 - 1 # Speech ends at frame 60; 15 quiet frames (0.3 s) later it is handed over
+    assert len(data) == (5 + 50 + 15) * FRAME * 2 # 0.1 s of pre-roll, the speech and the end silence
+    assert not detector.in_speech
+
+
+def test_noise_level_follows_a_slowly_rising_background_without_false_speech():
+    detector = endpointer()
+    frames = [noise(50, i) for i in range(10)] + [noise(50 + 2 * i, i) for i in range(300)]
+    assert all(detector.feed(frame) is None for frame in frames)
+    assert detector.threshold > 3 * 300
+    assert all(detector.feed(tone()) is None for _ in range(5)) # 0.1 s of speech starts an utterance
+    assert detector.in_speech # Real speech still stands out
+
+
+def test_long_speech_is_cut_at_the_maximum_length():
+    detector = endpointer(max_utterance_seconds=1.0)
+    for i in range(10):
+        detector.feed(noise(50, i))
+    outputs = [detector.feed(tone()) for _ in range(120)]
+    assert sum(output is not None for output in outputs) >= 2
+
+
+def test_microphone_session_hands_over_utterances_and_times_out_in_silence():
+    frames = iter([noise(50, i) for i in range(10)] + [tone()] * 20)
+    def read_frame():
+        frame = next(frames, None)
+        if frame is None:
+            time.sleep(0.001)
+            return noise(50)
+        return frame
+    session = MicrophoneSession(read_frame, RATE, FRAME, endpointer=endpointer()).start()
+    try:
+        assert session.wait_calibrated(timeout=5)
+        utterance = session.next_utterance(timeout=5)
+        assert utterance.sample_rate == RATE and utterance.sample_width == 2 and len(utterance.frame_data) > 20 * FRAME * 2
+        started = time.monotonic()
+        assert session.next_utterance(timeout=0.1) is None and time.monotonic() - started < 1
+    finally:
+        session.close()
+
+
+def test_microphone_session_discards_speech_heard_before_the_listen():
+    source = queue.Queue()
+    def read_frame():
+        return source.get()
+    def wait_until(condition):
+        deadline = time.monotonic() + 5
+        while not condition():
+            assert time.monotonic() < deadline
+            time.sleep(0.005)
+    # The bot's answer (a quiet tone) is played back: one sentence ends, the next is still being spoken
+    for frame in [noise(50, i) for i in range(10)] + [tone(3000)] * 20 + [noise(50)] * 20 + [tone(3000)] * 10:
+        source.put(frame)
+    session = MicrophoneSession(read_frame, RATE, FRAME, endpointer=endpointer()).start()
+    try:
+        wait_until(lambda: source.empty() and session.endpointer.in_speech and session._utterances.qsize() == 1)
+        session.discard_pending()
+        assert not session.endpointer.in_speech
+        for frame in [noise(50)] * 5 + [tone(8000)] * 20 + [noise(50)] * 20: # The user's (louder) answer
+            source.put(frame)
+        utterance = session.next_utterance(timeout=5)
+        frames = [utterance.frame_data[i:i + FRAME * 2] for i in range(0, len(utterance.frame_data), FRAME * 2)]
+        assert max(frame_rms(frame) for frame in frames) > 5000
+        assert session.next_utterance(timeout=0.1) is None
+    finally:
+        source.put(noise(50)) # Unblocks the capture thread so it sees the stop
+        session.close()
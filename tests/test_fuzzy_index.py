@@ -0,0 +1,46 @@
+from utils.fuzzy_index import FuzzyIndex, edit_distance, normalize_devanagari
+
+NAMES = ["गेहूं", "चना", "पूर्वी सिंहभूम", "जामताड़ा", "हजारीबाग", "पटना", "मेरठ", "पुणे", "इंदौर"]
+
+
+def index():
+    fuzzy_index = FuzzyIndex(min_confidence=0.75)
+    for position, name in enumerate(NAMES):
+        fuzzy_index.add(name, position)
+    return fuzzy_index
+
+
+def test_asr_spellings_share_one_skeleton():
+    assert normalize_devanagari("गेहूं") == normalize_devanagari("गेहू") == normalize_devanagari("गेंहू")
+    assert normalize_devanagari("जामताड़ा") == normalize_devanagari("जामताडा")
+    assert normalize_devanagari("हजारी बाग") == normalize_devanagari("हजारीबाग")
+
+
+def test_edit_distance_stops_past_the_bound():
+    assert edit_distance("जामताडा", "जामतारा", 2) == 1
+    assert edit_distance("कानपुर", "पटना", 1) == 2 # "more than 1" is all the caller needs
+
+
+def test_search_ranks_candidates_with_confidence():
+    match, = index().search("जामतारा")
+    assert (match.name, match.payload, match.distance) == ("जामताड़ा", 3, 1)
+    assert 0.75 <= match.confidence < 1.0
+    assert index().search("गेहू")[0].confidence == 1.0
+    assert index().search("दिल्ली") == []
+
+
+def test_find_in_handles_split_glued_and_misheard_names():
+    fuzzy_index = index()
+    assert fuzzy_index.find_in("हजारी बाग में मौसम").name == "हजारीबाग"
+    assert fuzzy_index.find_in("आज गे हूंक्या भाव है").name == "गेहूं"
+    assert fuzzy_index.find_in("पुर्वी सिंहभुम का मौसम").name == "पूर्वी सिंहभूम"
+    assert fuzzy_index.find_in("जामतारा में बारिश").name == "जामताड़ा"
+    assert fuzzy_index.find_in("योजना की सूचना दो") is None # "चना" inside another word is not the crop
+
+
+def test_everyday_words_do_not_become_places():
+    fuzzy_index = index()
+    for query in ("मेरे घर का मौसम", "मेरे खेत का मौसम", "मेरे यहां बारिश होगी", "पूरे हफ्ते का मौसम", "पटनायक जी से पूछो"):
+        assert fuzzy_index.find_in(query) is None, query
+    assert fuzzy_index.search("मेरे") == [] # Short words match exactly or not at all
+    assert fuzzy_index.find_in("आज इंदौरका मौसम").name == "इंदौर" # Glued to a postposition is still found
@@ -0,0 +1,113 @@
+import os
+
+from config import settings
+from core import intent_handler
+from utils import api_clients
+from utils import knowledge_base
+
+PRICE_HISTORY_FIXTURE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures", "mandi_prices.csv")
+
+
+FAKE_WEATHER = {"name": "कानपुर", "weather": [{"description": "साफ आसमान"}], "main": {"temp": 31.0, "humidity": 40}}
+
+
+def test_help_intent():
+    assert intent_handler.handle_intent({"intent": "get_help", "entities": {}}).startswith("मैं आपकी मदद कर सकता हूँ")
+
+
+def test_crop_intent_uses_crop_data():
+    response = intent_handler.handle_intent({"intent": "ask_crop_sowing_time", "entities": {"crop_name": "गेहूं"}})
+    assert response == f"गेहूं की बुवाई का सही समय {intent_handler.CROP_DATA['गेहूं']['sowing_time']} है।"
+
+
+def test_static_weather_is_dated_or_refused_when_old(monkeypatch):
+    snapshot = dict(FAKE_WEATHER, source="static", dt=1747137600) # 13-05-2025
+    monkeypatch.setattr(api_clients, "get_live_weather_data", lambda city_name: snapshot)
+    request = {"intent": "get_weather", "entities": {"location": "कानपुर"}}
+    assert intent_handler.handle_intent(request) == "क्षमा करें, कानपुर का ताज़ा मौसम अभी उपलब्ध नहीं है। कृपया थोड़ी देर बाद फिर से पूछें।"
+
+    monkeypatch.setattr(settings, "WEATHER_STATIC_MAX_AGE_SECONDS", None)
+    response = intent_handler.handle_intent(request)
+    assert "साफ आसमान" in response and "13-05-2025" in response
+
+
+def test_mandi_price_for_crop_and_mandi():
+    response = intent_handler.handle_intent(
+        {"intent": "get_mandi_price", "entities": {"crop_name": "गेहूं", "mandi_location": "कानपुर मंडी"}})
+    assert "2250 रुपये प्रति क्विंटल" in response
+
+
+def test_handle_intents_shares_weather_lookups(monkeypatch):
+    calls = []
+    def fake_weather(city_name):
+        calls.append(city_name)
+        return FAKE_WEATHER
+    monkeypatch.setattr(api_clients, "get_live_weather_data", fake_weather)
+
+    nlu_results = [
+        {"intent": "get_weather", "entities": {"location": "कानपुर"}},
+        {"intent": "get_help", "entities": {}},
+        {"intent": "get_weather", "entities": {"location": "कानपुर"}},
+    ]
+    responses = intent_handler.handle_intents(nlu_results)
+
+    assert calls == ["कानपुर"]
+    assert len(responses) == 3
+    assert responses[0] == responses[2] and "साफ आसमान" in responses[0]
+
+
+def test_every_nlu_intent_has_a_registered_handler():
+    for intent in ["get_help", "get_weather", "get_mandi_price", "ask_scheme_info",
+                   "ask_crop_sowing_time", "ask_crop_general_info", "ask_crop_pests",
+                   "ask_crop_fertilizers", "ask_crop_soil_type", "ask_crop_irrigation", "ask_price_trend"]:
+        assert intent in intent_handler.INTENT_HANDLERS
+
+
+def test_missing_dependency_short_circuits_handler(monkeypatch):
+    empty = knowledge_base.KnowledgeBase({}, {}, [])
+    monkeypatch.setattr(knowledge_base, "get_knowledge_base", lambda: empty)
+    response = intent_handler.handle_intent({"intent": "ask_crop_pests", "entities": {"crop_name": "गेहूं"}})
+    assert response == "क्षमा करें, मैं इस समय फसल सलाहकार डेटा तक नहीं पहुंच पा रहा हूँ।"
+
+
+def test_unregistered_intent_falls_back_to_unknown_and_is_timed():
+    response = intent_handler.handle_intent({"intent": "no_such_intent", "entities": {}})
+    assert response.startswith("क्षमा करें, मैं आपका सवाल समझ नहीं पाया।")
+    assert intent_handler.get_intent_stats()["unknown"]["calls"] >= 1
+
+
+def test_cheapest_mandi_price_is_ranked():
+    response = intent_handler.handle_intent(
+        {"intent": "get_mandi_price", "entities": {"crop_name": "गेहूं", "price_rank": "lowest"}})
+    lines = response.split("\n")
+    assert lines[0] == "गेहूं का सबसे कम भाव इन मंडियों में है:"
+    assert lines[1].startswith("1. पटना मंडी - 2100")
+    assert len(lines) == 1 + intent_handler.RANKED_PRICE_RESULTS
+
+
+def test_near_price_without_matches_falls_back_to_listing():
+    response = intent_handler.handle_intent(
+        {"intent": "get_mandi_price", "entities": {"crop_name": "गेहूं", "target_price": 9000.0}})
+    assert response == intent_handler.handle_intent({"intent": "get_mandi_price", "entities": {"crop_name": "गेहूं"}})
+
+
+def test_price_trend_for_one_mandi(monkeypatch):
+    monkeypatch.setattr(settings, "MANDI_PRICE_HISTORY_FILE", PRICE_HISTORY_FIXTURE)
+    monkeypatch.setattr(knowledge_base, "_current", None)
+    response = intent_handler.handle_intent(
+        {"intent": "ask_price_trend", "entities": {"crop_name": "गेहूं", "mandi_location": "कानपुर मंडी", "window_days": 7}})
+    assert response.startswith("गेहूं का भाव कानपुर मंडी में पिछले 7 दिनों में")
+    assert "(आखरी अपडेट: 13-05-2025)" in response
+
+
+def test_price_trend_without_history(monkeypatch):
+    empty = knowledge_base.KnowledgeBase({}, {}, [])
+    monkeypatch.setattr(knowledge_base, "get_knowledge_base", lambda: empty)
+    response = intent_handler.handle_intent({"intent": "ask_price_trend", "entities": {"crop_name": "गेहूं"}})
+    assert response == "क्षमा करें, मेरे पास अभी मंडी भाव के इतिहास की जानकारी उपलब्ध नहीं है।"
+
+
+def test_no_price_history_is_shipped():
+    # Trends are only answered from real data (ingested or dropped in as MANDI_PRICE_HISTORY_FILE)
+    response = intent_handler.handle_intent({"intent": "ask_price_trend", "entities": {"crop_name": "गेहूं"}})
+    assert response == "क्षमा करें, मेरे पास अभी मंडी भाव के इतिहास की जानकारी उपलब्ध नहीं है।"
@@ -0,0 +1,30 @@
+from utils.keyword_matcher import KeywordMatcher
+
+
+def _matcher(patterns):
+    matcher = KeywordMatcher()
+    for pattern in patterns:
+        matcher.add(pattern, pattern)
+    return matcher.build()
+
+
+def test_reports_overlapping_and_nested_patterns():
+    matcher = _matcher(["he", "she", "his", "hers"])
+    assert sorted(matcher.iter_matches("ushers")) == [(4, "he"), (4, "she"), (6, "hers")]
+
+
+def test_devanagari_patterns_found_in_one_pass():
+    matcher = _matcher(["भाव", "का भाव", "मंडी में", "गेहूं"])
+    assert matcher.find_all("कानपुर मंडी में गेहूं का भाव क्या है") == {"भाव", "का भाव", "मंडी में", "गेहूं"}
+    assert matcher.find_all("मौसम कैसा है") == set()
+
+
+def test_empty_pattern_is_ignored_and_build_is_required():
+    matcher = KeywordMatcher()
+    matcher.add("", "empty")
+    try:
+        matcher.find_all("text")
+        assert False, "matching before build() should fail"
+    except RuntimeError:
+        pass
+    assert matcher.build().find_all("text") == set()
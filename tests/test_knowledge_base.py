@@ -0,0 +1,101 @@
+import json
+import os
+import shutil
+
+import pytest
+
+from config import settings
+from core import intent_handler, nlu_processor
+from utils import knowledge_base
+
+
+@pytest.fixture
+def kb_files(tmp_path, monkeypatch):
+    """Points the knowledge base at temporary copies of the data files and starts from a fresh load."""
+    paths = {}
+    for setting in ("CROP_ADVISORY_FILE", "MANDI_PRICES_FILE", "SCHEMES_ADVISORY_FILE", "MANDI_PRICE_HISTORY_FILE"):
+        path = tmp_path / os.path.basename(getattr(settings, setting))
+        shutil.copy(getattr(settings, setting), path)
+        monkeypatch.setattr(settings, setting, str(path))
+        paths[setting] = path
+    monkeypatch.setattr(knowledge_base, "_current", None)
+    return paths
+
+
+def _write_json(path, data):
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False)
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000)) # make sure the mtime moves
+
+
+def test_reload_is_noop_when_files_unchanged(kb_files):
+    kb = knowledge_base.get_knowledge_base()
+    assert knowledge_base.reload_knowledge_base() is False
+    assert knowledge_base.get_knowledge_base() is kb
+
+
+def test_reload_swaps_data_and_derived_indexes(kb_files):
+    old_kb = knowledge_base.get_knowledge_base()
+    old_index = old_kb.derived("nlu_index")
+
+    mandi_data = json.loads(open(kb_files["MANDI_PRICES_FILE"], encoding="utf-8").read())
+    mandi_data["गया मंडी"] = {"गेहूं": {"price": "2300 रुपये प्रति क्विंटल", "last_updated": "15-05-2025"}}
+    _write_json(kb_files["MANDI_PRICES_FILE"], mandi_data)
+
+    assert knowledge_base.reload_knowledge_base() is True
+    new_kb = knowledge_base.get_knowledge_base()
+    assert new_kb.generation == old_kb.generation + 1
+    assert "गया मंडी" in nlu_processor.KNOWN_MANDIS
+    assert nlu_processor.process_query_rule_based("गया मंडी में गेहूं का भाव")["entities"]["mandi_location"] == "गया मंडी"
+    assert "2300" in intent_handler.handle_intent(
+        {"intent": "get_mandi_price", "entities": {"crop_name": "गेहूं", "mandi_location": "गया मंडी"}})
+    # Anyone still holding the old kb keeps a consistent, unchanged view
+    assert "गया मंडी" not in old_kb.known_mandis and "गया मंडी" not in old_kb.mandi_price_data
+    assert old_index.knowledge_base is old_kb and nlu_processor.get_nlu_index() is not old_index
+
+
+def test_broken_file_keeps_current_kb(kb_files):
+    kb = knowledge_base.get_knowledge_base()
+    with open(kb_files["CROP_ADVISORY_FILE"], "w", encoding="utf-8") as f:
+        f.write('{"गेहूं": ') # caught half-written
+    assert knowledge_base.reload_knowledge_base(force=True) is False
+    assert knowledge_base.get_knowledge_base() is kb
+
+
+def test_admin_reload_endpoint(kb_files, monkeypatch):
+    import api_server
+    monkeypatch.setattr(settings, "ADMIN_TOKEN", "secret")
+    client = api_server.app.test_client()
+    assert client.post("/admin/reload").status_code == 403
+    response = client.post("/admin/reload", headers={"X-Admin-Token": "secret"})
+    assert response.status_code == 200 and response.get_json()["reloaded"] is True
+    assert client.post("/admin/reload", headers={"X-Admin-Token": "wrong"}).status_code == 403
+
+
+def test_admin_reload_is_refused_without_a_configured_token(kb_files, monkeypatch):
+    import api_server
+    monkeypatch.setattr(settings, "ADMIN_TOKEN", None)
+    generation = knowledge_base.get_knowledge_base().generation
+    client = api_server.app.test_client()
+    assert client.post("/admin/reload").status_code == 403
+    assert client.post("/admin/reload", headers={"X-Admin-Token": ""}).status_code == 403
+    assert knowledge_base.get_knowledge_base().generation == generation
+
+
+def test_knowledge_base_is_read_only_and_owns_lookup_tables():
+    kb = knowledge_base.get_knowledge_base()
+    with pytest.raises(AttributeError):
+        kb.known_crops = ()
+    with pytest.raises(TypeError):
+        kb.crop_data["नई फसल"] = {}
+    with pytest.raises(TypeError):
+        kb.mandi_price_data["कानपुर मंडी"]["गेहूं"]["price"] = "0"
+    assert kb.mandi_by_core_location["कानपुर"] == "कानपुर मंडी"
+    assert "pm kisan" in kb.known_scheme_keywords
+
+
+def test_modules_share_one_knowledge_base():
+    kb = knowledge_base.get_knowledge_base()
+    assert nlu_processor.CROP_DATA is intent_handler.CROP_DATA is kb.crop_data
+    assert nlu_processor.get_nlu_index().knowledge_base is kb
@@ -0,0 +1,62 @@
+import io
+import json
+import logging
+import queue
+
+import pytest
+
+from utils import log
+
+
+@pytest.fixture
+def log_output():
+    """Logging configured to write JSON lines into a buffer; yields a function returning the records written so far."""
+    log.shutdown_logging()
+    buffer = io.StringIO()
+    log.configure_logging(level="DEBUG", log_format="json", sample_rate=1.0, stream=buffer)
+
+    def records():
+        log.shutdown_logging() # Drains the queue
+        entries = [json.loads(line) for line in buffer.getvalue().splitlines()]
+        return [entry for entry in entries if entry["logger"].startswith("krishi_mitra.tests")] # Not the settings summary
+
+    yield records
+    log.shutdown_logging()
+
+
+def test_records_carry_request_id_and_extra_fields(log_output):
+    logger = log.get_logger("tests.log")
+    with log.request_context("client-42") as request_id:
+        logger.info("answered %s", "query", extra={"session_id": "s1"})
+    logger.warning("outside a request")
+    first, second = log_output()
+    assert request_id == "client-42"
+    assert first["message"] == "answered query" and first["request_id"] == "client-42" and first["session_id"] == "s1"
+    assert first["logger"] == "krishi_mitra.tests.log" and first["level"] == "INFO"
+    assert second["request_id"] is None
+
+
+def test_malformed_client_request_id_is_replaced():
+    with log.request_context("bad id\r\nX-Injected: 1") as request_id:
+        assert log.current_request_id() == request_id
+    assert request_id != "bad id\r\nX-Injected: 1" and len(request_id) == 16
+    assert log.current_request_id() is None
+
+
+def test_debug_records_are_sampled_per_request(log_output):
+    logger = log.get_logger("tests.log")
+    with log.request_context(sample_rate=0.0):
+        logger.debug("dropped")
+        logger.info("kept")
+    with log.request_context(sample_rate=1.0):
+        logger.debug("traced")
+    assert [record["message"] for record in log_output()] == ["kept", "traced"]
+
+
+def test_full_queue_drops_records_instead_of_blocking():
+    handler = log.DroppingQueueHandler(queue.Queue(maxsize=1))
+    dropped_before = log._DROPPED_RECORDS._unlabelled.value
+    for message in ("one", "two", "three"):
+        handler.handle(logging.LogRecord("krishi_mitra.tests", logging.INFO, __file__, 1, message, (), None))
+    assert handler.queue.qsize() == 1
+    assert log._DROPPED_RECORDS._unlabelled.value - dropped_before == 2
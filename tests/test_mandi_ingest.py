@@ -0,0 +1,76 @@
+import csv
+import os
+
+from config import settings
+from utils import data_loaders, mandi_ingest, mandi_price_db
+from utils.price_history import PriceHistory
+
+
+PRICE_HISTORY_FIXTURE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures", "mandi_prices.csv")
+AGMARKNET_HEADER = ["State", "Market", "Commodity", "Arrival_Date", "Min_x0020_Price", "Max_x0020_Price", "Modal_x0020_Price"]
+
+
+def _write_dump(path, rows, header=AGMARKNET_HEADER):
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(header)
+        writer.writerows(rows)
+    return str(path)
+
+
+def test_name_normalization():
+    assert mandi_ingest.normalize_name("  गेहूँ ") == "गेहूं"
+    assert mandi_ingest.normalize_mandi_name("कानपुर") == "कानपुर मंडी"
+    assert mandi_ingest.normalize_mandi_name("कानपुर  मंडी") == "कानपुर मंडी"
+    assert mandi_ingest.parse_dump_date("13/05/2025") == mandi_ingest.parse_dump_date("2025-05-13") == "2025-05-13"
+
+
+def test_ingest_streams_chunks_and_keeps_latest_price(tmp_path):
+    csv_path = _write_dump(tmp_path / "dump.csv", [
+        ["UP", "कानपुर", "गेहूँ", "12/05/2025", "2100", "2300", "2200"],
+        ["UP", "कानपुर", "गेहूं", "13/05/2025", "2150", "2350", "2250"],
+        ["UP", "लखनऊ", "गेहूं", "13/05/2025", "", "", "2200"],
+        ["UP", "लखनऊ", "गेहूं", "कल", "", "", "2200"],      # bad date
+        ["UP", "कानपुर", "गेहूं", "11/05/2025", "", "", "2000"], # older than the latest, arrives last
+    ])
+    db_path = str(tmp_path / "prices.sqlite3")
+
+    report = mandi_ingest.ingest_csv(csv_path, db_path, chunk_size=2)
+    assert (report.rows_read, report.rows_written, report.rows_skipped) == (5, 4, 1)
+    assert mandi_price_db.load_latest_prices(db_path) == {
+        "कानपुर मंडी": {"गेहूं": {"price": "2250 रुपये प्रति क्विंटल", "last_updated": "13-05-2025"}},
+        "लखनऊ मंडी": {"गेहूं": {"price": "2200 रुपये प्रति क्विंटल", "last_updated": "13-05-2025"}},
+    }
+
+    assert mandi_ingest.is_ingested(csv_path, db_path)
+    assert mandi_ingest.ingest_if_changed(csv_path, db_path) is None
+    assert mandi_ingest.ingest_csv(csv_path, db_path).rows_written == 4 # Re-ingesting replaces, never duplicates
+    assert len(mandi_price_db.open_price_history(db_path).series("कानपुर मंडी", "गेहूं")) == 3
+
+
+def test_sqlite_history_matches_in_memory_history(tmp_path):
+    rows = [["UP", mandi, "गेहूं", f"{day:02d}/05/2025", str(price - 20), str(price + 20), str(price)]
+            for mandi in ("कानपुर", "लखनऊ") for day, price in zip(range(1, 21, 2), range(2000, 2200, 20))]
+    db_path = str(tmp_path / "prices.sqlite3")
+    mandi_ingest.ingest_csv(_write_dump(tmp_path / "dump.csv", rows), db_path)
+
+    in_memory, _ = PriceHistory.from_rows(
+        {"date": r[3].replace("/", "-"), "mandi": r[1] + " मंडी", "crop": r[2],
+         "min_price": r[4], "max_price": r[5], "modal_price": r[6]} for r in rows)
+    from_db = mandi_price_db.open_price_history(db_path)
+    assert len(from_db) == len(in_memory) == 2
+    assert from_db.mandis_for_crop("गेहूं") == in_memory.mandis_for_crop("गेहूं")
+    for days in (1, 7, 30):
+        assert from_db.crop_window_stats("गेहूं", days) == in_memory.crop_window_stats("गेहूं", days)
+    assert from_db.window_stats("पटना मंडी", "गेहूं") is None
+
+
+def test_data_loaders_sqlite_backend(tmp_path, monkeypatch):
+    db_path = str(tmp_path / "prices.sqlite3")
+    monkeypatch.setattr(settings, "MANDI_PRICE_BACKEND", "sqlite")
+    monkeypatch.setattr(settings, "MANDI_PRICE_DB_FILE", db_path)
+    assert data_loaders.get_mandi_price_data() is None # Not ingested yet
+
+    mandi_ingest.ingest_csv(PRICE_HISTORY_FIXTURE, db_path)
+    assert data_loaders.get_mandi_price_data() == data_loaders.load_json_data(settings.MANDI_PRICES_FILE)
+    assert data_loaders.get_mandi_price_history().window_stats("कानपुर मंडी", "गेहूं").modal_price == 2250.0
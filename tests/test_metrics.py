@@ -0,0 +1,41 @@
+import pytest
+
+from utils import metrics
+
+
+def test_histogram_buckets_are_cumulative_and_inclusive():
+    latency = metrics.histogram("test_latency_seconds", "Test latency.", ("stage",), buckets=(0.1, 1.0))
+    child = latency.labels("parse")
+    for value in (0.05, 0.1, 0.5, 3.0):
+        child.observe(value)
+    lines = latency.render()
+    assert 'test_latency_seconds_bucket{stage="parse",le="0.1"} 2' in lines
+    assert 'test_latency_seconds_bucket{stage="parse",le="1"} 3' in lines
+    assert 'test_latency_seconds_bucket{stage="parse",le="+Inf"} 4' in lines
+    assert 'test_latency_seconds_count{stage="parse"} 4' in lines
+    assert lines[:2] == ["# HELP test_latency_seconds Test latency.", "# TYPE test_latency_seconds histogram"]
+
+
+def test_counter_labels_and_registry():
+    requests = metrics.counter("test_requests_total", "Test requests.", ("route", "status"))
+    assert metrics.counter("test_requests_total", "Test requests.", ("route", "status")) is requests
+    requests.labels("/ask", 200).inc()
+    requests.labels("/ask", "200").inc()
+    requests.labels('/a"b', 500).inc(2)
+    assert 'test_requests_total{route="/ask",status="200"} 2' in requests.render()
+    assert 'test_requests_total{route="/a\\"b",status="500"} 2' in requests.render()
+    with pytest.raises(ValueError):
+        requests.labels("/ask")
+    with pytest.raises(ValueError):
+        metrics.histogram("test_requests_total", "Clash.", ("route", "status"))
+
+
+def test_render_merges_collector_families_and_skips_broken_collectors():
+    metrics.register_collector(lambda: [("test_cache_entries", "gauge", "Entries.", [({"cache": "a"}, 3)])])
+    metrics.register_collector(lambda: [("test_cache_entries", "gauge", "Entries.", [({"cache": "b"}, 4.5)])])
+    def broken():
+        raise RuntimeError("boom")
+    metrics.register_collector(broken)
+    text = metrics.render_metrics()
+    assert text.count("# TYPE test_cache_entries gauge") == 1
+    assert 'test_cache_entries{cache="a"} 3\ntest_cache_entries{cache="b"} 4.5\n' in text
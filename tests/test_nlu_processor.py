@@ -0,0 +1,63 @@
+import pytest
+
+from core import nlu_processor
+
+
+@pytest.mark.parametrize("query, intent, entities", [
+    ("मदद करो", "get_help", {}),
+    ("आज कानपुर में मौसम कैसा है", "get_weather", {"location": "कानपुर"}),
+    ("मौसम कैसा है", "get_weather", {"location": None}),
+    ("कानपुर मंडी में गेहूं का भाव क्या है?", "get_mandi_price", {"crop_name": "गेहूं", "mandi_location": "कानपुर मंडी"}),
+    ("गेहूं का दाम", "get_mandi_price", {"crop_name": "गेहूं"}),
+    ("गेहूं सबसे सस्ता कहाँ मिलेगा", "get_mandi_price", {"crop_name": "गेहूं", "price_rank": "lowest"}),
+    ("रांची मंडी में सबसे सस्ता गेहूं", "get_mandi_price",
+     {"crop_name": "गेहूं", "mandi_location": "रांची मंडी", "price_rank": "lowest"}),
+    # A rank phrase about a crop detail is not a price question
+    ("गेहूं के लिए सबसे सस्ता खाद कौन सा है", "ask_crop_fertilizers", {"crop_name": "गेहूं"}),
+    ("धान में सबसे सस्ती सिंचाई कैसे करें", "ask_crop_irrigation", {"crop_name": "धान"}),
+    ("2200 रुपये के आसपास गेहूं का भाव कहाँ है", "get_mandi_price", {"crop_name": "गेहूं", "target_price": 2200.0}),
+    ("गेहूं का भाव पिछले हफ्ते से कितना बदला", "ask_price_trend", {"crop_name": "गेहूं", "window_days": 7}),
+    ("कानपुर मंडी में आलू का पिछले महीने का भाव", "ask_price_trend",
+     {"crop_name": "आलू", "mandi_location": "कानपुर मंडी", "window_days": 30}),
+    ("पीएम किसान योजना के बारे में बताओ", "ask_scheme_info", {"scheme_name": "प्रधानमंत्री किसान सम्मान निधि (PM-KISAN)"}),
+    ("झारखंड की योजनाएं", "ask_scheme_info", {"filter": "jharkhand"}),
+    ("गेहूं की खेती कब करें", "ask_crop_sowing_time", {"crop_name": "गेहूं"}),
+    ("गेहूं में कौन से कीट लगते हैं", "ask_crop_pests", {"crop_name": "गेहूं"}),
+    ("गेहूं में कौन सी खाद डालें?", "ask_crop_fertilizers", {"crop_name": "गेहूं"}),
+    ("गेहूं के लिए मिट्टी कैसी चाहिए?", "ask_crop_soil_type", {"crop_name": "गेहूं"}),
+    ("गेहूं में सिंचाई कब करें?", "ask_crop_irrigation", {"crop_name": "गेहूं"}),
+    ("धान के बारे में बताओ", "ask_crop_general_info", {"crop_name": "धान"}),
+    ("कुछ भी ऊल जलूल", "unknown", {}),
+    ("", "unknown", {}),
+])
+def test_rule_based_intents(query, intent, entities):
+    result = nlu_processor.process_query_rule_based(query)
+    assert result == {"intent": intent, "entities": entities}
+
+
+def test_first_entity_in_list_order_wins():
+    # Both crops occur; KNOWN_CROPS order decides, not position in the query
+    result = nlu_processor.process_query_rule_based("आलू और गेहूं की खाद")
+    assert result["entities"]["crop_name"] == min(["आलू", "गेहूं"], key=nlu_processor.KNOWN_CROPS.index)
+
+
+@pytest.mark.parametrize("query, intent, entities", [
+    ("गेहू की खेती कब करें", "ask_crop_sowing_time", {"crop_name": "गेहूं"}),
+    ("जामतारा में मौसम कैसा है", "get_weather", {"location": "जामताड़ा"}),
+    ("कानपूर मंडी में गेंहू का भाव", "get_mandi_price", {"crop_name": "गेहूं", "mandi_location": "कानपुर मंडी"}),
+])
+def test_misheard_entity_names_are_resolved(query, intent, entities):
+    result = nlu_processor.process_query_rule_based(query)
+    assert (result["intent"], result["entities"]) == (intent, entities)
+    assert set(result["entity_confidence"]) <= set(entities)
+    assert all(0.75 <= confidence <= 1.0 for confidence in result["entity_confidence"].values())
+
+
+@pytest.mark.parametrize("query", ["मेरे घर का मौसम", "मेरे खेत का मौसम", "मेरे यहां बारिश होगी", "पूरे हफ्ते का मौसम"])
+def test_everyday_words_are_not_read_as_locations(query):
+    assert nlu_processor.process_query_rule_based(query) == {"intent": "get_weather", "entities": {"location": None}}
+
+
+def test_fuzzy_matching_can_be_turned_off(monkeypatch):
+    monkeypatch.setattr(nlu_processor.settings, "NLU_FUZZY_MATCHING", False)
+    assert nlu_processor.process_query_rule_based("गेहू की खेती कब करें") == {"intent": "unknown", "entities": {}}
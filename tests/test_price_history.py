@@ -0,0 +1,64 @@
+import csv
+from datetime import date, timedelta
+
+from utils import data_loaders
+from utils.price_history import PRICE_HISTORY_COLUMNS, PriceHistory
+
+
+START = date(2025, 5, 1)
+
+
+def _rows(modal_prices, mandi="अ मंडी", crop="गेहूं"):
+    return [{"date": (START + timedelta(days=i)).strftime("%d-%m-%Y"), "mandi": mandi, "crop": crop,
+             "min_price": str(price - 50), "max_price": str(price + 50), "modal_price": str(price)}
+            for i, price in enumerate(modal_prices)]
+
+
+def test_window_stats_over_last_week():
+    history, skipped = PriceHistory.from_rows(_rows([2000, 2010, 2020, 2030, 2040, 2050, 2060, 2070, 2080, 2090]))
+    stats = history.window_stats("अ मंडी", "गेहूं", days=7)
+    assert skipped == 0
+    assert stats.observations == 7 and stats.start_date == date(2025, 5, 4) and stats.end_date == date(2025, 5, 10)
+    assert (stats.min_price, stats.max_price, stats.mean_price) == (1980.0, 2140.0, 2060.0)
+    assert stats.previous_price == 2020.0 and stats.modal_price == 2090.0
+    assert round(stats.change_percent, 2) == round(70 / 2020 * 100, 2)
+
+
+def test_window_as_of_earlier_day_and_gaps():
+    rows = _rows([2000, 2100, 2200])
+    rows.append(dict(rows[0], date="20-05-2025", modal_price="2500", min_price="", max_price=""))
+    history, _ = PriceHistory.from_rows(rows)
+    assert history.window_stats("अ मंडी", "गेहूं", days=7).observations == 1 # Only the 20th is within a week of itself
+    assert history.window_stats("अ मंडी", "गेहूं", days=7).max_price == 2500.0 # Empty min/max fall back to modal
+    assert history.window_stats("अ मंडी", "गेहूं", days=2, as_of=date(2025, 5, 3)).modal_price == 2200.0
+    assert history.window_stats("अ मंडी", "गेहूं", days=2, as_of=date(2025, 5, 10)) is None
+    assert history.window_stats("ब मंडी", "गेहूं") is None
+
+
+def test_duplicate_days_keep_last_row_and_bad_rows_are_skipped():
+    rows = _rows([2000, 2100]) + _rows([2150]) + [{"date": "कल", "mandi": "अ मंडी", "crop": "गेहूं", "modal_price": "1"}]
+    history, skipped = PriceHistory.from_rows(rows)
+    assert skipped == 1
+    assert len(history.series("अ मंडी", "गेहूं")) == 2
+    assert history.window_stats("अ मंडी", "गेहूं", days=1, as_of=START).modal_price == 2150.0
+
+
+def test_crop_window_stats_across_mandis():
+    history, _ = PriceHistory.from_rows(_rows([2000, 2100], mandi="अ मंडी") + _rows([1900, 1800], mandi="ब मंडी"))
+    assert history.mandis_for_crop("गेहूं") == ["अ मंडी", "ब मंडी"]
+    assert [round(s.change_percent) for s in history.crop_window_stats("गेहूं", days=1)] == [5, -5]
+
+
+def test_load_price_history_csv(tmp_path):
+    path = tmp_path / "mandi_prices.csv"
+    assert len(data_loaders.load_price_history_csv(str(path))) == 0 # No file yet: empty history
+
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=PRICE_HISTORY_COLUMNS)
+        writer.writeheader()
+        writer.writerows(_rows([2000, 2100]))
+    history = data_loaders.load_price_history_csv(str(path))
+    assert history.window_stats("अ मंडी", "गेहूं", days=7).modal_price == 2100.0
+
+    path.write_text("date,mandi,price\n01-05-2025,अ मंडी,2000\n", encoding="utf-8")
+    assert data_loaders.load_price_history_csv(str(path)) is None
@@ -0,0 +1,34 @@
+from datetime import date
+
+from utils.price_index import MandiPriceIndex, parse_price, parse_price_date
+
+
+MANDI_PRICES = {
+    "अ मंडी": {"गेहूं": {"price": "2,250 रुपये प्रति क्विंटल", "last_updated": "13-05-2025"}},
+    "ब मंडी": {"गेहूं": {"price": "2100 रुपये प्रति क्विंटल", "last_updated": "12-05-2025"},
+               "धान": {"price": "उपलब्ध नहीं", "last_updated": "12-05-2025"}},
+    "स मंडी": {"गेहूं": {"price": "2180 रुपये प्रति क्विंटल", "last_updated": "14-05-2025"}},
+}
+
+
+def test_parse_price_and_date():
+    assert parse_price("2,250 रुपये प्रति क्विंटल") == 2250.0
+    assert parse_price("उपलब्ध नहीं") is None
+    assert parse_price_date("13-05-2025") == date(2025, 5, 13)
+    assert parse_price_date("कल") is None
+
+
+def test_listing_keeps_file_order():
+    index = MandiPriceIndex(MANDI_PRICES)
+    assert [e.mandi for e in index.prices_for_crop("गेहूं")] == ["अ मंडी", "ब मंडी", "स मंडी"]
+    assert index.lookup("गेहूं", "ब मंडी").price == 2100.0
+    assert index.prices_for_crop("मक्का") == ()
+
+
+def test_ranked_and_near_price_queries():
+    index = MandiPriceIndex(MANDI_PRICES)
+    assert [e.mandi for e in index.cheapest("गेहूं", 2)] == ["ब मंडी", "स मंडी"]
+    assert [e.mandi for e in index.costliest("गेहूं", 5)] == ["अ मंडी", "स मंडी", "ब मंडी"]
+    assert [e.mandi for e in index.near_price("गेहूं", 2200, 50)] == ["स मंडी", "अ मंडी"]
+    assert index.cheapest("धान") == () # Unparseable prices are listed but never ranked
+    assert len(index.prices_for_crop("धान")) == 1
@@ -0,0 +1,85 @@
+import pytest
+
+import api_server
+from core import conversation
+from utils import api_clients
+from utils.session_store import InMemorySessionStore, SqliteSessionStore, create_session_store
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_memory_store_evicts_least_recently_used():
+    store = InMemorySessionStore(max_sessions=2, idle_ttl_seconds=60, clock=FakeClock())
+    store.set("a", {"n": 1})
+    store.set("b", {"n": 2})
+    assert store.get("a") == {"n": 1} # "a" is now the most recently used
+    store.set("c", {"n": 3})
+    assert store.get("b") is None
+    assert store.get("a") == {"n": 1} and store.get("c") == {"n": 3}
+    assert store.stats() == {"backend": "memory", "sessions": 2, "hits": 3, "misses": 1, "expired": 0, "evicted": 1}
+
+
+def test_memory_store_expires_idle_sessions():
+    clock = FakeClock()
+    store = InMemorySessionStore(max_sessions=10, idle_ttl_seconds=60, clock=clock)
+    store.set("a", {})
+    store.set("b", {})
+    clock.now += 50
+    assert store.get("a") == {} # Reading refreshes "a"
+    clock.now += 20
+    store.set("c", {}) # Writes sweep "b", idle for 70s
+    assert len(store) == 2 and store.stats()["expired"] == 1
+    clock.now += 61
+    assert store.get("a") is None
+    assert store.stats()["expired"] == 2
+
+
+def test_sqlite_store_is_shared_and_swept(tmp_path):
+    clock = FakeClock()
+    db_path = str(tmp_path / "sessions.sqlite3")
+    worker_1 = SqliteSessionStore(db_path, max_sessions=2, idle_ttl_seconds=60, sweep_interval_seconds=0, clock=clock)
+    worker_2 = SqliteSessionStore(db_path, max_sessions=2, idle_ttl_seconds=60, sweep_interval_seconds=0, clock=clock)
+
+    worker_1.set("a", {"pending_mandi_entities": {"crop_name": "गेहूं"}})
+    assert worker_2.get("a") == {"pending_mandi_entities": {"crop_name": "गेहूं"}}
+
+    clock.now += 1
+    worker_1.set("b", {})
+    clock.now += 1
+    worker_1.set("c", {}) # Over max_sessions: "a" is the oldest
+    assert worker_2.get("a") is None and len(worker_2) == 2
+    clock.now += 61
+    assert worker_1.get("c") is None
+    worker_1.sweep()
+    assert len(worker_1) == 0
+    assert worker_1.stats()["evicted"] == 1 and worker_1.stats()["expired"] == 2
+
+
+def test_unknown_backend():
+    with pytest.raises(ValueError):
+        create_session_store("redis")
+
+
+@pytest.fixture
+def client(monkeypatch):
+    monkeypatch.setattr(api_clients, "get_live_weather_data", lambda city: None)
+    monkeypatch.setattr(conversation, "user_sessions", InMemorySessionStore(max_sessions=100, idle_ttl_seconds=60))
+    api_server.app.config["TESTING"] = True
+    return api_server.app.test_client()
+
+
+def test_server_keeps_only_sessions_with_pending_follow_ups(client):
+    client.post("/ask", json={"query": "गेहूं की खेती कब करें"})
+    client.post("/ask", json={"session_id": "s1", "query": "धान के बारे में बताओ"})
+    assert len(conversation.user_sessions) == 0
+
+    assert client.post("/ask", json={"session_id": "s2", "query": "मौसम कैसा है"}).get_json()["awaiting_weather_location"]
+    assert len(conversation.user_sessions) == 1
+    client.post("/ask", json={"session_id": "s2", "query": "पटना"})
+    assert len(conversation.user_sessions) == 0
@@ -0,0 +1,40 @@
+import subprocess
+import sys
+
+from benchmarks import startup
+from config import settings
+
+
+def _fresh_interpreter(code):
+    """Runs code in a new interpreter in the project root; returns its stdout."""
+    return subprocess.run([sys.executable, "-c", code], cwd=settings.PROJECT_ROOT, check=True,
+                          capture_output=True, text=True).stdout
+
+
+def test_importing_settings_has_no_side_effects():
+    output = _fresh_interpreter("import sys\n"
+                                "from config import settings\n"
+                                "print('dotenv' in sys.modules)\n"
+                                "print(settings.WEATHER_PROVIDER in ('auto', 'live', 'static'))")
+    assert output.split() == ["False", "True"] # Nothing printed at import, .env only read on first access
+
+
+def test_asgi_worker_does_not_import_flask_or_the_http_clients():
+    output = _fresh_interpreter("import sys\n"
+                                "import asgi_server\n"
+                                "print(sorted(m for m in ('flask', 'requests', 'httpx', 'speech_recognition') if m in sys.modules))")
+    assert output.strip() == "[]"
+
+
+def test_importing_the_servers_starts_nothing():
+    output = _fresh_interpreter("import threading\n"
+                                "import api_server, asgi_server\n"
+                                "from utils import knowledge_base, log\n"
+                                "print(threading.active_count(), log._listener is None, knowledge_base._current is None)")
+    assert output.split() == ["1", "True", "True"] # No watcher or log writer thread, nothing loaded
+
+
+def test_startup_benchmark_times_fresh_interpreters(monkeypatch):
+    monkeypatch.setattr(startup, "SCENARIOS", {"startup.python": "pass"})
+    results = startup.run(2)
+    assert results["startup.python"]["n"] == 2 and results["startup.python"]["p50"] > 0
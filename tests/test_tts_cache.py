@@ -0,0 +1,61 @@
+import os
+
+import pytest
+
+from core import voice_output
+from utils.tts_cache import TTSAudioCache, audio_key
+
+
+def test_key_covers_text_language_and_speed():
+    assert audio_key("नमस्ते", "hi") == audio_key("नमस्ते", "hi", slow=False)
+    assert len({audio_key("नमस्ते", "hi"), audio_key("नमस्ते", "en"), audio_key("नमस्ते", "hi", slow=True),
+                audio_key("नमस्ते!", "hi")}) == 4
+
+
+def test_least_recently_played_files_are_evicted_beyond_the_size_cap(tmp_path):
+    cache = TTSAudioCache(str(tmp_path), max_bytes=25)
+    first = cache.put("एक", "hi", False, b"1" * 10)
+    cache.put("दो", "hi", False, b"2" * 10)
+    assert cache.get("एक", "hi") == first # Now more recently used than "दो"
+    cache.put("तीन", "hi", False, b"3" * 10)
+    assert cache.get("दो", "hi") is None and not os.path.exists(os.path.join(str(tmp_path), audio_key("दो", "hi") + ".mp3"))
+    assert cache.get("एक", "hi") is not None and cache.get("तीन", "hi") is not None
+    assert cache.stats()["bytes"] == 20 and cache.stats()["evicted"] == 1
+
+
+def test_cached_files_survive_a_restart(tmp_path):
+    TTSAudioCache(str(tmp_path)).put("नमस्ते", "hi", False, b"mp3")
+    cache = TTSAudioCache(str(tmp_path))
+    path = cache.get("नमस्ते", "hi")
+    with open(path, "rb") as f:
+        assert f.read() == b"mp3"
+    assert len(cache) == 1
+
+
+@pytest.fixture
+def speech(tmp_path, monkeypatch):
+    """voice_output with a fresh cache, gTTS replaced by a counter and playback recorded instead of heard."""
+    monkeypatch.setattr(voice_output, "_audio_cache", TTSAudioCache(str(tmp_path / "tts")))
+    monkeypatch.setattr(voice_output, "_audio_cache_created", True)
+    synthesized, played = [], []
+    monkeypatch.setattr(voice_output, "_synthesize", lambda text: synthesized.append(text) or text.encode("utf-8"))
+    monkeypatch.setattr(voice_output, "_play", played.append)
+    return synthesized, played
+
+
+def test_repeated_speech_plays_from_cache_without_synthesis(speech):
+    synthesized, played = speech
+    voice_output.speak_hindi("आप किस जगह के मौसम के बारे में जानना चाहते हैं?")
+    voice_output.speak_hindi("आप किस जगह के मौसम के बारे में जानना चाहते हैं?")
+    assert len(synthesized) == 1 and len(played) == 2 and played[0] == played[1] and os.path.exists(played[0])
+
+
+def test_prewarm_synthesizes_prompts_and_crop_answers_once(speech):
+    synthesized, _ = speech
+    texts = voice_output.speech_texts_to_prewarm()
+    assert "आप किस जगह के मौसम के बारे में जानना चाहते हैं?" in texts
+    assert any(text.startswith("गेहूं की बुवाई का सही समय") for text in texts)
+    assert all("*" not in text for text in texts)
+    counts = voice_output.prewarm_audio_cache(texts)
+    assert counts["texts"] == len(texts) and counts["synthesized"] == counts["pieces"] >= len(texts)
+    assert voice_output.prewarm_audio_cache(texts)["cached"] == counts["pieces"] and len(synthesized) == counts["pieces"]
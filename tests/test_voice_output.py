@@ -0,0 +1,111 @@
+import threading
+import time
+
+import pytest
+
+from config import settings
+from core import voice_output
+
+
+def test_split_for_speech_cuts_sentences_then_long_clauses():
+    assert voice_output.split_for_speech("गेहूं की बुवाई नवंबर में करें। मूल्य 2.5 रुपये है?\n- धान") == \
+        ["गेहूं की बुवाई नवंबर में करें।", "मूल्य 2.5 रुपये है?", "- धान"]
+    chunks = voice_output.split_for_speech("एक, दो, तीन, चार", max_chars=8)
+    assert chunks == ["एक, दो,", "तीन, चार"] and all(len(chunk) <= 8 for chunk in chunks)
+    assert voice_output.split_for_speech("बहुत लंबा वाक्य बिना विराम", max_chars=10) == ["बहुत लंबा", "वाक्य बिना", "विराम"]
+
+
+@pytest.fixture
+def slow_speech(monkeypatch):
+    """Cache off, streaming on; synthesis takes longer for earlier sentences, playback is recorded with timestamps."""
+    monkeypatch.setattr(voice_output, "_audio_cache", None)
+    monkeypatch.setattr(voice_output, "_audio_cache_created", True)
+    monkeypatch.setattr(settings, "TTS_STREAMING", True)
+    monkeypatch.setattr(settings, "TTS_STREAM_WORKERS", 3)
+    delays = {"पहला।": 0.05, "दूसरा।": 0.2, "तीसरा।": 0.01}
+    synthesizing = set()
+
+    def synthesize(text):
+        synthesizing.add(text)
+        time.sleep(delays[text])
+        return text.encode("utf-8")
+
+    played = []
+    def play(path):
+        with open(path, "rb") as f:
+            played.append((f.read().decode("utf-8"), time.perf_counter(), set(synthesizing)))
+
+    monkeypatch.setattr(voice_output, "_synthesize", synthesize)
+    monkeypatch.setattr(voice_output, "_play", play)
+    return played
+
+
+def test_streaming_plays_in_order_and_starts_after_the_first_sentence(slow_speech):
+    started = time.perf_counter()
+    voice_output.speak_hindi("पहला। दूसरा। तीसरा।")
+    assert [text for text, _, _ in slow_speech] == ["पहला।", "दूसरा।", "तीसरा।"]
+    first_audio = slow_speech[0][1] - started
+    assert first_audio < 0.15 # Not waiting for the slow second sentence
+    assert slow_speech[0][2] == {"पहला।", "दूसरा।", "तीसरा।"} # The rest were being synthesised during playback
+    assert threading.active_count() < 10
+
+
+def test_failed_sentence_falls_back_to_text_and_the_rest_is_spoken(slow_speech, monkeypatch, capsys):
+    synthesize = voice_output._synthesize
+    def flaky(text):
+        if text == "दूसरा।":
+            raise OSError("network down")
+        return synthesize(text)
+    monkeypatch.setattr(voice_output, "_synthesize", flaky)
+    voice_output.speak_hindi("पहला। दूसरा। तीसरा।")
+    assert [text for text, _, _ in slow_speech] == ["पहला।", "तीसरा।"]
+    assert "BOT (audio fallback): दूसरा।" in capsys.readouterr().out
+
+
+@pytest.fixture
+def gated_speech(monkeypatch):
+    """Cache off, streaming on; each played piece is recorded, and playback of a piece blocks until released."""
+    monkeypatch.setattr(voice_output, "_audio_cache", None)
+    monkeypatch.setattr(voice_output, "_audio_cache_created", True)
+    monkeypatch.setattr(settings, "TTS_STREAMING", True)
+    monkeypatch.setattr(voice_output, "_synthesize", lambda text: text.encode("utf-8"))
+    played, release, playing = [], threading.Semaphore(0), threading.Event()
+
+    def play(path):
+        with open(path, "rb") as f:
+            played.append(f.read().decode("utf-8"))
+        playing.set()
+        release.acquire(timeout=5)
+
+    monkeypatch.setattr(voice_output, "_play", play)
+    return played, release, playing
+
+
+def test_player_returns_immediately_and_reports_completion(gated_speech):
+    played, release, playing = gated_speech
+    finished = []
+    player = voice_output.SpeechPlayer(on_finished=finished.append)
+    first, second = player.say("पहला। दूसरा।"), player.say("तीसरा।")
+    assert playing.wait(5) and player.speaking and first.status == "playing" and second.status == "queued"
+    for _ in range(3):
+        release.release()
+    assert player.wait(5) and not player.speaking
+    assert played == ["पहला।", "दूसरा।", "तीसरा।"]
+    assert [job.status for job in finished] == ["done", "done"] and finished == [first, second]
+    player.close(timeout=5)
+
+
+def test_stop_interrupts_the_current_answer_and_drops_the_queue(gated_speech):
+    played, release, playing = gated_speech
+    player = voice_output.SpeechPlayer()
+    long_answer, queued = player.say("पहला। दूसरा। तीसरा।"), player.say("चौथा।")
+    assert playing.wait(5)
+    player.stop()
+    release.release()
+    assert long_answer.wait(5) and queued.wait(5) and player.wait(5)
+    assert played == ["पहला।"] and long_answer.status == "cancelled" and queued.status == "cancelled"
+
+    player.say("पाँचवाँ।") # The player keeps working after a stop
+    release.release()
+    assert player.wait(5) and played[-1] == "पाँचवाँ।"
+    player.close(timeout=5)
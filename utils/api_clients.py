@@ -1,48 +1,532 @@
-import requests
 import json
+import os
+import random
+import threading
+import time
+import unicodedata
 from config import settings
+from utils import log
+from utils import metrics
 
-def get_live_weather_data(city_name):
-    if not settings.OPENWEATHERMAP_API_KEY or settings.OPENWEATHERMAP_API_KEY == "YOUR_ACTUAL_OPENWEATHERMAP_API_KEY_HERE":
-        if settings.DEBUG_MODE:
-            print("API Client Error: OpenWeatherMap API key not configured or is placeholder.")
+logger = log.get_logger(__name__)
+
+class CircuitBreaker:
+    """
+    Error-rate circuit breaker for an upstream service.
+
+    Closed: requests flow and outcomes are recorded in a sliding window.
+    Once at least min_requests outcomes are in the window and the failure rate reaches
+    failure_rate_threshold, the breaker opens and requests fail fast for open_seconds.
+    After that a single trial request is let through (half-open); its outcome closes or re-opens the breaker.
+    """
+    CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+    def __init__(self, failure_rate_threshold=0.5, window_size=20, min_requests=5, open_seconds=30, clock=time.monotonic):
+        self.failure_rate_threshold = failure_rate_threshold
+        self.window_size = window_size
+        self.min_requests = min_requests
+        self.open_seconds = open_seconds
+        self._clock = clock
+        self._outcomes = [] # True for failure, newest last
+        self._state = self.CLOSED
+        self._opened_at = 0.0
+        self._trial_in_progress = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self):
+        with self._lock:
+            if self._state == self.OPEN and self._clock() - self._opened_at >= self.open_seconds:
+                return self.HALF_OPEN
+            return self._state
+
+    def allow_request(self):
+        with self._lock:
+            if self._state == self.CLOSED:
+                return True
+            if self._state == self.OPEN:
+                if self._clock() - self._opened_at < self.open_seconds:
+                    return False
+                self._state = self.HALF_OPEN
+            if self._trial_in_progress:
+                return False
+            self._trial_in_progress = True
+            return True
+
+    def record_success(self):
+        self._record(failed=False)
+
+    def record_failure(self):
+        self._record(failed=True)
+
+    def _record(self, failed):
+        with self._lock:
+            if self._state == self.HALF_OPEN:
+                self._trial_in_progress = False
+                self._outcomes = []
+                if failed:
+                    self._state, self._opened_at = self.OPEN, self._clock()
+                else:
+                    self._state = self.CLOSED
+                return
+            self._outcomes.append(failed)
+            if len(self._outcomes) > self.window_size:
+                del self._outcomes[0]
+            if self._state == self.CLOSED and len(self._outcomes) >= self.min_requests:
+                if sum(self._outcomes) / len(self._outcomes) >= self.failure_rate_threshold:
+                    self._state, self._opened_at = self.OPEN, self._clock()
+                    logger.warning("Weather API error rate too high, circuit breaker opened.")
+
+# Added a common User-Agent
+USER_AGENT = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
+
+# --- Weather Upstream Metrics ---
+# One observation per HTTP attempt (retries included), labelled by client ("sync" here, "async" in
+# async_api_clients.py). Error rate = attempts with outcome != "ok" / all attempts.
+WEATHER_UPSTREAM_SECONDS = metrics.histogram(
+    "krishi_mitra_weather_upstream_duration_seconds", "Latency of one weather API request attempt.", ("client",))
+WEATHER_UPSTREAM_REQUESTS = metrics.counter(
+    "krishi_mitra_weather_upstream_requests_total",
+    "Weather API request attempts by outcome (ok, client_error, throttled, server_error, network_error, invalid_response).",
+    ("client", "outcome"))
+WEATHER_CIRCUIT_REJECTIONS = metrics.counter(
+    "krishi_mitra_weather_circuit_rejections_total", "Weather lookups failed fast because the circuit breaker was open.", ("client",))
+
+def weather_status_outcome(status_code):
+    """The outcome label for an upstream HTTP status code."""
+    if status_code < 400:
+        return "ok"
+    if status_code == 429:
+        return "throttled"
+    return "server_error" if status_code >= 500 else "client_error"
+
+class WeatherClient:
+    """
+    Reusable OpenWeatherMap client.
+
+    Keeps a pooled keep-alive session, gives every lookup a total time budget that covers
+    all attempts, retries transient failures (network errors, 429, 5xx) with jittered
+    exponential backoff, and fails fast while its circuit breaker is open.
+    """
+    RETRYABLE_STATUS_CODES = {429, 500, 502, 503, 504}
+
+    def __init__(self, base_url, api_key=None, timeout_budget_seconds=4.0, max_retries=2,
+                 backoff_seconds=0.2, pool_size=20, breaker=None):
+        self.base_url = base_url
+        self.api_key = api_key # None: settings.OPENWEATHERMAP_API_KEY, read on every lookup
+        self.timeout_budget_seconds = timeout_budget_seconds
+        self.max_retries = max_retries
+        self.backoff_seconds = backoff_seconds
+        self.breaker = breaker if breaker is not None else CircuitBreaker()
+        self.pool_size = pool_size
+        self._session = None
+        self._session_lock = threading.Lock()
+
+    @property
+    def session(self):
+        """The pooled requests session, created on the first lookup (requests is not imported until then)."""
+        if self._session is None:
+            with self._session_lock:
+                if self._session is None:
+                    import requests
+                    session = requests.Session()
+                    adapter = requests.adapters.HTTPAdapter(pool_connections=1, pool_maxsize=self.pool_size)
+                    session.mount("http://", adapter)
+                    session.mount("https://", adapter)
+                    session.headers.update({'User-Agent': USER_AGENT})
+                    self._session = session
+        return self._session
+
+    @property
+    def is_degraded(self):
+        """True while the circuit breaker is open and lookups are failing fast."""
+        return self.breaker.state == CircuitBreaker.OPEN
+
+    def fetch(self, city_name):
+        """
+        Fetches current weather for a city.
+        Returns:
+            dict: The OpenWeatherMap response, or None if the city is unknown, the upstream
+                  failed within the time budget, or the circuit breaker is open.
+        """
+        if not self.breaker.allow_request():
+            logger.debug("Weather circuit open, skipping upstream call for %s.", city_name)
+            WEATHER_CIRCUIT_REJECTIONS.labels("sync").inc()
+            return None
+
+        session = self.session
+        import requests # Already loaded by the session above
+
+        params = {
+            'q': city_name + ",IN",
+            'appid': self.api_key if self.api_key is not None else settings.OPENWEATHERMAP_API_KEY,
+            'units': 'metric',
+            'lang': 'hi'
+        }
+        deadline = time.monotonic() + self.timeout_budget_seconds
+        attempt = 0
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                self.breaker.record_failure()
+                return None
+            retryable = False
+            started, outcome = time.perf_counter(), "network_error"
+            try:
+                response = session.get(self.base_url, params=params, timeout=remaining)
+                outcome = weather_status_outcome(response.status_code)
+                if response.status_code in self.RETRYABLE_STATUS_CODES:
+                    retryable = True
+                    raise requests.exceptions.HTTPError(f"{response.status_code} from weather API", response=response)
+                # Anything else means the upstream itself is healthy, even if the city was not found
+                self.breaker.record_success()
+                response.raise_for_status()
+                weather_data = response.json()
+                
+                if weather_data.get("cod") != 200: # Check API specific status code
+                     outcome = "invalid_response"
+                     logger.debug("Weather API returned status %s for %s. Message: %s", weather_data.get('cod'), city_name, weather_data.get('message'))
+                     return None
+                return weather_data
+            except requests.exceptions.HTTPError as http_err:
+                if not retryable:
+                    logger.debug("Weather API HTTP error for %s: %s - Response: %s", city_name, http_err, response.text)
+                    return None
+                logger.debug("Weather API HTTP error for %s (attempt %d): %s", city_name, attempt + 1, http_err)
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as req_err:
+                logger.debug("Weather API network error for %s (attempt %d): %s", city_name, attempt + 1, req_err)
+            except json.JSONDecodeError as json_err: # Checked before RequestException, which requests' JSON errors also subclass
+                outcome = "invalid_response"
+                logger.warning("Weather API JSON decode error for %s: %s", city_name, json_err)
+                return None
+            except requests.exceptions.RequestException as req_err:
+                logger.warning("Weather API request error for %s: %s", city_name, req_err)
+                self.breaker.record_failure()
+                return None
+            finally:
+                WEATHER_UPSTREAM_SECONDS.labels("sync").observe(time.perf_counter() - started)
+                WEATHER_UPSTREAM_REQUESTS.labels("sync", outcome).inc()
+
+            # Transient failure: back off with full jitter and retry if the budget allows
+            attempt += 1
+            delay = random.uniform(0, self.backoff_seconds * (2 ** (attempt - 1)))
+            if attempt > self.max_retries or time.monotonic() + delay >= deadline:
+                self.breaker.record_failure()
+                return None
+            time.sleep(delay)
+
+weather_client = WeatherClient(
+    settings.OPENWEATHERMAP_BASE_URL,
+    timeout_budget_seconds=settings.WEATHER_API_TIMEOUT_BUDGET_SECONDS,
+    max_retries=settings.WEATHER_API_MAX_RETRIES,
+    backoff_seconds=settings.WEATHER_API_BACKOFF_SECONDS,
+    pool_size=settings.WEATHER_API_POOL_SIZE,
+    breaker=CircuitBreaker(
+        failure_rate_threshold=settings.WEATHER_CIRCUIT_FAILURE_RATE,
+        window_size=settings.WEATHER_CIRCUIT_WINDOW_SIZE,
+        min_requests=settings.WEATHER_CIRCUIT_MIN_REQUESTS,
+        open_seconds=settings.WEATHER_CIRCUIT_OPEN_SECONDS,
+    ),
+)
+
+def is_weather_api_configured():
+    """True if an OpenWeatherMap API key (not the .env placeholder) is set."""
+    return bool(settings.OPENWEATHERMAP_API_KEY) and settings.OPENWEATHERMAP_API_KEY != "YOUR_ACTUAL_OPENWEATHERMAP_API_KEY_HERE"
+
+def _fetch_live_weather_data(city_name):
+    if not is_weather_api_configured():
+        logger.debug("OpenWeatherMap API key not configured or is placeholder.")
         return None
     if not city_name:
-        if settings.DEBUG_MODE:
-            print("API Client Error: City name not provided for weather data.")
+        logger.debug("City name not provided for weather data.")
         return None
+    return weather_client.fetch(city_name)
+
+def is_weather_service_degraded():
+    """True while the weather upstream is considered down and lookups fail fast."""
+    return weather_client.is_degraded
+
+def normalize_city_name(city_name):
+    """Cache key for a city: Unicode NFC, case-folded, surrounding/repeated whitespace removed."""
+    return " ".join(unicodedata.normalize("NFC", city_name).casefold().split())
+
+class _InFlightFetch:
+    """A fetch in progress that other callers for the same city wait on (single-flight)."""
+    __slots__ = ("done", "result")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+
+class WeatherCache:
+    """
+    In-process cache of weather responses keyed by normalized city name.
+
+    - Entries younger than ttl_seconds are served directly (hit).
+    - Entries older than that but within stale_seconds more are served as-is (stale)
+      while a background thread refreshes them (stale-while-revalidate).
+    - Concurrent misses for the same city share a single upstream call.
+    Failed lookups (None) are never cached, and a failed refresh keeps the stale entry. Snapshot answers
+    (source "static") are not cached either, so live weather is asked again on the next lookup.
+    """
 
-    params = {
-        'q': city_name + ",IN",
-        'appid': settings.OPENWEATHERMAP_API_KEY,
-        'units': 'metric',
-        'lang': 'hi'
-    }
-    headers = { # Added a common User-Agent
-        'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-    }
-
-    try:
-        response = requests.get(settings.OPENWEATHERMAP_BASE_URL, params=params, headers=headers, timeout=10)
-        response.raise_for_status()
-        weather_data = response.json()
-        
-        if weather_data.get("cod") != 200: # Check API specific status code
-             if settings.DEBUG_MODE:
-                 print(f"API Client Warning: Weather API returned status {weather_data.get('cod')} for {city_name}. Message: {weather_data.get('message')}")
-             return None
+    def __init__(self, fetch_func, ttl_seconds, stale_seconds, max_entries=1024, clock=time.monotonic):
+        self._fetch_func = fetch_func
+        self.ttl_seconds = ttl_seconds
+        self.stale_seconds = stale_seconds
+        self.max_entries = max_entries
+        self._clock = clock
+        self._entries = {}   # key -> (weather_data, fetched_at)
+        self._in_flight = {} # key -> _InFlightFetch
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.stale_hits = 0
+        self.background_refreshes = 0
+
+    def get(self, city_name):
+        if not city_name:
+            return self._fetch_func(city_name)
+        key = normalize_city_name(city_name)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                weather_data, fetched_at = entry
+                age = self._clock() - fetched_at
+                if age < self.ttl_seconds:
+                    self.hits += 1
+                    return weather_data
+                if age < self.ttl_seconds + self.stale_seconds:
+                    self.stale_hits += 1
+                    if key not in self._in_flight:
+                        self._in_flight[key] = _InFlightFetch()
+                        self.background_refreshes += 1
+                        threading.Thread(target=self._fetch_and_store, args=(key, city_name),
+                                         name=f"weather-refresh-{key}", daemon=True).start()
+                    return weather_data
+            self.misses += 1
+            in_flight = self._in_flight.get(key)
+            if in_flight is None:
+                in_flight = self._in_flight[key] = _InFlightFetch()
+                is_leader = True
+            else:
+                is_leader = False
+
+        if is_leader:
+            return self._fetch_and_store(key, city_name)
+        in_flight.done.wait()
+        return in_flight.result
+
+    def _fetch_and_store(self, key, city_name):
+        """Runs the upstream fetch for key and releases everyone waiting on it."""
+        weather_data = None
+        try:
+            weather_data = self._fetch_func(city_name)
+        finally:
+            with self._lock:
+                if weather_data is not None and weather_data.get("source") != "static":
+                    if key not in self._entries and len(self._entries) >= self.max_entries:
+                        # Drop the oldest entry to stay bounded
+                        oldest_key = min(self._entries, key=lambda k: self._entries[k][1])
+                        del self._entries[oldest_key]
+                    self._entries[key] = (weather_data, self._clock())
+                elif key in self._entries:
+                    stale_data, fetched_at = self._entries[key]
+                    if self._clock() - fetched_at < self.ttl_seconds + self.stale_seconds:
+                        weather_data = stale_data # Keep serving the stale copy (a live one beats the snapshot)
+                    else:
+                        del self._entries[key]
+                in_flight = self._in_flight.pop(key)
+            in_flight.result = weather_data
+            in_flight.done.set()
         return weather_data
-    except requests.exceptions.HTTPError as http_err:
-        if settings.DEBUG_MODE: print(f"API Client HTTP error for {city_name}: {http_err} - Response: {response.text}")
-        return None
-    except requests.exceptions.RequestException as req_err:
-        if settings.DEBUG_MODE: print(f"API Client Network error for {city_name}: {req_err}")
-        return None
-    except json.JSONDecodeError as json_err:
-        if settings.DEBUG_MODE: print(f"API Client JSON decode error for {city_name}: {json_err}")
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "stale_hits": self.stale_hits,
+                "background_refreshes": self.background_refreshes,
+                "size": len(self._entries),
+            }
+
+# --- Weather Providers ---
+# A provider answers get(city_name) with an OpenWeatherMap-shaped dict, or None.
+
+class LiveWeatherProvider:
+    """Current weather from OpenWeatherMap (or anything speaking its API at OPENWEATHERMAP_BASE_URL)."""
+    name = "live"
+
+    def get(self, city_name):
+        return _fetch_live_weather_data(city_name)
+
+class StaticWeatherProvider:
+    """
+    Weather from a local snapshot file (weather_static.json): {city name: OpenWeatherMap-shaped dict}.
+    Answers with zero network latency; returned dicts carry "source": "static" so callers can say
+    the data is not live.
+    """
+    name = "static"
+
+    def __init__(self, file_path):
+        self.file_path = file_path
+        self._by_city = None
+        self._lock = threading.Lock()
+
+    def _load_raw(self):
+        """{city name as written in the file: weather dict}; empty if the file is missing, empty or unreadable."""
+        if not os.path.exists(self.file_path):
+            return {}
+        try:
+            with open(self.file_path, 'r', encoding='utf-8') as f:
+                raw = f.read()
+            snapshot = json.loads(raw) if raw.strip() else {}
+            if not isinstance(snapshot, dict):
+                raise ValueError("expected a JSON object of city -> weather")
+            return snapshot
+        except (OSError, ValueError) as e:
+            logger.error("Could not load static weather from %s: %s", self.file_path, e)
+            return {}
+
+    def _load(self):
+        with self._lock:
+            if self._by_city is None:
+                self._by_city = {normalize_city_name(city): weather_data for city, weather_data in self._load_raw().items()}
+        return self._by_city
+
+    def cities(self):
+        return list(self._load().keys())
+
+    def get(self, city_name):
+        if not city_name:
+            return None
+        weather_data = self._load().get(normalize_city_name(city_name))
+        if weather_data is None:
+            return None
+        return dict(weather_data, source=self.name)
+
+class FallbackWeatherProvider:
+    """Asks each provider in turn and returns the first answer."""
+
+    def __init__(self, providers):
+        self.providers = list(providers)
+        self.name = "+".join(p.name for p in self.providers)
+
+    def get(self, city_name):
+        for provider in self.providers:
+            weather_data = provider.get(city_name)
+            if weather_data is not None:
+                return weather_data
         return None
 
+def create_weather_provider(mode=None):
+    """
+    Builds the weather provider for settings.WEATHER_PROVIDER (or the given mode):
+    "live" - OpenWeatherMap only; "static" - weather_static.json only (offline);
+    "auto" - live, falling back to the static snapshot when live has no answer.
+    """
+    mode = mode or settings.WEATHER_PROVIDER
+    if mode == "live":
+        return LiveWeatherProvider()
+    if mode == "static":
+        return StaticWeatherProvider(settings.WEATHER_STATIC_FILE)
+    if mode == "auto":
+        return FallbackWeatherProvider([LiveWeatherProvider(), StaticWeatherProvider(settings.WEATHER_STATIC_FILE)])
+    raise ValueError(f"Unknown weather provider mode: {mode!r} (expected 'live', 'static' or 'auto')")
+
+weather_provider = create_weather_provider()
+
+def _fetch_weather_data(city_name):
+    return weather_provider.get(city_name)
+
+def capture_weather_snapshot(file_path=None, locations=None, fetch=None):
+    """
+    Writes current live weather for each location into the snapshot file the static provider answers
+    from (run it on a schedule: entries older than WEATHER_STATIC_MAX_AGE_SECONDS are not read out).
+    Cities the live lookup fails for keep their previous entry.
+    Args:
+        file_path (str, optional): Snapshot to write; defaults to settings.WEATHER_STATIC_FILE.
+        locations (list, optional): City names; defaults to settings.KNOWN_LOCATIONS_FOR_WEATHER.
+        fetch (callable, optional): city_name -> weather dict or None; defaults to the live API (uncached).
+    Returns:
+        tuple: (cities captured, cities that failed).
+    """
+    file_path = file_path or settings.WEATHER_STATIC_FILE
+    locations = settings.KNOWN_LOCATIONS_FOR_WEATHER if locations is None else locations
+    fetch = fetch or _fetch_live_weather_data
+    snapshot = StaticWeatherProvider(file_path)._load_raw()
+    captured, failed = 0, 0
+    for city in locations:
+        weather_data = fetch(city)
+        if weather_data is None:
+            failed += 1
+            logger.warning("No live weather for %s; its snapshot entry is left as it was.", city)
+            continue
+        snapshot[city] = weather_data
+        captured += 1
+    temp_path = file_path + ".tmp"
+    with open(temp_path, 'w', encoding='utf-8') as f:
+        json.dump(snapshot, f, ensure_ascii=False, indent=2)
+    os.replace(temp_path, file_path) # Readers never see a half-written snapshot
+    return captured, failed
+
+weather_cache = WeatherCache(
+    _fetch_weather_data,
+    ttl_seconds=settings.WEATHER_CACHE_TTL_SECONDS,
+    stale_seconds=settings.WEATHER_CACHE_STALE_SECONDS,
+    max_entries=settings.WEATHER_CACHE_MAX_ENTRIES,
+)
+
+def get_live_weather_data(city_name):
+    """
+    Returns OpenWeatherMap-shaped weather data for city_name from the configured weather provider,
+    served from the in-process weather cache when fresh enough.
+    """
+    return weather_cache.get(city_name)
+
+def get_weather_cache_stats():
+    """Returns the weather cache's hit/miss/stale counters and current size."""
+    return weather_cache.stats()
+
+def weather_cache_metric_families(stats, cache):
+    """Metric families (see metrics.register_collector) for a weather cache's stats() dict, labelled cache=cache."""
+    labels = {"cache": cache}
+    return [
+        ("krishi_mitra_weather_cache_entries", "gauge", "Cities currently held in the weather cache.", [(labels, stats["size"])]),
+        ("krishi_mitra_weather_cache_hits_total", "counter", "Weather cache lookups answered from a fresh entry.", [(labels, stats["hits"])]),
+        ("krishi_mitra_weather_cache_misses_total", "counter", "Weather cache lookups that had to wait for the provider.", [(labels, stats["misses"])]),
+        ("krishi_mitra_weather_cache_stale_hits_total", "counter", "Weather cache lookups answered from a stale entry.", [(labels, stats["stale_hits"])]),
+        ("krishi_mitra_weather_cache_background_refreshes_total", "counter", "Stale weather cache entries refreshed in the background.",
+         [(labels, stats["background_refreshes"])]),
+    ]
+
+@metrics.register_collector
+def _collect_weather_metrics():
+    return weather_cache_metric_families(weather_cache.stats(), "sync") + [
+        ("krishi_mitra_weather_circuit_open", "gauge", "1 while the weather API circuit breaker is open (failing fast).",
+         [({}, 1 if weather_client.is_degraded else 0)]),
+    ]
+
 if __name__ == '__main__':
+    import argparse
+    parser = argparse.ArgumentParser(description="Try the weather API, or capture a weather snapshot for offline use")
+    parser.add_argument("--snapshot", action="store_true",
+                        help="Write live weather for KNOWN_LOCATIONS_FOR_WEATHER into the static snapshot file")
+    parser.add_argument("--output", default=None, help="Snapshot file (default: settings.WEATHER_STATIC_FILE)")
+    args = parser.parse_args()
+    log.configure_logging()
+    if args.snapshot:
+        if not is_weather_api_configured():
+            raise SystemExit("OPENWEATHERMAP_API_KEY is not set; a snapshot needs the live API.")
+        captured, failed = capture_weather_snapshot(args.output)
+        print(f"Captured weather for {captured} cities into {args.output or settings.WEATHER_STATIC_FILE} ({failed} failed).")
+        raise SystemExit(0 if captured else 1)
+
     print("Testing API Clients...")
     if not settings.OPENWEATHERMAP_API_KEY or settings.OPENWEATHERMAP_API_KEY == "YOUR_ACTUAL_OPENWEATHERMAP_API_KEY_HERE":
         print("WARNING: OpenWeatherMap API key is not set in .env or is still the placeholder.")
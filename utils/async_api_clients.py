@@ -0,0 +1,285 @@
+import asyncio
+import json
+import random
+import time
+
+from config import settings
+from utils import api_clients
+from utils import log
+from utils import metrics
+from utils.api_clients import CircuitBreaker, normalize_city_name
+
+logger = log.get_logger(__name__)
+
+# --- Async Weather Clients ---
+# The asyncio counterparts of the weather client, providers and cache in api_clients.py, used by asgi_server.py.
+# Same time budget, retries, jittered backoff and cache semantics, but a lookup waiting on the upstream holds
+# no thread, so one process can keep thousands of weather questions in flight. The circuit breaker object is
+# shared with the synchronous client, so both serving modes agree on whether the weather service is degraded.
+# Everything here belongs to the event loop it was first used on and is not thread-safe.
+
+
+class AsyncWeatherClient:
+    """
+    OpenWeatherMap client on httpx.AsyncClient (pooled keep-alive connections, created on first use
+    inside the running event loop). Failure handling mirrors api_clients.WeatherClient.
+    """
+    RETRYABLE_STATUS_CODES = api_clients.WeatherClient.RETRYABLE_STATUS_CODES
+
+    def __init__(self, base_url, api_key=None, timeout_budget_seconds=4.0, max_retries=2,
+                 backoff_seconds=0.2, pool_size=20, breaker=None):
+        self.base_url = base_url
+        self.api_key = api_key # None: settings.OPENWEATHERMAP_API_KEY, read on every lookup
+        self.timeout_budget_seconds = timeout_budget_seconds
+        self.max_retries = max_retries
+        self.backoff_seconds = backoff_seconds
+        self.pool_size = pool_size
+        self.breaker = breaker if breaker is not None else CircuitBreaker()
+        self._client = None
+
+    def _get_client(self):
+        if self._client is None:
+            import httpx # Imported with the first lookup, not when the server starts
+            self._client = httpx.AsyncClient(
+                limits=httpx.Limits(max_connections=self.pool_size, max_keepalive_connections=self.pool_size),
+                headers={'User-Agent': api_clients.USER_AGENT},
+            )
+        return self._client
+
+    async def aclose(self):
+        """Closes the pooled connections (call on server shutdown)."""
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    @property
+    def is_degraded(self):
+        return self.breaker.state == CircuitBreaker.OPEN
+
+    async def fetch(self, city_name):
+        """
+        Fetches current weather for a city.
+        Returns:
+            dict: The OpenWeatherMap response, or None if the city is unknown, the upstream
+                  failed within the time budget, or the circuit breaker is open.
+        """
+        if not self.breaker.allow_request():
+            logger.debug("Weather circuit open, skipping upstream call for %s.", city_name)
+            api_clients.WEATHER_CIRCUIT_REJECTIONS.labels("async").inc()
+            return None
+
+        params = {
+            'q': city_name + ",IN",
+            'appid': self.api_key if self.api_key is not None else settings.OPENWEATHERMAP_API_KEY,
+            'units': 'metric',
+            'lang': 'hi'
+        }
+        client = self._get_client()
+        import httpx # Already loaded by _get_client()
+        deadline = time.monotonic() + self.timeout_budget_seconds
+        attempt = 0
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                self.breaker.record_failure()
+                return None
+            started, outcome = time.perf_counter(), "network_error"
+            try:
+                response = await client.get(self.base_url, params=params, timeout=remaining)
+                outcome = api_clients.weather_status_outcome(response.status_code)
+                if response.status_code not in self.RETRYABLE_STATUS_CODES:
+                    # Anything else means the upstream itself is healthy, even if the city was not found
+                    self.breaker.record_success()
+                    if response.is_error:
+                        logger.debug("Weather API HTTP error for %s: %s - Response: %s", city_name, response.status_code, response.text)
+                        return None
+                    weather_data = response.json()
+                    if weather_data.get("cod") != 200: # Check API specific status code
+                        outcome = "invalid_response"
+                        logger.debug("Weather API returned status %s for %s. Message: %s", weather_data.get('cod'), city_name, weather_data.get('message'))
+                        return None
+                    return weather_data
+                logger.debug("Weather API HTTP error for %s (attempt %d): %s", city_name, attempt + 1, response.status_code)
+            except (httpx.TimeoutException, httpx.NetworkError) as req_err:
+                logger.debug("Weather API network error for %s (attempt %d): %r", city_name, attempt + 1, req_err)
+            except json.JSONDecodeError as json_err:
+                outcome = "invalid_response"
+                logger.warning("Weather API JSON decode error for %s: %s", city_name, json_err)
+                return None
+            except httpx.HTTPError as req_err:
+                logger.warning("Weather API request error for %s: %r", city_name, req_err)
+                self.breaker.record_failure()
+                return None
+            finally:
+                api_clients.WEATHER_UPSTREAM_SECONDS.labels("async").observe(time.perf_counter() - started)
+                api_clients.WEATHER_UPSTREAM_REQUESTS.labels("async", outcome).inc()
+
+            # Transient failure: back off with full jitter and retry if the budget allows
+            attempt += 1
+            delay = random.uniform(0, self.backoff_seconds * (2 ** (attempt - 1)))
+            if attempt > self.max_retries or time.monotonic() + delay >= deadline:
+                self.breaker.record_failure()
+                return None
+            await asyncio.sleep(delay)
+
+
+class AsyncWeatherCache:
+    """
+    api_clients.WeatherCache for coroutines: fresh entries are hits, stale ones are served while a
+    background task refreshes them, and concurrent misses for a city await one shared upstream call.
+    A caller that is cancelled (e.g. the client disconnected) does not cancel the shared call.
+    Snapshot answers (source "static") are not cached.
+    """
+
+    def __init__(self, fetch_func, ttl_seconds, stale_seconds, max_entries=1024, clock=time.monotonic):
+        self._fetch_func = fetch_func # Coroutine function city_name -> weather data or None
+        self.ttl_seconds = ttl_seconds
+        self.stale_seconds = stale_seconds
+        self.max_entries = max_entries
+        self._clock = clock
+        self._entries = {}   # key -> (weather_data, fetched_at)
+        self._in_flight = {} # key -> asyncio.Task
+        self.hits = 0
+        self.misses = 0
+        self.stale_hits = 0
+        self.background_refreshes = 0
+
+    async def get(self, city_name):
+        if not city_name:
+            return await self._fetch_func(city_name)
+        key = normalize_city_name(city_name)
+        entry = self._entries.get(key)
+        if entry is not None:
+            weather_data, fetched_at = entry
+            age = self._clock() - fetched_at
+            if age < self.ttl_seconds:
+                self.hits += 1
+                return weather_data
+            if age < self.ttl_seconds + self.stale_seconds:
+                self.stale_hits += 1
+                if key not in self._in_flight:
+                    self.background_refreshes += 1
+                    self._start_fetch(key, city_name)
+                return weather_data
+        self.misses += 1
+        task = self._in_flight.get(key) or self._start_fetch(key, city_name)
+        return await asyncio.shield(task)
+
+    def _start_fetch(self, key, city_name):
+        task = self._in_flight[key] = asyncio.ensure_future(self._fetch_and_store(key, city_name))
+        return task
+
+    async def _fetch_and_store(self, key, city_name):
+        weather_data = None
+        try:
+            weather_data = await self._fetch_func(city_name)
+        finally:
+            if weather_data is not None and weather_data.get("source") != "static":
+                if key not in self._entries and len(self._entries) >= self.max_entries:
+                    # Drop the oldest entry to stay bounded
+                    oldest_key = min(self._entries, key=lambda k: self._entries[k][1])
+                    del self._entries[oldest_key]
+                self._entries[key] = (weather_data, self._clock())
+            elif key in self._entries:
+                stale_data, fetched_at = self._entries[key]
+                if self._clock() - fetched_at < self.ttl_seconds + self.stale_seconds:
+                    weather_data = stale_data # Keep serving the stale copy
+                else:
+                    del self._entries[key]
+            self._in_flight.pop(key, None)
+        return weather_data
+
+    def clear(self):
+        self._entries.clear()
+
+    def stats(self):
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "stale_hits": self.stale_hits,
+            "background_refreshes": self.background_refreshes,
+            "size": len(self._entries),
+        }
+
+# --- Async Weather Providers ---
+# Same contract as the providers in api_clients.py, with `async def get(city_name)`.
+
+class AsyncLiveWeatherProvider:
+    name = "live"
+
+    def __init__(self, client):
+        self.client = client
+
+    async def get(self, city_name):
+        if not api_clients.is_weather_api_configured():
+            logger.debug("OpenWeatherMap API key not configured or is placeholder.")
+            return None
+        if not city_name:
+            return None
+        return await self.client.fetch(city_name)
+
+class AsyncStaticWeatherProvider:
+    """The static snapshot provider; lookups are in-memory dict reads, so they run inline."""
+    name = "static"
+
+    def __init__(self, file_path):
+        self._provider = api_clients.StaticWeatherProvider(file_path)
+
+    async def get(self, city_name):
+        return self._provider.get(city_name)
+
+class AsyncFallbackWeatherProvider:
+    def __init__(self, providers):
+        self.providers = list(providers)
+        self.name = "+".join(p.name for p in self.providers)
+
+    async def get(self, city_name):
+        for provider in self.providers:
+            weather_data = await provider.get(city_name)
+            if weather_data is not None:
+                return weather_data
+        return None
+
+def create_async_weather_provider(client, mode=None):
+    """Builds the async provider for settings.WEATHER_PROVIDER (or mode); see api_clients.create_weather_provider."""
+    mode = mode or settings.WEATHER_PROVIDER
+    if mode == "live":
+        return AsyncLiveWeatherProvider(client)
+    if mode == "static":
+        return AsyncStaticWeatherProvider(settings.WEATHER_STATIC_FILE)
+    if mode == "auto":
+        return AsyncFallbackWeatherProvider([AsyncLiveWeatherProvider(client), AsyncStaticWeatherProvider(settings.WEATHER_STATIC_FILE)])
+    raise ValueError(f"Unknown weather provider mode: {mode!r} (expected 'live', 'static' or 'auto')")
+
+weather_client = AsyncWeatherClient(
+    settings.OPENWEATHERMAP_BASE_URL,
+    timeout_budget_seconds=settings.WEATHER_API_TIMEOUT_BUDGET_SECONDS,
+    max_retries=settings.WEATHER_API_MAX_RETRIES,
+    backoff_seconds=settings.WEATHER_API_BACKOFF_SECONDS,
+    pool_size=settings.WEATHER_API_POOL_SIZE,
+    breaker=api_clients.weather_client.breaker,
+)
+
+weather_provider = create_async_weather_provider(weather_client)
+
+weather_cache = AsyncWeatherCache(
+    weather_provider.get,
+    ttl_seconds=settings.WEATHER_CACHE_TTL_SECONDS,
+    stale_seconds=settings.WEATHER_CACHE_STALE_SECONDS,
+    max_entries=settings.WEATHER_CACHE_MAX_ENTRIES,
+)
+
+async def get_live_weather_data(city_name):
+    """Async api_clients.get_live_weather_data: weather for city_name from the configured provider, via the async cache."""
+    return await weather_cache.get(city_name)
+
+def get_weather_cache_stats():
+    return weather_cache.stats()
+
+@metrics.register_collector
+def _collect_weather_metrics():
+    return api_clients.weather_cache_metric_families(weather_cache.stats(), "async")
+
+async def aclose():
+    """Releases the upstream connections; the ASGI server calls this on shutdown."""
+    await weather_client.aclose()
@@ -1,6 +1,12 @@
+import csv
 import json
 import os
 from config import settings # To get file paths
+from utils import log
+from utils import mandi_price_db
+from utils.price_history import PRICE_HISTORY_COLUMNS, PriceHistory
+
+logger = log.get_logger(__name__)
 
 def load_json_data(file_path):
     """
@@ -11,8 +17,7 @@ def load_json_data(file_path):
         dict or list: The data loaded from the JSON file, or None if an error occurs.
     """
     if not os.path.exists(file_path):
-        if settings.DEBUG_MODE:
-            print(f"Data Loader Error: File not found at {file_path}")
+        logger.error("File not found at %s", file_path)
         return None
     
     try:
@@ -20,12 +25,10 @@ def load_json_data(file_path):
             data = json.load(f)
         return data
     except json.JSONDecodeError as e:
-        if settings.DEBUG_MODE:
-            print(f"Data Loader Error: Could not decode JSON from {file_path}. Error: {e}")
+        logger.error("Could not decode JSON from %s. Error: %s", file_path, e)
         return None
     except Exception as e:
-        if settings.DEBUG_MODE:
-            print(f"Data Loader Error: An unexpected error occurred while loading {file_path}. Error: {e}")
+        logger.error("An unexpected error occurred while loading %s. Error: %s", file_path, e)
         return None
 
 def get_crop_data():
@@ -38,10 +41,13 @@ def get_crop_data():
 
 def get_mandi_price_data():
     """
-    Loads the Mandi price data from the predefined JSON file.
+    Loads the current Mandi prices: from the predefined JSON file, or with MANDI_PRICE_BACKEND = "sqlite"
+    the newest ingested price per crop and mandi from the price database (same shape).
     Returns:
         dict: The Mandi price data, or None if loading fails.
     """
+    if settings.MANDI_PRICE_BACKEND == "sqlite":
+        return _load_from_price_database(mandi_price_db.load_latest_prices)
     return load_json_data(settings.MANDI_PRICES_FILE)
 
 def get_schemes_data():
@@ -53,6 +59,59 @@ def get_schemes_data():
     """
     return load_json_data(settings.SCHEMES_ADVISORY_FILE)
 
+def load_price_history_csv(file_path):
+    """
+    Loads a mandi price history CSV (columns: PRICE_HISTORY_COLUMNS) into a PriceHistory.
+    The file is read row by row, so only the parsed price columns are kept in memory.
+    Args:
+        file_path (str): The absolute path to the CSV file.
+    Returns:
+        PriceHistory: The loaded history. Empty if the file does not exist or has no rows yet;
+                      None if the file cannot be read or lacks required columns.
+    """
+    if not os.path.exists(file_path):
+        logger.info("No price history file at %s, starting with an empty history.", file_path)
+        return PriceHistory()
+
+    try:
+        with open(file_path, 'r', encoding='utf-8', newline='') as f:
+            reader = csv.DictReader(f)
+            if reader.fieldnames is None: # Empty file
+                return PriceHistory()
+            missing = [c for c in ("date", "mandi", "crop", "modal_price") if c not in reader.fieldnames]
+            if missing:
+                logger.error("Price history %s is missing columns %s.", file_path, missing)
+                return None
+            history, skipped_rows = PriceHistory.from_rows(reader)
+        if skipped_rows:
+            logger.warning("Skipped %d malformed rows in %s.", skipped_rows, file_path)
+        return history
+    except Exception as e:
+        logger.error("An unexpected error occurred while loading %s. Error: %s", file_path, e)
+        return None
+
+def get_mandi_price_history():
+    """
+    Loads the daily Mandi price history from the predefined CSV file, or with MANDI_PRICE_BACKEND = "sqlite"
+    opens it in the price database (queried per request, nothing is loaded up front).
+    Returns:
+        PriceHistory or SqlitePriceHistory: The price history, or None if loading fails.
+    """
+    if settings.MANDI_PRICE_BACKEND == "sqlite":
+        return _load_from_price_database(mandi_price_db.open_price_history)
+    return load_price_history_csv(settings.MANDI_PRICE_HISTORY_FILE)
+
+def _load_from_price_database(loader):
+    db_path = settings.MANDI_PRICE_DB_FILE
+    if not os.path.exists(db_path):
+        logger.error("Price database not found at %s. Run `python -m utils.mandi_ingest <dump.csv>` first.", db_path)
+        return None
+    try:
+        return loader(db_path)
+    except Exception as e:
+        logger.error("Could not read the price database %s. Error: %s", db_path, e)
+        return None
+
 
 if __name__ == '__main__':
     print("Testing Data Loaders...")
@@ -92,4 +151,14 @@ if __name__ == '__main__':
              print("  Schemes data loaded, but it's empty or not in the expected list format.")
         # No 'else' here because load_json_data returns None on failure, caught by the 'if schemes_data:'
     else:
-        print("योजनाओं की सलाह का डेटा लोड करने में विफल।")
\ No newline at end of file
+        print("योजनाओं की सलाह का डेटा लोड करने में विफल।")
+
+    print("-" * 30)
+    price_history = get_mandi_price_history()
+    if price_history is not None:
+        print(f"Mandi price history loaded successfully! Found {len(price_history)} mandi/crop series.")
+        weekly = price_history.window_stats("कानपुर मंडी", "गेहूं", days=7)
+        if weekly:
+            print(f"  कानपुर मंडी में गेहूं, पिछले 7 दिन: औसत {weekly.mean_price:.0f}, बदलाव {weekly.change_percent:+.1f}%")
+    else:
+        print("मंडी भाव इतिहास लोड करने में विफल।")
\ No newline at end of file
@@ -0,0 +1,117 @@
+import math
+from array import array
+from collections import deque, namedtuple
+
+# --- Endpointing ---
+# Cuts a continuous microphone stream (16-bit mono PCM, fed frame by frame) into utterances, so
+# core/voice_input.py can keep one microphone open for the whole conversation and hand each utterance to
+# recognition as soon as the speaker stops. Speech is any frame whose RMS energy is well above the
+# background noise level. The noise level is measured once at the start (calibration) and then follows the
+# room between utterances, so a fan switched on later does not read as speech.
+
+# One utterance: raw PCM and its format (the arguments of speech_recognition.AudioData)
+Utterance = namedtuple("Utterance", ["frame_data", "sample_rate", "sample_width"])
+
+
+def frame_rms(frame):
+    """RMS energy of a frame of 16-bit native-endian samples."""
+    samples = array("h", frame)
+    if not samples:
+        return 0.0
+    return math.sqrt(sum(sample * sample for sample in samples) / len(samples))
+
+
+class EnergyEndpointer:
+    """
+    Energy-based voice activity detection. feed() every captured frame; it returns the frames of an
+    utterance (bytes) on the frame that ends it, otherwise None.
+    - Speech starts after start_seconds of frames louder than `threshold`; the pre_roll_seconds before
+      that are kept (a ring buffer), so the first syllable is not clipped.
+    - Speech ends after end_silence_seconds of quiet frames, or after max_utterance_seconds.
+    - threshold = max(min_threshold, threshold_ratio * noise level). The noise level is the mean of the
+      first calibration_seconds (or the given noise_level, e.g. measured over a whole recording), then an
+      exponential average (weight `adaptation`) of quiet frames.
+    At the end of a recording, flush() returns the utterance still in progress.
+    """
+
+    def __init__(self, sample_rate, frame_samples, calibration_seconds=1.0, start_seconds=0.1, end_silence_seconds=0.5,
+                 pre_roll_seconds=0.3, max_utterance_seconds=10.0, threshold_ratio=3.0, min_threshold=100.0, adaptation=0.05,
+                 noise_level=None):
+        frame_seconds = frame_samples / float(sample_rate)
+        to_frames = lambda seconds: max(1, int(math.ceil(seconds / frame_seconds - 1e-9)))
+        self.frame_seconds = frame_seconds
+        self.calibration_frames = to_frames(calibration_seconds)
+        self.start_frames = to_frames(start_seconds)
+        self.end_frames = to_frames(end_silence_seconds)
+        self.max_frames = to_frames(max_utterance_seconds)
+        self.threshold_ratio = threshold_ratio
+        self.min_threshold = min_threshold
+        self.adaptation = adaptation
+        self.noise_level = noise_level
+        self._calibration = []
+        self._pre_roll = deque(maxlen=to_frames(pre_roll_seconds) + self.start_frames)
+        self._speech = None # Frames of the utterance in progress, or None between utterances
+        self._loud_frames = 0
+        self._quiet_frames = 0
+
+    @property
+    def calibrated(self):
+        return self.noise_level is not None
+
+    @property
+    def in_speech(self):
+        """True while an utterance has started and not ended yet."""
+        return self._speech is not None
+
+    @property
+    def threshold(self):
+        return max(self.min_threshold, self.threshold_ratio * (self.noise_level or 0.0))
+
+    def feed(self, frame):
+        energy = frame_rms(frame)
+        if self.noise_level is None:
+            self._calibration.append(energy)
+            self._pre_roll.append(frame)
+            if len(self._calibration) >= self.calibration_frames:
+                self.noise_level = sum(self._calibration) / len(self._calibration)
+                self._calibration = []
+            return None
+
+        loud = energy > self.threshold
+        if self._speech is None:
+            self._pre_roll.append(frame)
+            if not loud:
+                self._loud_frames = 0
+                self.noise_level += self.adaptation * (energy - self.noise_level)
+                return None
+            self._loud_frames += 1
+            if self._loud_frames >= self.start_frames:
+                self._speech = list(self._pre_roll)
+                self._pre_roll.clear()
+                self._quiet_frames = 0
+            return None
+
+        self._speech.append(frame)
+        self._quiet_frames = 0 if loud else self._quiet_frames + 1
+        if self._quiet_frames >= self.end_frames or len(self._speech) >= self.max_frames:
+            utterance = b"".join(self._speech)
+            self._speech = None
+            self._loud_frames = 0
+            return utterance
+        return None
+
+    def flush(self):
+        """The utterance in progress (bytes), or None; call when the stream ends."""
+        if self._speech is None:
+            return None
+        utterance = b"".join(self._speech)
+        self._speech = None
+        self._loud_frames = 0
+        return utterance
+
+    def reset(self):
+        """Drops the utterance in progress and the pre-roll; the noise level is kept."""
+        self._speech = None
+        self._loud_frames = 0
+        self._quiet_frames = 0
+        self._pre_roll.clear()
@@ -0,0 +1,211 @@
+import unicodedata
+from collections import namedtuple
+from functools import lru_cache
+
+from utils.keyword_matcher import KeywordMatcher
+
+# --- Fuzzy Name Index ---
+# Speech recognition rarely spells a name the way our data does: "गेहू", "गेंहू" and "गेहूं" are the same
+# crop, a district comes back with a short vowel or without its nukta. Names are compared on a spelling
+# skeleton (normalize_devanagari) by edit distance. Scanning every name for every query would cost
+# O(names), so candidates come from a character n-gram index: only names sharing enough n-grams with
+# the query text are compared at all. Before that, one Aho-Corasick pass finds names whose skeleton occurs
+# verbatim in the query's, which also catches a split name ("गे हूं") or one glued to a postposition ("इंदौरका").
+# Short words are only ever matched exactly: one edit turns everyday words into places ("मेरे" -> "मेरठ").
+
+MIN_EMBEDDED_LENGTH = 3 # Shorter skeletons are only matched as whole words ("चना" is not found in "सूचना" anyway)
+MIN_FUZZY_LENGTH = 5 # Skeletons shorter than this (on either side) never match by edit distance
+# What ASR glues onto a name (as skeletons); a short name followed by anything else is part of another word
+GLUED_SUFFIXES = frozenset(["का", "कि", "के", "मे", "से", "को", "ने", "पर", "तक", "वाला", "वाले", "क्या", "है"])
+RESULT_CACHE_SIZE = 10000 # Memoized lookups per index; the memo starts over when it is full
+
+# One ranked candidate. confidence = 1 - distance / length of the longer skeleton (1.0 is an exact skeleton match)
+FuzzyMatch = namedtuple("FuzzyMatch", ["name", "payload", "confidence", "distance"])
+
+# Marks ASR confuses freely: nasalisation (anusvara, chandrabindu), nukta, zero-width (non-)joiners
+_DROPPED_MARKS = {ord(c): None for c in "ंँ़‌‍"}
+# Long and short vowels (as signs and as letters) are one sound class
+_VOWEL_CLASSES = str.maketrans({"ी": "ि", "ू": "ु", "ई": "इ", "ऊ": "उ"})
+
+
+@lru_cache(maxsize=65536) # Queries are made of a small vocabulary, so most words are seen before
+def normalize_devanagari(text):
+    """The spelling skeleton of text: lower case, no spaces, nasal marks and nukta dropped, vowel length ignored."""
+    text = unicodedata.normalize("NFD", text.lower()) # NFD splits precomposed nukta letters (e.g. "ड़")
+    return "".join(text.translate(_DROPPED_MARKS).translate(_VOWEL_CLASSES).split())
+
+
+def edit_distance(a, b, max_distance):
+    """Levenshtein distance of a and b, or max_distance + 1 as soon as it is known to exceed max_distance."""
+    if abs(len(a) - len(b)) > max_distance:
+        return max_distance + 1
+    previous = list(range(len(b) + 1))
+    for i, char_a in enumerate(a, 1):
+        current = [i]
+        for j, char_b in enumerate(b, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (char_a != char_b)))
+        if min(current) > max_distance:
+            return max_distance + 1
+        previous = current
+    return previous[-1]
+
+
+class FuzzyIndex:
+    """
+    Character n-gram index over names, each with a payload (like KeywordMatcher).
+    search() ranks the names close to one piece of text; find_in() looks for the best name anywhere
+    in a query, trying every run of up to a few words (ASR also splits a name into two words).
+    """
+
+    def __init__(self, n=2, min_confidence=0.75):
+        self.n = n
+        self.min_confidence = min_confidence
+        self._entries = [] # (name, payload, skeleton, number of n-grams)
+        self._postings = {} # n-gram -> entry ids
+        self._by_skeleton = {} # skeleton -> entry ids, for the exact-skeleton fast path
+        self._min_length = None # Shortest and longest skeleton, to skip text that cannot match anything
+        self._max_length = 0
+        self._matcher = None # Skeleton -> entry id automaton for find_in (see build)
+        self._results = {} # (skeleton, limit, min_confidence) -> ranked tuple; the same words recur in most queries
+        self.max_words = 1
+
+    def _grams(self, skeleton):
+        padded = f"^{skeleton}$"
+        return {padded[i:i + self.n] for i in range(max(1, len(padded) - self.n + 1))}
+
+    def add(self, name, payload):
+        """Indexes name (a str) with payload; empty names are ignored."""
+        skeleton = normalize_devanagari(name)
+        if not skeleton:
+            return
+        grams = self._grams(skeleton)
+        entry_id = len(self._entries)
+        self._entries.append((name, payload, skeleton, len(grams)))
+        self._by_skeleton.setdefault(skeleton, []).append(entry_id)
+        for gram in grams:
+            self._postings.setdefault(gram, []).append(entry_id)
+        self.max_words = max(self.max_words, len(name.split()))
+        self._results.clear()
+        self._matcher = None
+        self._min_length = len(skeleton) if self._min_length is None else min(self._min_length, len(skeleton))
+        self._max_length = max(self._max_length, len(skeleton))
+
+    def _ranked(self, skeleton, limit, min_confidence):
+        """((entry id, FuzzyMatch), ...) for a skeleton, best first and then by entry id (memoized)."""
+        key = (skeleton, limit, min_confidence)
+        ranked = self._results.get(key)
+        if ranked is None:
+            if len(self._results) >= RESULT_CACHE_SIZE:
+                self._results.clear()
+            ranked = self._results[key] = tuple(self._rank(skeleton, limit, min_confidence))
+        return ranked
+
+    def _rank(self, skeleton, limit, min_confidence):
+        exact = self._by_skeleton.get(skeleton, ())
+        if len(exact) >= limit or len(skeleton) < MIN_FUZZY_LENGTH: # Nothing can rank above an exact skeleton match
+            return [(i, FuzzyMatch(self._entries[i][0], self._entries[i][1], 1.0, 0)) for i in exact[:limit]]
+
+        grams = self._grams(skeleton)
+        shared = {}
+        for gram in grams:
+            for entry_id in self._postings.get(gram, ()):
+                shared[entry_id] = shared.get(entry_id, 0) + 1
+        ranked = []
+        for entry_id, count in shared.items():
+            name, payload, candidate, candidate_grams = self._entries[entry_id]
+            if len(candidate) < MIN_FUZZY_LENGTH:
+                continue
+            longest = max(len(skeleton), len(candidate))
+            max_distance = int(longest * (1.0 - min_confidence) + 1e-9)
+            # Count filter: one edit changes at most n of the n-grams, so too few shared n-grams rule a name out
+            if count < max(len(grams), candidate_grams) - self.n * max_distance:
+                continue
+            distance = edit_distance(skeleton, candidate, max_distance)
+            if distance <= max_distance:
+                ranked.append((entry_id, FuzzyMatch(name, payload, round(1.0 - distance / longest, 3), distance)))
+        ranked.sort(key=lambda item: (-item[1].confidence, item[0]))
+        return ranked[:limit]
+
+    def search(self, text, limit=3, min_confidence=None):
+        """
+        Names close to text, best first.
+        Args:
+            text (str): What was heard (one name's worth of words).
+            limit (int): Most candidates returned.
+            min_confidence (float, optional): Lowest confidence returned (default: the index's).
+        Returns:
+            list: FuzzyMatch tuples, by confidence and then in the order the names were added.
+        """
+        skeleton = normalize_devanagari(text)
+        if not skeleton:
+            return []
+        min_confidence = self.min_confidence if min_confidence is None else min_confidence
+        return [match for _, match in self._ranked(skeleton, limit, min_confidence)]
+
+    def find_in(self, text, min_confidence=None):
+        """
+        The best name occurring anywhere in text (a whole query), or None.
+        A name whose skeleton starts at a word of text and ends at a word (or before a GLUED_SUFFIXES
+        remainder; any remainder for names of MIN_FUZZY_LENGTH or more) counts as exact (confidence 1.0);
+        otherwise every run of 1 to max_words + 1 words is searched. Ties go to the earlier-added name.
+        """
+        if not self._entries:
+            return None
+        skeletons = [normalize_devanagari(word) for word in text.split()]
+        embedded = self._find_embedded(skeletons)
+        if embedded is not None:
+            return embedded
+
+        min_confidence = self.min_confidence if min_confidence is None else min_confidence
+        # A skeleton matches no name if its length differs from every name's by more than the edits allowed
+        shortest, longest = self._min_length * min_confidence, self._max_length / max(min_confidence, 1e-9)
+        best_key, best = None, None
+        for start in range(len(skeletons)):
+            skeleton = ""
+            for end in range(start, min(len(skeletons), start + self.max_words + 1)):
+                skeleton += skeletons[end]
+                if len(skeleton) > longest:
+                    break
+                if not skeleton or len(skeleton) < shortest:
+                    continue
+                for entry_id, match in self._ranked(skeleton, 1, min_confidence):
+                    if best is None or (-match.confidence, entry_id) < best_key:
+                        best_key, best = (-match.confidence, entry_id), match
+        return best
+
+    def build(self):
+        """Compiles the automaton find_in uses, so the first query does not pay for it. Returns self."""
+        matcher = KeywordMatcher()
+        for entry_id, (_, _, skeleton, _) in enumerate(self._entries):
+            if len(skeleton) >= MIN_EMBEDDED_LENGTH:
+                matcher.add(skeleton, entry_id)
+        self._matcher = matcher.build()
+        return self
+
+    def _find_embedded(self, skeletons):
+        """The earliest-added name whose skeleton occurs in the joined skeletons starting at a word, or None."""
+        if self._matcher is None: # Names were added since the last build()
+            self.build()
+        matcher = self._matcher
+        joined = "".join(skeletons)
+        word_starts, offset = [], 0
+        for skeleton in skeletons:
+            word_starts.append(offset)
+            offset += len(skeleton)
+        word_starts.append(offset)
+        starts = set(word_starts)
+        found = []
+        for end, entry_id in matcher.iter_matches(joined):
+            length = len(self._entries[entry_id][2])
+            if end - length not in starts:
+                continue
+            word_end = next(boundary for boundary in word_starts if boundary >= end)
+            if end == word_end or length >= MIN_FUZZY_LENGTH or joined[end:word_end] in GLUED_SUFFIXES:
+                found.append(entry_id)
+        if not found:
+            return None
+        name, payload, _, _ = self._entries[min(found)]
+        return FuzzyMatch(name, payload, 1.0, 0)
+
+    def __len__(self):
+        return len(self._entries)
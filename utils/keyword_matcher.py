@@ -0,0 +1,78 @@
+from collections import deque
+
+
+class KeywordMatcher:
+    """
+    Aho-Corasick style multi-pattern matcher.
+
+    Patterns are added with an arbitrary payload, the automaton is compiled once
+    with build(), and every occurrence of every pattern in a text is then reported
+    in a single left-to-right pass. The cost of a scan depends on the length of
+    the text and the number of hits, not on how many patterns were added.
+    """
+
+    def __init__(self):
+        self._goto = [{}]      # state -> {char: next_state}
+        self._fail = [0]       # state -> fallback state
+        self._output = [[]]    # state -> payloads of patterns ending here
+        self._built = False
+
+    def add(self, pattern, payload):
+        """
+        Adds a pattern to the automaton.
+        Args:
+            pattern (str): The text to look for. Empty patterns are ignored.
+            payload: Any value reported back when the pattern is found.
+        """
+        if self._built:
+            raise RuntimeError("KeywordMatcher is already built; create a new one to add patterns.")
+        if not pattern:
+            return
+        state = 0
+        for char in pattern:
+            next_state = self._goto[state].get(char)
+            if next_state is None:
+                next_state = len(self._goto)
+                self._goto[state][char] = next_state
+                self._goto.append({})
+                self._fail.append(0)
+                self._output.append([])
+            state = next_state
+        self._output[state].append(payload)
+
+    def build(self):
+        """Computes the failure links. Must be called once, after all patterns are added."""
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, next_state in self._goto[state].items():
+                queue.append(next_state)
+                fallback = self._fail[state]
+                while fallback and char not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                self._fail[next_state] = self._goto[fallback].get(char, 0)
+                # Inherit the outputs of the longest proper suffix that is also a pattern.
+                self._output[next_state] = self._output[next_state] + self._output[self._fail[next_state]]
+        self._built = True
+        return self
+
+    def iter_matches(self, text):
+        """
+        Yields (end_index, payload) for every pattern occurrence in text.
+        end_index is the index one past the last character of the match.
+        """
+        if not self._built:
+            raise RuntimeError("KeywordMatcher.build() must be called before matching.")
+        goto, fail, output = self._goto, self._fail, self._output
+        state = 0
+        for index, char in enumerate(text):
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            if output[state]:
+                for payload in output[state]:
+                    yield index + 1, payload
+
+    def find_all(self, text):
+        """Returns the set of payloads whose patterns occur anywhere in text."""
+        return {payload for _, payload in self.iter_matches(text)}
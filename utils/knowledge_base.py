@@ -0,0 +1,248 @@
+import gc
+import os
+import threading
+from types import MappingProxyType
+
+from config import settings
+from utils import data_loaders
+from utils import log
+from utils import metrics
+from utils.price_index import MandiPriceIndex
+
+logger = log.get_logger(__name__)
+
+# --- Shared Knowledge Base ---
+# The crop, mandi and scheme files are parsed once per process into a single read-only KnowledgeBase
+# that owns the data and every lookup table derived from it. The NLU, the intent handler and the front
+# ends all read from get_knowledge_base().
+#
+# A KnowledgeBase is never modified after it is published. A reload builds a complete new one (data plus
+# every derived index) and then swaps the single module-level reference, so a request that took a
+# reference keeps a consistent view even if a reload happens mid-request.
+
+
+def _freeze(value):
+    """Recursively converts loaded JSON into read-only equivalents (dict -> mappingproxy, list -> tuple)."""
+    if isinstance(value, dict):
+        return MappingProxyType({key: _freeze(item) for key, item in value.items()})
+    if isinstance(value, list):
+        return tuple(_freeze(item) for item in value)
+    return value
+
+# name -> builder(knowledge_base) for indexes that belong to one consumer (e.g. the NLU's query matcher)
+_DERIVED_INDEX_BUILDERS = {}
+
+def register_derived_index(name, builder):
+    """
+    Registers builder(knowledge_base) -> index. It runs for every new KnowledgeBase before it is published.
+    """
+    _DERIVED_INDEX_BUILDERS[name] = builder
+
+
+class KnowledgeBase:
+    """
+    One consistent, read-only generation of the knowledge base.
+
+    Attributes:
+        crop_data, mandi_price_data, schemes_data: The loaded files (frozen), or None if a file failed to load.
+        known_crops, known_mandis, known_mandi_core_locations: Entity names, in file order.
+        mandi_by_core_location: Lower-cased core location (e.g. "कानपुर") -> full mandi name ("कानपुर मंडी").
+        price_index: MandiPriceIndex, crop -> mandis with parsed numeric prices and dates.
+        price_history: PriceHistory with the daily price series (None if the history file failed to load).
+        known_scheme_keywords, known_scheme_names: Sorted, lower-cased scheme keywords and names.
+        weather_locations: settings.KNOWN_LOCATIONS_FOR_WEATHER.
+    """
+
+    def __init__(self, crop_data, mandi_price_data, schemes_data, price_history=None, generation=1, file_mtimes=None):
+        set_attr = object.__setattr__
+        set_attr(self, "generation", generation)
+        set_attr(self, "file_mtimes", MappingProxyType(dict(file_mtimes or {})))
+        set_attr(self, "crop_data", _freeze(crop_data))
+        set_attr(self, "mandi_price_data", _freeze(mandi_price_data))
+        set_attr(self, "schemes_data", _freeze(schemes_data))
+
+        set_attr(self, "known_crops", tuple(crop_data.keys()) if crop_data else ())
+        known_mandis = tuple(mandi_price_data.keys()) if mandi_price_data else ()
+        set_attr(self, "known_mandis", known_mandis)
+        set_attr(self, "known_mandi_core_locations", tuple(m.replace("मंडी", "").strip() for m in known_mandis))
+        mandi_by_core_location = {}
+        for core_location, mandi in zip(self.known_mandi_core_locations, known_mandis):
+            mandi_by_core_location.setdefault(core_location.lower(), mandi)
+        set_attr(self, "mandi_by_core_location", MappingProxyType(mandi_by_core_location))
+        set_attr(self, "price_index", MandiPriceIndex(mandi_price_data))
+        set_attr(self, "price_history", price_history) # Already read-only (its arrays are not writeable)
+
+        scheme_keywords = set()
+        scheme_names = set() # Canonical scheme names
+        if isinstance(schemes_data, list):
+            for scheme in schemes_data:
+                if scheme and isinstance(scheme.get("keywords"), list): # Check if scheme is not None
+                    scheme_keywords.update(k.lower() for k in scheme["keywords"])
+                if scheme and scheme.get("name"):
+                    scheme_names.add(scheme.get("name").lower())
+        set_attr(self, "known_scheme_keywords", tuple(sorted(scheme_keywords)))
+        set_attr(self, "known_scheme_names", tuple(sorted(scheme_names)))
+        set_attr(self, "weather_locations", tuple(settings.KNOWN_LOCATIONS_FOR_WEATHER))
+
+        set_attr(self, "_derived", {})
+        set_attr(self, "_derived_lock", threading.Lock())
+
+    def __setattr__(self, name, value):
+        raise AttributeError("KnowledgeBase is read-only; build a new one and publish it instead")
+
+    __delattr__ = __setattr__
+
+    @classmethod
+    def load(cls, generation=1):
+        """Parses the knowledge base files (once) and builds a KnowledgeBase from them."""
+        file_mtimes = _file_mtimes()
+        return cls(data_loaders.get_crop_data(), data_loaders.get_mandi_price_data(), data_loaders.get_schemes_data(),
+                   data_loaders.get_mandi_price_history(), generation=generation, file_mtimes=file_mtimes)
+
+    def derived(self, name):
+        """Returns the derived index `name`, building it on first use if it was registered after this object was made."""
+        index = self._derived.get(name)
+        if index is None:
+            with self._derived_lock:
+                index = self._derived.get(name)
+                if index is None:
+                    index = self._derived[name] = _DERIVED_INDEX_BUILDERS[name](self)
+        return index
+
+    def build_derived_indexes(self):
+        for name in list(_DERIVED_INDEX_BUILDERS):
+            self.derived(name)
+        return self
+
+
+def _knowledge_base_files():
+    """KnowledgeBase attribute -> file it is loaded from."""
+    files = {
+        "crop_data": settings.CROP_ADVISORY_FILE,
+        "mandi_price_data": settings.MANDI_PRICES_FILE,
+        "schemes_data": settings.SCHEMES_ADVISORY_FILE,
+        "price_history": settings.MANDI_PRICE_HISTORY_FILE,
+    }
+    if settings.MANDI_PRICE_BACKEND == "sqlite": # Current prices and history both come from the ingested database
+        files["mandi_price_data"] = files["price_history"] = settings.MANDI_PRICE_DB_FILE
+    return files
+
+def _file_mtimes():
+    mtimes = {}
+    for name, path in _knowledge_base_files().items():
+        try:
+            mtimes[name] = os.stat(path).st_mtime_ns
+        except OSError:
+            mtimes[name] = None
+    return mtimes
+
+_lock = threading.Lock() # Serialises loads/reloads; readers never take it once a knowledge base exists
+_current = None
+reload_count = 0
+
+_RELOAD_FAILURES = metrics.counter("krishi_mitra_knowledge_base_reload_failures_total",
+                                   "Knowledge base reloads aborted because a file failed to load.")
+
+def get_knowledge_base():
+    """Returns the current KnowledgeBase, loading it on first use."""
+    knowledge_base = _current
+    if knowledge_base is None:
+        with _lock:
+            if _current is None:
+                _publish(KnowledgeBase.load(generation=1))
+            knowledge_base = _current
+    return knowledge_base
+
+def _publish(knowledge_base):
+    global _current
+    knowledge_base.build_derived_indexes() # Everything is built before anyone can see it
+    _current = knowledge_base # Single reference assignment: readers see the old or the new one, never a mix
+
+def reload_knowledge_base(force=False):
+    """
+    Reloads the knowledge base files if any of them changed on disk (or always, with force=True).
+    A file that fails to load (e.g. caught half-written) aborts the reload and the current data stays in place.
+    Returns:
+        bool: True if a new KnowledgeBase was published.
+    """
+    global reload_count
+    get_knowledge_base()
+    with _lock:
+        current = _current
+        if not force and _file_mtimes() == dict(current.file_mtimes):
+            return False
+        knowledge_base = KnowledgeBase.load(generation=current.generation + 1)
+        if any(getattr(knowledge_base, name) is None for name in _knowledge_base_files()):
+            _RELOAD_FAILURES.inc()
+            logger.error("Reload aborted, a file failed to load. Keeping the current data.")
+            return False
+        _publish(knowledge_base)
+        reload_count += 1
+    logger.info("Reloaded (generation %d).", knowledge_base.generation)
+    return True
+
+@metrics.register_collector
+def _collect_knowledge_base_metrics():
+    knowledge_base = _current
+    return [
+        ("krishi_mitra_knowledge_base_reloads_total", "counter", "Knowledge base reloads published since start.", [({}, reload_count)]),
+        ("krishi_mitra_knowledge_base_generation", "gauge", "Generation of the knowledge base currently served (0 before the first load).",
+         [({}, knowledge_base.generation if knowledge_base is not None else 0)]),
+    ]
+
+def preload_knowledge_base():
+    """
+    Loads the knowledge base and all derived indexes up front, then moves every object allocated so far
+    out of the garbage collector's generations (gc.freeze). Call this in the master process of a pre-fork
+    server (e.g. gunicorn --preload) so workers start with the data already built and the collector does
+    not touch, and thereby copy, those shared pages in every worker.
+    """
+    knowledge_base = get_knowledge_base()
+    gc.collect()
+    gc.freeze()
+    return knowledge_base
+
+
+class KnowledgeBaseWatcher:
+    """Background thread that polls the knowledge base file mtimes and reloads on change."""
+
+    def __init__(self, interval_seconds):
+        self.interval_seconds = interval_seconds
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="knowledge-base-watcher", daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+
+    def _run(self):
+        while not self._stop.wait(self.interval_seconds):
+            try:
+                reload_knowledge_base()
+            except Exception as e:
+                logger.exception("Watcher failed to reload: %s", e)
+
+_watcher = None
+_watcher_interval = None
+
+def start_knowledge_base_watcher(interval_seconds=None):
+    """
+    Starts the file watcher once per process (no-op for a non-positive interval).
+    Threads do not survive fork, so a pre-fork server's workers each restart their own watcher.
+    """
+    global _watcher, _watcher_interval
+    interval_seconds = settings.KNOWLEDGE_BASE_RELOAD_INTERVAL_SECONDS if interval_seconds is None else interval_seconds
+    if _watcher is None and interval_seconds and interval_seconds > 0:
+        if _watcher_interval is None and hasattr(os, "register_at_fork"):
+            os.register_at_fork(after_in_child=_restart_watcher_after_fork)
+        _watcher_interval = interval_seconds
+        _watcher = KnowledgeBaseWatcher(interval_seconds).start()
+    return _watcher
+
+def _restart_watcher_after_fork():
+    global _watcher
+    _watcher = None
+    start_knowledge_base_watcher(_watcher_interval)
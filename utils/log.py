@@ -0,0 +1,231 @@
+import atexit
+import contextvars
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import random
+import re
+import sys
+import time
+import uuid
+from contextlib import contextmanager
+
+from config import settings
+from utils import metrics
+
+# --- Logging ---
+# Modules log through get_logger(__name__) with %-style arguments, which are only formatted when a record
+# is actually written:
+#   logger = log.get_logger(__name__)
+#   logger.debug("Fetching weather for %s", location, extra={"session_id": session_id})
+# A DEBUG call on a logger that is not enabled for DEBUG returns after one cached level check.
+#
+# configure_logging() (called once by each entry point: api_server, asgi_server, main, app) attaches a
+# QueueHandler to the "krishi_mitra" logger. Request threads and the event loop only put records on a bounded
+# queue; a background QueueListener thread formats and writes them to stderr. When the queue is full, records
+# are dropped and counted rather than blocking a request.
+#
+# Records carry the request id of the request they belong to (request_context()), so every line of one /ask
+# can be grepped together. DEBUG records are sampled per request: with LOG_DEBUG_SAMPLE_RATE = 0.01, one
+# request in a hundred has its complete debug trace written and the rest have none.
+# Without configure_logging() (tests, benchmarks, library use) the stdlib defaults apply: WARNING and above
+# go to stderr, synchronously.
+
+ROOT_LOGGER_NAME = "krishi_mitra"
+
+_request_id = contextvars.ContextVar("request_id", default=None)
+_debug_sampled = contextvars.ContextVar("debug_sampled", default=None) # None outside a request: sample per record
+
+_DROPPED_RECORDS = metrics.counter("krishi_mitra_log_records_dropped_total",
+                                   "Log records dropped because the log queue was full.")
+
+
+def get_logger(name):
+    """The logger for a module, under the "krishi_mitra" hierarchy ("api_server" -> "krishi_mitra.api_server")."""
+    return logging.getLogger(name if name.startswith(ROOT_LOGGER_NAME) else f"{ROOT_LOGGER_NAME}.{name}")
+
+
+def current_request_id():
+    """The id of the request being handled in this thread / task, or None."""
+    return _request_id.get()
+
+
+_VALID_REQUEST_ID = re.compile(r"[A-Za-z0-9._:-]{1,64}") # Client ids are echoed in a header and the logs, so keep them tame
+
+def new_request_id():
+    return uuid.uuid4().hex[:16]
+
+
+@contextmanager
+def request_context(request_id=None, sample_rate=None):
+    """
+    Tags every record logged inside the block (including from asyncio tasks started in it) with request_id,
+    and decides once whether this request's DEBUG records are kept.
+    Args:
+        request_id (str, optional): E.g. the client's X-Request-ID; a new id is generated if it is missing or malformed.
+        sample_rate (float, optional): Defaults to settings.LOG_DEBUG_SAMPLE_RATE.
+    Yields:
+        str: The request id.
+    """
+    if not request_id or not _VALID_REQUEST_ID.fullmatch(request_id):
+        request_id = new_request_id()
+    rate = settings.LOG_DEBUG_SAMPLE_RATE if sample_rate is None else sample_rate
+    id_token = _request_id.set(request_id)
+    sampled_token = _debug_sampled.set(rate >= 1.0 or random.random() < rate)
+    try:
+        yield request_id
+    finally:
+        _debug_sampled.reset(sampled_token)
+        _request_id.reset(id_token)
+
+
+class RequestContextFilter(logging.Filter):
+    """Adds record.request_id and drops DEBUG records of requests not sampled for debug logging."""
+
+    def __init__(self, sample_rate=1.0):
+        super().__init__()
+        self.sample_rate = sample_rate
+
+    def filter(self, record):
+        record.request_id = _request_id.get()
+        if record.levelno <= logging.DEBUG:
+            sampled = _debug_sampled.get()
+            if sampled is None:
+                sampled = self.sample_rate >= 1.0 or random.random() < self.sample_rate
+            return sampled
+        return True
+
+
+class DroppingQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler that drops (and counts) records when the queue is full instead of raising or blocking."""
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            _DROPPED_RECORDS.inc()
+
+
+# Attributes every LogRecord has; anything else on a record came from extra={...}
+_STANDARD_RECORD_ATTRIBUTES = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime", "request_id"}
+
+def _extra_fields(record):
+    return {key: value for key, value in vars(record).items() if key not in _STANDARD_RECORD_ATTRIBUTES}
+
+
+class TextFormatter(logging.Formatter):
+    """time LEVEL logger [request id] message key=value ..."""
+
+    def __init__(self):
+        super().__init__("%(asctime)s %(levelname)s %(name)s [%(request_id)s] %(message)s")
+
+    def format(self, record):
+        if not hasattr(record, "request_id"):
+            record.request_id = None
+        text = super().format(record)
+        fields = _extra_fields(record)
+        if fields:
+            text += " " + " ".join(f"{key}={value!r}" for key, value in fields.items())
+        return text
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per record: ts, level, logger, request_id, message, plus any extra fields."""
+
+    def format(self, record):
+        entry = {
+            "ts": time.strftime("%Y-%m-%dT%H:%M:%S", time.gmtime(record.created)) + f".{int(record.msecs):03d}Z",
+            "level": record.levelname,
+            "logger": record.name,
+            "request_id": getattr(record, "request_id", None),
+            "message": record.getMessage(),
+        }
+        entry.update(_extra_fields(record))
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry["exception"] = record.exc_text
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+FORMATTERS = {"text": TextFormatter, "json": JsonFormatter}
+
+
+class _StderrHandler(logging.StreamHandler):
+    """Writes to whatever sys.stderr is at the time of each record (it may be replaced, e.g. by test runners)."""
+
+    def __init__(self):
+        super().__init__(sys.stderr)
+
+    @property
+    def stream(self):
+        return sys.stderr
+
+    @stream.setter
+    def stream(self, value):
+        pass
+
+_listener = None
+_queue_handler = None
+_fork_hook_registered = False
+
+def configure_logging(level=None, log_format=None, sample_rate=None, queue_size=None, stream=None):
+    """
+    Routes the "krishi_mitra" loggers through a bounded queue to a background writer thread.
+    Calling it again while configured does nothing. Arguments default to the LOG_* settings.
+    Args:
+        level (str or int): Minimum level written.
+        log_format (str): "text" or "json".
+        sample_rate (float): Share of requests (or, outside requests, of records) whose DEBUG records are written.
+        queue_size (int): Records that may wait for the writer before new ones are dropped.
+        stream: Where the writer thread writes (default sys.stderr).
+    """
+    global _listener, _queue_handler, _fork_hook_registered
+    if _listener is not None:
+        return
+    log_format = log_format or settings.LOG_FORMAT
+    if log_format not in FORMATTERS:
+        raise ValueError(f"Unknown log format: {log_format!r} (expected one of {sorted(FORMATTERS)})")
+    log_queue = queue.Queue(maxsize=queue_size or settings.LOG_QUEUE_SIZE)
+
+    _queue_handler = DroppingQueueHandler(log_queue)
+    _queue_handler.addFilter(RequestContextFilter(settings.LOG_DEBUG_SAMPLE_RATE if sample_rate is None else sample_rate))
+    root = logging.getLogger(ROOT_LOGGER_NAME)
+    root.setLevel(level or settings.LOG_LEVEL)
+    root.addHandler(_queue_handler)
+    root.propagate = False # Keep our records out of other libraries' root handlers (e.g. uvicorn's, Flask's)
+
+    writer = logging.StreamHandler(stream) if stream is not None else _StderrHandler()
+    writer.setFormatter(FORMATTERS[log_format]())
+    _listener = logging.handlers.QueueListener(log_queue, writer)
+    _listener.start()
+    atexit.register(shutdown_logging)
+    if not _fork_hook_registered and hasattr(os, "register_at_fork"):
+        # Threads do not survive fork: the workers of a pre-fork server (gunicorn --preload) each restart the writer
+        os.register_at_fork(after_in_child=_restart_writer_after_fork)
+        _fork_hook_registered = True
+
+    settings_logger = get_logger("config.settings")
+    for message in settings.describe():
+        settings_logger.debug(message)
+
+
+def _restart_writer_after_fork():
+    if _listener is not None:
+        _listener._thread = None # The parent's writer thread is gone in the child
+        _listener.start()
+
+
+def shutdown_logging():
+    """Writes out everything still queued, stops the writer thread and detaches the queue handler."""
+    global _listener, _queue_handler
+    if _listener is None:
+        return
+    _listener.stop()
+    root = logging.getLogger(ROOT_LOGGER_NAME)
+    root.removeHandler(_queue_handler)
+    root.propagate = True
+    root.setLevel(logging.NOTSET)
+    _listener = _queue_handler = None
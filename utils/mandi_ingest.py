@@ -0,0 +1,213 @@
+"""
+Streams a mandi price CSV dump into the SQLite price store (utils/mandi_price_db.py).
+
+The file is read row by row and written in fixed-size chunks, one transaction per chunk, so memory
+stays flat however large the dump is. Re-ingesting a dump (or overlapping daily dumps) is safe:
+rows are keyed on (crop, mandi, date) and a later row for the same day replaces the earlier one.
+
+    python -m utils.mandi_ingest data/knowledge_base/mandi_prices.csv
+    python -m utils.mandi_ingest agmarknet_dump.csv --db /var/lib/krishi/mandi_prices.sqlite3 --chunk-size 50000
+
+Besides the repo's own columns (date, mandi, crop, min_price, max_price, modal_price) the common
+Agmarknet export headers (Arrival_Date, Market, Commodity, Min_x0020_Price, ...) are recognised.
+"""
+import argparse
+import csv
+import os
+import time
+import unicodedata
+from collections import namedtuple
+from datetime import datetime, timezone
+from functools import lru_cache
+
+from config import settings
+from utils import log
+from utils import mandi_price_db
+from utils.price_index import parse_price
+
+logger = log.get_logger(__name__)
+
+DEFAULT_CHUNK_SIZE = 10000
+
+# Our column -> header names accepted for it (compared case-insensitively, spaces and "_x0020_" as "_")
+COLUMN_ALIASES = {
+    "date": ("date", "arrival_date", "price_date"),
+    "mandi": ("mandi", "market", "market_name", "mandi_name"),
+    "crop": ("crop", "commodity", "commodity_name", "crop_name"),
+    "min_price": ("min_price", "minimum_price"),
+    "max_price": ("max_price", "maximum_price"),
+    "modal_price": ("modal_price", "price"),
+}
+REQUIRED_COLUMNS = ("date", "mandi", "crop", "modal_price")
+DATE_FORMATS = ("%d-%m-%Y", "%d/%m/%Y", "%Y-%m-%d")
+
+IngestReport = namedtuple("IngestReport", ["rows_read", "rows_written", "rows_skipped", "seconds"])
+
+# Chandrabindu is written as anusvara in our data ("गेहूँ" -> "गेहूं"); zero-width joiners carry no meaning here
+_NAME_TRANSLATION = str.maketrans({"ँ": "ं", "‌": None, "‍": None})
+
+
+@lru_cache(maxsize=65536)
+def normalize_name(name):
+    """Unicode NFC, spelling-variant folding and whitespace cleanup for a Hindi crop or mandi name."""
+    return " ".join(unicodedata.normalize("NFC", name).translate(_NAME_TRANSLATION).split())
+
+
+@lru_cache(maxsize=65536)
+def normalize_mandi_name(name):
+    """normalize_name plus the " मंडी" suffix the knowledge base uses ("कानपुर" -> "कानपुर मंडी")."""
+    name = normalize_name(name)
+    if name and not name.endswith("मंडी"):
+        name += " मंडी"
+    return name
+
+
+@lru_cache(maxsize=16384)
+def parse_dump_date(date_text):
+    """Any of DATE_FORMATS -> ISO 'YYYY-MM-DD'; None if it does not parse. Cached: a dump repeats each day's date on every row."""
+    date_text = date_text.strip()
+    for date_format in DATE_FORMATS:
+        try:
+            return datetime.strptime(date_text, date_format).date().isoformat()
+        except ValueError:
+            continue
+    return None
+
+
+def _column_positions(header):
+    """Maps our column names to positions in the CSV header. Raises ValueError if a required column is missing."""
+    normalized = [h.strip().lower().replace("_x0020_", "_").replace(" ", "_") for h in header]
+    positions = {}
+    for column, aliases in COLUMN_ALIASES.items():
+        for alias in aliases:
+            if alias in normalized:
+                positions[column] = normalized.index(alias)
+                break
+    missing = [column for column in REQUIRED_COLUMNS if column not in positions]
+    if missing:
+        raise ValueError(f"CSV header {header} has no column for {missing}")
+    return positions
+
+
+def _write_chunk(connection, rows):
+    """Writes one chunk of (crop, mandi, date, min, max, modal) rows and advances latest_mandi_prices, in one transaction."""
+    latest = {}
+    for row in rows:
+        key = (row[0], row[1])
+        if key not in latest or row[2] >= latest[key][2]:
+            latest[key] = row
+    with connection:
+        connection.executemany(
+            "INSERT OR REPLACE INTO mandi_prices (crop, mandi, date, min_price, max_price, modal_price)"
+            " VALUES (?, ?, ?, ?, ?, ?)", rows)
+        connection.executemany(
+            "INSERT INTO latest_mandi_prices (crop, mandi, date, modal_price) VALUES (?, ?, ?, ?)"
+            " ON CONFLICT (crop, mandi) DO UPDATE SET date = excluded.date, modal_price = excluded.modal_price"
+            " WHERE excluded.date >= latest_mandi_prices.date",
+            [(crop, mandi, day, modal) for crop, mandi, day, _, _, modal in latest.values()])
+
+
+def ingest_csv(csv_path, db_path, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Streams csv_path into the price database at db_path.
+    Args:
+        csv_path (str): The CSV dump (UTF-8, with a header row).
+        db_path (str): The SQLite database; created if it does not exist.
+        chunk_size (int): Rows per insert transaction.
+    Returns:
+        IngestReport: Row counts and elapsed time. Rows with an unparseable date or modal price, or an
+                      empty mandi/crop name, are counted as skipped.
+    """
+    started = time.perf_counter()
+    rows_read = rows_written = rows_skipped = 0
+    stat = os.stat(csv_path)
+    connection = mandi_price_db.connect(db_path)
+    connection.execute("PRAGMA synchronous=NORMAL") # Safe with WAL; the dump can always be ingested again
+    try:
+        with open(csv_path, "r", encoding="utf-8-sig", newline="") as f:
+            reader = csv.reader(f)
+            positions = _column_positions(next(reader, []))
+            date_at, mandi_at, crop_at, modal_at = (positions[c] for c in REQUIRED_COLUMNS)
+            min_at, max_at = positions.get("min_price"), positions.get("max_price")
+            width = max(positions.values()) + 1
+
+            chunk = []
+            for record in reader:
+                rows_read += 1
+                if len(record) < width:
+                    rows_skipped += 1
+                    continue
+                day = parse_dump_date(record[date_at])
+                modal_price = parse_price(record[modal_at])
+                mandi, crop = normalize_mandi_name(record[mandi_at]), normalize_name(record[crop_at])
+                if day is None or modal_price is None or not mandi or not crop:
+                    rows_skipped += 1
+                    continue
+                min_price = parse_price(record[min_at]) if min_at is not None else None
+                max_price = parse_price(record[max_at]) if max_at is not None else None
+                chunk.append((crop, mandi, day,
+                              modal_price if min_price is None else min_price,
+                              modal_price if max_price is None else max_price,
+                              modal_price))
+                if len(chunk) >= chunk_size:
+                    _write_chunk(connection, chunk)
+                    rows_written += len(chunk)
+                    chunk = []
+            if chunk:
+                _write_chunk(connection, chunk)
+                rows_written += len(chunk)
+
+        with connection:
+            connection.execute(
+                "INSERT OR REPLACE INTO ingest_log (source, size, mtime_ns, rows_written, ingested_at) VALUES (?, ?, ?, ?, ?)",
+                (os.path.abspath(csv_path), stat.st_size, stat.st_mtime_ns, rows_written,
+                 datetime.now(timezone.utc).isoformat(timespec="seconds")))
+        # Fold the WAL into the main file so its mtime changes and the knowledge base watcher picks the new prices up
+        connection.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+    finally:
+        connection.close()
+
+    report = IngestReport(rows_read, rows_written, rows_skipped, time.perf_counter() - started)
+    logger.debug("Ingested %s -> %s: %s", csv_path, db_path, report)
+    return report
+
+
+def is_ingested(csv_path, db_path):
+    """True if csv_path, as it is on disk now (same size and mtime), was already ingested into db_path."""
+    if not os.path.exists(db_path):
+        return False
+    stat = os.stat(csv_path)
+    connection = mandi_price_db.connect(db_path)
+    try:
+        row = connection.execute("SELECT size, mtime_ns FROM ingest_log WHERE source = ?",
+                                 (os.path.abspath(csv_path),)).fetchone()
+    finally:
+        connection.close()
+    return row == (stat.st_size, stat.st_mtime_ns)
+
+
+def ingest_if_changed(csv_path, db_path, chunk_size=DEFAULT_CHUNK_SIZE):
+    """Runs ingest_csv unless this exact file was already ingested. Returns the IngestReport, or None if skipped."""
+    if is_ingested(csv_path, db_path):
+        return None
+    return ingest_csv(csv_path, db_path, chunk_size)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Stream a mandi price CSV dump into the SQLite price store")
+    parser.add_argument("csv_path", nargs="?", default=settings.MANDI_PRICE_HISTORY_FILE)
+    parser.add_argument("--db", default=settings.MANDI_PRICE_DB_FILE, help="SQLite database (default: settings.MANDI_PRICE_DB_FILE)")
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE)
+    parser.add_argument("--force", action="store_true", help="Ingest even if this file was already ingested unchanged")
+    args = parser.parse_args()
+    log.configure_logging()
+
+    if args.force:
+        result = ingest_csv(args.csv_path, args.db, args.chunk_size)
+    else:
+        result = ingest_if_changed(args.csv_path, args.db, args.chunk_size)
+    if result is None:
+        print(f"{args.csv_path} is already ingested into {args.db}; use --force to ingest it again.")
+    else:
+        print(f"Ingested {result.rows_written} of {result.rows_read} rows ({result.rows_skipped} skipped) "
+              f"into {args.db} in {result.seconds:.1f}s")
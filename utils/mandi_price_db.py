@@ -0,0 +1,148 @@
+import os
+import sqlite3
+import threading
+from contextlib import closing
+from datetime import date, timedelta
+
+from utils.price_history import PriceSeries, series_window_stats
+
+# --- SQLite Mandi Price Store ---
+# Written by utils/mandi_ingest.py, read here. Every daily price is a row of mandi_prices, whose primary key
+# (crop, mandi, date) doubles as the lookup index. latest_mandi_prices keeps the newest row per (crop, mandi)
+# so answering "current price" questions, and building the knowledge base at startup, costs the number of
+# series rather than the number of rows. Dates are ISO text (YYYY-MM-DD), which sorts chronologically.
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS mandi_prices (
+    crop TEXT NOT NULL,
+    mandi TEXT NOT NULL,
+    date TEXT NOT NULL,
+    min_price REAL NOT NULL,
+    max_price REAL NOT NULL,
+    modal_price REAL NOT NULL,
+    PRIMARY KEY (crop, mandi, date)
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS latest_mandi_prices (
+    crop TEXT NOT NULL,
+    mandi TEXT NOT NULL,
+    date TEXT NOT NULL,
+    modal_price REAL NOT NULL,
+    UNIQUE (crop, mandi)
+);
+
+CREATE TABLE IF NOT EXISTS ingest_log (
+    source TEXT PRIMARY KEY,
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    rows_written INTEGER NOT NULL,
+    ingested_at TEXT NOT NULL
+);
+"""
+
+PRICE_UNIT = "रुपये प्रति क्विंटल"
+
+
+def connect(db_path):
+    """Opens the price database, creating the tables if needed."""
+    connection = sqlite3.connect(db_path, timeout=30)
+    connection.execute("PRAGMA journal_mode=WAL") # Readers keep answering while an ingest is writing
+    connection.executescript(SCHEMA)
+    return connection
+
+
+def format_price(price):
+    """2250.0 -> '2250 रुपये प्रति क्विंटल' (the display format of mandi_prices.json)."""
+    return f"{price:.0f} {PRICE_UNIT}" if float(price).is_integer() else f"{price:.2f} {PRICE_UNIT}"
+
+
+def load_latest_prices(db_path):
+    """
+    Reads the newest price of every crop in every mandi, in the shape of mandi_prices.json.
+    Args:
+        db_path (str): The SQLite database written by utils/mandi_ingest.py.
+    Returns:
+        dict: {mandi: {crop: {"price": ..., "last_updated": "DD-MM-YYYY"}}}, mandis and crops in the order
+              they were first ingested; None if the database does not exist.
+    """
+    if not os.path.exists(db_path):
+        return None
+    with closing(connect(db_path)) as connection:
+        rows = connection.execute(
+            "SELECT mandi, crop, date, modal_price FROM latest_mandi_prices ORDER BY rowid").fetchall()
+    mandi_price_data = {}
+    for mandi, crop, date_text, modal_price in rows:
+        mandi_price_data.setdefault(mandi, {})[crop] = {
+            "price": format_price(modal_price),
+            "last_updated": date.fromisoformat(date_text).strftime("%d-%m-%Y"),
+        }
+    return mandi_price_data
+
+
+class SqlitePriceHistory:
+    """
+    PriceHistory backed by the SQLite store instead of in-memory arrays: every window query is a few
+    index seeks on (crop, mandi, date), so memory and startup time do not grow with the history.
+    Connections are per thread (and re-opened after a fork).
+    """
+
+    def __init__(self, db_path):
+        self.db_path = db_path
+        self._local = threading.local()
+        self._series_count = self._connection().execute("SELECT COUNT(*) FROM latest_mandi_prices").fetchone()[0]
+
+    def _connection(self):
+        local = self._local
+        if getattr(local, "pid", None) != os.getpid():
+            local.connection = connect(self.db_path)
+            local.connection.execute("PRAGMA query_only=1")
+            local.pid = os.getpid()
+        return local.connection
+
+    def __len__(self):
+        return self._series_count
+
+    def series(self, mandi, crop, start_date=None, end_date=None):
+        """The PriceSeries for a crop in a mandi (optionally only start_date..end_date, ISO strings), or None."""
+        rows = self._connection().execute(
+            "SELECT date, min_price, max_price, modal_price FROM mandi_prices"
+            " WHERE crop = ? AND mandi = ? AND date >= ? AND date <= ? ORDER BY date",
+            (crop, mandi, start_date or "", end_date or "9999-12-31")).fetchall()
+        if not rows:
+            return None
+        return PriceSeries([date.fromisoformat(row[0]).toordinal() for row in rows],
+                           [row[1] for row in rows], [row[2] for row in rows], [row[3] for row in rows])
+
+    def mandis_for_crop(self, crop):
+        """Mandis that have history for a crop, in the order they were first ingested."""
+        rows = self._connection().execute(
+            "SELECT mandi FROM latest_mandi_prices WHERE crop = ? ORDER BY rowid", (crop,)).fetchall()
+        return [row[0] for row in rows]
+
+    def window_stats(self, mandi, crop, days=7, as_of=None):
+        """Same as PriceHistory.window_stats, reading only the window (plus the row before it) from the database."""
+        connection = self._connection()
+        if as_of is None:
+            end_date = connection.execute(
+                "SELECT MAX(date) FROM mandi_prices WHERE crop = ? AND mandi = ?", (crop, mandi)).fetchone()[0]
+            if end_date is None:
+                return None
+            as_of = date.fromisoformat(end_date)
+        window_start = (as_of - timedelta(days=days - 1)).isoformat()
+        previous_date = connection.execute(
+            "SELECT MAX(date) FROM mandi_prices WHERE crop = ? AND mandi = ? AND date < ?",
+            (crop, mandi, window_start)).fetchone()[0]
+        series = self.series(mandi, crop, previous_date or window_start, as_of.isoformat())
+        return series_window_stats(series, mandi, crop, days, as_of)
+
+    def crop_window_stats(self, crop, days=7, as_of=None):
+        """window_stats for every mandi that has history for a crop (mandis without prices in the window are left out)."""
+        stats = (self.window_stats(mandi, crop, days, as_of) for mandi in self.mandis_for_crop(crop))
+        return [s for s in stats if s is not None]
+
+
+def open_price_history(db_path):
+    """Returns a SqlitePriceHistory for db_path, or None if the database does not exist."""
+    if not os.path.exists(db_path):
+        return None
+    return SqlitePriceHistory(db_path)
@@ -0,0 +1,251 @@
+import bisect
+import logging
+import threading
+
+# Not utils.log.get_logger: utils.log itself records a metric, so it imports this module
+logger = logging.getLogger("krishi_mitra.utils.metrics")
+
+# --- Metrics ---
+# In-process counters and latency histograms, rendered in the Prometheus text exposition format by the
+# /metrics endpoint of api_server.py and asgi_server.py. Recording is a dict lookup, a bisect and a short
+# lock, so it stays on in production. Each worker process has its own numbers; Prometheus scrapes every
+# worker (or sums them per instance) as usual for a pre-fork server.
+#
+# Metrics are created once at import time by the module they instrument, e.g.
+#   STAGE_SECONDS = metrics.histogram("krishi_mitra_stage_duration_seconds", "...", ("stage",))
+#   NLU_SECONDS = STAGE_SECONDS.labels("nlu")   # resolve the labels once for a hot path
+#   NLU_SECONDS.observe(time.perf_counter() - started)
+# Values that already live elsewhere (session store size, cache counters) are read at scrape time by a
+# collector registered with register_collector().
+
+# Latency buckets (seconds) from tens of microseconds (NLU, intent handlers) up to the weather API time budget
+DEFAULT_LATENCY_BUCKETS = (0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05,
+                           0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class _CounterChild:
+    __slots__ = ("value", "_lock")
+
+    def __init__(self):
+        self.value = 0.0
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1.0):
+        with self._lock:
+            self.value += amount
+
+
+class _HistogramChild:
+    __slots__ = ("_bounds", "_counts", "sum", "count", "_lock")
+
+    def __init__(self, bounds):
+        self._bounds = bounds
+        self._counts = [0] * (len(bounds) + 1) # Per bucket (not cumulative); the last one is +Inf
+        self.sum = 0.0
+        self.count = 0
+        self._lock = threading.Lock()
+
+    def observe(self, value):
+        index = bisect.bisect_left(self._bounds, value) # Buckets are "less than or equal to" their bound
+        with self._lock:
+            self._counts[index] += 1
+            self.sum += value
+            self.count += 1
+
+    def snapshot(self):
+        """Returns (cumulative bucket counts, sum, count)."""
+        with self._lock:
+            counts, total, count = list(self._counts), self.sum, self.count
+        cumulative, running = [], 0
+        for bucket_count in counts:
+            running += bucket_count
+            cumulative.append(running)
+        return cumulative, total, count
+
+
+class _Metric:
+    """A metric family: one child (the actual numbers) per combination of label values."""
+    kind = None
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children = {}
+        self._lock = threading.Lock()
+        if not self.labelnames:
+            self._unlabelled = self.labels()
+
+    def _new_child(self):
+        raise NotImplementedError
+
+    def labels(self, *values):
+        """The child for these label values (in labelnames order), created on first use."""
+        if len(values) != len(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {values}")
+        key = tuple(str(value) for value in values)
+        child = self._children.get(key)
+        if child is None:
+            with self._lock:
+                child = self._children.setdefault(key, self._new_child())
+        return child
+
+    def _label_text(self, values, extra=""):
+        pairs = [f'{name}="{_escape(value)}"' for name, value in zip(self.labelnames, values)]
+        if extra:
+            pairs.append(extra)
+        return "{" + ",".join(pairs) + "}" if pairs else ""
+
+    def _samples(self):
+        with self._lock:
+            return sorted(self._children.items())
+
+    def render(self):
+        lines = [f"# HELP {self.name} {_escape_help(self.documentation)}", f"# TYPE {self.name} {self.kind}"]
+        lines.extend(self._render_samples())
+        return lines
+
+
+class Counter(_Metric):
+    """A count that only goes up (requests served, errors, reloads)."""
+    kind = "counter"
+
+    def _new_child(self):
+        return _CounterChild()
+
+    def inc(self, amount=1.0):
+        self._unlabelled.inc(amount)
+
+    def _render_samples(self):
+        return [f"{self.name}{self._label_text(values)} {_format_value(child.value)}" for values, child in self._samples()]
+
+
+class Histogram(_Metric):
+    """Latency distribution in fixed buckets, with the sum and count of all observations."""
+    kind = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_LATENCY_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        super().__init__(name, documentation, labelnames)
+
+    def _new_child(self):
+        return _HistogramChild(self.buckets)
+
+    def observe(self, value):
+        self._unlabelled.observe(value)
+
+    def _render_samples(self):
+        lines = []
+        bounds = [_format_value(bound) for bound in self.buckets] + ["+Inf"]
+        for values, child in self._samples():
+            cumulative, total, count = child.snapshot()
+            for bound, bucket_count in zip(bounds, cumulative):
+                le = 'le="' + bound + '"'
+                lines.append(f"{self.name}_bucket{self._label_text(values, le)} {bucket_count}")
+            lines.append(f"{self.name}_sum{self._label_text(values)} {_format_value(total)}")
+            lines.append(f"{self.name}_count{self._label_text(values)} {count}")
+        return lines
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _escape_help(text):
+    return text.replace("\\", "\\\\").replace("\n", "\\n")
+
+def _format_value(value):
+    if isinstance(value, float) and value.is_integer() and abs(value) < 1e15:
+        return str(int(value))
+    return repr(value) if isinstance(value, float) else str(value)
+
+
+# --- Registry ---
+
+_metrics = {}    # name -> Counter/Histogram
+_collectors = [] # Functions returning [(name, kind, documentation, [(labels dict, value), ...]), ...]
+_registry_lock = threading.Lock()
+
+def _register(metric):
+    with _registry_lock:
+        existing = _metrics.get(metric.name)
+        if existing is not None:
+            # Re-importing an instrumented module (e.g. in tests) reuses the metric instead of failing
+            if type(existing) is not type(metric) or existing.labelnames != metric.labelnames:
+                raise ValueError(f"Metric {metric.name} is already registered with a different type or labels")
+            return existing
+        _metrics[metric.name] = metric
+        return metric
+
+def counter(name, documentation, labelnames=()):
+    """Creates (or returns the already registered) Counter called name."""
+    return _register(Counter(name, documentation, labelnames))
+
+def histogram(name, documentation, labelnames=(), buckets=DEFAULT_LATENCY_BUCKETS):
+    """Creates (or returns the already registered) Histogram called name."""
+    return _register(Histogram(name, documentation, labelnames, buckets))
+
+def register_collector(collect):
+    """
+    Registers collect() to be called on every scrape, for values owned by another object.
+    Args:
+        collect (callable): Returns a list of (name, kind, documentation, samples) tuples, where kind is
+            "gauge" or "counter" and samples is a list of (labels dict, value) pairs.
+    Returns:
+        callable: collect, so this can be used as a decorator.
+    """
+    with _registry_lock:
+        if collect not in _collectors:
+            _collectors.append(collect)
+    return collect
+
+def get_metric(name):
+    """The registered Counter or Histogram called name, or None."""
+    return _metrics.get(name)
+
+# Time spent in each processing stage of a query, across modules (nlu, intent, weather_prefetch, session_load, ...)
+_stage_seconds = histogram("krishi_mitra_stage_duration_seconds", "Time spent in one processing stage of a query.", ("stage",))
+
+def stage_timer(stage):
+    """The histogram child for stage; modules resolve it once at import and observe() durations on it."""
+    return _stage_seconds.labels(stage)
+
+# Request metrics of the Flask and ASGI servers; route is the URL rule (not the raw path, to keep label values bounded)
+REQUEST_SECONDS = histogram("krishi_mitra_http_request_duration_seconds", "Time to answer one HTTP request.", ("route",))
+REQUESTS_TOTAL = counter("krishi_mitra_http_requests_total", "HTTP requests answered.", ("route", "method", "status"))
+
+def record_request(route, method, status, seconds):
+    """Records one answered request in the request metrics."""
+    REQUEST_SECONDS.labels(route).observe(seconds)
+    REQUESTS_TOTAL.labels(route, method, status).inc()
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+def render_metrics():
+    """
+    All registered metrics and collector values in the Prometheus text exposition format.
+    Collector samples with the same metric name are merged into one family (e.g. the sync and async
+    weather caches). A collector that raises is skipped (and logged as a warning), so one broken
+    source does not take the whole endpoint down.
+    """
+    lines = []
+    with _registry_lock:
+        metrics_list, collectors = [_metrics[name] for name in sorted(_metrics)], list(_collectors)
+    for metric in metrics_list:
+        lines.extend(metric.render())
+
+    families = {} # name -> (kind, documentation, samples), in first-seen order
+    for collect in collectors:
+        try:
+            collected = collect()
+        except Exception as e:
+            logger.warning("Collector %s failed: %s", collect.__name__, e)
+            continue
+        for name, kind, documentation, samples in collected:
+            families.setdefault(name, (kind, documentation, []))[2].extend(samples)
+    for name, (kind, documentation, samples) in families.items():
+        lines.append(f"# HELP {name} {_escape_help(documentation)}")
+        lines.append(f"# TYPE {name} {kind}")
+        for labels, value in samples:
+            label_text = ",".join(f'{key}="{_escape(val)}"' for key, val in labels.items())
+            lines.append(f"{name}{{{label_text}}} {_format_value(value)}" if label_text else f"{name} {_format_value(value)}")
+    return "\n".join(lines) + "\n"
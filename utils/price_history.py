@@ -0,0 +1,147 @@
+from collections import namedtuple
+from datetime import date
+
+import numpy as np
+
+from utils.price_index import parse_price, parse_price_date
+
+# Columns of the mandi price history CSV (one row per mandi, crop and trading day; prices in rupees per quintal).
+# min_price/max_price may be left empty, in which case the modal price is used for them.
+PRICE_HISTORY_COLUMNS = ["date", "mandi", "crop", "min_price", "max_price", "modal_price"]
+
+# Aggregates over one window of a series. `previous_price` is the last modal price before the window
+# (or the first one inside it if the series starts within the window); change_percent is measured from it.
+PriceWindowStats = namedtuple("PriceWindowStats", [
+    "mandi", "crop", "days", "start_date", "end_date", "observations",
+    "min_price", "max_price", "mean_price", "modal_price", "previous_price", "change_percent",
+])
+
+
+class PriceSeries:
+    """
+    Daily prices of one crop in one mandi, stored as parallel NumPy arrays sorted by day.
+    `days` holds proleptic Gregorian ordinals (date.toordinal()); prices are float32, which is
+    exact for whole rupees and keeps a year of one series under 6 KB.
+    """
+    __slots__ = ("days", "min_prices", "max_prices", "modal_prices")
+
+    def __init__(self, days, min_prices, max_prices, modal_prices):
+        days = np.asarray(days, dtype=np.int32)
+        order = np.argsort(days, kind="stable")
+        days = days[order]
+        # The same day reported twice: keep the row that came last in the input
+        keep = np.append(days[1:] != days[:-1], True) if len(days) else np.zeros(0, dtype=bool)
+        self.days = days[keep]
+        self.min_prices = np.asarray(min_prices, dtype=np.float32)[order][keep]
+        self.max_prices = np.asarray(max_prices, dtype=np.float32)[order][keep]
+        self.modal_prices = np.asarray(modal_prices, dtype=np.float32)[order][keep]
+        for array in (self.days, self.min_prices, self.max_prices, self.modal_prices):
+            array.flags.writeable = False # Shared by every request; never modified after loading
+
+    def __len__(self):
+        return len(self.days)
+
+    def window_bounds(self, days, as_of=None):
+        """
+        Returns (previous, start, end) array positions for the `days`-day window ending at as_of
+        (default: the series' latest day). previous is start - 1, or start if nothing precedes the window.
+        """
+        end_day = int(self.days[-1]) if as_of is None else as_of.toordinal()
+        end = int(np.searchsorted(self.days, end_day, side="right"))
+        start = int(np.searchsorted(self.days, end_day - days + 1, side="left"))
+        return max(start - 1, 0), start, end
+
+
+def series_window_stats(series, mandi, crop, days=7, as_of=None):
+    """Aggregates the `days`-day window of one PriceSeries (see PriceHistory.window_stats)."""
+    if series is None or not len(series):
+        return None
+    previous, start, end = series.window_bounds(days, as_of)
+    if start >= end:
+        return None
+    modal_prices = series.modal_prices[start:end]
+    modal_price = float(modal_prices[-1])
+    previous_price = float(series.modal_prices[previous])
+    change_percent = (modal_price - previous_price) / previous_price * 100.0 if previous_price else 0.0
+    return PriceWindowStats(
+        mandi, crop, days,
+        date.fromordinal(int(series.days[start])), date.fromordinal(int(series.days[end - 1])), end - start,
+        float(series.min_prices[start:end].min()), float(series.max_prices[start:end].max()),
+        float(modal_prices.mean()), modal_price, previous_price, change_percent,
+    )
+
+
+class PriceHistory:
+    """
+    In-memory mandi price history: one PriceSeries per (mandi, crop).
+
+    Window queries are two binary searches plus NumPy reductions over the window slice, so they cost
+    microseconds regardless of how many years of history are loaded.
+    """
+
+    def __init__(self, series=None):
+        self._series = dict(series or {}) # (mandi, crop) -> PriceSeries
+        self._mandis_by_crop = {}
+        for mandi, crop in self._series:
+            self._mandis_by_crop.setdefault(crop, []).append(mandi)
+
+    @classmethod
+    def from_rows(cls, rows):
+        """
+        Builds the history from dict rows with the PRICE_HISTORY_COLUMNS keys (e.g. a csv.DictReader).
+        Rows whose date or modal price does not parse are skipped.
+        Returns:
+            tuple: (PriceHistory, number of skipped rows)
+        """
+        columns = {} # (mandi, crop) -> ([days], [min], [max], [modal])
+        ordinals = {} # Dates repeat on every row of a day; parse each distinct string once
+        skipped = 0
+        for row in rows:
+            date_text = row.get("date")
+            day = ordinals.get(date_text)
+            if day is None:
+                parsed = parse_price_date(date_text)
+                day = ordinals[date_text] = parsed.toordinal() if parsed else -1
+            modal_price = parse_price(row.get("modal_price"))
+            mandi, crop = (row.get("mandi") or "").strip(), (row.get("crop") or "").strip()
+            if day < 0 or modal_price is None or not mandi or not crop:
+                skipped += 1
+                continue
+            min_price = parse_price(row.get("min_price"))
+            max_price = parse_price(row.get("max_price"))
+            series_columns = columns.get((mandi, crop))
+            if series_columns is None:
+                series_columns = columns[(mandi, crop)] = ([], [], [], [])
+            series_columns[0].append(day)
+            series_columns[1].append(modal_price if min_price is None else min_price)
+            series_columns[2].append(modal_price if max_price is None else max_price)
+            series_columns[3].append(modal_price)
+        series = {key: PriceSeries(*series_columns) for key, series_columns in columns.items()}
+        return cls(series), skipped
+
+    def __len__(self):
+        return len(self._series)
+
+    def series(self, mandi, crop):
+        """The PriceSeries for a crop in a mandi, or None."""
+        return self._series.get((mandi, crop))
+
+    def mandis_for_crop(self, crop):
+        """Mandis that have history for a crop, in the order they first appear in the data."""
+        return list(self._mandis_by_crop.get(crop, ()))
+
+    def window_stats(self, mandi, crop, days=7, as_of=None):
+        """
+        Aggregates the last `days` days of a series.
+        Args:
+            days (int): Window length in calendar days, counted back from as_of (inclusive).
+            as_of (date, optional): Last day of the window; defaults to the latest day in the series.
+        Returns:
+            PriceWindowStats, or None if the series does not exist or has no prices in the window.
+        """
+        return series_window_stats(self._series.get((mandi, crop)), mandi, crop, days, as_of)
+
+    def crop_window_stats(self, crop, days=7, as_of=None):
+        """window_stats for every mandi that has history for a crop (mandis without prices in the window are left out)."""
+        stats = (self.window_stats(mandi, crop, days, as_of) for mandi in self._mandis_by_crop.get(crop, ()))
+        return [s for s in stats if s is not None]
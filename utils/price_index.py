@@ -0,0 +1,80 @@
+import re
+from bisect import bisect_left, bisect_right
+from collections import namedtuple
+from datetime import datetime
+
+# One crop's price in one mandi. `price` is the parsed number (None if the display string has no number),
+# `price_text`/`last_updated` are the strings from mandi_prices.json, `date` is the parsed last_updated date.
+PriceEntry = namedtuple("PriceEntry", ["crop", "mandi", "price", "price_text", "last_updated", "date"])
+
+_NUMBER_PATTERN = re.compile(r"\d[\d,]*(?:\.\d+)?")
+
+
+def parse_price(price_text):
+    """'2,250 रुपये प्रति क्विंटल' -> 2250.0; None if there is no number."""
+    if isinstance(price_text, (int, float)):
+        return float(price_text)
+    match = _NUMBER_PATTERN.search(price_text or "")
+    return float(match.group().replace(",", "")) if match else None
+
+
+def parse_price_date(date_text):
+    """'13-05-2025' (DD-MM-YYYY, as in mandi_prices.json) -> date; None if it does not parse."""
+    try:
+        return datetime.strptime(date_text, "%d-%m-%Y").date()
+    except (TypeError, ValueError):
+        return None
+
+
+class MandiPriceIndex:
+    """
+    Inverted crop -> mandi price index built once from the mandi price data.
+
+    For every crop it keeps the entries in file order (for listings) and sorted by numeric price,
+    so cheapest/costliest/top-N answers are O(n) in the number of results and "near a price" queries
+    are O(log m + k) instead of a scan over every mandi.
+    """
+
+    def __init__(self, mandi_price_data):
+        by_crop = {}
+        self._by_crop_and_mandi = {}
+        for mandi, crops_in_mandi in (mandi_price_data or {}).items():
+            for crop, price_info in crops_in_mandi.items():
+                entry = PriceEntry(crop, mandi, parse_price(price_info.get("price")), price_info.get("price"),
+                                   price_info.get("last_updated"), parse_price_date(price_info.get("last_updated")))
+                by_crop.setdefault(crop, []).append(entry)
+                self._by_crop_and_mandi[(crop, mandi)] = entry
+
+        self._in_file_order = {crop: tuple(entries) for crop, entries in by_crop.items()}
+        self._by_price = {}
+        self._sorted_prices = {}
+        for crop, entries in by_crop.items():
+            priced = sorted((e for e in entries if e.price is not None), key=lambda e: e.price)
+            self._by_price[crop] = tuple(priced)
+            self._sorted_prices[crop] = tuple(e.price for e in priced)
+
+    def crops(self):
+        return list(self._in_file_order)
+
+    def lookup(self, crop, mandi):
+        """Returns the PriceEntry for a crop in a mandi, or None."""
+        return self._by_crop_and_mandi.get((crop, mandi))
+
+    def prices_for_crop(self, crop):
+        """All entries for a crop, in the order the mandis appear in the data file."""
+        return self._in_file_order.get(crop, ())
+
+    def cheapest(self, crop, n=1):
+        """The n lowest-priced entries for a crop, cheapest first."""
+        return self._by_price.get(crop, ())[:n]
+
+    def costliest(self, crop, n=1):
+        """The n highest-priced entries for a crop, costliest first."""
+        entries = self._by_price.get(crop, ())
+        return tuple(reversed(entries[max(len(entries) - n, 0):]))
+
+    def near_price(self, crop, target_price, tolerance):
+        """Entries for a crop whose price is within +/- tolerance of target_price, closest first."""
+        prices = self._sorted_prices.get(crop, ())
+        low, high = bisect_left(prices, target_price - tolerance), bisect_right(prices, target_price + tolerance)
+        return tuple(sorted(self._by_price[crop][low:high], key=lambda e: abs(e.price - target_price)))
@@ -0,0 +1,181 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+from config import settings
+
+# --- Session Stores ---
+# A session store keeps one conversation context dict per session id for api_server:
+#   get(session_id) -> context dict, or None if unknown or idle for longer than the TTL
+#   set(session_id, context), delete(session_id), stats() -> counters, len(store)
+# Contexts must be JSON-serialisable so every backend can hold them.
+
+
+class InMemorySessionStore:
+    """
+    Per-process store with a size cap (least recently used sessions are evicted first) and an idle TTL.
+    Sessions are kept in access order, so expired ones are always at the front and are swept in O(1)
+    amortised time on every write. Not shared between worker processes.
+    """
+    name = "memory"
+
+    def __init__(self, max_sessions=10000, idle_ttl_seconds=1800, clock=time.monotonic):
+        self.max_sessions = max_sessions
+        self.idle_ttl_seconds = idle_ttl_seconds
+        self._clock = clock
+        self._sessions = OrderedDict() # session_id -> [context, last_seen], least recently used first
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.expired = 0
+        self.evicted = 0
+
+    def get(self, session_id):
+        with self._lock:
+            now = self._clock()
+            entry = self._sessions.get(session_id)
+            if entry is not None and now - entry[1] > self.idle_ttl_seconds:
+                del self._sessions[session_id]
+                self.expired += 1
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            entry[1] = now
+            self._sessions.move_to_end(session_id)
+            return entry[0]
+
+    def set(self, session_id, context):
+        with self._lock:
+            now = self._clock()
+            self._sessions[session_id] = [context, now]
+            self._sessions.move_to_end(session_id)
+            while len(self._sessions) > self.max_sessions:
+                self._sessions.popitem(last=False)
+                self.evicted += 1
+            self._sweep(now)
+
+    def delete(self, session_id):
+        with self._lock:
+            self._sessions.pop(session_id, None)
+
+    def _sweep(self, now):
+        while self._sessions:
+            oldest_id, (_, last_seen) = next(iter(self._sessions.items()))
+            if now - last_seen <= self.idle_ttl_seconds:
+                break
+            del self._sessions[oldest_id]
+            self.expired += 1
+
+    def __len__(self):
+        return len(self._sessions)
+
+    def stats(self):
+        with self._lock:
+            return {"backend": self.name, "sessions": len(self._sessions), "hits": self.hits, "misses": self.misses,
+                    "expired": self.expired, "evicted": self.evicted}
+
+
+class SqliteSessionStore:
+    """
+    Store in a local SQLite file, shared by every worker process on the host (e.g. gunicorn workers),
+    so a follow-up turn can land on any worker. Idle sessions are deleted by a sweep that runs at most
+    every sweep_interval_seconds; the sweep also trims the table to max_sessions, oldest first.
+    Counters in stats() are per process; "sessions" is the shared total.
+    """
+    name = "sqlite"
+
+    def __init__(self, db_path, max_sessions=1000000, idle_ttl_seconds=1800, sweep_interval_seconds=60, clock=time.time):
+        self.db_path = db_path
+        self.max_sessions = max_sessions
+        self.idle_ttl_seconds = idle_ttl_seconds
+        self.sweep_interval_seconds = sweep_interval_seconds
+        self._clock = clock # Wall clock: last_seen is compared across processes
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._next_sweep = 0.0
+        self.hits = 0
+        self.misses = 0
+        self.expired = 0
+        self.evicted = 0
+        with self._connection() as connection:
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS sessions (session_id TEXT PRIMARY KEY, context TEXT NOT NULL, last_seen REAL NOT NULL)")
+            connection.execute("CREATE INDEX IF NOT EXISTS sessions_last_seen ON sessions (last_seen)")
+
+    def _connection(self):
+        local = self._local
+        if getattr(local, "pid", None) != os.getpid(): # One connection per thread, re-opened after a fork
+            local.connection = sqlite3.connect(self.db_path, timeout=30)
+            local.connection.execute("PRAGMA journal_mode=WAL")
+            local.connection.execute("PRAGMA synchronous=NORMAL")
+            local.pid = os.getpid()
+        return local.connection
+
+    def get(self, session_id):
+        now = self._clock()
+        with self._connection() as connection:
+            row = connection.execute("SELECT context, last_seen FROM sessions WHERE session_id = ?", (session_id,)).fetchone()
+            if row is not None and now - row[1] > self.idle_ttl_seconds:
+                connection.execute("DELETE FROM sessions WHERE session_id = ?", (session_id,))
+                self._count("expired")
+                row = None
+            if row is not None:
+                connection.execute("UPDATE sessions SET last_seen = ? WHERE session_id = ?", (now, session_id))
+        self._count("hits" if row is not None else "misses")
+        return json.loads(row[0]) if row is not None else None
+
+    def set(self, session_id, context):
+        now = self._clock()
+        with self._connection() as connection:
+            connection.execute(
+                "INSERT INTO sessions (session_id, context, last_seen) VALUES (?, ?, ?)"
+                " ON CONFLICT (session_id) DO UPDATE SET context = excluded.context, last_seen = excluded.last_seen",
+                (session_id, json.dumps(context, ensure_ascii=False), now))
+        if now >= self._next_sweep:
+            self.sweep(now)
+
+    def delete(self, session_id):
+        with self._connection() as connection:
+            connection.execute("DELETE FROM sessions WHERE session_id = ?", (session_id,))
+
+    def sweep(self, now=None):
+        """Deletes idle sessions, then the oldest ones beyond max_sessions."""
+        now = self._clock() if now is None else now
+        self._next_sweep = now + self.sweep_interval_seconds
+        with self._connection() as connection:
+            expired = connection.execute("DELETE FROM sessions WHERE last_seen < ?", (now - self.idle_ttl_seconds,)).rowcount
+            evicted = connection.execute(
+                "DELETE FROM sessions WHERE session_id IN"
+                " (SELECT session_id FROM sessions ORDER BY last_seen DESC LIMIT -1 OFFSET ?)", (self.max_sessions,)).rowcount
+        self._count("expired", expired)
+        self._count("evicted", evicted)
+
+    def _count(self, counter, amount=1):
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + amount)
+
+    def __len__(self):
+        return self._connection().execute("SELECT COUNT(*) FROM sessions").fetchone()[0]
+
+    def stats(self):
+        with self._lock:
+            counters = {"hits": self.hits, "misses": self.misses, "expired": self.expired, "evicted": self.evicted}
+        return {"backend": self.name, "sessions": len(self), **counters}
+
+
+def create_session_store(backend=None):
+    """
+    Builds the session store for settings.SESSION_STORE_BACKEND (or the given backend):
+    "memory" - per-process LRU with idle TTL; "sqlite" - SESSION_STORE_FILE, shared by all worker processes.
+    """
+    backend = backend or settings.SESSION_STORE_BACKEND
+    if backend == "memory":
+        return InMemorySessionStore(settings.SESSION_MAX_ENTRIES, settings.SESSION_IDLE_TTL_SECONDS)
+    if backend == "sqlite":
+        return SqliteSessionStore(settings.SESSION_STORE_FILE, settings.SESSION_MAX_ENTRIES, settings.SESSION_IDLE_TTL_SECONDS)
+    raise ValueError(f"Unknown session store backend: {backend!r} (expected 'memory' or 'sqlite')")
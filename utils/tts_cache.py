@@ -0,0 +1,131 @@
+import hashlib
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+
+from config import settings
+from utils import log
+
+logger = log.get_logger(__name__)
+
+# --- Speech Audio Cache ---
+# Synthesised speech (MP3 from gTTS) on disk, so repeated answers (the help text, follow-up questions,
+# crop advice) play without a network call. Files are content-addressed: the name is a hash of
+# (text, language, speed), so the same words always map to the same file and no index file is needed.
+# The least recently played files are deleted once the directory grows beyond max_bytes; a file's
+# mtime is its last use, so the order survives restarts.
+
+
+def audio_key(text, lang, slow=False):
+    """The cache key (hex SHA-256) for speaking text in lang at the given speed."""
+    return hashlib.sha256(f"{lang}\0{int(bool(slow))}\0{text}".encode("utf-8")).hexdigest()
+
+
+class TTSAudioCache:
+    """
+    Size-capped LRU cache of audio files in one directory, safe to share between threads.
+    get() returns the path of a cached file, put() stores new audio and returns its path.
+    """
+    SUFFIX = ".mp3"
+
+    def __init__(self, directory, max_bytes=200 * 1024 * 1024):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._files = None # key -> size in bytes, least recently used first; read from disk on first use
+        self._total_bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evicted = 0
+
+    def _path(self, key):
+        return os.path.join(self.directory, key + self.SUFFIX)
+
+    def _load(self):
+        """Indexes the files already in the directory, oldest use first (caller holds the lock)."""
+        if self._files is not None:
+            return
+        os.makedirs(self.directory, exist_ok=True)
+        entries = []
+        with os.scandir(self.directory) as scan:
+            for entry in scan:
+                if entry.is_file() and entry.name.endswith(self.SUFFIX):
+                    stat = entry.stat()
+                    entries.append((stat.st_mtime, entry.name[:-len(self.SUFFIX)], stat.st_size))
+        entries.sort()
+        self._files = OrderedDict((key, size) for _, key, size in entries)
+        self._total_bytes = sum(self._files.values())
+
+    def get(self, text, lang, slow=False):
+        """Path of the cached audio for (text, lang, slow), or None on a miss."""
+        key = audio_key(text, lang, slow)
+        with self._lock:
+            self._load()
+            if key in self._files:
+                path = self._path(key)
+                try:
+                    os.utime(path) # Mark as recently used for the next process too
+                except FileNotFoundError: # Deleted behind our back (e.g. by another process's eviction)
+                    self._total_bytes -= self._files.pop(key)
+                else:
+                    self._files.move_to_end(key)
+                    self.hits += 1
+                    return path
+            self.misses += 1
+            return None
+
+    def put(self, text, lang, slow, audio):
+        """
+        Stores audio (bytes) for (text, lang, slow) and returns its path. The file is written under a
+        temporary name and renamed, so a reader never sees half a file.
+        """
+        key = audio_key(text, lang, slow)
+        path = self._path(key)
+        with self._lock:
+            self._load()
+            descriptor, temporary_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+            try:
+                with os.fdopen(descriptor, "wb") as f:
+                    f.write(audio)
+                os.replace(temporary_path, path)
+            except BaseException:
+                if os.path.exists(temporary_path):
+                    os.remove(temporary_path)
+                raise
+            self._total_bytes += len(audio) - self._files.get(key, 0)
+            self._files[key] = len(audio)
+            self._files.move_to_end(key)
+            self._evict()
+        return path
+
+    def _evict(self):
+        # The newest file is kept even if it alone is over the cap: it is about to be played
+        while self._total_bytes > self.max_bytes and len(self._files) > 1:
+            key, size = self._files.popitem(last=False)
+            self._total_bytes -= size
+            self.evicted += 1
+            try:
+                os.remove(self._path(key))
+            except FileNotFoundError:
+                pass
+            except OSError as e: # E.g. the file is still open for playback on Windows
+                logger.warning("Could not remove cached audio %s: %s", key, e)
+
+    def stats(self):
+        with self._lock:
+            self._load()
+            return {"files": len(self._files), "bytes": self._total_bytes, "max_bytes": self.max_bytes,
+                    "hits": self.hits, "misses": self.misses, "evicted": self.evicted}
+
+    def __len__(self):
+        with self._lock:
+            self._load()
+            return len(self._files)
+
+
+def create_tts_cache():
+    """The speech cache for settings.TTS_CACHE_DIR, or None if TTS_CACHE_MAX_BYTES is 0 (caching off)."""
+    if not settings.TTS_CACHE_MAX_BYTES:
+        return None
+    return TTSAudioCache(settings.TTS_CACHE_DIR, settings.TTS_CACHE_MAX_BYTES)
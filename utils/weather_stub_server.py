@@ -0,0 +1,107 @@
+"""
+Local stand-in for the OpenWeatherMap current-weather API.
+
+Serves GET /data/2.5/weather?q=<city>[,IN]&appid=... from weather_static.json with the
+same response shape (and the same {"cod": "404", ...} error body for unknown cities), so
+the live weather path can be run and load-tested without internet access:
+
+    python -m utils.weather_stub_server --port 8089 [--static-file tests/fixtures/weather_static.json]
+    OPENWEATHERMAP_BASE_URL=http://127.0.0.1:8089/data/2.5/weather OPENWEATHERMAP_API_KEY=stub python api_server.py
+"""
+import argparse
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+from config import settings
+from utils import log
+from utils.api_clients import StaticWeatherProvider
+
+logger = log.get_logger(__name__)
+
+WEATHER_PATH = "/data/2.5/weather"
+
+
+class _StubWeatherHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1" # Keep-alive, like the real API
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        if url.path != WEATHER_PATH:
+            return self._send_json(404, {"cod": "404", "message": "Internal error"})
+        query = parse_qs(url.query)
+        if not query.get("appid"):
+            return self._send_json(401, {"cod": 401, "message": "Invalid API key."})
+
+        stub = self.server
+        if stub.latency_seconds:
+            time.sleep(stub.latency_seconds)
+        if stub.error_rate and random.random() < stub.error_rate:
+            return self._send_json(503, {"cod": "503", "message": "Service unavailable (simulated)"})
+
+        city_name = query.get("q", [""])[0].split(",")[0] # "<city>,IN" -> "<city>"
+        weather_data = stub.provider.get(city_name)
+        if weather_data is None:
+            return self._send_json(404, {"cod": "404", "message": "city not found"})
+        weather_data.pop("source", None)
+        self._send_json(200, weather_data)
+
+    def _send_json(self, status, body):
+        payload = json.dumps(body, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, format, *args):
+        logger.debug("%s - " + format, self.address_string(), *args)
+
+
+def create_stub_server(host="127.0.0.1", port=0, static_file=None, latency_seconds=0.0, error_rate=0.0):
+    """
+    Creates (but does not start) the stand-in server. port=0 picks a free port.
+    Args:
+        static_file (str, optional): Snapshot to serve; defaults to settings.WEATHER_STATIC_FILE.
+        latency_seconds (float): Artificial delay added to every answer.
+        error_rate (float): Share of requests answered with a simulated 503.
+    Returns:
+        ThreadingHTTPServer: Call serve_forever() (or use start_stub_server) to run it.
+    """
+    server = ThreadingHTTPServer((host, port), _StubWeatherHandler)
+    server.daemon_threads = True
+    server.provider = StaticWeatherProvider(static_file or settings.WEATHER_STATIC_FILE)
+    server.latency_seconds = latency_seconds
+    server.error_rate = error_rate
+    return server
+
+
+def start_stub_server(**kwargs):
+    """Starts the stand-in on a background thread and returns (server, base_url)."""
+    server = create_stub_server(**kwargs)
+    threading.Thread(target=server.serve_forever, name="weather-stub-server", daemon=True).start()
+    host, port = server.server_address[:2]
+    return server, f"http://{host}:{port}{WEATHER_PATH}"
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Local OpenWeatherMap stand-in backed by weather_static.json")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8089)
+    parser.add_argument("--static-file", default=None, help="Snapshot file to serve (default: settings.WEATHER_STATIC_FILE)")
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="Artificial delay per request")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Share of requests answered with 503")
+    args = parser.parse_args()
+    log.configure_logging()
+
+    stub = create_stub_server(args.host, args.port, args.static_file, args.latency_ms / 1000.0, args.error_rate)
+    print(f"Weather stub serving {len(stub.provider.cities())} cities at http://{args.host}:{args.port}{WEATHER_PATH}")
+    try:
+        stub.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        stub.server_close()